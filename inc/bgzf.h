@@ -0,0 +1,56 @@
+/*
+ * Copyright (C) 2012 by
+ * Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+ * ... and other members of the Reconstruction Team of David Haussler's
+ * lab (BME Dept. UCSC).
+ *
+ * Permission is hereby granted, free of charge, to any person obtaining a copy
+ * of this software and associated documentation files (the "Software"), to deal
+ * in the Software without restriction, including without limitation the rights
+ * to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+ * copies of the Software, and to permit persons to whom the Software is
+ * furnished to do so, subject to the following conditions:
+ *
+ * The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+ *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+ * AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+ * LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+ * OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+ * THE SOFTWARE.
+ */
+#ifndef BGZF_H_
+#define BGZF_H_
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdio.h>
+
+// BGZF, blocked gzip, is gzip made of a series of small members that each say
+// how long they are compressed. Any gzip reader can read it, and a position in
+// the uncompressed data can be given as a virtual offset,
+//     (file offset of the member) << 16 | (offset into its uncompressed data),
+// which can be seeked to directly.
+typedef struct bgzfReader bgzfReader_t;
+typedef struct bgzfWriter bgzfWriter_t;
+
+bool bgzf_isGzip(const char *s, size_t n); // s holds the first n bytes of a file
+// reader. prefix holds bytes already read from f while looking at the file,
+// plain (non blocked) gzip is read too but can not be seeked.
+bgzfReader_t* bgzf_newReader(FILE *f, const char *filename, const char *prefix, size_t n);
+void bgzf_destroyReader(bgzfReader_t *r);
+void bgzf_setThreads(bgzfReader_t *r, unsigned n); // decompression threads, 0 decompresses inline
+size_t bgzf_read(bgzfReader_t *r, char *buf, size_t n); // as fread(), 0 at the end of the data
+bool bgzf_isSeekable(bgzfReader_t *r);
+uint64_t bgzf_virtualOffset(bgzfReader_t *r, uint64_t position); // position in the uncompressed data
+void bgzf_discardBefore(bgzfReader_t *r, uint64_t position); // positions before will not be asked for
+uint64_t bgzf_seek(bgzfReader_t *r, uint64_t virtualOffset); // returns the new position
+// writer
+bgzfWriter_t* bgzf_newWriter(FILE *f, const char *filename);
+void bgzf_write(bgzfWriter_t *w, const char *s, size_t n);
+uint64_t bgzf_writerVirtualOffset(bgzfWriter_t *w); // of the next byte written
+void bgzf_destroyWriter(bgzfWriter_t *w); // flushes and writes the end of file marker, f is left open
+
+#endif // BGZF_H_
@@ -24,6 +24,7 @@
  */
 #ifndef COMMON_H_
 #define COMMON_H_
+#include <stdbool.h>
 #include <stdio.h>
 #include <stdint.h>
 
@@ -32,6 +33,7 @@ extern int g_debug_flag;
 extern const int kMaxStringLength;
 extern const int kMaxMessageLength;
 extern const int kMaxSeqName;
+extern const unsigned kMaxThreads;
 
 void de_verbose(char const *fmt, ...);
 void de_debug(char const *fmt, ...);
@@ -47,5 +49,35 @@ int minint(int a, int b);
 char* de_strtok(char **s, char t);
 unsigned countChar(char *s, const char c);
 char** extractSubStrings(char *nameList, unsigned n, const char delineator);
+bool parseThreads(const char *s, unsigned *threads);
+
+// profiling. Tools built with -DMAFTOOLS_PROFILING (`make PROFILE=1') and run
+// with the environment variable MAFTOOLS_PROFILE=path write a json report of
+// their phase timings, counters and peak memory to path when they exit. The
+// run's wallSeconds and cpuSeconds are counted from program start.
+// Otherwise the PROFILE_ macros compile to nothing. Phases are named by
+// string literals and are begun and ended from the main thread, counters may
+// be bumped from any thread.
+typedef enum {
+    kProfileBytesRead = 0,
+    kProfileBlocksParsed,
+    kProfileLinesParsed,
+    kProfileParseAllocations,
+    kProfileNumberOfCounters
+} profileCounter_t;
+void de_profile_begin(const char *phase);
+void de_profile_end(const char *phase);
+void de_profile_count(profileCounter_t counter, uint64_t n);
+uint64_t de_profile_getCount(profileCounter_t counter);
+void de_profile_writeReport(FILE *f);
+#ifdef MAFTOOLS_PROFILING
+#define PROFILE_BEGIN(phase) de_profile_begin(phase)
+#define PROFILE_END(phase) de_profile_end(phase)
+#define PROFILE_COUNT(counter, n) de_profile_count((counter), (n))
+#else
+#define PROFILE_BEGIN(phase) ((void) 0)
+#define PROFILE_END(phase) ((void) 0)
+#define PROFILE_COUNT(counter, n) ((void) 0)
+#endif
 
 #endif // COMMON_H_
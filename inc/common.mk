@@ -37,9 +37,18 @@ cflags_prof = -Wall --pedantic -pg -O3 -g
 
 sonLibPath = ../../sonLib/lib
 
+# zlib and pthreads, for gzip input and output in lib/bgzf.c
+lz = -lz -lpthread
+
+#Phase timers and read counters, reported to the file named by the
+#MAFTOOLS_PROFILE environment variable. Build with `make clean && make PROFILE=1'.
+ifneq (${PROFILE},)
+	cflags_profiling = -DMAFTOOLS_PROFILING
+endif
+
 #Flags to use
-cflags = ${cflags_opt} -I ${sonLibPath} -I ../inc -I ../external
-testFlags = -O0 -g -Wall --pedantic -I ${sonLibPath} -I ../inc -I ../external
+cflags = ${cflags_opt} ${cflags_profiling} -I ${sonLibPath} -I ../inc -I ../external
+testFlags = -O0 -g -Wall --pedantic ${cflags_profiling} -I ${sonLibPath} -I ../inc -I ../external
 #cflags = ${cflags_dbg}
 
 # location of Tokyo cabinet
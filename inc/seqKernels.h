@@ -0,0 +1,53 @@
+/*
+ * Copyright (C) 2012 by
+ * Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+ * ... and other members of the Reconstruction Team of David Haussler's
+ * lab (BME Dept. UCSC).
+ *
+ * Permission is hereby granted, free of charge, to any person obtaining a copy
+ * of this software and associated documentation files (the "Software"), to deal
+ * in the Software without restriction, including without limitation the rights
+ * to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+ * copies of the Software, and to permit persons to whom the Software is
+ * furnished to do so, subject to the following conditions:
+ *
+ * The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+ *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+ * AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+ * LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+ * OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+ * THE SOFTWARE.
+ */
+#ifndef SEQKERNELS_H_
+#define SEQKERNELS_H_
+#include <stddef.h>
+#include <stdint.h>
+
+// Kernels over alignment sequence text. Each has a lookup table version and,
+// on x86, SSE2 and AVX2 versions picked at run time from what the cpu supports.
+// All of them give the same results at every level.
+typedef enum seqKernelsLevel {
+  kSeqKernelsScalar = 0,
+  kSeqKernelsSse2 = 1,
+  kSeqKernelsAvx2 = 2
+} seqKernelsLevel_t;
+
+seqKernelsLevel_t seq_getKernelLevel(void); // the level in use
+void seq_setKernelLevel(seqKernelsLevel_t level); // use at most this level, for testing and benchmarking
+const char* seq_kernelLevelName(seqKernelsLevel_t level);
+// in place, upper and lower case and full iupac. Any other character is an error.
+void seq_complement(char *s, size_t n);
+void seq_reverseComplement(char *s, size_t n);
+void seq_toUpper(char *s, size_t n); // in place, a-z only
+uint64_t seq_countGaps(const char *s, size_t n); // '-' characters
+uint64_t seq_countNs(const char *s, size_t n); // 'N' and 'n' characters
+// out[i] is the number of non-gap characters in s[0, i), out holds n + 1 values.
+void seq_nonGapPrefixSum(const char *s, size_t n, uint64_t *out);
+// out[i] is table[c], c the i-th 4 bit code of packed, the low half of each byte first.
+void seq_unpackNibbles(char *out, const uint8_t *packed, size_t n, const char table[16]);
+
+#endif // SEQKERNELS_H_
@@ -26,13 +26,22 @@
 #define SHAREDMAF_H_
 #include <stdbool.h>
 #include <stdint.h>
+#include <stdio.h>
 
 typedef struct mafFileApi mafFileApi_t;
 typedef struct mafBlock mafBlock_t;
 typedef struct mafLine mafLine_t;
+typedef struct mafIndex mafIndex_t;
+typedef struct mafBlockPipeline mafBlockPipeline_t;
+typedef struct mafWriter mafWriter_t;
+typedef struct mafSequenceMatrix mafSequenceMatrix_t;
+typedef struct mafNameDict mafNameDict_t;
+typedef struct mafCoordinateMap mafCoordinateMap_t;
+typedef struct mafBinaryWriter mafBinaryWriter_t;
+typedef struct mafBlockCursor mafBlockCursor_t;
 
 // creators, destroyers
-mafFileApi_t* maf_newMfa(const char *filename, char const *mode);
+mafFileApi_t* maf_newMfa(const char *filename, char const *mode); // mode "rm" memory maps the file
 mafBlock_t* maf_newMafBlock(void);
 mafBlock_t* maf_newMafBlockFromString(const char *s, uint64_t lineNumber);
 mafBlock_t* maf_newMafBlockListFromString(const char *s, uint64_t lineNumber);
@@ -49,14 +58,20 @@ void maf_mafBlock_destroySequenceMatrix(char **mat, unsigned n);
 // read / write
 mafBlock_t* maf_readAll(mafFileApi_t *mfa);
 mafBlock_t* maf_readBlock(mafFileApi_t *mfa);
+mafBlock_t* maf_readBlockInto(mafFileApi_t *mfa, mafBlock_t *mb); // reuses mb's storage
 mafBlock_t* maf_readBlockHeader(mafFileApi_t *mfa);
 mafBlock_t* maf_readBlockBody(mafFileApi_t *mfa);
+int64_t maf_mafFileApi_readLine(mafFileApi_t *mfa, char **line); // view valid until next read
+void maf_mafFileApi_setLazyParsing(mafFileApi_t *mfa, bool lazy); // parse s line fields on first use
+void maf_mafFileApi_setDecompressionThreads(mafFileApi_t *mfa, unsigned n); // gzip input only
+void maf_mafFileApi_setNameInterning(mafFileApi_t *mfa, bool intern); // give lines name ids as read
 void maf_writeAll(mafFileApi_t *mfa, mafBlock_t *mb);
 void maf_writeBlock(mafFileApi_t *mfa, mafBlock_t *mb);
 uint64_t maf_mafFileApi_getLineNumber(mafFileApi_t *mfa);
 // getters
 char* maf_mafFileApi_getFilename(mafFileApi_t *mfa);
 uint64_t maf_mafFileApi_getLineNumber(mafFileApi_t *mfa);
+mafNameDict_t* maf_mafFileApi_getNameDict(mafFileApi_t *mfa);
 mafLine_t* maf_mafBlock_getHeadLine(mafBlock_t *mb);
 mafLine_t* maf_mafBlock_getTailLine(mafBlock_t *mb);
 uint64_t maf_mafBlock_getLineNumber(mafBlock_t *mb);
@@ -74,6 +89,26 @@ mafBlock_t* maf_mafBlock_getNext(mafBlock_t *mb);
 char** maf_mafBlock_getSequenceMatrix(mafBlock_t *mb, unsigned n, unsigned m);
 mafLine_t** maf_mafBlock_getMafLineArray_seqOnly(mafBlock_t *mb);
 uint64_t maf_mafBlock_getSequenceFieldLength(mafBlock_t *mb);
+// read-only columnar views of the s lines, built on first use and owned by the block.
+// They stay valid until the block is changed or destroyed.
+const char* maf_mafBlock_getStrandArrayView(mafBlock_t *mb);
+const int* maf_mafBlock_getStrandIntArrayView(mafBlock_t *mb);
+const uint64_t* maf_mafBlock_getStartArrayView(mafBlock_t *mb);
+const uint64_t* maf_mafBlock_getPosCoordStartArrayView(mafBlock_t *mb);
+const uint64_t* maf_mafBlock_getPosCoordLeftArrayView(mafBlock_t *mb);
+const uint64_t* maf_mafBlock_getSourceLengthArrayView(mafBlock_t *mb);
+const uint64_t* maf_mafBlock_getSequenceLengthArrayView(mafBlock_t *mb);
+char* const* maf_mafBlock_getSpeciesArrayView(mafBlock_t *mb);
+const uint32_t* maf_mafBlock_getNameIdArrayView(mafBlock_t *mb);
+const uint32_t* maf_mafBlock_getSpeciesIdArrayView(mafBlock_t *mb);
+mafLine_t* const* maf_mafBlock_getMafLineArrayView_seqOnly(mafBlock_t *mb);
+void maf_mafBlock_invalidateArrayViews(mafBlock_t *mb); // after changing a block's lines directly
+// read-only sequence matrix owned by the block, rows borrowed from the lines where possible
+mafSequenceMatrix_t* maf_mafBlock_getSequenceMatrixView(mafBlock_t *mb);
+uint64_t maf_mafSequenceMatrix_getNumberOfRows(mafSequenceMatrix_t *mat);
+uint64_t maf_mafSequenceMatrix_getNumberOfColumns(mafSequenceMatrix_t *mat);
+char** maf_mafSequenceMatrix_getRows(mafSequenceMatrix_t *mat); // rows[r][c]
+const char* maf_mafSequenceMatrix_getColumn(mafSequenceMatrix_t *mat, uint64_t c); // column c, n contiguous chars
 char* maf_mafLine_getLine(mafLine_t *ml);
 uint64_t maf_mafLine_getLineNumber(mafLine_t *ml);
 char maf_mafLine_getType(mafLine_t *ml);
@@ -83,8 +118,11 @@ uint64_t maf_mafLine_getLength(mafLine_t *ml);
 char maf_mafLine_getStrand(mafLine_t *ml);
 uint64_t maf_mafLine_getSourceLength(mafLine_t *ml);
 char* maf_mafLine_getSequence(mafLine_t *ml);
+char* maf_mafLine_getMutableSequence(mafLine_t *ml); // copy-on-write, leaves the line text intact
 uint64_t maf_mafLine_getSequenceFieldLength(mafLine_t *ml);
 mafLine_t* maf_mafLine_getNext(mafLine_t *ml);
+uint32_t maf_mafLine_getNameId(mafLine_t *ml); // kMafNoNameId unless read with name interning on
+uint32_t maf_mafLine_getSpeciesId(mafLine_t *ml);
 // setters
 void maf_mafBlock_setHeadLine(mafBlock_t *mb, mafLine_t *ml);
 void maf_mafBlock_setTailLine(mafBlock_t *mb, mafLine_t *ml);
@@ -117,6 +155,16 @@ char* maf_mafLine_imputeLine(mafLine_t* ml);
 uint64_t maf_mafLine_getNumberOfSequences(mafLine_t *m);
 uint64_t maf_mafLine_getPositiveCoord(mafLine_t *ml);
 uint64_t maf_mafLine_getPositiveLeftCoord(mafLine_t *ml);
+// column <-> coordinate maps, built on first use and owned by the line
+mafCoordinateMap_t* maf_mafLine_getCoordinateMap(mafLine_t *ml);
+uint64_t maf_mafCoordinateMap_getNumberOfColumns(mafCoordinateMap_t *map);
+uint64_t maf_mafCoordinateMap_getNumberOfBases(mafCoordinateMap_t *map);
+uint64_t maf_mafCoordinateMap_getBasesBefore(mafCoordinateMap_t *map, uint64_t c); // in columns [0, c)
+int64_t maf_mafCoordinateMap_getColumnOfBase(mafCoordinateMap_t *map, uint64_t k); // -1 past the end
+int64_t maf_mafLine_getPositiveCoordOfColumn(mafLine_t *ml, uint64_t c); // -1 for a gap
+int64_t maf_mafLine_getColumnOfPositiveCoord(mafLine_t *ml, uint64_t pos); // -1 if not in the line
+bool maf_mafLine_getColumnRange(mafLine_t *ml, uint64_t start, uint64_t stop,
+                                uint64_t *firstColumn, uint64_t *lastColumn);
 unsigned umax(unsigned a, unsigned b);
 uint64_t countNonGaps(char *seq);
 void maf_mafBlock_flipStrand(mafBlock_t *mb);
@@ -128,4 +176,65 @@ char *copyChromosomeName(const char *s); // hg18.chr1 -> chr1
 // print
 void maf_mafBlock_printList(mafBlock_t *m);
 void maf_mafBlock_print(mafBlock_t *m);
+void maf_mafBlock_fprint(FILE *f, mafBlock_t *m);
+// buffered output
+mafWriter_t* maf_newMafWriter(FILE *f, bool threaded);
+void maf_destroyMafWriter(mafWriter_t *w); // flushes, f is left open
+void maf_mafWriter_flush(mafWriter_t *w);
+void maf_mafWriter_write(mafWriter_t *w, const char *s, size_t n);
+void maf_mafWriter_writeString(mafWriter_t *w, const char *s);
+void maf_mafWriter_writeChar(mafWriter_t *w, char c);
+void maf_mafWriter_writePadded(mafWriter_t *w, const char *s, size_t width); // printf("%-*s")
+void maf_mafWriter_writeUInt(mafWriter_t *w, uint64_t x, size_t width); // printf("%*" PRIu64)
+void maf_mafWriter_writeInt(mafWriter_t *w, int64_t x, size_t width); // printf("%*" PRIi64)
+void maf_mafWriter_writeBlock(mafWriter_t *w, mafBlock_t *mb); // lines verbatim, as maf_writeBlock()
+void maf_mafWriter_printBlock(mafWriter_t *w, mafBlock_t *mb); // as maf_mafBlock_print()
+// interned names, ids are dense and given out in order of first appearance
+extern const uint32_t kMafNoNameId;
+mafNameDict_t* maf_newMafNameDict(void);
+void maf_destroyMafNameDict(mafNameDict_t *d);
+uint32_t maf_mafNameDict_intern(mafNameDict_t *d, const char *name); // hg18.chr1 also interns hg18
+uint32_t maf_mafNameDict_lookup(mafNameDict_t *d, const char *name); // kMafNoNameId if unseen
+uint32_t maf_mafNameDict_lookupSpecies(mafNameDict_t *d, const char *species);
+const char* maf_mafNameDict_getName(mafNameDict_t *d, uint32_t nameId);
+const char* maf_mafNameDict_getSpecies(mafNameDict_t *d, uint32_t speciesId);
+uint32_t maf_mafNameDict_getSpeciesId(mafNameDict_t *d, uint32_t nameId);
+uint32_t maf_mafNameDict_getNumberOfNames(mafNameDict_t *d);
+uint32_t maf_mafNameDict_getNumberOfSpecies(mafNameDict_t *d);
+// .mafb binary maf, read transparently by every reader above
+mafBinaryWriter_t* maf_newMafBinaryWriter(FILE *f);
+void maf_mafBinaryWriter_writeBlock(mafBinaryWriter_t *w, mafBlock_t *mb); // keeps mb's line numbers
+void maf_destroyMafBinaryWriter(mafBinaryWriter_t *w); // writes the tables and flushes, f is left open
+// .mafidx block index
+void maf_writeMafIndex(const char *filename); // writes filename.mafidx
+mafIndex_t* maf_newMafIndex(const char *filename); // NULL if missing or out of date
+void maf_destroyMafIndex(mafIndex_t *idx);
+uint64_t maf_mafIndex_query(mafIndex_t *idx, const char *name, uint64_t start, uint64_t stop);
+uint64_t maf_mafIndex_queryPrefix(mafIndex_t *idx, const char *prefix, uint64_t start, uint64_t stop);
+void maf_mafIndex_clearHits(mafIndex_t *idx);
+uint64_t maf_mafIndex_getNumberOfHits(mafIndex_t *idx);
+uint64_t maf_mafIndex_getBlockNumber(mafIndex_t *idx, uint64_t i);
+mafBlock_t* maf_mafIndex_readBlock(mafIndex_t *idx, mafFileApi_t *mfa, uint64_t i);
+mafBlock_t* maf_mafIndex_readBlockInto(mafIndex_t *idx, mafFileApi_t *mfa, uint64_t i, mafBlock_t *mb);
+// chunked parallel reading
+mafFileApi_t** maf_newMfaChunks(const char *filename, unsigned n, unsigned *numberOfChunks);
+void maf_destroyMfaChunks(mafFileApi_t **chunks, unsigned n);
+unsigned maf_readBlocksParallel(const char *filename, unsigned n, bool lazy,
+                                void (*f)(mafBlock_t *mb, unsigned chunk, void *data), void *data);
+// line at a time reading, for blocks too large to hold in memory
+mafBlockCursor_t* maf_newMafBlockCursor(mafFileApi_t *mfa);
+void maf_destroyMafBlockCursor(mafBlockCursor_t *bc); // mfa is left open
+bool maf_blockCursor_nextBlock(mafBlockCursor_t *bc); // false at the end of the file
+mafLine_t* maf_blockCursor_next(mafBlockCursor_t *bc); // NULL at the end of the block, valid until the next call
+uint64_t maf_blockCursor_getLineNumber(mafBlockCursor_t *bc); // of the block, as maf_mafBlock_getLineNumber()
+uint64_t maf_blockCursor_getNumberOfLines(mafBlockCursor_t *bc); // returned from the block so far
+uint64_t maf_blockCursor_getNumberOfSequences(mafBlockCursor_t *bc); // returned from the block so far
+// pipelined reading, blocks are read ahead on a separate thread
+extern const unsigned kMafBlockPipelineDepth; // a sensible capacity for maf_newMafBlockPipeline()
+mafBlockPipeline_t* maf_newMafBlockPipeline(mafFileApi_t *mfa, unsigned capacity);
+mafBlock_t* maf_mafBlockPipeline_readBlock(mafBlockPipeline_t *bp);
+void maf_destroyMafBlockPipeline(mafBlockPipeline_t *bp);
+// ordered parallel processing, output is written in input order whatever the number of threads
+void maf_processBlocksInOrder(mafFileApi_t *mfa, unsigned threads,
+                              void (*f)(mafBlock_t *mb, uint64_t i, FILE *out, void *data), void *data, FILE *out);
 #endif // SHAREDMAF_H_
@@ -25,6 +25,7 @@
 #ifndef TEST_COMMON_H_
 #define TEST_COMMON_H_
 #include <assert.h>
+#include <string.h>
 #include "CuTest.h"
 #include "common.h"
 
@@ -38,10 +39,39 @@ static void test_de_malloc(CuTest *testCase) {
     }
     free(t);
 }
+static void test_de_profile(CuTest *testCase) {
+    assert(testCase != NULL);
+    uint64_t before = de_profile_getCount(kProfileLinesParsed);
+    de_profile_count(kProfileLinesParsed, 3);
+    CuAssertTrue(testCase, de_profile_getCount(kProfileLinesParsed) == before + 3);
+    de_profile_begin("testPhase");
+    de_profile_end("testPhase");
+    de_profile_begin("testPhase");
+    de_profile_begin("running \"phase\"");
+    de_profile_end("testPhase");
+    de_profile_end("never begun");
+    FILE *f = tmpfile();
+    CuAssertTrue(testCase, f != NULL);
+    de_profile_writeReport(f);
+    long n = ftell(f);
+    char *report = (char *) de_malloc(n + 1);
+    rewind(f);
+    CuAssertTrue(testCase, fread(report, 1, n, f) == (size_t) n);
+    report[n] = '\0';
+    fclose(f);
+    CuAssertTrue(testCase, strstr(report, "\"wallSeconds\": ") != NULL);
+    CuAssertTrue(testCase, strstr(report, "\"peakResidentBytes\": ") != NULL);
+    CuAssertTrue(testCase, strstr(report, "\"linesParsed\": ") != NULL);
+    CuAssertTrue(testCase, strstr(report, "{\"name\": \"testPhase\", \"calls\": 2, ") != NULL);
+    CuAssertTrue(testCase, strstr(report, "{\"name\": \"running \\\"phase\\\"\", \"calls\": 1, ") != NULL);
+    CuAssertTrue(testCase, strstr(report, "never begun") == NULL);
+    free(report);
+}
 
 CuSuite* common_TestSuite(void) {
     CuSuite* suite = CuSuiteNew();
     SUITE_ADD_TEST(suite, test_de_malloc);
+    SUITE_ADD_TEST(suite, test_de_profile);
     return suite;
 }
 
@@ -0,0 +1,383 @@
+/*
+ * Copyright (C) 2012 by
+ * Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+ * ... and other members of the Reconstruction Team of David Haussler's
+ * lab (BME Dept. UCSC).
+ *
+ * Permission is hereby granted, free of charge, to any person obtaining a copy
+ * of this software and associated documentation files (the "Software"), to deal
+ * in the Software without restriction, including without limitation the rights
+ * to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+ * copies of the Software, and to permit persons to whom the Software is
+ * furnished to do so, subject to the following conditions:
+ *
+ * The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+ *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+ * AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+ * LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+ * OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+ * THE SOFTWARE.
+ */
+/*
+ * Throughput benchmarks for the sharedMaf reading paths.
+ * usage: ./benchmark [path to maf]
+ *        ./benchmark --kernels
+ * If no maf is given a synthetic one is written to benchmark_tmp/. With
+ * --kernels only the sequence kernels are timed, in GB/s.
+ */
+#define _POSIX_C_SOURCE 200809L
+#include <inttypes.h>
+#include <stdbool.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/stat.h>
+#include <time.h>
+#include <unistd.h>
+#include "common.h"
+#include "sharedMaf.h"
+#include "seqKernels.h"
+
+static const char *kBenchmarkMaf = "benchmark_tmp/benchmark.maf";
+static const char *kBenchmarkGzMaf = "benchmark_tmp/benchmark.maf.gz";
+static const char *kBenchmarkBinaryMaf = "benchmark_tmp/benchmark.mafb";
+static const uint64_t kBenchmarkBytes = 1 << 26;
+
+static double wallTime(void) {
+  struct timespec ts;
+  clock_gettime(CLOCK_MONOTONIC, &ts);
+  return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+static uint64_t fileSize(const char *filename) {
+  struct stat st;
+  if (stat(filename, &st) != 0) {
+    fprintf(stderr, "Error, unable to stat %s\n", filename);
+    exit(EXIT_FAILURE);
+  }
+  return (uint64_t) st.st_size;
+}
+static void writeSyntheticMaf(const char *filename, uint64_t targetBytes) {
+  // write a deterministic maf of roughly targetBytes bytes.
+  const char *bases = "ACGTacgtN-";
+  unsigned numSpecies = 10, width = 200;
+  char *seq = (char*) de_malloc(width + 1);
+  FILE *f = de_fopen(filename, "w");
+  uint64_t written = 0, start = 0;
+  srand(1);
+  written += fprintf(f, "##maf version=1 scoring=benchmark\n\n");
+  while (written < targetBytes) {
+    written += fprintf(f, "a score=%d.0\n", rand() % 100000);
+    for (unsigned s = 0; s < numSpecies; ++s) {
+      uint64_t length = 0;
+      for (unsigned i = 0; i < width; ++i) {
+        seq[i] = bases[rand() % 10];
+        if (seq[i] != '-') {
+          ++length;
+        }
+      }
+      seq[width] = '\0';
+      written += fprintf(f, "s species%u.chr%u %10" PRIu64 " %3" PRIu64 " %c 1000000000 %s\n",
+                         s, s % 3, start, length, (rand() % 2) ? '+' : '-', seq);
+    }
+    written += fprintf(f, "\n");
+    start += width;
+  }
+  fclose(f);
+  free(seq);
+}
+static void report(const char *name, uint64_t bytes, double seconds, uint64_t count, const char *unit) {
+  printf("%-28s %10.1f MB/s %12" PRIu64 " %s in %.3f s\n",
+         name, (bytes / (1024.0 * 1024.0)) / seconds, count, unit, seconds);
+}
+static void benchmark_deGetline(const char *filename, uint64_t bytes) {
+  // the original per character reader
+  int64_t n = kMaxStringLength;
+  char *line = (char*) de_malloc(n);
+  uint64_t lines = 0;
+  double t = wallTime();
+  FILE *f = de_fopen(filename, "r");
+  while (de_getline(&line, &n, f) != -1) {
+    ++lines;
+  }
+  fclose(f);
+  report("de_getline", bytes, wallTime() - t, lines, "lines");
+  free(line);
+}
+static void benchmark_readLine(const char *filename, uint64_t bytes) {
+  // the block buffered reader inside mafFileApi_t
+  char *line = NULL;
+  uint64_t lines = 0;
+  double t = wallTime();
+  mafFileApi_t *mfa = maf_newMfa(filename, "r");
+  while (maf_mafFileApi_readLine(mfa, &line) != -1) {
+    ++lines;
+  }
+  maf_destroyMfa(mfa);
+  report("maf_mafFileApi_readLine", bytes, wallTime() - t, lines, "lines");
+}
+static void benchmark_readBlock(const char *filename, uint64_t bytes) {
+  // full parse of every block
+  mafBlock_t *mb = NULL;
+  uint64_t blocks = 0;
+  double t = wallTime();
+  mafFileApi_t *mfa = maf_newMfa(filename, "r");
+  while ((mb = maf_readBlock(mfa)) != NULL) {
+    ++blocks;
+    maf_destroyMafBlockList(mb);
+  }
+  maf_destroyMfa(mfa);
+  report("maf_readBlock", bytes, wallTime() - t, blocks, "blocks");
+}
+static void benchmark_readBlockInto(const char *filename, uint64_t bytes, const char *mode) {
+  // full parse of every block into one reused block
+  mafBlock_t *mb = maf_newMafBlock();
+  uint64_t blocks = 0;
+  double t = wallTime();
+  mafFileApi_t *mfa = maf_newMfa(filename, mode);
+  while (maf_readBlockInto(mfa, mb) != NULL) {
+    ++blocks;
+  }
+  maf_destroyMfa(mfa);
+  report(strcmp(mode, "r") == 0 ? "maf_readBlockInto" : "maf_readBlockInto, mapped",
+         bytes, wallTime() - t, blocks, "blocks");
+  maf_destroyMafBlockList(mb);
+}
+static void benchmark_filter(const char *filename, uint64_t bytes, bool lazy, const char *mode) {
+  // a mafFilter style pass, rows are only matched on name and echoed back out
+  const char *keep[] = {"species1.chr1", "species4.chr1", "species7.chr1"};
+  mafBlock_t *mb = maf_newMafBlock();
+  uint64_t kept = 0, echoed = 0;
+  double t = wallTime();
+  mafFileApi_t *mfa = maf_newMfa(filename, mode);
+  maf_mafFileApi_setLazyParsing(mfa, lazy);
+  while (maf_readBlockInto(mfa, mb) != NULL) {
+    for (mafLine_t *ml = maf_mafBlock_getHeadLine(mb); ml != NULL; ml = maf_mafLine_getNext(ml)) {
+      if (maf_mafLine_getType(ml) != 's') {
+        continue;
+      }
+      for (unsigned i = 0; i < sizeof(keep) / sizeof(*keep); ++i) {
+        if (strcmp(maf_mafLine_getSpecies(ml), keep[i]) == 0) {
+          echoed += strlen(maf_mafLine_getLine(ml));
+          ++kept;
+          break;
+        }
+      }
+    }
+  }
+  maf_destroyMfa(mfa);
+  char name[64];
+  sprintf(name, "filter, %s%s", lazy ? "lazy" : "eager", strcmp(mode, "r") == 0 ? "" : ", mapped");
+  report(name, bytes, wallTime() - t, kept, "rows kept");
+  maf_destroyMafBlockList(mb);
+  if (echoed == 0) {
+    fprintf(stderr, "Error, filter benchmark kept nothing\n");
+  }
+}
+static void writeMafCopy(const char *filename, const char *outFilename) {
+  // the output format, blocked gzip or .mafb, follows the extension
+  mafFileApi_t *in = maf_newMfa(filename, "r");
+  mafFileApi_t *out = maf_newMfa(outFilename, "w");
+  mafBlock_t *mb = maf_newMafBlock();
+  while (maf_readBlockInto(in, mb) != NULL) {
+    maf_writeBlock(out, mb);
+  }
+  maf_destroyMafBlockList(mb);
+  maf_destroyMfa(in);
+  maf_destroyMfa(out);
+}
+static void benchmark_readCompressed(const char *gzFilename, uint64_t bytes, unsigned threads) {
+  // full parse of every block of a blocked gzip maf, bytes are those of the uncompressed maf
+  mafBlock_t *mb = maf_newMafBlock();
+  uint64_t blocks = 0;
+  double t = wallTime();
+  mafFileApi_t *mfa = maf_newMfa(gzFilename, "r");
+  maf_mafFileApi_setDecompressionThreads(mfa, threads);
+  while (maf_readBlockInto(mfa, mb) != NULL) {
+    ++blocks;
+  }
+  maf_destroyMfa(mfa);
+  char name[64];
+  sprintf(name, "readBlockInto, bgzf, %u threads", threads);
+  report(name, bytes, wallTime() - t, blocks, "blocks");
+  maf_destroyMafBlockList(mb);
+}
+static void benchmark_readBinary(const char *binaryFilename, uint64_t bytes, const char *mode, bool lazy) {
+  // full or lazy parse of every block of a .mafb, bytes are those of the maf it was written from
+  mafBlock_t *mb = maf_newMafBlock();
+  uint64_t blocks = 0;
+  double t = wallTime();
+  mafFileApi_t *mfa = maf_newMfa(binaryFilename, mode);
+  maf_mafFileApi_setLazyParsing(mfa, lazy);
+  while (maf_readBlockInto(mfa, mb) != NULL) {
+    ++blocks;
+  }
+  maf_destroyMfa(mfa);
+  char name[64];
+  sprintf(name, "readBlockInto, .mafb%s%s", strcmp(mode, "r") == 0 ? "" : ", mapped", lazy ? ", lazy" : "");
+  report(name, bytes, wallTime() - t, blocks, "blocks");
+  maf_destroyMafBlockList(mb);
+}
+static void countBlock(mafBlock_t *mb, unsigned chunk, void *data) {
+  (void) mb;
+  ++((uint64_t *) data)[chunk];
+}
+static void benchmark_readParallel(const char *filename, uint64_t bytes, unsigned threads) {
+  // full parse of every block, the file split into one chunk per thread
+  uint64_t *counts = (uint64_t *) de_malloc(sizeof(*counts) * threads);
+  memset(counts, 0, sizeof(*counts) * threads);
+  uint64_t blocks = 0;
+  double t = wallTime();
+  unsigned n = maf_readBlocksParallel(filename, threads, false, countBlock, counts);
+  double seconds = wallTime() - t;
+  for (unsigned i = 0; i < n; ++i) {
+    blocks += counts[i];
+  }
+  char name[64];
+  sprintf(name, "readBlocksParallel, %u threads", threads);
+  report(name, bytes, seconds, blocks, "blocks");
+  free(counts);
+}
+static void benchmark_columnScan(const char *filename, uint64_t bytes, bool columnMajor) {
+  // count the non-gap characters of every column, as the comparator's pair counting does
+  mafBlock_t *mb = maf_newMafBlock();
+  uint64_t bases = 0;
+  double t = wallTime();
+  mafFileApi_t *mfa = maf_newMfa(filename, "r");
+  maf_mafFileApi_setLazyParsing(mfa, true);
+  while (maf_readBlockInto(mfa, mb) != NULL) {
+    if (maf_mafBlock_getNumberOfSequences(mb) == 0) {
+      continue;
+    }
+    mafSequenceMatrix_t *mat = maf_mafBlock_getSequenceMatrixView(mb);
+    uint64_t n = maf_mafSequenceMatrix_getNumberOfRows(mat);
+    uint64_t m = maf_mafSequenceMatrix_getNumberOfColumns(mat);
+    char **rows = maf_mafSequenceMatrix_getRows(mat);
+    for (uint64_t c = 0; c < m; ++c) {
+      const char *column = columnMajor ? maf_mafSequenceMatrix_getColumn(mat, c) : NULL;
+      for (uint64_t r = 0; r < n; ++r) {
+        bases += ((columnMajor ? column[r] : rows[r][c]) != '-');
+      }
+    }
+  }
+  maf_destroyMfa(mfa);
+  report(columnMajor ? "column scan, column-major" : "column scan, row-major",
+         bytes, wallTime() - t, bases, "bases");
+  maf_destroyMafBlockList(mb);
+}
+static void benchmark_print(const char *filename, uint64_t bytes, int writer) {
+  // pretty print every block to /dev/null, with fprint (0), a writer (1) or a threaded writer (2)
+  const char *names[] = {"maf_mafBlock_fprint", "mafWriter_printBlock", "mafWriter_printBlock, thread"};
+  mafBlock_t *mb = maf_newMafBlock();
+  uint64_t blocks = 0;
+  FILE *f = de_fopen("/dev/null", "w");
+  double t = wallTime();
+  mafFileApi_t *mfa = maf_newMfa(filename, "r");
+  mafWriter_t *w = (writer > 0) ? maf_newMafWriter(f, writer > 1) : NULL;
+  while (maf_readBlockInto(mfa, mb) != NULL) {
+    if (w == NULL) {
+      maf_mafBlock_fprint(f, mb);
+    } else {
+      maf_mafWriter_printBlock(w, mb);
+    }
+    ++blocks;
+  }
+  if (w != NULL) {
+    maf_destroyMafWriter(w);
+  }
+  maf_destroyMfa(mfa);
+  fclose(f);
+  report(names[writer], bytes, wallTime() - t, blocks, "blocks");
+  maf_destroyMafBlockList(mb);
+}
+static void benchmark_kernels(void) {
+  // throughput of each sequence kernel at each level, over a buffer that does not fit in cache
+  const size_t n = 1 << 24;
+  const char *names[] = {"complement", "reverseComplement", "toUpper", "countGaps", "countNs",
+                         "nonGapPrefixSum", "unpackNibbles"};
+  char *s = (char*) de_malloc(n);
+  uint64_t *sums = (uint64_t*) de_malloc(sizeof(*sums) * (n + 1));
+  srand(1);
+  for (size_t i = 0; i < n; ++i) {
+    // gaps come in runs, as they do in alignments
+    s[i] = ((i / 100) % 4 == 0) ? '-' : "ACGTacgtN"[rand() % 9];
+  }
+  for (int level = kSeqKernelsScalar; level <= kSeqKernelsAvx2; ++level) {
+    seq_setKernelLevel((seqKernelsLevel_t) level);
+    if (seq_getKernelLevel() != (seqKernelsLevel_t) level) {
+      continue; // not supported here
+    }
+    for (unsigned k = 0; k < sizeof(names) / sizeof(*names); ++k) {
+      uint64_t check = 0, passes = 0;
+      double t = wallTime(), seconds;
+      do {
+        switch (k) {
+        case 0: seq_complement(s, n); break;
+        case 1: seq_reverseComplement(s, n); break;
+        case 2: seq_toUpper(s, n); break;
+        case 3: check += seq_countGaps(s, n); break;
+        case 4: check += seq_countNs(s, n); break;
+        case 5: seq_nonGapPrefixSum(s, n, sums); check += sums[n]; break;
+        default: seq_unpackNibbles((char *) sums, (const uint8_t *) s, n, "ACGTNRYSWKMBDHVX"); break;
+        }
+        ++passes;
+      } while ((seconds = wallTime() - t) < 0.2);
+      printf("%-18s %-6s %8.2f GB/s (%" PRIu64 ")\n", names[k], seq_kernelLevelName((seqKernelsLevel_t) level),
+             passes * n / seconds / 1e9, check);
+    }
+  }
+  seq_setKernelLevel(kSeqKernelsAvx2);
+  free(s);
+  free(sums);
+}
+int main(int argc, char **argv) {
+  const char *filename = kBenchmarkMaf;
+  if (argc > 1 && strcmp(argv[1], "--kernels") == 0) {
+    benchmark_kernels();
+    return EXIT_SUCCESS;
+  }
+  bool synthetic = false;
+  if (argc > 1) {
+    filename = argv[1];
+  } else {
+    mkdir("benchmark_tmp", S_IRWXU);
+    writeSyntheticMaf(filename, kBenchmarkBytes);
+    synthetic = true;
+  }
+  uint64_t bytes = fileSize(filename);
+  printf("benchmarking %s, %" PRIu64 " bytes\n", filename, bytes);
+  benchmark_deGetline(filename, bytes);
+  benchmark_readLine(filename, bytes);
+  benchmark_readBlock(filename, bytes);
+  benchmark_readBlockInto(filename, bytes, "r");
+  benchmark_readBlockInto(filename, bytes, "rm");
+  benchmark_filter(filename, bytes, false, "r");
+  benchmark_filter(filename, bytes, true, "r");
+  benchmark_filter(filename, bytes, true, "rm");
+  benchmark_columnScan(filename, bytes, false);
+  benchmark_columnScan(filename, bytes, true);
+  benchmark_print(filename, bytes, 0);
+  benchmark_print(filename, bytes, 1);
+  benchmark_print(filename, bytes, 2);
+  benchmark_readParallel(filename, bytes, 1);
+  benchmark_readParallel(filename, bytes, 4);
+  mkdir("benchmark_tmp", S_IRWXU);
+  writeMafCopy(filename, kBenchmarkGzMaf);
+  benchmark_readCompressed(kBenchmarkGzMaf, bytes, 0);
+  benchmark_readCompressed(kBenchmarkGzMaf, bytes, 4);
+  unlink(kBenchmarkGzMaf);
+  writeMafCopy(filename, kBenchmarkBinaryMaf);
+  printf("%s is %" PRIu64 " bytes\n", kBenchmarkBinaryMaf, fileSize(kBenchmarkBinaryMaf));
+  benchmark_readBinary(kBenchmarkBinaryMaf, bytes, "r", false);
+  benchmark_readBinary(kBenchmarkBinaryMaf, bytes, "rm", false);
+  benchmark_readBinary(kBenchmarkBinaryMaf, bytes, "rm", true);
+  unlink(kBenchmarkBinaryMaf);
+  if (synthetic) {
+    unlink(filename);
+  }
+  rmdir("benchmark_tmp");
+  return EXIT_SUCCESS;
+}
@@ -0,0 +1,589 @@
+/*
+ * Copyright (C) 2012 by
+ * Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+ * ... and other members of the Reconstruction Team of David Haussler's
+ * lab (BME Dept. UCSC).
+ *
+ * Permission is hereby granted, free of charge, to any person obtaining a copy
+ * of this software and associated documentation files (the "Software"), to deal
+ * in the Software without restriction, including without limitation the rights
+ * to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+ * copies of the Software, and to permit persons to whom the Software is
+ * furnished to do so, subject to the following conditions:
+ *
+ * The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+ *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+ * AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+ * LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+ * OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+ * THE SOFTWARE.
+ */
+#define _DEFAULT_SOURCE // fseeko() under -std=c99
+#include <assert.h>
+#include <inttypes.h>
+#include <pthread.h>
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/types.h>
+#include <zlib.h>
+#include "common.h"
+#include "bgzf.h"
+
+static const size_t kBgzfMaxBlockSize = 1 << 16; // compressed or not
+static const size_t kBgzfBlockDataSize = 0xff00; // data per written block, leaves room to not compress
+static const size_t kBgzfHeaderSize = 18;
+static const size_t kBgzfFooterSize = 8;
+static const unsigned kBgzfSlotsPerThread = 4;
+static const unsigned char kBgzfEofMarker[28] = {
+  0x1f, 0x8b, 0x08, 0x04, 0x00, 0x00, 0x00, 0x00, 0x00, 0xff, 0x06, 0x00, 0x42, 0x43,
+  0x02, 0x00, 0x1b, 0x00, 0x03, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00};
+
+enum bgzfSlotState {
+  kBgzfSlotEmpty,
+  kBgzfSlotPending, // compressed data read, waiting for a thread
+  kBgzfSlotWorking,
+  kBgzfSlotDone
+};
+typedef struct bgzfSlot {
+  // one block on its way through the reader
+  unsigned char *compressed;
+  size_t compressedSize;
+  char *data;
+  size_t dataSize;
+  uint64_t offset; // file offset of the block
+  enum bgzfSlotState state;
+  bool corrupt;
+} bgzfSlot_t;
+typedef struct bgzfRecord {
+  uint64_t position; // of the first uncompressed byte of a block
+  uint64_t offset; // file offset of that block
+} bgzfRecord_t;
+struct bgzfReader {
+  // a bgzfReader struct reads the uncompressed data of a gzip file. Blocked
+  // gzip is read a block at a time, read ahead blocks being inflated by a pool
+  // of threads and handed out in order. Anything else is inflated as a stream.
+  FILE *f;
+  char *filename;
+  unsigned char *prefix; // bytes already read from f by whoever opened it
+  size_t prefixSize;
+  size_t prefixStart;
+  uint64_t fileOffset; // of the next byte read from prefix or f
+  bool blocked; // blocked gzip, see bgzf.h
+  bool rawEof; // nothing left in f
+  // plain gzip
+  z_stream stream;
+  unsigned char *in;
+  bool streamEnd;
+  // blocked gzip
+  bgzfSlot_t *slots;
+  unsigned numberOfSlots;
+  unsigned head; // next slot to be handed out
+  unsigned tail; // next slot to be read into
+  unsigned filled; // slots between head and tail
+  bgzfSlot_t *current; // slot being handed out
+  size_t dataStart; // next byte of current to hand out
+  size_t skip; // bytes of the next block to skip, after a seek
+  unsigned numberOfThreads;
+  pthread_t *threads;
+  bool threadsStarted;
+  bool stop;
+  pthread_mutex_t mutex;
+  pthread_cond_t workCond; // a slot became pending, or stop
+  pthread_cond_t doneCond; // a slot became done
+  uint64_t position; // of the next uncompressed byte handed out
+  bgzfRecord_t *records; // blocks handed out that positions may still be asked for
+  size_t recordsStart;
+  size_t numberOfRecords;
+  size_t recordsSize;
+};
+struct bgzfWriter {
+  // a bgzfWriter struct writes blocked gzip, a block at a time
+  FILE *f;
+  char *filename;
+  char *data;
+  size_t dataSize;
+  unsigned char *compressed;
+  uint64_t offset; // file offset of the next block
+};
+
+static uint16_t bgzf_unpack16(const unsigned char *s) {
+  return (uint16_t) (s[0] | (s[1] << 8));
+}
+static uint32_t bgzf_unpack32(const unsigned char *s) {
+  return (uint32_t) s[0] | ((uint32_t) s[1] << 8) | ((uint32_t) s[2] << 16) | ((uint32_t) s[3] << 24);
+}
+static void bgzf_pack16(unsigned char *s, uint16_t x) {
+  s[0] = x & 0xff;
+  s[1] = x >> 8;
+}
+static void bgzf_pack32(unsigned char *s, uint32_t x) {
+  s[0] = x & 0xff;
+  s[1] = (x >> 8) & 0xff;
+  s[2] = (x >> 16) & 0xff;
+  s[3] = (x >> 24) & 0xff;
+}
+bool bgzf_isGzip(const char *s, size_t n) {
+  const unsigned char *u = (const unsigned char *) s;
+  return n >= 3 && u[0] == 0x1f && u[1] == 0x8b && u[2] == 0x08;
+}
+static bool bgzf_isBlockHeader(const unsigned char *u, size_t n) {
+  // true if u is the start of a member with the BC extra subfield where
+  // blocked gzip puts it
+  return (n >= kBgzfHeaderSize && bgzf_isGzip((const char *) u, n) && (u[3] & 4) &&
+          bgzf_unpack16(u + 10) == 6 && u[12] == 'B' && u[13] == 'C' && bgzf_unpack16(u + 14) == 2);
+}
+static size_t bgzf_readRaw(bgzfReader_t *r, unsigned char *buf, size_t n) {
+  // read up to n compressed bytes, first from the prefix and then from the file
+  size_t m = 0;
+  if (r->prefixStart < r->prefixSize) {
+    m = r->prefixSize - r->prefixStart;
+    m = (m < n) ? m : n;
+    memcpy(buf, r->prefix + r->prefixStart, m);
+    r->prefixStart += m;
+  }
+  while (m < n && !r->rawEof) {
+    size_t k = fread(buf + m, 1, n - m, r->f);
+    if (k == 0) {
+      if (ferror(r->f)) {
+        fprintf(stderr, "Error, unable to read from file: %s\n", r->filename);
+        exit(EXIT_FAILURE);
+      }
+      r->rawEof = true;
+    }
+    m += k;
+  }
+  r->fileOffset += m;
+  return m;
+}
+static void bgzf_failCorrupt(bgzfReader_t *r, uint64_t offset) {
+  fprintf(stderr, "Error, corrupt gzip data in %s at offset %" PRIu64 "\n", r->filename, offset);
+  exit(EXIT_FAILURE);
+}
+bgzfReader_t* bgzf_newReader(FILE *f, const char *filename, const char *prefix, size_t n) {
+  bgzfReader_t *r = (bgzfReader_t *) de_malloc(sizeof(*r));
+  memset(r, 0, sizeof(*r));
+  r->f = f;
+  r->filename = de_strdup(filename);
+  r->prefix = (unsigned char *) de_malloc(n + 1);
+  memcpy(r->prefix, prefix, n);
+  r->prefixSize = n;
+  r->blocked = bgzf_isBlockHeader(r->prefix, n);
+  if (!r->blocked) {
+    r->in = (unsigned char *) de_malloc(kBgzfMaxBlockSize);
+    if (inflateInit2(&(r->stream), 16 + MAX_WBITS) != Z_OK) {
+      fprintf(stderr, "Error, unable to start decompressing %s\n", filename);
+      exit(EXIT_FAILURE);
+    }
+  }
+  r->numberOfThreads = 0;
+  r->numberOfSlots = 1;
+  pthread_mutex_init(&(r->mutex), NULL);
+  pthread_cond_init(&(r->workCond), NULL);
+  pthread_cond_init(&(r->doneCond), NULL);
+  return r;
+}
+void bgzf_setThreads(bgzfReader_t *r, unsigned n) {
+  // only before the first read
+  assert(r->slots == NULL);
+  r->numberOfThreads = r->blocked ? n : 0;
+  r->numberOfSlots = (r->numberOfThreads > 0) ? kBgzfSlotsPerThread * r->numberOfThreads : 1;
+}
+static bool bgzf_inflateSlot(bgzfSlot_t *s) {
+  // inflate a whole block, checking its length and crc. Returns false if it is corrupt.
+  size_t headerSize = 12 + bgzf_unpack16(s->compressed + 10);
+  if (s->compressedSize < headerSize + kBgzfFooterSize) {
+    return false;
+  }
+  const unsigned char *footer = s->compressed + s->compressedSize - kBgzfFooterSize;
+  uint32_t crc = bgzf_unpack32(footer);
+  uint32_t size = bgzf_unpack32(footer + 4);
+  if (size > kBgzfMaxBlockSize) {
+    return false;
+  }
+  z_stream zs;
+  memset(&zs, 0, sizeof(zs));
+  if (inflateInit2(&zs, -MAX_WBITS) != Z_OK) {
+    return false;
+  }
+  zs.next_in = s->compressed + headerSize;
+  zs.avail_in = (uInt) (s->compressedSize - headerSize - kBgzfFooterSize);
+  zs.next_out = (Bytef *) s->data;
+  zs.avail_out = (uInt) kBgzfMaxBlockSize;
+  int status = inflate(&zs, Z_FINISH);
+  s->dataSize = zs.total_out;
+  inflateEnd(&zs);
+  return (status == Z_STREAM_END && s->dataSize == size &&
+          crc32(crc32(0L, Z_NULL, 0), (const Bytef *) s->data, (uInt) s->dataSize) == crc);
+}
+static void* bgzf_worker(void *p) {
+  // inflate pending slots, oldest first, until told to stop
+  bgzfReader_t *r = (bgzfReader_t *) p;
+  pthread_mutex_lock(&(r->mutex));
+  while (true) {
+    bgzfSlot_t *s = NULL;
+    for (unsigned i = 0; i < r->filled; ++i) {
+      bgzfSlot_t *t = r->slots + (r->head + i) % r->numberOfSlots;
+      if (t->state == kBgzfSlotPending) {
+        s = t;
+        break;
+      }
+    }
+    if (s == NULL) {
+      if (r->stop) {
+        break;
+      }
+      pthread_cond_wait(&(r->workCond), &(r->mutex));
+      continue;
+    }
+    s->state = kBgzfSlotWorking;
+    pthread_mutex_unlock(&(r->mutex));
+    bool ok = bgzf_inflateSlot(s);
+    pthread_mutex_lock(&(r->mutex));
+    s->corrupt = !ok;
+    s->state = kBgzfSlotDone;
+    pthread_cond_broadcast(&(r->doneCond));
+  }
+  pthread_mutex_unlock(&(r->mutex));
+  return NULL;
+}
+static void bgzf_startReading(bgzfReader_t *r) {
+  r->slots = (bgzfSlot_t *) de_malloc(sizeof(*(r->slots)) * r->numberOfSlots);
+  for (unsigned i = 0; i < r->numberOfSlots; ++i) {
+    r->slots[i].compressed = (unsigned char *) de_malloc(kBgzfMaxBlockSize);
+    r->slots[i].data = (char *) de_malloc(kBgzfMaxBlockSize);
+    r->slots[i].state = kBgzfSlotEmpty;
+  }
+  if (r->numberOfThreads > 0) {
+    r->threads = (pthread_t *) de_malloc(sizeof(*(r->threads)) * r->numberOfThreads);
+    for (unsigned i = 0; i < r->numberOfThreads; ++i) {
+      if (pthread_create(r->threads + i, NULL, bgzf_worker, r) != 0) {
+        fprintf(stderr, "Error, unable to start a decompression thread\n");
+        exit(EXIT_FAILURE);
+      }
+    }
+    r->threadsStarted = true;
+  }
+}
+static bool bgzf_readBlock(bgzfReader_t *r, bgzfSlot_t *s) {
+  // read the next compressed block into s, returning false at the end of the file
+  s->offset = r->fileOffset;
+  size_t n = bgzf_readRaw(r, s->compressed, kBgzfHeaderSize);
+  if (n == 0) {
+    return false;
+  }
+  if (!bgzf_isBlockHeader(s->compressed, n)) {
+    bgzf_failCorrupt(r, s->offset);
+  }
+  // the block size is the last extra subfield in blocks we recognise
+  size_t blockSize = (size_t) bgzf_unpack16(s->compressed + 16) + 1;
+  if (blockSize < kBgzfHeaderSize + kBgzfFooterSize ||
+      bgzf_readRaw(r, s->compressed + kBgzfHeaderSize, blockSize - kBgzfHeaderSize) !=
+      blockSize - kBgzfHeaderSize) {
+    bgzf_failCorrupt(r, s->offset);
+  }
+  s->compressedSize = blockSize;
+  return true;
+}
+static void bgzf_fillSlots(bgzfReader_t *r) {
+  // read ahead into every free slot, handing the blocks to the threads
+  while (r->filled < r->numberOfSlots && !r->rawEof) {
+    bgzfSlot_t *s = r->slots + r->tail;
+    if (!bgzf_readBlock(r, s)) {
+      break;
+    }
+    pthread_mutex_lock(&(r->mutex));
+    s->state = kBgzfSlotPending;
+    r->tail = (r->tail + 1) % r->numberOfSlots;
+    ++(r->filled);
+    pthread_cond_signal(&(r->workCond));
+    pthread_mutex_unlock(&(r->mutex));
+    if (r->numberOfThreads == 0) {
+      break;
+    }
+  }
+}
+static void bgzf_addRecord(bgzfReader_t *r, uint64_t position, uint64_t offset) {
+  if (r->recordsStart > 0 && r->recordsStart == r->numberOfRecords) {
+    r->recordsStart = 0;
+    r->numberOfRecords = 0;
+  }
+  if (r->numberOfRecords == r->recordsSize) {
+    if (r->recordsStart > 0) {
+      memmove(r->records, r->records + r->recordsStart,
+              sizeof(*(r->records)) * (r->numberOfRecords - r->recordsStart));
+      r->numberOfRecords -= r->recordsStart;
+      r->recordsStart = 0;
+    } else {
+      r->recordsSize = (r->recordsSize == 0) ? 64 : 2 * r->recordsSize;
+      r->records = (bgzfRecord_t *) realloc(r->records, sizeof(*(r->records)) * r->recordsSize);
+      assert(r->records != NULL);
+    }
+  }
+  r->records[r->numberOfRecords].position = position;
+  r->records[r->numberOfRecords].offset = offset;
+  ++(r->numberOfRecords);
+}
+static bool bgzf_nextSlot(bgzfReader_t *r) {
+  // release the current slot and make the next block current, returning false
+  // at the end of the data
+  if (r->current != NULL) {
+    pthread_mutex_lock(&(r->mutex));
+    r->current->state = kBgzfSlotEmpty;
+    r->head = (r->head + 1) % r->numberOfSlots;
+    --(r->filled);
+    pthread_mutex_unlock(&(r->mutex));
+    r->current = NULL;
+  }
+  bgzf_fillSlots(r);
+  if (r->filled == 0) {
+    return false;
+  }
+  bgzfSlot_t *s = r->slots + r->head;
+  if (r->numberOfThreads == 0) {
+    s->corrupt = !bgzf_inflateSlot(s);
+    s->state = kBgzfSlotDone;
+  } else {
+    pthread_mutex_lock(&(r->mutex));
+    while (s->state != kBgzfSlotDone) {
+      pthread_cond_wait(&(r->doneCond), &(r->mutex));
+    }
+    pthread_mutex_unlock(&(r->mutex));
+  }
+  if (s->corrupt || r->skip > s->dataSize) {
+    bgzf_failCorrupt(r, s->offset);
+  }
+  r->current = s;
+  r->dataStart = r->skip;
+  bgzf_addRecord(r, r->position - r->skip, s->offset);
+  r->skip = 0;
+  return true;
+}
+static size_t bgzf_readStream(bgzfReader_t *r, char *buf, size_t n) {
+  // plain gzip, possibly several members one after another
+  r->stream.next_out = (Bytef *) buf;
+  r->stream.avail_out = (uInt) n;
+  while (r->stream.avail_out > 0 && !r->streamEnd) {
+    if (r->stream.avail_in == 0) {
+      r->stream.next_in = r->in;
+      r->stream.avail_in = (uInt) bgzf_readRaw(r, r->in, kBgzfMaxBlockSize);
+      if (r->stream.avail_in == 0) {
+        fprintf(stderr, "Error, %s ended in the middle of its gzip data\n", r->filename);
+        exit(EXIT_FAILURE);
+      }
+    }
+    int status = inflate(&(r->stream), Z_NO_FLUSH);
+    if (status == Z_STREAM_END) {
+      if (r->stream.avail_in == 0) {
+        r->stream.next_in = r->in;
+        r->stream.avail_in = (uInt) bgzf_readRaw(r, r->in, kBgzfMaxBlockSize);
+      }
+      if (r->stream.avail_in == 0) {
+        r->streamEnd = true;
+      } else {
+        inflateReset(&(r->stream));
+      }
+    } else if (status != Z_OK && status != Z_BUF_ERROR) {
+      bgzf_failCorrupt(r, r->fileOffset);
+    }
+  }
+  return n - r->stream.avail_out;
+}
+size_t bgzf_read(bgzfReader_t *r, char *buf, size_t n) {
+  size_t m = 0;
+  if (!r->blocked) {
+    m = bgzf_readStream(r, buf, n);
+    r->position += m;
+    return m;
+  }
+  if (r->slots == NULL) {
+    bgzf_startReading(r);
+  }
+  while (m < n) {
+    if (r->current == NULL || r->dataStart == r->current->dataSize) {
+      if (!bgzf_nextSlot(r)) {
+        break;
+      }
+      continue;
+    }
+    size_t k = r->current->dataSize - r->dataStart;
+    k = (k < n - m) ? k : n - m;
+    memcpy(buf + m, r->current->data + r->dataStart, k);
+    r->dataStart += k;
+    r->position += k;
+    m += k;
+  }
+  return m;
+}
+bool bgzf_isSeekable(bgzfReader_t *r) {
+  return r->blocked && r->f != stdin;
+}
+uint64_t bgzf_virtualOffset(bgzfReader_t *r, uint64_t position) {
+  // the virtual offset of a position in the uncompressed data, which must not
+  // be later than the data read so far nor earlier than bgzf_discardBefore() allows
+  assert(r->blocked);
+  for (size_t i = r->numberOfRecords; i > r->recordsStart; --i) {
+    if (r->records[i - 1].position <= position) {
+      return (r->records[i - 1].offset << 16) | (position - r->records[i - 1].position);
+    }
+  }
+  // nothing has been read yet
+  assert(position == r->position && r->recordsStart == r->numberOfRecords);
+  return (r->fileOffset << 16) | r->skip;
+}
+void bgzf_discardBefore(bgzfReader_t *r, uint64_t position) {
+  while (r->recordsStart + 1 < r->numberOfRecords && r->records[r->recordsStart + 1].position <= position) {
+    ++(r->recordsStart);
+  }
+}
+uint64_t bgzf_seek(bgzfReader_t *r, uint64_t virtualOffset) {
+  // make the next byte read the one at virtualOffset. Positions carry on from
+  // the within block part of the offset, so that virtual offsets can still be
+  // worked out from them.
+  if (!bgzf_isSeekable(r)) {
+    fprintf(stderr, "Error, unable to seek in %s, only blocked gzip (bgzip) files can be\n", r->filename);
+    exit(EXIT_FAILURE);
+  }
+  if (r->slots != NULL) {
+    // let the threads finish what they are doing, then drop everything read ahead
+    pthread_mutex_lock(&(r->mutex));
+    for (unsigned i = 0; i < r->numberOfSlots; ++i) {
+      while (r->slots[i].state == kBgzfSlotWorking) {
+        pthread_cond_wait(&(r->doneCond), &(r->mutex));
+      }
+      r->slots[i].state = kBgzfSlotEmpty;
+    }
+    r->head = 0;
+    r->tail = 0;
+    r->filled = 0;
+    pthread_mutex_unlock(&(r->mutex));
+  }
+  r->current = NULL;
+  uint64_t offset = virtualOffset >> 16;
+  if (fseeko(r->f, (off_t) offset, SEEK_SET) != 0) {
+    fprintf(stderr, "Error, unable to seek in %s\n", r->filename);
+    exit(EXIT_FAILURE);
+  }
+  r->prefixStart = r->prefixSize;
+  r->fileOffset = offset;
+  r->rawEof = false;
+  r->skip = virtualOffset & 0xffff;
+  r->position = r->skip;
+  r->recordsStart = 0;
+  r->numberOfRecords = 0;
+  return r->position;
+}
+void bgzf_destroyReader(bgzfReader_t *r) {
+  if (r == NULL) {
+    return;
+  }
+  if (r->threadsStarted) {
+    pthread_mutex_lock(&(r->mutex));
+    r->stop = true;
+    pthread_cond_broadcast(&(r->workCond));
+    pthread_mutex_unlock(&(r->mutex));
+    for (unsigned i = 0; i < r->numberOfThreads; ++i) {
+      pthread_join(r->threads[i], NULL);
+    }
+  }
+  if (r->slots != NULL) {
+    for (unsigned i = 0; i < r->numberOfSlots; ++i) {
+      free(r->slots[i].compressed);
+      free(r->slots[i].data);
+    }
+  }
+  if (!r->blocked) {
+    inflateEnd(&(r->stream));
+  }
+  pthread_mutex_destroy(&(r->mutex));
+  pthread_cond_destroy(&(r->workCond));
+  pthread_cond_destroy(&(r->doneCond));
+  free(r->slots);
+  free(r->threads);
+  free(r->records);
+  free(r->in);
+  free(r->prefix);
+  free(r->filename);
+  free(r);
+}
+bgzfWriter_t* bgzf_newWriter(FILE *f, const char *filename) {
+  bgzfWriter_t *w = (bgzfWriter_t *) de_malloc(sizeof(*w));
+  w->f = f;
+  w->filename = de_strdup(filename);
+  w->data = (char *) de_malloc(kBgzfBlockDataSize);
+  w->dataSize = 0;
+  w->compressed = (unsigned char *) de_malloc(kBgzfMaxBlockSize);
+  w->offset = 0;
+  return w;
+}
+static void bgzf_writeRaw(bgzfWriter_t *w, const void *s, size_t n) {
+  if (fwrite(s, 1, n, w->f) != n) {
+    fprintf(stderr, "Error, unable to write to file: %s\n", w->filename);
+    exit(EXIT_FAILURE);
+  }
+  w->offset += n;
+}
+static void bgzf_flushBlock(bgzfWriter_t *w) {
+  // compress the buffered data as one block
+  if (w->dataSize == 0) {
+    return;
+  }
+  unsigned char *c = w->compressed;
+  z_stream zs;
+  memset(&zs, 0, sizeof(zs));
+  if (deflateInit2(&zs, Z_DEFAULT_COMPRESSION, Z_DEFLATED, -MAX_WBITS, 8, Z_DEFAULT_STRATEGY) != Z_OK) {
+    fprintf(stderr, "Error, unable to start compressing %s\n", w->filename);
+    exit(EXIT_FAILURE);
+  }
+  zs.next_in = (Bytef *) w->data;
+  zs.avail_in = (uInt) w->dataSize;
+  zs.next_out = c + kBgzfHeaderSize;
+  zs.avail_out = (uInt) (kBgzfMaxBlockSize - kBgzfHeaderSize - kBgzfFooterSize);
+  // a full block of incompressible data still fits, see kBgzfBlockDataSize
+  if (deflate(&zs, Z_FINISH) != Z_STREAM_END) {
+    fprintf(stderr, "Error, unable to compress data for %s\n", w->filename);
+    exit(EXIT_FAILURE);
+  }
+  size_t blockSize = kBgzfHeaderSize + zs.total_out + kBgzfFooterSize;
+  deflateEnd(&zs);
+  memcpy(c, kBgzfEofMarker, 16);
+  bgzf_pack16(c + 16, (uint16_t) (blockSize - 1));
+  bgzf_pack32(c + blockSize - 8, (uint32_t) crc32(crc32(0L, Z_NULL, 0), (const Bytef *) w->data,
+                                                 (uInt) w->dataSize));
+  bgzf_pack32(c + blockSize - 4, (uint32_t) w->dataSize);
+  bgzf_writeRaw(w, c, blockSize);
+  w->dataSize = 0;
+}
+void bgzf_write(bgzfWriter_t *w, const char *s, size_t n) {
+  while (n > 0) {
+    size_t k = kBgzfBlockDataSize - w->dataSize;
+    k = (k < n) ? k : n;
+    memcpy(w->data + w->dataSize, s, k);
+    w->dataSize += k;
+    s += k;
+    n -= k;
+    if (w->dataSize == kBgzfBlockDataSize) {
+      bgzf_flushBlock(w);
+    }
+  }
+}
+uint64_t bgzf_writerVirtualOffset(bgzfWriter_t *w) {
+  return (w->offset << 16) | w->dataSize;
+}
+void bgzf_destroyWriter(bgzfWriter_t *w) {
+  if (w == NULL) {
+    return;
+  }
+  bgzf_flushBlock(w);
+  bgzf_writeRaw(w, kBgzfEofMarker, sizeof(kBgzfEofMarker));
+  free(w->data);
+  free(w->compressed);
+  free(w->filename);
+  free(w);
+}
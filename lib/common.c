@@ -23,15 +23,19 @@
  * THE SOFTWARE. 
  */
 
+#define _POSIX_C_SOURCE 200809L // clock_gettime()
 #include <assert.h>
 #include <inttypes.h>
 #include <ctype.h>
 #include <stdarg.h>
+#include <stdbool.h>
 #include <errno.h>
 #include <stdio.h>
 #include <stdint.h>
 #include <stdlib.h>
 #include <string.h>
+#include <sys/resource.h>
+#include <time.h>
 #include "CuTest.h"
 #include "common.h"
 
@@ -40,6 +44,7 @@ int g_debug_flag = 0;
 const int kMaxStringLength = 2048;
 const int kMaxMessageLength = 1024;
 const int kMaxSeqName = 1 << 9;
+const unsigned kMaxThreads = 256;
 
 void* de_malloc(size_t n) {
     void *i;
@@ -264,3 +269,167 @@ char** extractSubStrings(char *nameList, unsigned n, const char delineator) {
     copy = NULL;
     return mat;
 }
+bool parseThreads(const char *s, unsigned *threads) {
+    // parse the value of a --threads option, an integer from 1 to kMaxThreads.
+    // Anything else is reported and false returned, leaving *threads alone.
+    char *end = NULL;
+    errno = 0;
+    long n = strtol(s, &end, 10);
+    if (end == s || *end != '\0' || errno != 0 || n < 1 || n > (long) kMaxThreads) {
+        fprintf(stderr, "Error, --threads must be an integer from 1 to %u, not %s\n", kMaxThreads, s);
+        return false;
+    }
+    *threads = (unsigned) n;
+    return true;
+}
+
+typedef struct profilePhase {
+    const char *name;
+    uint64_t calls;
+    double wallSeconds;
+    double cpuSeconds;
+    double wallStart;
+    double cpuStart;
+    bool running;
+} profilePhase_t;
+enum { kProfileMaxPhases = 64 };
+static profilePhase_t g_profilePhases[kProfileMaxPhases];
+static int g_profileNumberOfPhases = 0;
+static uint64_t g_profileCounters[kProfileNumberOfCounters];
+static const char *g_profileCounterNames[kProfileNumberOfCounters] = {
+    "bytesRead", "blocksParsed", "linesParsed", "parseAllocations"
+};
+static bool g_profileStarted = false;
+static double g_profileWallStart = 0.0;
+
+static double de_profile_wallSeconds(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (double) ts.tv_sec + (double) ts.tv_nsec / 1e9;
+}
+static double de_profile_cpuSeconds(void) {
+    // of the whole process, all threads included
+    return (double) clock() / CLOCKS_PER_SEC;
+}
+static uint64_t de_profile_peakResidentBytes(void) {
+    struct rusage usage;
+    if (getrusage(RUSAGE_SELF, &usage) != 0) {
+        return 0;
+    }
+#ifdef __APPLE__
+    return (uint64_t) usage.ru_maxrss;
+#else
+    return (uint64_t) usage.ru_maxrss * 1024;
+#endif
+}
+static void de_profile_writeAtExit(void) {
+    const char *path = getenv("MAFTOOLS_PROFILE");
+    FILE *f = fopen(path, "w");
+    if (f == NULL) {
+        // too late to fail the run over it
+        fprintf(stderr, "Error, unable to open MAFTOOLS_PROFILE file %s for writing\n", path);
+        return;
+    }
+    de_profile_writeReport(f);
+    fclose(f);
+}
+static void de_profile_start(void) {
+    // start the clock and, if MAFTOOLS_PROFILE is set, arrange for the report
+    // to be written at exit. Profiling builds start as the program is loaded,
+    // see de_profile_init(), otherwise the first use of the profiler starts.
+    if (g_profileStarted) {
+        return;
+    }
+    g_profileStarted = true;
+    g_profileWallStart = de_profile_wallSeconds();
+    const char *path = getenv("MAFTOOLS_PROFILE");
+    if (path != NULL && path[0] != '\0') {
+        atexit(de_profile_writeAtExit);
+    }
+}
+#ifdef MAFTOOLS_PROFILING
+__attribute__((constructor)) static void de_profile_init(void) {
+    // before main(), so that wallSeconds covers the whole run
+    de_profile_start();
+}
+#endif
+static profilePhase_t* de_profile_findPhase(const char *phase, bool add) {
+    // phases are kept in the order they were first begun
+    for (int i = 0; i < g_profileNumberOfPhases; ++i) {
+        if (g_profilePhases[i].name == phase || strcmp(g_profilePhases[i].name, phase) == 0) {
+            return g_profilePhases + i;
+        }
+    }
+    if (!add || g_profileNumberOfPhases == kProfileMaxPhases) {
+        return NULL;
+    }
+    profilePhase_t *p = g_profilePhases + g_profileNumberOfPhases++;
+    memset(p, 0, sizeof(*p));
+    p->name = phase;
+    return p;
+}
+void de_profile_begin(const char *phase) {
+    // start timing phase, which may be begun and ended any number of times
+    de_profile_start();
+    profilePhase_t *p = de_profile_findPhase(phase, true);
+    if (p == NULL || p->running) {
+        return;
+    }
+    p->running = true;
+    ++(p->calls);
+    p->wallStart = de_profile_wallSeconds();
+    p->cpuStart = de_profile_cpuSeconds();
+}
+void de_profile_end(const char *phase) {
+    profilePhase_t *p = de_profile_findPhase(phase, false);
+    if (p == NULL || !p->running) {
+        return;
+    }
+    p->running = false;
+    p->wallSeconds += de_profile_wallSeconds() - p->wallStart;
+    p->cpuSeconds += de_profile_cpuSeconds() - p->cpuStart;
+}
+void de_profile_count(profileCounter_t counter, uint64_t n) {
+    de_profile_start();
+    __sync_fetch_and_add(g_profileCounters + counter, n);
+}
+uint64_t de_profile_getCount(profileCounter_t counter) {
+    return __sync_fetch_and_add(g_profileCounters + counter, 0);
+}
+static void de_profile_writeName(FILE *f, const char *s) {
+    fputc('"', f);
+    for (; *s != '\0'; ++s) {
+        if (*s == '"' || *s == '\\') {
+            fputc('\\', f);
+        }
+        fputc(*s, f);
+    }
+    fputc('"', f);
+}
+void de_profile_writeReport(FILE *f) {
+    // write the profile so far as json. Phases still running are reported up to now.
+    de_profile_start();
+    double wallNow = de_profile_wallSeconds();
+    double cpuNow = de_profile_cpuSeconds();
+    fprintf(f, "{\n  \"wallSeconds\": %.6f,\n  \"cpuSeconds\": %.6f,\n  \"peakResidentBytes\": %" PRIu64 ",\n",
+            wallNow - g_profileWallStart, cpuNow, de_profile_peakResidentBytes());
+    fprintf(f, "  \"counters\": {");
+    for (int i = 0; i < kProfileNumberOfCounters; ++i) {
+        fprintf(f, "%s\n    \"%s\": %" PRIu64, (i == 0) ? "" : ",", g_profileCounterNames[i],
+                de_profile_getCount((profileCounter_t) i));
+    }
+    fprintf(f, "\n  },\n  \"phases\": [");
+    for (int i = 0; i < g_profileNumberOfPhases; ++i) {
+        profilePhase_t *p = g_profilePhases + i;
+        double wall = p->wallSeconds, cpu = p->cpuSeconds;
+        if (p->running) {
+            wall += wallNow - p->wallStart;
+            cpu += cpuNow - p->cpuStart;
+        }
+        fprintf(f, "%s\n    {\"name\": ", (i == 0) ? "" : ",");
+        de_profile_writeName(f, p->name);
+        fprintf(f, ", \"calls\": %" PRIu64 ", \"wallSeconds\": %.6f, \"cpuSeconds\": %.6f}",
+                p->calls, wall, cpu);
+    }
+    fprintf(f, "%s]\n}\n", (g_profileNumberOfPhases == 0) ? "" : "\n  ");
+}
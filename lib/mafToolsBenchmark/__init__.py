@@ -0,0 +1,37 @@
+##################################################
+# Copyright (C) 2013 by
+# Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+# ... and other members of the Reconstruction Team of David Haussler's
+# lab (BME Dept. UCSC).
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+##################################################
+"""
+Reproducible benchmarks of the built mafTools.
+
+generator writes seeded synthetic maf files, runner times the tools found in
+bin/ on them across size tiers and records the results as json, and compare
+flags the regressions between two such results. From lib/:
+
+    python2.7 -m mafToolsBenchmark run --tiers small,medium --out after.json
+    python2.7 -m mafToolsBenchmark compare before.json after.json
+"""
+from mafToolsBenchmark.generator import generateMaf, writeFasta
+from mafToolsBenchmark.runner import g_tiers, parseTiers, runBenchmarks
+from mafToolsBenchmark.compare import compareResults
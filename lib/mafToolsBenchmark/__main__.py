@@ -0,0 +1,128 @@
+##################################################
+# Copyright (C) 2013 by
+# Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+# ... and other members of the Reconstruction Team of David Haussler's
+# lab (BME Dept. UCSC).
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+##################################################
+"""
+python2.7 -m mafToolsBenchmark (generate|run|compare) [options]
+
+generate writes a synthetic maf, run times the built tools across size tiers
+and writes the results as json, compare reports the change between two such
+results and exits non-zero if any tool regressed by more than --threshold.
+"""
+from optparse import OptionParser
+import json
+import os
+import shutil
+import sys
+import tempfile
+from mafToolsBenchmark.compare import compareResults, reportComparisons
+from mafToolsBenchmark.generator import generateMaf
+from mafToolsBenchmark.runner import g_tiers, g_toolNames, parseTiers, runBenchmarks
+
+def initOptions(parser):
+    parser.add_option('--out', dest='out', default=None,
+                      help='generate: path of the maf to write. run: path of the json results, '
+                      'default=stdout.')
+    parser.add_option('--size', dest='size', default='small',
+                      help='generate: size of the maf, a tier name or name=bytes. default=%default')
+    parser.add_option('--seed', dest='seed', type='int', default=0,
+                      help='seed of the synthetic mafs. default=%default')
+    parser.add_option('--species', dest='numSpecies', type='int', default=8,
+                      help='generate: number of species. default=%default')
+    parser.add_option('--degree', dest='degree', type='int', default=6,
+                      help='generate: rows per block, before duplications. default=%default')
+    parser.add_option('--width', dest='width', type='int', default=60,
+                      help='generate: mean block width. default=%default')
+    parser.add_option('--gapRate', dest='gapRate', type='float', default=0.1,
+                      help='generate: fraction of gap columns in a row. default=%default')
+    parser.add_option('--reverseRate', dest='reverseRate', type='float', default=0.5,
+                      help='generate: fraction of rows on the - strand. default=%default')
+    parser.add_option('--duplicationRate', dest='duplicationRate', type='float', default=0.05,
+                      help='generate: fraction of rows followed by a duplicate of the same '
+                      'sequence. default=%default')
+    parser.add_option('--tiers', dest='tiers', default='small,medium',
+                      help='run: comma separated size tiers, names from %s or name=bytes. '
+                      'default=%%default' % ', '.join('%s=%d' % t for t in g_tiers))
+    parser.add_option('--tools', dest='tools', default=','.join(g_toolNames),
+                      help='run: comma separated tools to time. default=all built tools')
+    parser.add_option('--bin', dest='binDir',
+                      default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'bin'),
+                      help='run: directory holding the built tools. default=mafTools/bin')
+    parser.add_option('--repeats', dest='repeats', type='int', default=3,
+                      help='run: times to run each tool on each tier. default=%default')
+    parser.add_option('--threshold', dest='threshold', type='float', default=0.1,
+                      help='compare: the fractional slow down, or growth in memory, that counts '
+                      'as a regression. default=%default')
+    parser.add_option('--minSeconds', dest='minSeconds', type='float', default=0.05,
+                      help='compare: slow downs of fewer seconds than this are not regressions. '
+                      'default=%default')
+def checkOptions(options, args, parser):
+    if len(args) == 0 or args[0] not in ['generate', 'run', 'compare']:
+        parser.error('specify one of generate, run or compare')
+    if args[0] == 'generate' and options.out is None:
+        parser.error('generate needs --out')
+    if args[0] == 'compare' and len(args) != 3:
+        parser.error('compare needs two json results, the baseline first')
+    if options.repeats < 1:
+        parser.error('--repeats must be at least 1')
+    try:
+        options.tiers = parseTiers(options.tiers)
+        options.size = parseTiers(options.size)[0][1]
+    except ValueError, e:
+        parser.error(str(e))
+def main():
+    parser = OptionParser(usage=__doc__.strip())
+    initOptions(parser)
+    options, args = parser.parse_args()
+    checkOptions(options, args, parser)
+    if args[0] == 'generate':
+        info = generateMaf(options.out, options.size, seed=options.seed,
+                           numSpecies=options.numSpecies, degree=options.degree,
+                           width=options.width, gapRate=options.gapRate,
+                           reverseRate=options.reverseRate,
+                           duplicationRate=options.duplicationRate)
+        sys.stderr.write('wrote %d blocks, %d bytes to %s\n'
+                         % (info['blocks'], info['bytes'], options.out))
+    elif args[0] == 'run':
+        tmpDir = tempfile.mkdtemp(prefix='mafToolsBenchmark')
+        try:
+            results = runBenchmarks(options.binDir, tmpDir, options.tiers,
+                                    tools=options.tools.split(','), repeats=options.repeats,
+                                    seed=options.seed, log=sys.stderr)
+        finally:
+            shutil.rmtree(tmpDir)
+        out = sys.stdout if options.out is None else open(options.out, 'w')
+        json.dump(results, out, indent=2, sort_keys=True)
+        out.write('\n')
+        if out is not sys.stdout:
+            out.close()
+    else:
+        baseline = json.load(open(args[1]))
+        current = json.load(open(args[2]))
+        comparisons = compareResults(baseline, current, threshold=options.threshold,
+                                     minSeconds=options.minSeconds)
+        if reportComparisons(comparisons, sys.stdout) > 0:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
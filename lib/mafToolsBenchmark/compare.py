@@ -0,0 +1,67 @@
+##################################################
+# Copyright (C) 2013 by
+# Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+# ... and other members of the Reconstruction Team of David Haussler's
+# lab (BME Dept. UCSC).
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+##################################################
+
+def resultKey(result):
+    return (result['tool'], result['tier'])
+def compareResults(baseline, current, threshold=0.1, minSeconds=0.05):
+    """
+    compare two results of runner.runBenchmarks() and return a list of one
+    dict per tool and tier timed in both, giving the ratio, current over
+    baseline, of the wall time and of the peak resident memory. A ratio above
+    1 + threshold is a regression and is listed in the dict's 'regressions',
+    unless it is a slow down of less than minSeconds, which is put down to
+    noise.
+    """
+    before = dict((resultKey(r), r) for r in baseline['results'] if 'wallSeconds' in r)
+    comparisons = []
+    for r in current['results']:
+        if 'wallSeconds' not in r or resultKey(r) not in before:
+            continue
+        b = before[resultKey(r)]
+        c = {'tool': r['tool'], 'tier': r['tier'], 'regressions': []}
+        for metric in ['wallSeconds', 'peakResidentBytes']:
+            ratio = float(r[metric]) / max(b[metric], 1e-9)
+            c[metric] = ratio
+            if metric == 'wallSeconds' and r[metric] - b[metric] < minSeconds:
+                continue
+            if ratio > 1.0 + threshold:
+                c['regressions'].append(metric)
+        comparisons.append(c)
+    return comparisons
+def reportComparisons(comparisons, out):
+    """
+    write a table of comparisons from compareResults() to out and return the
+    number of regressions.
+    """
+    n = 0
+    out.write('%-20s %-8s %10s %10s\n' % ('tool', 'tier', 'time', 'memory'))
+    for c in comparisons:
+        flag = ''
+        if c['regressions']:
+            flag = '  REGRESSION (%s)' % ', '.join(c['regressions'])
+            n += len(c['regressions'])
+        out.write('%-20s %-8s %9.2fx %9.2fx%s\n'
+                  % (c['tool'], c['tier'], c['wallSeconds'], c['peakResidentBytes'], flag))
+    return n
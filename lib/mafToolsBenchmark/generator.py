@@ -0,0 +1,136 @@
+##################################################
+# Copyright (C) 2013 by
+# Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+# ... and other members of the Reconstruction Team of David Haussler's
+# lab (BME Dept. UCSC).
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+##################################################
+import random
+
+g_poolLength = 1 << 16
+
+def sequenceNames(numSpecies):
+    """
+    return the names of the sequences of a synthetic maf, one per species.
+    """
+    return ['species%d.chr0' % i for i in xrange(0, numSpecies)]
+def rowPool(rng, gapRate):
+    """
+    return a string of random bases and gaps, gapRate of them gaps, from which
+    the rows of the blocks are cut. Slicing one long string keeps generating
+    large files fast.
+    """
+    pool = []
+    for i in xrange(0, g_poolLength):
+        if rng.random() < gapRate:
+            pool.append('-')
+        else:
+            pool.append(rng.choice('ACGTACGTacgtN'))
+    pool = ''.join(pool)
+    return pool + pool
+def sourceLengthFor(size, numSpecies, degree, width, duplicationRate):
+    """
+    return a source length that the rows of a file of size bytes, numbered
+    along each sequence, will not run past. Generation stops short of size if
+    they would.
+    """
+    rowsPerBlock = min(degree, numSpecies) * (1.0 + duplicationRate)
+    bytesPerBlock = 20 + rowsPerBlock * (width + 40)
+    basesPerSequence = (float(size) / bytesPerBlock) * rowsPerBlock * width / numSpecies
+    return int(1.5 * basesPerSequence) + 10000
+def generateMaf(path, size, seed=0, numSpecies=8, degree=6, width=60, gapRate=0.1,
+                reverseRate=0.5, duplicationRate=0.05, sourceLength=None):
+    """
+    write a well formed maf of about size bytes to path and return a dict
+    describing it. The file depends only on the arguments.
+
+    Every block holds a row from min(degree, numSpecies) of the numSpecies
+    species, each row being followed by a second row of the same sequence
+    duplicationRate of the time. Block widths are uniform on [1, 2 * width - 1],
+    gapRate of the columns of a row are gaps and reverseRate of the rows are on
+    the - strand. Rows follow on from one another along each sequence so that
+    no position is aligned twice. sourceLength, if given, sets the length of
+    every sequence, which is otherwise kept to little more than the rows need.
+    """
+    rng = random.Random(seed)
+    names = sequenceNames(numSpecies)
+    pool = rowPool(rng, gapRate)
+    if sourceLength is None:
+        sourceLength = sourceLengthFor(size, numSpecies, degree, width, duplicationRate)
+    positions = dict((n, 0) for n in names)
+    numRows = min(degree, numSpecies)
+    written = 0
+    blocks = 0
+    f = open(path, 'w')
+    header = '##maf version=1 scoring=mafToolsBenchmark seed=%d\n\n' % seed
+    f.write(header)
+    written += len(header)
+    while written < size:
+        blockWidth = rng.randint(1, 2 * width - 1)
+        rows = []
+        for n in rng.sample(names, numRows):
+            rows.append(n)
+            if rng.random() < duplicationRate:
+                rows.append(n)
+        lines = ['a score=%d\n' % rng.randint(0, 100000)]
+        full = False
+        for n in rows:
+            offset = rng.randint(0, g_poolLength - 1)
+            seq = pool[offset:offset + blockWidth]
+            length = blockWidth - seq.count('-')
+            if length == 0:
+                seq = 'A' + seq[1:]
+                length = 1
+            if positions[n] + length > sourceLength:
+                full = True
+                break
+            start = positions[n]
+            positions[n] += length + rng.randint(0, 10)
+            if rng.random() < reverseRate:
+                strand = '-'
+                start = sourceLength - (start + length)
+            else:
+                strand = '+'
+            lines.append('s %s %d %d %s %d %s\n' % (n, start, length, strand, sourceLength, seq))
+        if full:
+            break
+        lines.append('\n')
+        block = ''.join(lines)
+        f.write(block)
+        written += len(block)
+        blocks += 1
+    f.close()
+    return {'path': path, 'bytes': written, 'blocks': blocks, 'seed': seed,
+            'sourceLength': sourceLength, 'names': names}
+def writeFasta(path, names, sourceLength, seed=0):
+    """
+    write a fasta holding a random sequence sourceLength long for each name,
+    for the tools that read the sequences of a maf alongside it.
+    """
+    rng = random.Random(seed)
+    line = ''.join(rng.choice('ACGT') for x in xrange(0, 4096))
+    line = line + line
+    f = open(path, 'w')
+    for n in names:
+        f.write('>%s\n' % n)
+        for i in xrange(0, sourceLength, 80):
+            offset = rng.randint(0, 4095)
+            f.write('%s\n' % line[offset:offset + min(80, sourceLength - i)])
+    f.close()
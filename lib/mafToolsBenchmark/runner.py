@@ -0,0 +1,162 @@
+##################################################
+# Copyright (C) 2013 by
+# Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+# ... and other members of the Reconstruction Team of David Haussler's
+# lab (BME Dept. UCSC).
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+##################################################
+import os
+import platform
+import subprocess
+import sys
+import time
+from mafToolsBenchmark.generator import generateMaf, writeFasta
+
+g_tiers = [('small', 1 << 20), ('medium', 16 << 20), ('large', 128 << 20)]
+g_toolNames = ['mafStats', 'mafFilter', 'mafExtractor', 'mafComparator', 'mafCoverage',
+               'mafPairCoverage', 'mafSorter', 'mafTransitiveClosure', 'mafToFastaStitcher',
+               'mafValidator.py']
+
+def parseTiers(s):
+    """
+    return the (name, bytes) size tiers listed in the comma separated string
+    s, each either the name of one of g_tiers or name=bytes, where bytes may
+    end in k, m or g.
+    """
+    known = dict(g_tiers)
+    tiers = []
+    for t in s.split(','):
+        if '=' in t:
+            name, size = t.split('=', 1)
+            scale = {'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30}.get(size[-1:].lower(), 1)
+            if scale != 1:
+                size = size[:-1]
+            tiers.append((name, int(size) * scale))
+        elif t in known:
+            tiers.append((t, known[t]))
+        else:
+            raise ValueError('unknown size tier %s, expected one of %s or name=bytes'
+                             % (t, ', '.join(n for n, b in g_tiers)))
+    return tiers
+def toolCommand(tool, path, maf, info, tmpDir):
+    """
+    return the command line that benchmarks tool, found at path, on maf,
+    described by info as returned by generateMaf().
+    """
+    names = info['names']
+    if tool == 'mafStats':
+        return [path, '--maf', maf]
+    if tool == 'mafFilter':
+        return [path, '--maf', maf, '--excludeSeq', names[0]]
+    if tool == 'mafExtractor':
+        return [path, '--maf', maf, '--seq', names[0], '--start', '0',
+                '--stop', str(info['sourceLength'] // 2)]
+    if tool == 'mafComparator':
+        return [path, '--maf1', maf, '--maf2', maf, '--samples', '100000',
+                '--out', os.path.join(tmpDir, 'comparator.xml')]
+    if tool == 'mafCoverage':
+        return [path, '--maf', maf, '--speciesOrChr', names[0].split('.')[0]]
+    if tool == 'mafPairCoverage':
+        return [path, '--maf', maf, '--seq1', names[0], '--seq2', names[1 % len(names)]]
+    if tool == 'mafSorter':
+        return [path, '--maf', maf, '--seq', names[0]]
+    if tool == 'mafTransitiveClosure':
+        return [path, '--maf', maf]
+    if tool == 'mafToFastaStitcher':
+        return [path, '--maf', maf, '--seqs', info['fasta'], '--breakpointPenalty', '5',
+                '--interstitialSequence', '20', '--outMfa', os.path.join(tmpDir, 'stitched.mfa')]
+    if tool == 'mafValidator.py':
+        return [sys.executable, path, '--maf', maf]
+    raise ValueError('no benchmark for %s' % tool)
+def timeCommand(cmd, tmpDir):
+    """
+    run cmd, discarding its output, and return its wall seconds, peak resident
+    bytes and exit status.
+    """
+    devnull = open(os.devnull, 'w')
+    err = open(os.path.join(tmpDir, 'stderr.txt'), 'w')
+    start = time.time()
+    p = subprocess.Popen(cmd, stdout=devnull, stderr=err, cwd=tmpDir)
+    pid, status, usage = os.wait4(p.pid, 0)
+    wall = time.time() - start
+    p.returncode = status
+    devnull.close()
+    err.close()
+    # ru_maxrss is in kilobytes on linux and in bytes on os x
+    rss = usage.ru_maxrss if platform.system() == 'Darwin' else usage.ru_maxrss * 1024
+    if os.WIFEXITED(status):
+        status = os.WEXITSTATUS(status)
+    else:
+        status = -os.WTERMSIG(status)
+    return wall, rss, status
+def runBenchmarks(binDir, tmpDir, tiers, tools=None, repeats=3, seed=0, log=None):
+    """
+    time each of tools, by default every one of g_toolNames that is built in
+    binDir, on a synthetic maf of each of tiers, and return the results as a
+    json ready dict. Each run is repeated, keeping the fastest time and the
+    largest peak resident memory.
+    """
+    if tools is None:
+        tools = g_toolNames
+    results = {'platform': platform.platform(), 'seed': seed, 'repeats': repeats,
+               'tiers': dict(tiers), 'results': []}
+    for tier, size in tiers:
+        maf = os.path.abspath(os.path.join(tmpDir, 'benchmark.%s.maf' % tier))
+        info = generateMaf(maf, size, seed=seed)
+        if 'mafToFastaStitcher' in tools and os.path.exists(os.path.join(binDir, 'mafToFastaStitcher')):
+            info['fasta'] = os.path.abspath(os.path.join(tmpDir, 'benchmark.%s.fa' % tier))
+            writeFasta(info['fasta'], info['names'], info['sourceLength'], seed=seed)
+        for tool in tools:
+            path = os.path.abspath(os.path.join(binDir, tool))
+            result = {'tool': tool, 'tier': tier, 'bytes': info['bytes'], 'blocks': info['blocks']}
+            if not os.path.exists(path):
+                result['skipped'] = 'not built'
+            else:
+                cmd = toolCommand(tool, path, maf, info, tmpDir)
+                walls, rsss = [], []
+                for r in xrange(0, repeats):
+                    wall, rss, status = timeCommand(cmd, tmpDir)
+                    if status != 0:
+                        result['error'] = 'exit status %d from %s' % (status, ' '.join(cmd))
+                        break
+                    walls.append(wall)
+                    rsss.append(rss)
+                if 'error' not in result:
+                    result['wallSeconds'] = min(walls)
+                    result['megabytesPerSecond'] = info['bytes'] / float(1 << 20) / max(min(walls), 1e-6)
+                    result['peakResidentBytes'] = max(rsss)
+            results['results'].append(result)
+            if log is not None:
+                log.write('%s %s %s\n' % (tier, tool, describe(result)))
+        for f in [maf, info.get('fasta')]:
+            if f is not None and os.path.exists(f):
+                os.remove(f)
+    return results
+def describe(result):
+    """
+    return a one line summary of a result of runBenchmarks().
+    """
+    if 'skipped' in result:
+        return 'skipped, %s' % result['skipped']
+    if 'error' in result:
+        return 'failed, %s' % result['error']
+    return ('%.3fs %.1f MB/s %.1f MB peak'
+            % (result['wallSeconds'], result['megabytesPerSecond'],
+               result['peakResidentBytes'] / float(1 << 20)))
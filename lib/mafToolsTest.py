@@ -214,6 +214,28 @@ def testFile(mafFile, s, headers=None):
     f.write(s)
     f.close()
     return mafFile, header
+def randomMafBody(numBlocks, names, seed=0):
+    """
+    return a string of numBlocks random but well formed maf blocks, each
+    holding rows from a random selection of the sequence names in names.
+    The rows of a name follow on from one another along its sequence, each on
+    a random strand. A name listed twice may appear twice in one block.
+    """
+    rng = random.Random(seed)
+    sourceLength = 10 * numBlocks * 100
+    positions = dict((n, 0) for n in names)
+    body = ''
+    for b in xrange(0, numBlocks):
+        width = rng.randint(1, 60)
+        body += 'a score=%d.%d\n' % (rng.randint(0, 100000), rng.randint(0, 9))
+        for n in rng.sample(names, rng.randint(1, len(names))):
+            seq = ''.join(rng.choice('ACGTacgtN--') for x in xrange(width))
+            length = width - seq.count('-')
+            strand = rng.choice('+-')
+            body += 's %s %d %d %s %d %s\n' % (n, positions[n], length, strand, sourceLength, seq)
+            positions[n] += length + rng.randint(0, 10)
+        body += '\n'
+    return body
 def recordCommands(cmdList, tmpDir, inPipes=None, outPipes=None):
     """
     given a path to the tmpDir, and the command list that was executed, record the command(s)
@@ -0,0 +1,402 @@
+/*
+ * Copyright (C) 2012 by
+ * Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+ * ... and other members of the Reconstruction Team of David Haussler's
+ * lab (BME Dept. UCSC).
+ *
+ * Permission is hereby granted, free of charge, to any person obtaining a copy
+ * of this software and associated documentation files (the "Software"), to deal
+ * in the Software without restriction, including without limitation the rights
+ * to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+ * copies of the Software, and to permit persons to whom the Software is
+ * furnished to do so, subject to the following conditions:
+ *
+ * The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+ *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+ * AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+ * LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+ * OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+ * THE SOFTWARE.
+ */
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include "seqKernels.h"
+
+#if defined(__GNUC__) && (defined(__x86_64__) || defined(__i386__))
+#define SEQ_KERNELS_X86 1
+#include <immintrin.h>
+#define SEQ_TARGET(t) __attribute__((target(t)))
+#endif
+
+static seqKernelsLevel_t g_maxLevel = kSeqKernelsAvx2;
+
+// complements, case preserving, 0 for characters that may not appear in a sequence
+static const char kComplement[256] = {
+  ['A'] = 'T', ['C'] = 'G', ['G'] = 'C', ['T'] = 'A',
+  ['M'] = 'K', ['R'] = 'Y', ['W'] = 'W', ['S'] = 'S', ['Y'] = 'R', ['K'] = 'M',
+  ['V'] = 'B', ['H'] = 'D', ['D'] = 'H', ['B'] = 'V', ['N'] = 'N', ['X'] = 'X',
+  ['a'] = 't', ['c'] = 'g', ['g'] = 'c', ['t'] = 'a',
+  ['m'] = 'k', ['r'] = 'y', ['w'] = 'w', ['s'] = 's', ['y'] = 'r', ['k'] = 'm',
+  ['v'] = 'b', ['h'] = 'd', ['d'] = 'h', ['b'] = 'v', ['n'] = 'n', ['x'] = 'x',
+  ['-'] = '-'
+};
+
+static void seq_invalidCharacter(char c) {
+  fprintf(stderr, "Error, unanticipated character in DNA sequence: %c\n", c);
+  exit(EXIT_FAILURE);
+}
+static inline char seq_complementChar(char c) {
+  char a = kComplement[(unsigned char) c];
+  if (a == '\0') {
+    seq_invalidCharacter(c);
+  }
+  return a;
+}
+seqKernelsLevel_t seq_getKernelLevel(void) {
+  seqKernelsLevel_t level = kSeqKernelsScalar;
+#ifdef SEQ_KERNELS_X86
+  if (__builtin_cpu_supports("avx2")) {
+    level = kSeqKernelsAvx2;
+  } else if (__builtin_cpu_supports("sse2")) {
+    level = kSeqKernelsSse2;
+  }
+#endif
+  return (level < g_maxLevel) ? level : g_maxLevel;
+}
+void seq_setKernelLevel(seqKernelsLevel_t level) {
+  g_maxLevel = level;
+}
+const char* seq_kernelLevelName(seqKernelsLevel_t level) {
+  switch (level) {
+  case kSeqKernelsAvx2:
+    return "avx2";
+  case kSeqKernelsSse2:
+    return "sse2";
+  default:
+    return "scalar";
+  }
+}
+//////////////////////////////////////////////////
+// lookup table versions
+//////////////////////////////////////////////////
+static void seq_complement_scalar(char *s, size_t n) {
+  for (size_t i = 0; i < n; ++i) {
+    s[i] = seq_complementChar(s[i]);
+  }
+}
+static void seq_reverseComplement_scalar(char *s, size_t n) {
+  if (n == 0) {
+    return;
+  }
+  char c;
+  for (size_t i = 0, j = n - 1; i < j; ++i, --j) {
+    c = seq_complementChar(s[i]);
+    s[i] = seq_complementChar(s[j]);
+    s[j] = c;
+  }
+  if (n % 2 == 1) {
+    s[n / 2] = seq_complementChar(s[n / 2]);
+  }
+}
+static void seq_toUpper_scalar(char *s, size_t n) {
+  for (size_t i = 0; i < n; ++i) {
+    s[i] = (char) (s[i] - (((unsigned) ((unsigned char) s[i] - 'a') < 26u) ? 0x20 : 0));
+  }
+}
+static uint64_t seq_countGaps_scalar(const char *s, size_t n) {
+  uint64_t gaps = 0;
+  for (size_t i = 0; i < n; ++i) {
+    gaps += (s[i] == '-');
+  }
+  return gaps;
+}
+static uint64_t seq_countNs_scalar(const char *s, size_t n) {
+  uint64_t ns = 0;
+  for (size_t i = 0; i < n; ++i) {
+    ns += ((s[i] | 0x20) == 'n');
+  }
+  return ns;
+}
+static void seq_nonGapPrefixSum_scalar(const char *s, size_t n, uint64_t *out, uint64_t base) {
+  out[0] = base;
+  for (size_t i = 0; i < n; ++i) {
+    out[i + 1] = out[i] + (s[i] != '-');
+  }
+}
+static void seq_unpackNibbles_scalar(char *out, const uint8_t *packed, size_t n, const char table[16]) {
+  for (size_t i = 0; i + 1 < n; i += 2) {
+    out[i] = table[packed[i / 2] & 0xf];
+    out[i + 1] = table[packed[i / 2] >> 4];
+  }
+  if (n % 2 == 1) {
+    out[n - 1] = table[packed[n / 2] & 0xf];
+  }
+}
+#ifdef SEQ_KERNELS_X86
+//////////////////////////////////////////////////
+// SSE2 versions. SSE2 has no byte shuffle, so the complements stay table driven.
+//////////////////////////////////////////////////
+SEQ_TARGET("sse2")
+static uint64_t seq_sumBytes_sse2(__m128i counts) {
+  __m128i sums = _mm_sad_epu8(counts, _mm_setzero_si128());
+  return (uint64_t) _mm_cvtsi128_si32(sums) + (uint64_t) _mm_cvtsi128_si32(_mm_srli_si128(sums, 8));
+}
+SEQ_TARGET("sse2")
+static uint64_t seq_countMatches_sse2(const char *s, size_t n, char c, char orMask) {
+  // the number of bytes b for which (b | orMask) == c. Matches are gathered in
+  // byte counters that are summed before they can overflow.
+  const __m128i target = _mm_set1_epi8(c), mask = _mm_set1_epi8(orMask);
+  uint64_t total = 0;
+  size_t i = 0;
+  while (i + 16 <= n) {
+    __m128i counts = _mm_setzero_si128();
+    for (unsigned k = 0; k < 255 && i + 16 <= n; ++k, i += 16) {
+      __m128i v = _mm_or_si128(_mm_loadu_si128((const __m128i*) (s + i)), mask);
+      counts = _mm_sub_epi8(counts, _mm_cmpeq_epi8(v, target));
+    }
+    total += seq_sumBytes_sse2(counts);
+  }
+  for (; i < n; ++i) {
+    total += ((s[i] | orMask) == c);
+  }
+  return total;
+}
+SEQ_TARGET("sse2")
+static void seq_toUpper_sse2(char *s, size_t n) {
+  const __m128i below = _mm_set1_epi8('a' - 1), above = _mm_set1_epi8('z' + 1), caseBit = _mm_set1_epi8(0x20);
+  size_t i = 0;
+  for (; i + 16 <= n; i += 16) {
+    __m128i v = _mm_loadu_si128((const __m128i*) (s + i));
+    // bytes >= 0x80 compare as negative and are left alone
+    __m128i lower = _mm_and_si128(_mm_cmpgt_epi8(v, below), _mm_cmpgt_epi8(above, v));
+    _mm_storeu_si128((__m128i*) (s + i), _mm_sub_epi8(v, _mm_and_si128(lower, caseBit)));
+  }
+  seq_toUpper_scalar(s + i, n - i);
+}
+//////////////////////////////////////////////////
+// AVX2 versions
+//////////////////////////////////////////////////
+// complements of letters by their position in the alphabet (c & 0x1f), 0 for
+// letters that are not iupac codes. The case bits are carried over unchanged.
+static const char kComplementByLetter[32] = {
+  [1] = 20, [2] = 22, [3] = 7, [4] = 8, [7] = 3, [8] = 4, [11] = 13, [13] = 11, [14] = 14,
+  [18] = 25, [19] = 19, [20] = 1, [22] = 2, [23] = 23, [24] = 24, [25] = 18
+};
+SEQ_TARGET("avx2")
+static uint64_t seq_sumBytes_avx2(__m256i counts) {
+  __m256i sums = _mm256_sad_epu8(counts, _mm256_setzero_si256());
+  return (uint64_t) _mm256_extract_epi64(sums, 0) + (uint64_t) _mm256_extract_epi64(sums, 1) +
+    (uint64_t) _mm256_extract_epi64(sums, 2) + (uint64_t) _mm256_extract_epi64(sums, 3);
+}
+SEQ_TARGET("avx2")
+static uint64_t seq_countMatches_avx2(const char *s, size_t n, char c, char orMask) {
+  const __m256i target = _mm256_set1_epi8(c), mask = _mm256_set1_epi8(orMask);
+  uint64_t total = 0;
+  size_t i = 0;
+  while (i + 32 <= n) {
+    __m256i counts = _mm256_setzero_si256();
+    for (unsigned k = 0; k < 255 && i + 32 <= n; ++k, i += 32) {
+      __m256i v = _mm256_or_si256(_mm256_loadu_si256((const __m256i*) (s + i)), mask);
+      counts = _mm256_sub_epi8(counts, _mm256_cmpeq_epi8(v, target));
+    }
+    total += seq_sumBytes_avx2(counts);
+  }
+  return total + seq_countMatches_sse2(s + i, n - i, c, orMask);
+}
+SEQ_TARGET("avx2")
+static void seq_toUpper_avx2(char *s, size_t n) {
+  const __m256i below = _mm256_set1_epi8('a' - 1), above = _mm256_set1_epi8('z' + 1);
+  const __m256i caseBit = _mm256_set1_epi8(0x20);
+  size_t i = 0;
+  for (; i + 32 <= n; i += 32) {
+    __m256i v = _mm256_loadu_si256((const __m256i*) (s + i));
+    __m256i lower = _mm256_and_si256(_mm256_cmpgt_epi8(v, below), _mm256_cmpgt_epi8(above, v));
+    _mm256_storeu_si256((__m256i*) (s + i), _mm256_sub_epi8(v, _mm256_and_si256(lower, caseBit)));
+  }
+  seq_toUpper_scalar(s + i, n - i);
+}
+SEQ_TARGET("avx2")
+static __m256i seq_complement32_avx2(__m256i v, const char *s) {
+  // complement 32 characters, s is where they came from and is only used to
+  // report a character that can not be complemented.
+  const __m256i low = _mm256_broadcastsi128_si256(_mm_loadu_si128((const __m128i*) kComplementByLetter));
+  const __m256i high = _mm256_broadcastsi128_si256(_mm_loadu_si128((const __m128i*) (kComplementByLetter + 16)));
+  const __m256i nibble = _mm256_set1_epi8(0x0f), bit4 = _mm256_set1_epi8(0x10);
+  __m256i folded = _mm256_or_si256(v, _mm256_set1_epi8(0x20));
+  __m256i isLetter = _mm256_and_si256(_mm256_cmpgt_epi8(folded, _mm256_set1_epi8('a' - 1)),
+                                      _mm256_cmpgt_epi8(_mm256_set1_epi8('z' + 1), folded));
+  __m256i index = _mm256_and_si256(v, nibble);
+  __m256i comp = _mm256_blendv_epi8(_mm256_shuffle_epi8(low, index), _mm256_shuffle_epi8(high, index),
+                                    _mm256_cmpeq_epi8(_mm256_and_si256(v, bit4), bit4));
+  __m256i valid = _mm256_or_si256(_mm256_andnot_si256(_mm256_cmpeq_epi8(comp, _mm256_setzero_si256()), isLetter),
+                                  _mm256_cmpeq_epi8(v, _mm256_set1_epi8('-')));
+  uint32_t validBits = (uint32_t) _mm256_movemask_epi8(valid);
+  if (validBits != 0xffffffffu) {
+    seq_invalidCharacter(s[__builtin_ctz(~validBits)]);
+  }
+  __m256i letters = _mm256_or_si256(_mm256_and_si256(v, _mm256_set1_epi8((char) 0xe0)), comp);
+  return _mm256_blendv_epi8(v, letters, isLetter);
+}
+SEQ_TARGET("avx2")
+static __m256i seq_reverse32_avx2(__m256i v) {
+  const __m256i reverse = _mm256_setr_epi8(15, 14, 13, 12, 11, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1, 0,
+                                           15, 14, 13, 12, 11, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1, 0);
+  return _mm256_permute4x64_epi64(_mm256_shuffle_epi8(v, reverse), 0x4e);
+}
+SEQ_TARGET("avx2")
+static void seq_complement_avx2(char *s, size_t n) {
+  size_t i = 0;
+  for (; i + 32 <= n; i += 32) {
+    __m256i v = _mm256_loadu_si256((const __m256i*) (s + i));
+    _mm256_storeu_si256((__m256i*) (s + i), seq_complement32_avx2(v, s + i));
+  }
+  seq_complement_scalar(s + i, n - i);
+}
+SEQ_TARGET("avx2")
+static void seq_reverseComplement_avx2(char *s, size_t n) {
+  // swap 32 characters from each end at a time, the middle is done by table
+  size_t i = 0, j = n;
+  while (j - i >= 64) {
+    __m256i a = _mm256_loadu_si256((const __m256i*) (s + i));
+    __m256i b = _mm256_loadu_si256((const __m256i*) (s + j - 32));
+    a = seq_reverse32_avx2(seq_complement32_avx2(a, s + i));
+    b = seq_reverse32_avx2(seq_complement32_avx2(b, s + j - 32));
+    _mm256_storeu_si256((__m256i*) (s + i), b);
+    _mm256_storeu_si256((__m256i*) (s + j - 32), a);
+    i += 32;
+    j -= 32;
+  }
+  seq_reverseComplement_scalar(s + i, j - i);
+}
+SEQ_TARGET("avx2")
+static void seq_nonGapPrefixSum_avx2(const char *s, size_t n, uint64_t *out) {
+  // runs of 32 characters that are all gaps or all bases, the usual case, are
+  // written four counts at a time, mixed runs are done by table.
+  const __m256i gap = _mm256_set1_epi8('-');
+  const __m256i step = _mm256_setr_epi64x(1, 2, 3, 4), four = _mm256_set1_epi64x(4);
+  out[0] = 0;
+  size_t i = 0;
+  for (; i + 32 <= n; i += 32) {
+    uint32_t gaps = (uint32_t) _mm256_movemask_epi8(_mm256_cmpeq_epi8(_mm256_loadu_si256((const __m256i*) (s + i)),
+                                                                       gap));
+    uint64_t base = out[i];
+    if (gaps == 0) {
+      __m256i counts = _mm256_add_epi64(_mm256_set1_epi64x((long long) base), step);
+      for (unsigned k = 0; k < 32; k += 4) {
+        _mm256_storeu_si256((__m256i*) (out + i + 1 + k), counts);
+        counts = _mm256_add_epi64(counts, four);
+      }
+    } else if (gaps == 0xffffffffu) {
+      __m256i counts = _mm256_set1_epi64x((long long) base);
+      for (unsigned k = 0; k < 32; k += 4) {
+        _mm256_storeu_si256((__m256i*) (out + i + 1 + k), counts);
+      }
+    } else {
+      seq_nonGapPrefixSum_scalar(s + i, 32, out + i, base);
+    }
+  }
+  seq_nonGapPrefixSum_scalar(s + i, n - i, out + i, out[i]);
+}
+SEQ_TARGET("avx2")
+static void seq_unpackNibbles_avx2(char *out, const uint8_t *packed, size_t n, const char table[16]) {
+  // 16 bytes, 32 codes, at a time: both halves of each byte are looked up
+  // with a byte shuffle and interleaved back into order
+  const __m128i codes = _mm_loadu_si128((const __m128i*) table), nibble = _mm_set1_epi8(0x0f);
+  size_t i = 0;
+  for (; i + 32 <= n; i += 32) {
+    __m128i p = _mm_loadu_si128((const __m128i*) (packed + i / 2));
+    __m128i low = _mm_shuffle_epi8(codes, _mm_and_si128(p, nibble));
+    __m128i high = _mm_shuffle_epi8(codes, _mm_and_si128(_mm_srli_epi16(p, 4), nibble));
+    _mm_storeu_si128((__m128i*) (out + i), _mm_unpacklo_epi8(low, high));
+    _mm_storeu_si128((__m128i*) (out + i + 16), _mm_unpackhi_epi8(low, high));
+  }
+  seq_unpackNibbles_scalar(out + i, packed + i / 2, n - i, table);
+}
+#endif // SEQ_KERNELS_X86
+//////////////////////////////////////////////////
+// dispatch
+//////////////////////////////////////////////////
+void seq_complement(char *s, size_t n) {
+#ifdef SEQ_KERNELS_X86
+  if (seq_getKernelLevel() == kSeqKernelsAvx2) {
+    seq_complement_avx2(s, n);
+    return;
+  }
+#endif
+  seq_complement_scalar(s, n);
+}
+void seq_reverseComplement(char *s, size_t n) {
+#ifdef SEQ_KERNELS_X86
+  if (seq_getKernelLevel() == kSeqKernelsAvx2) {
+    seq_reverseComplement_avx2(s, n);
+    return;
+  }
+#endif
+  seq_reverseComplement_scalar(s, n);
+}
+void seq_toUpper(char *s, size_t n) {
+#ifdef SEQ_KERNELS_X86
+  switch (seq_getKernelLevel()) {
+  case kSeqKernelsAvx2:
+    seq_toUpper_avx2(s, n);
+    return;
+  case kSeqKernelsSse2:
+    seq_toUpper_sse2(s, n);
+    return;
+  default:
+    break;
+  }
+#endif
+  seq_toUpper_scalar(s, n);
+}
+uint64_t seq_countGaps(const char *s, size_t n) {
+#ifdef SEQ_KERNELS_X86
+  switch (seq_getKernelLevel()) {
+  case kSeqKernelsAvx2:
+    return seq_countMatches_avx2(s, n, '-', 0);
+  case kSeqKernelsSse2:
+    return seq_countMatches_sse2(s, n, '-', 0);
+  default:
+    break;
+  }
+#endif
+  return seq_countGaps_scalar(s, n);
+}
+uint64_t seq_countNs(const char *s, size_t n) {
+#ifdef SEQ_KERNELS_X86
+  switch (seq_getKernelLevel()) {
+  case kSeqKernelsAvx2:
+    return seq_countMatches_avx2(s, n, 'n', 0x20);
+  case kSeqKernelsSse2:
+    return seq_countMatches_sse2(s, n, 'n', 0x20);
+  default:
+    break;
+  }
+#endif
+  return seq_countNs_scalar(s, n);
+}
+void seq_nonGapPrefixSum(const char *s, size_t n, uint64_t *out) {
+#ifdef SEQ_KERNELS_X86
+  if (seq_getKernelLevel() == kSeqKernelsAvx2) {
+    seq_nonGapPrefixSum_avx2(s, n, out);
+    return;
+  }
+#endif
+  seq_nonGapPrefixSum_scalar(s, n, out, 0);
+}
+void seq_unpackNibbles(char *out, const uint8_t *packed, size_t n, const char table[16]) {
+#ifdef SEQ_KERNELS_X86
+  if (seq_getKernelLevel() == kSeqKernelsAvx2) {
+    seq_unpackNibbles_avx2(out, packed, n, table);
+    return;
+  }
+#endif
+  seq_unpackNibbles_scalar(out, packed, n, table);
+}
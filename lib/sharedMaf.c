@@ -22,6 +22,7 @@
  * OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
  * THE SOFTWARE.
  */
+#define _DEFAULT_SOURCE // mmap() and MAP_POPULATE under -std=c99
 #include <assert.h>
 #include <ctype.h>
 #include <inttypes.h>
@@ -31,10 +32,18 @@
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <fcntl.h>
+#include <pthread.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
 #include "common.h"
 #include "CuTest.h"
 #include "sharedMaf.h"
+#include "bgzf.h"
+#include "seqKernels.h"
 
+typedef struct mafBinaryInput mafBinaryInput_t;
 struct mafFileApi {
   // a mafFileApi struct provides an interface into a maf file.
   // Allows for easy reading of files in entirety or block by block via
@@ -45,9 +54,58 @@ struct mafFileApi {
   char *lastLine; /* a temporary cache in case the header fails to have a blank
                    * line before the first alignment block.
                    */
+  char *buffer; // block read buffer, lines are handed out as views into this
+  size_t bufferSize; // allocated size of buffer
+  size_t bufferStart; // offset of the first unconsumed byte in buffer
+  size_t bufferEnd; // offset one past the last valid byte in buffer
+  bool eof; // true once the underlying file has been exhausted
+  bool lazyParsing; // see maf_mafFileApi_setLazyParsing()
+  char *map; // the whole file when it is memory mapped, see maf_newMfa(). buffer then points here
+  size_t mapSize;
+  char *scratch; // '\0' terminated copies of mapped lines, which are read only
+  size_t scratchSize;
+  uint64_t bufferOffset; // file offset of buffer[0]
+  uint64_t lineOffset; // file offset of the line last read
+  uint64_t lastLineOffset; // file offset of lastLine
+  uint64_t blockOffset; // file offset of the first line of the block last read
+  bgzfReader_t *bgzf; // gzip input, offsets are then positions in the uncompressed data
+  bgzfWriter_t *bgzfOut; // blocked gzip output
+  mafWriter_t *out; // plain output
+  mafNameDict_t *names; // see maf_mafFileApi_getNameDict()
+  bool internNames; // see maf_mafFileApi_setNameInterning()
+  bool formatKnown; // whether the input has been checked for being a .mafb file yet
+  mafBinaryInput_t *binary; // .mafb input, NULL for text
+  mafBinaryWriter_t *binaryOut; // .mafb output
 };
+// .mafb input, see the binary maf section below
+static bool maf_mafFileApi_isBinary(mafFileApi_t *mfa);
+static mafBlock_t* maf_mafFileApi_readBinaryBlock(mafFileApi_t *mfa, mafBlock_t *mb);
+static void maf_destroyMafBinaryInput(mafBinaryInput_t *in);
+static void maf_mafFileApi_writeBinaryBlock(mafFileApi_t *mfa, mafBlock_t *mb);
+static const size_t kMafReadBufferSize = 1 << 20;
+static const size_t kMafCompressionPeekSize = 18; // enough to recognise blocked gzip
+static const long kMafMaxDecompressionThreads = 8;
+enum mafLineStorage {
+  // records which of a mafLine_t's buffers must be released by
+  // maf_destroyMafLineList(). Lines read with maf_readBlockInto() live in their
+  // block's arena and own nothing.
+  kMafLineOwnsLine = 1 << 0,
+  kMafLineOwnsSpecies = 1 << 1,
+  kMafLineOwnsSequence = 1 << 2,
+  kMafLineInArena = 1 << 3,
+  kMafLineSequenceInLine = 1 << 4, // sequence is a view of the tail of line, not a copy
+  kMafLineSpeciesUnread = 1 << 5, // read lazily, species not yet copied out of line
+  kMafLineSequenceUnread = 1 << 6, // read lazily, sequence not yet located in line
+  kMafLineUnconverted = 1 << 7, // read lazily, start, length, strand and source length not yet read
+  kMafLineUnread = kMafLineSpeciesUnread | kMafLineSequenceUnread | kMafLineUnconverted,
+};
+static const uint8_t kMafLineOwnsAll = kMafLineOwnsLine | kMafLineOwnsSpecies | kMafLineOwnsSequence;
 struct mafLine {
-  // a mafLine struct is a single line of a mafBlock
+  // a mafLine struct is a single line of a mafBlock.
+  // Lines built from text hold everything in one buffer, laid out as
+  // line\0species\0, with sequence pointing into line itself wherever the
+  // sequence field is the last thing on the line (otherwise a copy follows
+  // species). Only line is then separately allocated.
   char *line; // the entire line, unparsed
   uint64_t lineNumber; // line number in the maf file
   char type; // either a, s, i, q, e, h, f where h is header (an internal code)
@@ -56,10 +114,88 @@ struct mafLine {
   uint64_t length;
   char strand;
   uint64_t sourceLength;
-  char *sequence; // sequence field
+  char *sequence; // sequence field, see maf_mafLine_getMutableSequence()
   uint64_t sequenceFieldLength;
+  uint8_t storage; // mafLineStorage flags
+  uint32_t nameId; // ids in the file's mafNameDict_t, kMafNoNameId unless interned
+  uint32_t speciesId;
+  mafCoordinateMap_t *coordinates; // see maf_mafLine_getCoordinateMap()
   struct mafLine *next;
 };
+struct mafCoordinateMap {
+  // the columns of a line's sequence field against the bases they hold, see
+  // maf_mafLine_getCoordinateMap(). Either prefix holds the number of bases
+  // before every column, or, when the gaps fall in few runs, only the runs are
+  // kept and counts are found by binary search over them.
+  bool valid;
+  bool usesRuns;
+  uint64_t columns;
+  uint64_t bases;
+  uint64_t *prefix; // columns + 1 values, prefix[c] bases in columns [0, c)
+  uint64_t prefixCapacity;
+  uint64_t numberOfRuns;
+  uint64_t *runStarts; // first column of each run of gaps
+  uint64_t *gapsBefore; // numberOfRuns + 1 values, gaps in the runs before each run
+  uint64_t runsCapacity;
+};
+typedef struct mafLineFields {
+  // offsets into a line of the fields of an `s' line, see maf_parseSequenceLine()
+  size_t species;
+  size_t speciesLength;
+  uint64_t start;
+  uint64_t length;
+  char strand;
+  uint64_t sourceLength;
+  size_t sequence;
+  size_t sequenceLength;
+} mafLineFields_t;
+typedef struct mafBlockArena {
+  // storage reused from block to block by maf_readBlockInto(). All of the text
+  // of a block lives in one contiguous buffer and all of its mafLine_t structs
+  // in one array, so a steady state read performs no allocations at all.
+  char *text; // line\0species\0 for each line of the block, as in mafLine_t
+  size_t textSize;
+  size_t textUsed;
+  mafLine_t *lines;
+  size_t linesSize;
+  size_t *offsets; // three text offsets per line, resolved to pointers once the block is read
+  size_t offsetsSize;
+} mafBlockArena_t;
+typedef struct mafBlockColumns {
+  // the s line fields of a block as one array per field, built on first use
+  // by maf_mafBlock_getColumns() and owned by the block. The arrays are kept
+  // from block to block by maf_readBlockInto() and only regrown when needed.
+  bool valid;
+  uint64_t n; // number of s lines
+  uint64_t capacity;
+  mafLine_t **lines;
+  char **species; // pointers to the lines' own species strings
+  char *strands; // '\0' terminated
+  int *strandInts;
+  uint64_t *starts;
+  uint64_t *posCoordStarts;
+  uint64_t *posCoordLefts;
+  uint64_t *sourceLengths;
+  uint64_t *sequenceLengths;
+  uint32_t *nameIds;
+  uint32_t *speciesIds; // shares the nameIds allocation
+} mafBlockColumns_t;
+struct mafSequenceMatrix {
+  // the sequences of a block as an n x m matrix, see maf_mafBlock_getSequenceMatrixView().
+  // Rows are borrowed from the lines where they are exactly m long and copied
+  // into one shared allocation otherwise. The column-major transpose is only
+  // built when a column is asked for.
+  bool valid;
+  bool columnsValid;
+  uint64_t n;
+  uint64_t m;
+  char **rows;
+  uint64_t rowsCapacity;
+  char *copies; // (m + 1) bytes per copied row
+  uint64_t copiesCapacity;
+  char *columns; // n * m bytes, column c starts at columns + c * n
+  uint64_t columnsCapacity;
+};
 struct mafBlock {
   // a mafBlock struct contains a maf block as a linked list
   // and itself can be part of a mafBlock linked list.
@@ -69,11 +205,33 @@ struct mafBlock {
   uint64_t numberOfLines; // number of mafLine_t structures in the *headLine list
   uint64_t numberOfSequences;
   uint64_t sequenceFieldLength;
+  mafBlockArena_t *arena; // only present for blocks filled by maf_readBlockInto()
+  mafBlockColumns_t *columns; // only present once one of the *ArrayView() getters is used
+  mafSequenceMatrix_t *matrix; // only present once maf_mafBlock_getSequenceMatrixView() is used
+  bool lazySequenceFieldLength; // sequenceFieldLength is taken from the first s line on first use
   struct mafBlock *next;
 };
-static bool maf_isBlankLine(char *s) {
-  // return true if line is only whitespaces
-  size_t n = strlen(s);
+struct mafWriter {
+  // buffered output, see maf_newMafWriter(). Text is gathered in buffer and
+  // handed to fwrite() a buffer at a time, by a writer thread if there is one.
+  FILE *f;
+  char *buffer;
+  size_t size;
+  size_t used;
+  bool ownsBuffer;
+  bool threaded;
+  char *spare; // the buffer being written by the writer thread
+  size_t spareUsed;
+  bool spareFull;
+  bool stop;
+  pthread_mutex_t lock;
+  pthread_cond_t cond;
+  pthread_t thread;
+};
+static const size_t kMafWriterBufferSize = 1 << 20;
+static const size_t kMafPrintBufferSize = 1 << 13;
+static bool maf_isBlankLine(const char *s, size_t n) {
+  // return true if the n characters of line s are only whitespaces
   for (size_t i = 0; i < n; ++i) {
     if (!isspace(*(s + i))) {
       return false;
@@ -81,10 +239,8 @@ static bool maf_isBlankLine(char *s) {
   }
   return true;
 }
-static void maf_checkForPrematureMafEnd(char *filename, int status, char *line) {
+static void maf_checkForPrematureMafEnd(char *filename, int64_t status) {
   if (status == -1) {
-    free(line);
-    line = NULL;
     fprintf(stderr, "Error, premature end to maf file: %s\n", filename);
     exit(EXIT_FAILURE);
   }
@@ -96,6 +252,7 @@ static void maf_failBadFormat(uint64_t lineNumber, char *errorMessage) {
 }
 mafLine_t* maf_newMafLine(void) {
   mafLine_t *ml = (mafLine_t *) de_malloc(sizeof(*ml));
+  PROFILE_COUNT(kProfileParseAllocations, 1);
   ml->line = NULL;
   ml->lineNumber = 0;
   ml->type = '\0';
@@ -106,9 +263,42 @@ mafLine_t* maf_newMafLine(void) {
   ml->sourceLength = 0;
   ml->sequence = NULL;
   ml->sequenceFieldLength = 0;
+  ml->storage = kMafLineOwnsAll;
+  ml->nameId = kMafNoNameId;
+  ml->speciesId = kMafNoNameId;
+  ml->coordinates = NULL;
   ml->next = NULL;
   return ml;
 }
+static size_t maf_packedTextSize(size_t lineLength, size_t speciesLength, size_t sequenceLength,
+                                 bool sequenceIsLineTail) {
+  return lineLength + 1 + speciesLength + 1 + (sequenceIsLineTail ? 0 : sequenceLength + 1);
+}
+static void maf_mafLine_packText(mafLine_t *ml, const char *line, size_t lineLength,
+                                 const char *species, size_t speciesLength,
+                                 const char *sequence, size_t sequenceLength,
+                                 bool sequenceIsLineTail) {
+  // give ml a single allocation holding line\0species\0, pointing sequence
+  // into line when it is the tail of line and appending a copy otherwise.
+  char *text = (char *) de_malloc(maf_packedTextSize(lineLength, speciesLength, sequenceLength,
+                                                     sequenceIsLineTail));
+  PROFILE_COUNT(kProfileParseAllocations, 1);
+  memcpy(text, line, lineLength);
+  text[lineLength] = '\0';
+  ml->line = text;
+  ml->species = text + lineLength + 1;
+  memcpy(ml->species, species, speciesLength);
+  ml->species[speciesLength] = '\0';
+  if (sequenceIsLineTail) {
+    ml->sequence = text + lineLength - sequenceLength;
+    ml->storage = kMafLineOwnsLine | kMafLineSequenceInLine;
+  } else {
+    ml->sequence = ml->species + speciesLength + 1;
+    memcpy(ml->sequence, sequence, sequenceLength);
+    ml->sequence[sequenceLength] = '\0';
+    ml->storage = kMafLineOwnsLine;
+  }
+}
 mafLine_t* maf_copyMafLineList(mafLine_t *orig) {
   // create and return a copy of orig, a mafLine_t linked list
   if (orig == NULL) {
@@ -135,22 +325,36 @@ mafLine_t* maf_copyMafLine(mafLine_t *orig) {
     return NULL;
   }
   mafLine_t *ml = maf_newMafLine();
-  if (orig->line != NULL) {
+  if (orig->storage & kMafLineSequenceUnread) {
     ml->line = de_strdup(orig->line);
+    ml->species = de_strdup(maf_mafLine_getSpecies(orig));
+    ml->storage = kMafLineOwnsLine | kMafLineOwnsSpecies | kMafLineSequenceUnread;
+  } else if (orig->line != NULL && orig->species != NULL && orig->sequence != NULL) {
+    maf_mafLine_packText(ml, orig->line, strlen(orig->line), orig->species, strlen(orig->species),
+                         orig->sequence, orig->sequenceFieldLength,
+                         (orig->storage & kMafLineSequenceInLine) != 0);
+  } else {
+    if (orig->line != NULL) {
+      ml->line = de_strdup(orig->line);
+    }
+    if (orig->species != NULL) {
+      ml->species = de_strdup(orig->species);
+    }
+    if (orig->sequence != NULL) {
+      ml->sequence = de_strdup(orig->sequence);
+    }
   }
   ml->lineNumber = orig->lineNumber;
   ml->type = orig->type;
-  if (orig->species != NULL) {
-    ml->species = de_strdup(orig->species);
-  }
   ml->start = orig->start;
   ml->length = orig->length;
   ml->strand = orig->strand;
   ml->sourceLength = orig->sourceLength;
-  if (orig->sequence != NULL) {
-    ml->sequence = de_strdup(orig->sequence);
-  }
   ml->sequenceFieldLength = orig->sequenceFieldLength;
+  ml->nameId = orig->nameId;
+  ml->speciesId = orig->speciesId;
+  // a lazily read line stays lazy in the copy
+  ml->storage |= orig->storage & kMafLineUnconverted;
   return ml;
 }
 mafBlock_t* maf_newMafBlockListFromString(const char *s, uint64_t lineNumber) {
@@ -235,95 +439,171 @@ mafBlock_t* maf_newMafBlockFromString(const char *s, uint64_t lineNumber) {
   cline_orig = NULL;
   return mb;
 }
-mafLine_t* maf_newMafLineFromString(const char *s, uint64_t lineNumber) {
-  extern const int kMaxStringLength;
-  mafLine_t *ml = (mafLine_t *) de_malloc(sizeof(*ml));
-  char *copy = (char *) de_malloc(strlen(s) + 1);
-  char *cline = (char *) de_malloc(strlen(s) + 1);
-  strcpy(copy, s);
-  strcpy(cline, s);
-  ml->next = NULL;
-  ml->line = copy;
-  ml->lineNumber = lineNumber;
-  ml->species = NULL;
-  ml->sequence = NULL;
-  ml->start = 0;
-  ml->length = 0;
-  ml->sourceLength = 0;
-  ml->strand = 0;
-  ml->type = ml->line[0];
-  if (ml->type != 's') {
-    free(cline);
-    cline = NULL;
-    return ml;
+static bool maf_nextField(const char *s, size_t *pos, size_t *length) {
+  // advance *pos past any spaces and tabs to the start of the next field and
+  // report the field's length. returns false if there are no more fields.
+  size_t i = *pos;
+  while (s[i] == ' ' || s[i] == '\t') {
+    ++i;
   }
-  char *tkn = NULL;
-  tkn = strtok(cline, " \t");
-  if (tkn == NULL) {
-    free(cline);
-    cline = NULL;
+  if (s[i] == '\0') {
+    *pos = i;
+    return false;
+  }
+  size_t j = i;
+  while (s[j] != '\0' && s[j] != ' ' && s[j] != '\t') {
+    ++j;
+  }
+  *pos = i;
+  *length = j - i;
+  return true;
+}
+static size_t maf_parseSequenceLineCoordinates(const char *s, uint64_t lineNumber, mafLineFields_t *f,
+                                                bool convert) {
+  // split an `s' line into its fields up to and including the source length,
+  // without modifying or copying it. The numeric fields and strand are only
+  // read if convert is true. Returns the position following the source length.
+  extern const int kMaxStringLength;
+  size_t pos = 0, n = 0;
+  if (!maf_nextField(s, &pos, &n)) {
     char *error = de_malloc(kMaxStringLength);
     sprintf(error, "Unable to separate line on tabs and spaces at line definition field:\n%s", s);
     maf_failBadFormat(lineNumber, error);
   }
-  tkn = strtok(NULL, " \t"); // name field
-  if (tkn == NULL) {
-    free(cline);
-    cline = NULL;
+  pos += n;
+  if (!maf_nextField(s, &pos, &n)) { // name field
     maf_failBadFormat(lineNumber, "Unable to separate line on tabs and spaces at name field.");
   }
-  char *species = (char *) de_malloc(strlen(tkn) + 1);
-  strcpy(species, tkn);
-  ml->species = species;
-  tkn = strtok(NULL, " \t"); // start position
-  if (tkn == NULL) {
-    free(cline);
-    cline = NULL;
+  f->species = pos;
+  f->speciesLength = n;
+  pos += n;
+  if (!maf_nextField(s, &pos, &n)) { // start position
     maf_failBadFormat(lineNumber, "Unable to separate line on tabs and spaces at start position field.");
   }
-  ml->start = strtoul(tkn, NULL, 10);
-  tkn = strtok(NULL, " \t"); // length position
-  if (tkn == NULL){
-    free(cline);
-    cline = NULL;
+  if (convert) {
+    f->start = strtoul(s + pos, NULL, 10);
+  }
+  pos += n;
+  if (!maf_nextField(s, &pos, &n)) { // length position
     maf_failBadFormat(lineNumber, "Unable to separate line on tabs and spaces at length position field.");
   }
-  ml->length = strtoul(tkn, NULL, 10);
-  tkn = strtok(NULL, " \t"); // strand
-  if (tkn == NULL) {
-    free(cline);
-    cline = NULL;
+  if (convert) {
+    f->length = strtoul(s + pos, NULL, 10);
+  }
+  pos += n;
+  if (!maf_nextField(s, &pos, &n)) { // strand
     maf_failBadFormat(lineNumber, "Unable to separate line on tabs and spaces at strand field.");
   }
-  if (tkn[0] != '-' && tkn[0] != '+') {
-    char *error = (char*) de_malloc(kMaxStringLength);
-    sprintf(error, "Strand must be either + or -, not %c.", tkn[0]);
-    maf_failBadFormat(lineNumber, error);
+  if (convert) {
+    if (s[pos] != '-' && s[pos] != '+') {
+      char *error = (char*) de_malloc(kMaxStringLength);
+      sprintf(error, "Strand must be either + or -, not %c.", s[pos]);
+      maf_failBadFormat(lineNumber, error);
+    }
+    f->strand = s[pos];
   }
-  ml->strand = tkn[0];
-  tkn = strtok(NULL, " \t"); // source length position
-  if (tkn == NULL) {
-    free(cline);
-    cline = NULL;
+  pos += n;
+  if (!maf_nextField(s, &pos, &n)) { // source length position
     maf_failBadFormat(lineNumber, "Unable to separate line on tabs and spaces at source length field.");
   }
-  ml->sourceLength = strtoul(tkn, NULL, 10);
-  tkn = strtok(NULL, " \t"); // sequence field
-  if (tkn == NULL) {
-    free(cline);
-    cline = NULL;
+  if (convert) {
+    f->sourceLength = strtoul(s + pos, NULL, 10);
+  }
+  return pos + n;
+}
+static void maf_parseSequenceLine(const char *s, uint64_t lineNumber, mafLineFields_t *f, bool convert) {
+  // split an `s' line into all of its fields, see maf_parseSequenceLineCoordinates()
+  extern const int kMaxStringLength;
+  size_t pos = maf_parseSequenceLineCoordinates(s, lineNumber, f, convert), n = 0;
+  if (!maf_nextField(s, &pos, &n)) { // sequence field
     char *error = de_malloc(kMaxStringLength);
     sprintf(error, "Unable to separate line on tabs and spaces at sequence field:\n%s", s);
     maf_failBadFormat(lineNumber, error);
   }
-  char *seq = (char *) de_malloc(strlen(tkn) + 1);
-  strcpy(seq, tkn);
-  ml->sequence = seq;
-  ml->sequenceFieldLength = strlen(ml->sequence);
-  free(cline);
-  cline = NULL;
+  f->sequence = pos;
+  f->sequenceLength = n;
+}
+mafLine_t* maf_newMafLineFromString(const char *s, uint64_t lineNumber) {
+  mafLine_t *ml = maf_newMafLine();
+  ml->lineNumber = lineNumber;
+  ml->type = s[0];
+  if (ml->type != 's') {
+    ml->line = de_strdup(s);
+    PROFILE_COUNT(kProfileParseAllocations, 1);
+    return ml;
+  }
+  mafLineFields_t f;
+  size_t n = strlen(s);
+  maf_parseSequenceLine(s, lineNumber, &f, true);
+  maf_mafLine_packText(ml, s, n, s + f.species, f.speciesLength, s + f.sequence, f.sequenceLength,
+                       f.sequence + f.sequenceLength == n);
+  ml->start = f.start;
+  ml->length = f.length;
+  ml->strand = f.strand;
+  ml->sourceLength = f.sourceLength;
+  ml->sequenceFieldLength = f.sequenceLength;
+  return ml;
+}
+static mafLine_t* maf_newLazyMafLineFromString(const char *s, uint64_t lineNumber) {
+  // like maf_newMafLineFromString(), but the fields of an `s' line are left
+  // to be parsed on first use, see maf_mafLine_readSpecies()
+  mafLine_t *ml = maf_newMafLine();
+  ml->line = de_strdup(s);
+  PROFILE_COUNT(kProfileParseAllocations, 1);
+  ml->lineNumber = lineNumber;
+  ml->type = s[0];
+  ml->storage = kMafLineOwnsLine;
+  if (ml->type == 's') {
+    ml->storage |= kMafLineUnread;
+  }
   return ml;
 }
+static void maf_mafLine_readSpecies(mafLine_t *ml) {
+  // copy the species out of a lazily read line so that it can be terminated
+  if (!(ml->storage & kMafLineSpeciesUnread)) {
+    return;
+  }
+  mafLineFields_t f;
+  maf_parseSequenceLineCoordinates(ml->line, ml->lineNumber, &f, false);
+  ml->species = de_strndup(ml->line + f.species, f.speciesLength);
+  ml->storage |= kMafLineOwnsSpecies;
+  ml->storage &= ~kMafLineSpeciesUnread;
+}
+static void maf_mafLine_readSequence(mafLine_t *ml) {
+  // locate the sequence of a lazily read line, which is usually left as a view
+  if (!(ml->storage & kMafLineSequenceUnread)) {
+    return;
+  }
+  mafLineFields_t f;
+  maf_parseSequenceLine(ml->line, ml->lineNumber, &f, false);
+  if (ml->line[f.sequence + f.sequenceLength] == '\0') {
+    ml->sequence = ml->line + f.sequence;
+    ml->storage |= kMafLineSequenceInLine;
+  } else {
+    ml->sequence = de_strndup(ml->line + f.sequence, f.sequenceLength);
+    ml->storage |= kMafLineOwnsSequence;
+  }
+  ml->sequenceFieldLength = f.sequenceLength;
+  ml->storage &= ~kMafLineSequenceUnread;
+}
+static void maf_mafLine_convertFields(mafLine_t *ml) {
+  // read the coordinates and strand of a lazily read line
+  if (!(ml->storage & kMafLineUnconverted)) {
+    return;
+  }
+  mafLineFields_t f;
+  maf_parseSequenceLineCoordinates(ml->line, ml->lineNumber, &f, true);
+  ml->start = f.start;
+  ml->length = f.length;
+  ml->strand = f.strand;
+  ml->sourceLength = f.sourceLength;
+  ml->storage &= ~kMafLineUnconverted;
+}
+static void maf_mafLine_parseFields(mafLine_t *ml) {
+  maf_mafLine_readSpecies(ml);
+  maf_mafLine_readSequence(ml);
+  maf_mafLine_convertFields(ml);
+}
 mafBlock_t* maf_newMafBlock(void) {
   mafBlock_t *mb = (mafBlock_t *) de_malloc(sizeof(*mb));
   mb->next = NULL;
@@ -333,6 +613,10 @@ mafBlock_t* maf_newMafBlock(void) {
   mb->numberOfSequences = 0;
   mb->numberOfLines = 0;
   mb->sequenceFieldLength = 0;
+  mb->arena = NULL;
+  mb->columns = NULL;
+  mb->matrix = NULL;
+  mb->lazySequenceFieldLength = false;
   return mb;
 }
 mafBlock_t* maf_copyMafBlockList(mafBlock_t *orig) {
@@ -373,21 +657,578 @@ mafBlock_t* maf_copyMafBlock(mafBlock_t *orig) {
   mb->numberOfSequences = orig->numberOfSequences;
   mb->numberOfLines = orig->numberOfLines;
   mb->sequenceFieldLength = orig->sequenceFieldLength;
+  mb->lazySequenceFieldLength = orig->lazySequenceFieldLength;
   return mb;
 }
+/*
+ * mafNameDict_t interns the sequence names of a file, handing out dense ids
+ * (0, 1, 2, ...) in order of first appearance, and separately the species
+ * prefixes of those names (hg18 of hg18.chr1). Tools can then keep per name
+ * or per species state in arrays indexed by id rather than hashing strings
+ * for every line. Names are copied once and never move, so the strings the
+ * dictionary hands out stay valid for its whole life. Every operation takes
+ * the dictionary's lock, as it is filled by whichever thread reads the file.
+ */
+typedef struct mafNameTable {
+  // an open addressing hash of strings to their position in strings
+  char **strings;
+  uint32_t n;
+  uint32_t capacity;
+  uint32_t *slots; // position + 1, 0 for an empty slot
+  uint32_t numberOfSlots; // a power of two, kept at least twice n
+} mafNameTable_t;
+struct mafNameDict {
+  mafNameTable_t names;
+  mafNameTable_t species;
+  uint32_t *speciesIds; // species id of each name id, names.capacity long
+  unsigned references; // chunks from maf_newMfaChunks() share one dictionary
+  pthread_mutex_t lock;
+};
+const uint32_t kMafNoNameId = UINT32_MAX;
+static const uint32_t kMafNameTableInitialSlots = 64;
+static uint64_t maf_hashName(const char *s, size_t n) {
+  // FNV-1a of the n characters at s
+  uint64_t h = 14695981039346656037ULL;
+  for (size_t i = 0; i < n; ++i) {
+    h ^= (unsigned char) s[i];
+    h *= 1099511628211ULL;
+  }
+  return h;
+}
+static void maf_mafNameTable_init(mafNameTable_t *t) {
+  t->strings = NULL;
+  t->n = 0;
+  t->capacity = 0;
+  t->numberOfSlots = kMafNameTableInitialSlots;
+  t->slots = (uint32_t *) de_malloc(sizeof(*(t->slots)) * t->numberOfSlots);
+  memset(t->slots, 0, sizeof(*(t->slots)) * t->numberOfSlots);
+}
+static void maf_mafNameTable_destroy(mafNameTable_t *t) {
+  for (uint32_t i = 0; i < t->n; ++i) {
+    free(t->strings[i]);
+  }
+  free(t->strings);
+  free(t->slots);
+}
+static uint32_t* maf_mafNameTable_findSlot(mafNameTable_t *t, const char *s, size_t n, uint64_t h) {
+  // return the slot holding the n characters at s, or the empty slot where they belong
+  uint32_t mask = t->numberOfSlots - 1;
+  for (uint32_t i = (uint32_t) (h & mask); ; i = (i + 1) & mask) {
+    uint32_t k = t->slots[i];
+    if (k == 0 || (strncmp(t->strings[k - 1], s, n) == 0 && t->strings[k - 1][n] == '\0')) {
+      return t->slots + i;
+    }
+  }
+}
+static void maf_mafNameTable_grow(mafNameTable_t *t) {
+  free(t->slots);
+  t->numberOfSlots *= 2;
+  t->slots = (uint32_t *) de_malloc(sizeof(*(t->slots)) * t->numberOfSlots);
+  memset(t->slots, 0, sizeof(*(t->slots)) * t->numberOfSlots);
+  for (uint32_t k = 0; k < t->n; ++k) {
+    size_t n = strlen(t->strings[k]);
+    *maf_mafNameTable_findSlot(t, t->strings[k], n, maf_hashName(t->strings[k], n)) = k + 1;
+  }
+}
+static uint32_t maf_mafNameTable_lookup(mafNameTable_t *t, const char *s, size_t n) {
+  uint32_t k = *maf_mafNameTable_findSlot(t, s, n, maf_hashName(s, n));
+  return (k == 0) ? kMafNoNameId : k - 1;
+}
+static uint32_t maf_mafNameTable_intern(mafNameTable_t *t, const char *s, size_t n, bool *added) {
+  // return the position of the n characters at s, adding a copy if they are new
+  uint32_t *slot = maf_mafNameTable_findSlot(t, s, n, maf_hashName(s, n));
+  *added = (*slot == 0);
+  if (!*added) {
+    return *slot - 1;
+  }
+  if (t->n == t->capacity) {
+    t->capacity = (t->capacity == 0) ? kMafNameTableInitialSlots : 2 * t->capacity;
+    t->strings = (char **) realloc(t->strings, sizeof(*(t->strings)) * t->capacity);
+    assert(t->strings != NULL);
+  }
+  char *copy = (char *) de_malloc(n + 1);
+  memcpy(copy, s, n);
+  copy[n] = '\0';
+  t->strings[t->n] = copy;
+  *slot = ++(t->n);
+  if (2 * t->n > t->numberOfSlots) {
+    maf_mafNameTable_grow(t);
+  }
+  return t->n - 1;
+}
+mafNameDict_t* maf_newMafNameDict(void) {
+  mafNameDict_t *d = (mafNameDict_t *) de_malloc(sizeof(*d));
+  maf_mafNameTable_init(&(d->names));
+  maf_mafNameTable_init(&(d->species));
+  d->speciesIds = NULL;
+  d->references = 1;
+  pthread_mutex_init(&(d->lock), NULL);
+  return d;
+}
+void maf_destroyMafNameDict(mafNameDict_t *d) {
+  if (d == NULL) {
+    return;
+  }
+  pthread_mutex_lock(&(d->lock));
+  unsigned references = --(d->references);
+  pthread_mutex_unlock(&(d->lock));
+  if (references > 0) {
+    return;
+  }
+  maf_mafNameTable_destroy(&(d->names));
+  maf_mafNameTable_destroy(&(d->species));
+  free(d->speciesIds);
+  pthread_mutex_destroy(&(d->lock));
+  free(d);
+}
+static mafNameDict_t* maf_mafNameDict_share(mafNameDict_t *d) {
+  pthread_mutex_lock(&(d->lock));
+  ++(d->references);
+  pthread_mutex_unlock(&(d->lock));
+  return d;
+}
+static uint32_t maf_mafNameDict_internLocked(mafNameDict_t *d, const char *s, size_t n) {
+  // intern the n characters at s, and their species prefix if they are new.
+  // The caller holds d->lock.
+  bool added = false;
+  uint32_t capacity = d->names.capacity;
+  uint32_t id = maf_mafNameTable_intern(&(d->names), s, n, &added);
+  if (added) {
+    if (d->names.capacity != capacity) {
+      d->speciesIds = (uint32_t *) realloc(d->speciesIds, sizeof(*(d->speciesIds)) * d->names.capacity);
+      assert(d->speciesIds != NULL);
+    }
+    const char *dot = (const char *) memchr(s, '.', n);
+    d->speciesIds[id] = maf_mafNameTable_intern(&(d->species), s, (dot == NULL) ? n : (size_t) (dot - s),
+                                                &added);
+  }
+  return id;
+}
+uint32_t maf_mafNameDict_intern(mafNameDict_t *d, const char *name) {
+  // return the id of name, adding it (and its species) if it is new
+  pthread_mutex_lock(&(d->lock));
+  uint32_t id = maf_mafNameDict_internLocked(d, name, strlen(name));
+  pthread_mutex_unlock(&(d->lock));
+  return id;
+}
+uint32_t maf_mafNameDict_lookup(mafNameDict_t *d, const char *name) {
+  // return the id of name, or kMafNoNameId if it has not been seen
+  pthread_mutex_lock(&(d->lock));
+  uint32_t id = maf_mafNameTable_lookup(&(d->names), name, strlen(name));
+  pthread_mutex_unlock(&(d->lock));
+  return id;
+}
+uint32_t maf_mafNameDict_lookupSpecies(mafNameDict_t *d, const char *species) {
+  // return the id of species (e.g. hg18), or kMafNoNameId if it has not been seen
+  pthread_mutex_lock(&(d->lock));
+  uint32_t id = maf_mafNameTable_lookup(&(d->species), species, strlen(species));
+  pthread_mutex_unlock(&(d->lock));
+  return id;
+}
+const char* maf_mafNameDict_getName(mafNameDict_t *d, uint32_t nameId) {
+  pthread_mutex_lock(&(d->lock));
+  const char *name = (nameId < d->names.n) ? d->names.strings[nameId] : NULL;
+  pthread_mutex_unlock(&(d->lock));
+  return name;
+}
+const char* maf_mafNameDict_getSpecies(mafNameDict_t *d, uint32_t speciesId) {
+  pthread_mutex_lock(&(d->lock));
+  const char *species = (speciesId < d->species.n) ? d->species.strings[speciesId] : NULL;
+  pthread_mutex_unlock(&(d->lock));
+  return species;
+}
+uint32_t maf_mafNameDict_getSpeciesId(mafNameDict_t *d, uint32_t nameId) {
+  pthread_mutex_lock(&(d->lock));
+  uint32_t id = (nameId < d->names.n) ? d->speciesIds[nameId] : kMafNoNameId;
+  pthread_mutex_unlock(&(d->lock));
+  return id;
+}
+uint32_t maf_mafNameDict_getNumberOfNames(mafNameDict_t *d) {
+  pthread_mutex_lock(&(d->lock));
+  uint32_t n = d->names.n;
+  pthread_mutex_unlock(&(d->lock));
+  return n;
+}
+uint32_t maf_mafNameDict_getNumberOfSpecies(mafNameDict_t *d) {
+  pthread_mutex_lock(&(d->lock));
+  uint32_t n = d->species.n;
+  pthread_mutex_unlock(&(d->lock));
+  return n;
+}
+static void maf_mafFileApi_internNames(mafFileApi_t *mfa, mafBlock_t *mb) {
+  // give every named line of a freshly read block the ids of its name and
+  // species, see maf_mafFileApi_setNameInterning(). The name is found in the
+  // line's text so that lazily read lines stay unread.
+  if (!mfa->internNames || mb == NULL) {
+    return;
+  }
+  mafNameDict_t *d = mfa->names;
+  pthread_mutex_lock(&(d->lock));
+  for (mafLine_t *ml = mb->headLine; ml != NULL; ml = ml->next) {
+    if ((ml->type != 's' && ml->type != 'i' && ml->type != 'e' && ml->type != 'q') || ml->line == NULL) {
+      continue;
+    }
+    const char *s = ml->line + 1;
+    s += strspn(s, " \t");
+    size_t n = strcspn(s, " \t\r\n");
+    if (n == 0) {
+      continue;
+    }
+    ml->nameId = maf_mafNameDict_internLocked(d, s, n);
+    ml->speciesId = d->speciesIds[ml->nameId];
+  }
+  pthread_mutex_unlock(&(d->lock));
+}
+static bool maf_mafFileApi_map(mafFileApi_t *mfa, const char *filename, bool populate) {
+  // map filename into memory for reading and point the read buffer at it.
+  // Returns false, leaving mfa untouched, for anything other than a non-empty
+  // regular file, or if the map fails, in which case the file is streamed.
+  int fd = open(filename, O_RDONLY);
+  if (fd == -1) {
+    return false;
+  }
+  struct stat st;
+  if (fstat(fd, &st) != 0 || !S_ISREG(st.st_mode) || st.st_size == 0) {
+    close(fd);
+    return false;
+  }
+  int flags = MAP_PRIVATE;
+#ifdef MAP_POPULATE
+  if (populate) {
+    flags |= MAP_POPULATE;
+  }
+#else
+  (void) populate;
+#endif
+  void *map = mmap(NULL, (size_t) st.st_size, PROT_READ, flags, fd, 0);
+  close(fd);
+  if (map == MAP_FAILED) {
+    return false;
+  }
+  if (bgzf_isGzip((const char *) map, (size_t) st.st_size)) {
+    // compressed files are streamed through a bgzfReader
+    munmap(map, (size_t) st.st_size);
+    return false;
+  }
+  posix_madvise(map, (size_t) st.st_size, POSIX_MADV_SEQUENTIAL);
+  mfa->map = (char *) map;
+  mfa->mapSize = (size_t) st.st_size;
+  mfa->buffer = mfa->map;
+  mfa->bufferSize = mfa->mapSize;
+  mfa->bufferEnd = mfa->mapSize;
+  mfa->eof = true;
+  PROFILE_COUNT(kProfileBytesRead, mfa->mapSize);
+  return true;
+}
+static void maf_mafFileApi_detectCompression(mafFileApi_t *mfa) {
+  // look at the start of a streamed file and read gzip through a bgzfReader.
+  // Bytes that turn out to be plain text are left in the buffer.
+  mfa->bufferSize = kMafReadBufferSize;
+  mfa->buffer = (char *) de_malloc(mfa->bufferSize + 1);
+  size_t n = 0, k = 0;
+  while (n < kMafCompressionPeekSize &&
+         (k = fread(mfa->buffer + n, sizeof(char), kMafCompressionPeekSize - n, mfa->mfp)) > 0) {
+    n += k;
+  }
+  if (!bgzf_isGzip(mfa->buffer, n)) {
+    // gzip peek bytes are handed to the reader and counted decompressed
+    mfa->bufferEnd = n;
+    PROFILE_COUNT(kProfileBytesRead, n);
+    return;
+  }
+  mfa->bgzf = bgzf_newReader(mfa->mfp, mfa->filename, mfa->buffer, n);
+  long cpus = sysconf(_SC_NPROCESSORS_ONLN);
+  cpus = (cpus < kMafMaxDecompressionThreads) ? cpus : kMafMaxDecompressionThreads;
+  bgzf_setThreads(mfa->bgzf, (cpus > 1) ? (unsigned) cpus : 0);
+}
 mafFileApi_t* maf_newMfa(const char *filename, char const *mode) {
+  // open filename in mode, as for fopen(). Files opened for reading with an
+  // `m' in the mode (e.g. "rm") are memory mapped and parsed in place, and
+  // with a `p' as well ("rmp") the mapping is populated up front. Standard
+  // input ("-") and anything that cannot be mapped is streamed as usual.
+  // gzip input is recognised and decompressed whatever the mode, and files
+  // opened for writing with a `z' in the mode ("wz") or a name ending in .gz
+  // are written as blocked gzip, see bgzf.h. .mafb input is recognised and
+  // read whatever the mode, and files whose name ends in .mafb are written as
+  // .mafb, see maf_newMafBinaryWriter().
   mafFileApi_t *mfa = (mafFileApi_t *) de_malloc(sizeof(*mfa));
   mfa->lineNumber = 0;
   mfa->lastLine = NULL;
+  mfa->buffer = NULL;
+  mfa->bufferSize = 0;
+  mfa->bufferStart = 0;
+  mfa->bufferEnd = 0;
+  mfa->eof = false;
+  mfa->lazyParsing = false;
+  mfa->map = NULL;
+  mfa->mapSize = 0;
+  mfa->scratch = NULL;
+  mfa->scratchSize = 0;
+  mfa->bufferOffset = 0;
+  mfa->lineOffset = 0;
+  mfa->lastLineOffset = 0;
+  mfa->blockOffset = 0;
+  mfa->bgzf = NULL;
+  mfa->bgzfOut = NULL;
+  mfa->out = NULL;
+  mfa->names = maf_newMafNameDict();
+  mfa->internNames = false;
+  mfa->formatKnown = false;
+  mfa->binary = NULL;
+  mfa->binaryOut = NULL;
+  mfa->mfp = NULL;
+  mfa->filename = de_strdup(filename);
   if (strcmp(filename, "-") == 0) {
-    assert(strcmp(mode, "r") == 0);
+    assert(mode[0] == 'r');
     mfa->mfp = stdin;
-  } else {
+  } else if (mode[0] == 'r' && strchr(mode, 'm') != NULL) {
+    if (!maf_mafFileApi_map(mfa, filename, strchr(mode, 'p') != NULL)) {
+      mfa->mfp = de_fopen(filename, "r");
+    }
+  } else if (mode[0] == 'r') {
     mfa->mfp = de_fopen(filename, mode);
+  } else {
+    char *fopenMode = stringReplace(mode, 'z', 'b');
+    mfa->mfp = de_fopen(filename, fopenMode);
+    free(fopenMode);
+    size_t n = strlen(filename);
+    if (strchr(mode, 'z') != NULL || (n > 3 && strcmp(filename + n - 3, ".gz") == 0)) {
+      mfa->bgzfOut = bgzf_newWriter(mfa->mfp, filename);
+    } else if (n > 5 && strcmp(filename + n - 5, ".mafb") == 0) {
+      mfa->binaryOut = maf_newMafBinaryWriter(mfa->mfp);
+    } else {
+      mfa->out = maf_newMafWriter(mfa->mfp, false);
+    }
+  }
+  if (mfa->mfp != NULL && mode[0] == 'r') {
+    maf_mafFileApi_detectCompression(mfa);
   }
-  mfa->filename = de_strdup(filename);
   return mfa;
 }
+void maf_mafFileApi_setDecompressionThreads(mafFileApi_t *mfa, unsigned n) {
+  // the number of threads inflating blocked gzip input ahead of the reader,
+  // 0 inflates as the data is needed. Has no effect on anything else, and must
+  // be set before anything is read.
+  if (mfa->bgzf != NULL) {
+    bgzf_setThreads(mfa->bgzf, n);
+  }
+}
+static const uint64_t kMafCoordinateMapRunRatio = 16; // keep runs when they take a sixteenth of the space
+static void maf_destroyMafCoordinateMap(mafCoordinateMap_t *map) {
+  if (map == NULL) {
+    return;
+  }
+  free(map->prefix);
+  free(map->runStarts);
+  free(map->gapsBefore);
+  free(map);
+}
+static void maf_mafLine_invalidateCoordinateMap(mafLine_t *ml) {
+  if (ml->coordinates != NULL) {
+    ml->coordinates->valid = false;
+  }
+}
+static void maf_mafCoordinateMap_build(mafCoordinateMap_t *map, const char *seq, uint64_t m) {
+  uint64_t runs = 0;
+  for (uint64_t c = 0; c < m; ++c) {
+    if (seq[c] == '-' && (c == 0 || seq[c - 1] != '-')) {
+      ++runs;
+    }
+  }
+  map->columns = m;
+  map->numberOfRuns = runs;
+  map->usesRuns = 2 * runs * kMafCoordinateMapRunRatio <= m;
+  if (!map->usesRuns) {
+    if (m + 1 > map->prefixCapacity) {
+      free(map->prefix);
+      map->prefix = (uint64_t *) de_malloc(sizeof(*(map->prefix)) * (m + 1));
+      map->prefixCapacity = m + 1;
+    }
+    seq_nonGapPrefixSum(seq, m, map->prefix);
+    map->bases = map->prefix[m];
+  } else {
+    if (runs + 1 > map->runsCapacity) {
+      free(map->runStarts);
+      free(map->gapsBefore);
+      map->runStarts = (uint64_t *) de_malloc(sizeof(*(map->runStarts)) * (runs + 1));
+      map->gapsBefore = (uint64_t *) de_malloc(sizeof(*(map->gapsBefore)) * (runs + 1));
+      map->runsCapacity = runs + 1;
+    }
+    uint64_t j = 0, gaps = 0;
+    map->gapsBefore[0] = 0;
+    for (uint64_t c = 0; c < m; ++c) {
+      if (seq[c] != '-') {
+        continue;
+      }
+      if (c == 0 || seq[c - 1] != '-') {
+        map->runStarts[j++] = c;
+      }
+      map->gapsBefore[j] = ++gaps;
+    }
+    map->bases = m - gaps;
+  }
+  map->valid = true;
+}
+mafCoordinateMap_t* maf_mafLine_getCoordinateMap(mafLine_t *ml) {
+  // return the map between the columns of ml's sequence field and the bases in
+  // them, built on first use and owned by ml. Building it is a single pass over
+  // the sequence, after which a column is turned into a base (and so a source
+  // coordinate) in O(1), or O(log r) for a sequence with r runs of gaps, and a
+  // base into its column in O(log n). It is rebuilt if the sequence changes.
+  if (ml->coordinates == NULL) {
+    ml->coordinates = (mafCoordinateMap_t *) de_malloc(sizeof(*(ml->coordinates)));
+    memset(ml->coordinates, 0, sizeof(*(ml->coordinates)));
+  }
+  mafCoordinateMap_t *map = ml->coordinates;
+  if (!map->valid) {
+    const char *seq = maf_mafLine_getSequence(ml);
+    maf_mafCoordinateMap_build(map, seq, (seq == NULL) ? 0 : ml->sequenceFieldLength);
+  }
+  return map;
+}
+uint64_t maf_mafCoordinateMap_getNumberOfColumns(mafCoordinateMap_t *map) {
+  return map->columns;
+}
+uint64_t maf_mafCoordinateMap_getNumberOfBases(mafCoordinateMap_t *map) {
+  return map->bases;
+}
+uint64_t maf_mafCoordinateMap_getBasesBefore(mafCoordinateMap_t *map, uint64_t c) {
+  // return the number of bases (non-gap characters) in columns [0, c)
+  if (c > map->columns) {
+    c = map->columns;
+  }
+  if (!map->usesRuns) {
+    return map->prefix[c];
+  }
+  // j is the number of runs starting before c
+  uint64_t lo = 0, hi = map->numberOfRuns;
+  while (lo < hi) {
+    uint64_t mid = lo + (hi - lo) / 2;
+    if (map->runStarts[mid] < c) {
+      lo = mid + 1;
+    } else {
+      hi = mid;
+    }
+  }
+  if (lo == 0) {
+    return c;
+  }
+  uint64_t j = lo - 1;
+  uint64_t runLength = map->gapsBefore[j + 1] - map->gapsBefore[j];
+  uint64_t inRun = c - map->runStarts[j];
+  return c - map->gapsBefore[j] - ((inRun < runLength) ? inRun : runLength);
+}
+int64_t maf_mafCoordinateMap_getColumnOfBase(mafCoordinateMap_t *map, uint64_t k) {
+  // return the column holding the k'th base (counting from 0), or -1 if there
+  // are not that many bases
+  if (k >= map->bases) {
+    return -1;
+  }
+  uint64_t lo = 0, hi = 0;
+  if (!map->usesRuns) {
+    // the first column c with k < prefix[c + 1]
+    hi = map->columns - 1;
+    while (lo < hi) {
+      uint64_t mid = lo + (hi - lo) / 2;
+      if (map->prefix[mid + 1] <= k) {
+        lo = mid + 1;
+      } else {
+        hi = mid;
+      }
+    }
+    return (int64_t) lo;
+  }
+  // the number of runs that start before the k'th base, each shifting it right
+  hi = map->numberOfRuns;
+  while (lo < hi) {
+    uint64_t mid = lo + (hi - lo) / 2;
+    if (map->runStarts[mid] - map->gapsBefore[mid] <= k) {
+      lo = mid + 1;
+    } else {
+      hi = mid;
+    }
+  }
+  return (int64_t) (k + map->gapsBefore[lo]);
+}
+int64_t maf_mafLine_getPositiveCoordOfColumn(mafLine_t *ml, uint64_t c) {
+  // return the positive strand, zero based, source coordinate of the base in
+  // column c of ml, or -1 if the column is a gap or past the end of the line
+  mafCoordinateMap_t *map = maf_mafLine_getCoordinateMap(ml);
+  if (c >= map->columns) {
+    return -1;
+  }
+  uint64_t k = maf_mafCoordinateMap_getBasesBefore(map, c);
+  if (maf_mafCoordinateMap_getBasesBefore(map, c + 1) == k) {
+    return -1;
+  }
+  maf_mafLine_convertFields(ml);
+  if (ml->strand == '+') {
+    return (int64_t) (ml->start + k);
+  }
+  return (int64_t) ml->sourceLength - 1 - (int64_t) (ml->start + k);
+}
+static int64_t maf_mafLine_getBaseOfPositiveCoord(mafLine_t *ml, uint64_t pos) {
+  // the index, in column order, of the base at positive coordinate pos. May be
+  // out of range.
+  maf_mafLine_convertFields(ml);
+  if (ml->strand == '+') {
+    return (int64_t) pos - (int64_t) ml->start;
+  }
+  return (int64_t) ml->sourceLength - 1 - (int64_t) ml->start - (int64_t) pos;
+}
+int64_t maf_mafLine_getColumnOfPositiveCoord(mafLine_t *ml, uint64_t pos) {
+  // return the column of ml holding the base at positive strand, zero based,
+  // source coordinate pos, or -1 if ml does not cover pos
+  mafCoordinateMap_t *map = maf_mafLine_getCoordinateMap(ml);
+  int64_t k = maf_mafLine_getBaseOfPositiveCoord(ml, pos);
+  if (k < 0) {
+    return -1;
+  }
+  return maf_mafCoordinateMap_getColumnOfBase(map, (uint64_t) k);
+}
+bool maf_mafLine_getColumnRange(mafLine_t *ml, uint64_t start, uint64_t stop,
+                                uint64_t *firstColumn, uint64_t *lastColumn) {
+  // find the columns of the first and last bases of ml whose positive strand
+  // coordinates lie in [start, stop]. Every non-gap column between the two holds
+  // such a base. Returns false, leaving the columns alone, if there are none.
+  mafCoordinateMap_t *map = maf_mafLine_getCoordinateMap(ml);
+  if (start > stop || map->bases == 0) {
+    return false;
+  }
+  int64_t a = maf_mafLine_getBaseOfPositiveCoord(ml, start);
+  int64_t b = maf_mafLine_getBaseOfPositiveCoord(ml, stop);
+  int64_t lo = (a < b) ? a : b, hi = (a < b) ? b : a;
+  if (hi < 0 || lo >= (int64_t) map->bases) {
+    return false;
+  }
+  lo = (lo < 0) ? 0 : lo;
+  hi = (hi >= (int64_t) map->bases) ? (int64_t) map->bases - 1 : hi;
+  *firstColumn = (uint64_t) maf_mafCoordinateMap_getColumnOfBase(map, (uint64_t) lo);
+  *lastColumn = (uint64_t) maf_mafCoordinateMap_getColumnOfBase(map, (uint64_t) hi);
+  return true;
+}
+static void maf_destroyMafLine(mafLine_t *ml) {
+  // release whatever a single line owns, see mafLineStorage
+  if (ml->storage & kMafLineOwnsLine) {
+    free(ml->line);
+  }
+  ml->line = NULL;
+  if (ml->storage & kMafLineOwnsSpecies) {
+    // you can have a maf line without a species member
+    free(ml->species);
+  }
+  ml->species = NULL;
+  if (ml->storage & kMafLineOwnsSequence) {
+    // you can have a maf line without a sequence member
+    free(ml->sequence);
+  }
+  ml->sequence = NULL;
+  if (!(ml->storage & kMafLineInArena)) {
+    // arena lines keep their coordinate maps for reuse, the arena frees them
+    maf_destroyMafCoordinateMap(ml->coordinates);
+    free(ml);
+  }
+}
 void maf_destroyMafLineList(mafLine_t *ml) {
   // walk down a mafLine_t following the ->next pointers, search and destroy
   if (ml == NULL) {
@@ -397,22 +1238,43 @@ void maf_destroyMafLineList(mafLine_t *ml) {
   while(ml != NULL) {
     tmp = ml;
     ml = ml->next;
-    free(tmp->line);
-    tmp->line = NULL;
-    if (tmp->species != NULL) {
-      // you can have a maf line without a species member
-      free(tmp->species);
-      tmp->species = NULL;
-    }
-    if (tmp->sequence != NULL) {
-      // you can have a maf line without a sequence member
-      free(tmp->sequence);
-      tmp->sequence = NULL;
-    }
-    free(tmp);
+    maf_destroyMafLine(tmp);
     tmp = NULL;
   }
 }
+static void maf_destroyMafBlockArena(mafBlockArena_t *arena) {
+  if (arena == NULL) {
+    return;
+  }
+  free(arena->text);
+  for (size_t i = 0; i < arena->linesSize; ++i) {
+    maf_destroyMafCoordinateMap(arena->lines[i].coordinates);
+  }
+  free(arena->lines);
+  free(arena->offsets);
+  free(arena);
+}
+static void maf_destroyMafBlockColumns(mafBlockColumns_t *cols) {
+  if (cols == NULL) {
+    return;
+  }
+  free(cols->lines);
+  free(cols->species);
+  free(cols->strands);
+  free(cols->strandInts);
+  free(cols->starts);
+  free(cols->nameIds);
+  free(cols);
+}
+static void maf_destroySequenceMatrix(mafSequenceMatrix_t *mat) {
+  if (mat == NULL) {
+    return;
+  }
+  free(mat->rows);
+  free(mat->copies);
+  free(mat->columns);
+  free(mat);
+}
 void maf_destroyMafBlockList(mafBlock_t *mb) {
   if (mb == NULL) {
     return;
@@ -423,28 +1285,182 @@ void maf_destroyMafBlockList(mafBlock_t *mb) {
     mb = mb->next;
     if (tmp->headLine != NULL)
       maf_destroyMafLineList(tmp->headLine);
+    maf_destroyMafBlockArena(tmp->arena);
+    maf_destroyMafBlockColumns(tmp->columns);
+    maf_destroySequenceMatrix(tmp->matrix);
     free(tmp);
     tmp = NULL;
   }
 }
 void maf_destroyMfa(mafFileApi_t *mfa) {
+  bgzf_destroyReader(mfa->bgzf);
+  mfa->bgzf = NULL;
+  bgzf_destroyWriter(mfa->bgzfOut);
+  mfa->bgzfOut = NULL;
+  maf_destroyMafWriter(mfa->out);
+  mfa->out = NULL;
+  maf_destroyMafBinaryWriter(mfa->binaryOut);
+  mfa->binaryOut = NULL;
+  maf_destroyMafBinaryInput(mfa->binary);
+  mfa->binary = NULL;
   if (mfa->mfp != NULL && mfa->mfp != stdin) {
     fclose(mfa->mfp);
     mfa->mfp = NULL;
   }
   free(mfa->lastLine);
   mfa->lastLine = NULL;
+  if (mfa->map != NULL) {
+    munmap(mfa->map, mfa->mapSize);
+  } else {
+    free(mfa->buffer);
+  }
+  mfa->map = NULL;
+  mfa->buffer = NULL;
+  free(mfa->scratch);
+  mfa->scratch = NULL;
   free(mfa->filename);
   mfa->filename = NULL;
+  maf_destroyMafNameDict(mfa->names);
+  mfa->names = NULL;
   free(mfa);
   mfa = NULL;
 }
 char* maf_mafFileApi_getFilename(mafFileApi_t *mfa) {
   return mfa->filename;
 }
+void maf_mafFileApi_setLazyParsing(mafFileApi_t *mfa, bool lazy) {
+  // when lazy, the fields of `s' lines are not parsed as blocks are read but
+  // the first time they are asked for, and their numeric fields only if those
+  // are asked for. Reading is then much cheaper for callers that only look at
+  // names or write lines back out unchanged, but a badly formatted line is
+  // only reported once one of its fields is used.
+  mfa->lazyParsing = lazy;
+}
+void maf_mafFileApi_setNameInterning(mafFileApi_t *mfa, bool intern) {
+  // when on, every s, i, e and q line read is given the ids of its name and
+  // its species in the file's dictionary, see maf_mafLine_getNameId(). Off by
+  // default, as it costs a hash lookup per line.
+  mfa->internNames = intern;
+}
+mafNameDict_t* maf_mafFileApi_getNameDict(mafFileApi_t *mfa) {
+  // the dictionary of the names read from mfa, owned by mfa
+  return mfa->names;
+}
 uint64_t maf_mafFileApi_getLineNumber(mafFileApi_t *mfa) {
   return mfa->lineNumber;
 }
+static void maf_mafFileApi_fillBuffer(mafFileApi_t *mfa) {
+  // slide any unconsumed bytes (a partial line) to the front of the buffer,
+  // grow the buffer if that partial line already fills it, then top it up
+  // with one large fread().
+  if (mfa->buffer == NULL) {
+    mfa->bufferSize = kMafReadBufferSize;
+    mfa->buffer = (char *) de_malloc(mfa->bufferSize + 1);
+  }
+  size_t remaining = mfa->bufferEnd - mfa->bufferStart;
+  if (mfa->bufferStart > 0) {
+    memmove(mfa->buffer, mfa->buffer + mfa->bufferStart, remaining);
+    mfa->bufferOffset += mfa->bufferStart;
+    mfa->bufferStart = 0;
+    mfa->bufferEnd = remaining;
+  }
+  if (mfa->bgzf != NULL) {
+    // only the start of the block being read can still be asked for
+    bgzf_discardBefore(mfa->bgzf, mfa->blockOffset);
+  }
+  if (mfa->bufferEnd == mfa->bufferSize) {
+    mfa->bufferSize *= 2;
+    mfa->buffer = (char *) realloc(mfa->buffer, mfa->bufferSize + 1);
+    assert(mfa->buffer != NULL);
+    PROFILE_COUNT(kProfileParseAllocations, 1);
+  }
+  size_t n = 0;
+  if (mfa->bgzf != NULL) {
+    n = bgzf_read(mfa->bgzf, mfa->buffer + mfa->bufferEnd, mfa->bufferSize - mfa->bufferEnd);
+  } else {
+    n = fread(mfa->buffer + mfa->bufferEnd, sizeof(char), mfa->bufferSize - mfa->bufferEnd, mfa->mfp);
+  }
+  mfa->bufferEnd += n;
+  PROFILE_COUNT(kProfileBytesRead, n);
+  if (n == 0) {
+    if (mfa->bgzf == NULL && ferror(mfa->mfp)) {
+      fprintf(stderr, "Error, unable to read from maf file: %s\n", mfa->filename);
+      exit(EXIT_FAILURE);
+    }
+    mfa->eof = true;
+  }
+}
+static int64_t maf_stripCarriageReturns(char *s, int64_t n) {
+  // remove '\r' characters in place, returning the new length.
+  char *cr = memchr(s, '\r', n);
+  if (cr == NULL) {
+    return n;
+  }
+  char *dest = cr;
+  for (char *src = cr; src < s + n; ++src) {
+    if (*src != '\r') {
+      *dest++ = *src;
+    }
+  }
+  *dest = '\0';
+  return dest - s;
+}
+static int64_t maf_mafFileApi_copyToScratch(mafFileApi_t *mfa, const char *s, int64_t n, char **line) {
+  // copy a mapped line so that it can be terminated and have its carriage returns stripped
+  if (mfa->scratchSize < (size_t) n + 1) {
+    free(mfa->scratch);
+    mfa->scratchSize = (size_t) n + 1;
+    mfa->scratch = (char *) de_malloc(mfa->scratchSize);
+  }
+  memcpy(mfa->scratch, s, n);
+  mfa->scratch[n] = '\0';
+  *line = mfa->scratch;
+  return maf_stripCarriageReturns(mfa->scratch, n);
+}
+static int64_t maf_mafFileApi_nextLine(mafFileApi_t *mfa, char **line, bool terminate) {
+  // see maf_mafFileApi_readLine() and maf_mafFileApi_readLineView()
+  while (true) {
+    char *start = mfa->buffer + mfa->bufferStart;
+    size_t available = mfa->bufferEnd - mfa->bufferStart;
+    char *newline = (available > 0) ? memchr(start, '\n', available) : NULL;
+    if (newline != NULL) {
+      int64_t n = newline - start;
+      mfa->lineOffset = mfa->bufferOffset + mfa->bufferStart;
+      mfa->bufferStart += n + 1;
+      if (mfa->map == NULL) {
+        *newline = '\0';
+        *line = start;
+        return maf_stripCarriageReturns(start, n);
+      }
+      if (terminate || memchr(start, '\r', n) != NULL) {
+        return maf_mafFileApi_copyToScratch(mfa, start, n, line);
+      }
+      *line = start;
+      return n;
+    }
+    if (mfa->eof) {
+      mfa->bufferStart = mfa->bufferEnd;
+      *line = NULL;
+      return -1;
+    }
+    maf_mafFileApi_fillBuffer(mfa);
+  }
+}
+int64_t maf_mafFileApi_readLine(mafFileApi_t *mfa, char **line) {
+  // set *line to a view of the next line in the file and return its length.
+  // The newline (and any carriage returns) are stripped and the view is
+  // '\0' terminated, but it lives inside mfa's read buffer and is only valid
+  // until the next read on mfa, so copy anything that needs to be kept.
+  // Like de_getline(), returns -1 at the end of the file, including when the
+  // final line is not terminated by a newline. Does not touch mfa->lineNumber.
+  return maf_mafFileApi_nextLine(mfa, line, true);
+}
+static int64_t maf_mafFileApi_readLineView(mafFileApi_t *mfa, char **line) {
+  // like maf_mafFileApi_readLine(), but the line is only '\0' terminated when
+  // that is free. Lines of a mapped file are left in place, so only the
+  // returned length marks where they end.
+  return maf_mafFileApi_nextLine(mfa, line, false);
+}
 mafLine_t* maf_mafBlock_getHeadLine(mafBlock_t *mb) {
   return mb->headLine;
 }
@@ -462,7 +1478,8 @@ mafBlock_t* maf_mafBlock_getNext(mafBlock_t *mb) {
 }
 char** maf_mafBlock_getSequenceMatrix(mafBlock_t *mb, unsigned n, unsigned m) {
   // currently this is not stored and must be built
-  // should return a matrix containing the alignment, one row per sequence
+  // should return a matrix containing the alignment, one row per sequence.
+  // See maf_mafBlock_getSequenceMatrixView() for a read-only matrix that is not copied.
   char** matrix = NULL;
   matrix = (char**) de_malloc(sizeof(char*) * n);
   unsigned i;
@@ -495,7 +1512,8 @@ void maf_mafBlock_destroySequenceMatrix(char **mat, unsigned n) {
   mat = NULL;
 }
 char* maf_mafBlock_getStrandArray(mafBlock_t *mb) {
-  // currently this is not stored and must be built
+  // builds a fresh, caller owned array each call, see the *ArrayView() getters
+  // for the cached read-only arrays owned by the block.
   // should return a char array containing an in-order list of strandedness
   // for all sequence lines. Either + or - char permitted.
   if (maf_mafBlock_getNumberOfSequences(mb) == 0) {
@@ -506,14 +1524,15 @@ char* maf_mafBlock_getStrandArray(mafBlock_t *mb) {
   unsigned i = 0;
   while (ml != NULL) {
     if (ml->type == 's')
-      a[i++] = ml->strand;
+      a[i++] = maf_mafLine_getStrand(ml);
     ml = ml->next;
   }
   a[i] = '\0';
   return a;
 }
 mafLine_t** maf_mafBlock_getMafLineArray_seqOnly(mafBlock_t *mb) {
-  // currently this is not stored and must be built
+  // builds a fresh, caller owned array each call, see the *ArrayView() getters
+  // for the cached read-only arrays owned by the block.
   // should return an array of mafLine_t pointers to all sequences in mb
   if (maf_mafBlock_getNumberOfSequences(mb) == 0) {
     return NULL;
@@ -529,7 +1548,8 @@ mafLine_t** maf_mafBlock_getMafLineArray_seqOnly(mafBlock_t *mb) {
   return a;
 }
 int* maf_mafBlock_getStrandIntArray(mafBlock_t *mb) {
-  // currently this is not stored and must be built
+  // builds a fresh, caller owned array each call, see the *ArrayView() getters
+  // for the cached read-only arrays owned by the block.
   // should return an int array containing an in-order list of strandedness
   // for all sequence lines. Either 1 or -1
   int *a = (int*) de_malloc(sizeof(*a) * maf_mafBlock_getNumberOfSequences(mb));
@@ -537,7 +1557,7 @@ int* maf_mafBlock_getStrandIntArray(mafBlock_t *mb) {
   unsigned i = 0;
   while (ml != NULL) {
     if (ml->type == 's') {
-      if (ml->strand == '+') {
+      if (maf_mafLine_getStrand(ml) == '+') {
         a[i++] = 1;
       } else {
         a[i++] = -1;
@@ -548,7 +1568,8 @@ int* maf_mafBlock_getStrandIntArray(mafBlock_t *mb) {
   return a;
 }
 uint64_t* maf_mafBlock_getStartArray(mafBlock_t *mb) {
-  // currently this is not stored and must be built
+  // builds a fresh, caller owned array each call, see the *ArrayView() getters
+  // for the cached read-only arrays owned by the block.
   // should return a uint64_t array containing an in-order list of source lengths
   // for all sequence lines.
   uint64_t *a = (uint64_t*) de_malloc(sizeof(*a) * maf_mafBlock_getNumberOfSequences(mb));
@@ -556,14 +1577,15 @@ uint64_t* maf_mafBlock_getStartArray(mafBlock_t *mb) {
   unsigned i = 0;
   while (ml != NULL) {
     if (ml->type == 's') {
-      a[i++] = ml->start;
+      a[i++] = maf_mafLine_getStart(ml);
     }
     ml = ml->next;
   }
   return a;
 }
 uint64_t* maf_mafBlock_getPosCoordStartArray(mafBlock_t *mb) {
-  // currently this is not stored and must be built
+  // builds a fresh, caller owned array each call, see the *ArrayView() getters
+  // for the cached read-only arrays owned by the block.
   // should return a uint64_t array containing an in-order list of the start position in
   // positive coordinates.
   uint64_t *a = (uint64_t*) de_malloc(sizeof(*a) * maf_mafBlock_getNumberOfSequences(mb));
@@ -571,6 +1593,7 @@ uint64_t* maf_mafBlock_getPosCoordStartArray(mafBlock_t *mb) {
   unsigned i = 0;
   while (ml != NULL) {
     if (ml->type == 's') {
+      maf_mafLine_convertFields(ml);
       if (ml->strand == '+')
         a[i++] = ml->start;
       else
@@ -581,7 +1604,8 @@ uint64_t* maf_mafBlock_getPosCoordStartArray(mafBlock_t *mb) {
   return a;
 }
 uint64_t* maf_mafBlock_getPosCoordLeftArray(mafBlock_t *mb) {
-  // currently this is not stored and must be built
+  // builds a fresh, caller owned array each call, see the *ArrayView() getters
+  // for the cached read-only arrays owned by the block.
   // should return a uint64_t array containing an in-order list of the left-most positon
   // of the block in positive coordinates.
   uint64_t *a = (uint64_t*) de_malloc(sizeof(*a) * maf_mafBlock_getNumberOfSequences(mb));
@@ -589,6 +1613,7 @@ uint64_t* maf_mafBlock_getPosCoordLeftArray(mafBlock_t *mb) {
   unsigned i = 0;
   while (ml != NULL) {
     if (ml->type == 's') {
+      maf_mafLine_convertFields(ml);
       if (ml->strand == '+')
         a[i++] = ml->start;
       else
@@ -599,7 +1624,8 @@ uint64_t* maf_mafBlock_getPosCoordLeftArray(mafBlock_t *mb) {
   return a;
 }
 uint64_t* maf_mafBlock_getSourceLengthArray(mafBlock_t *mb) {
-  // currently this is not stored and must be built
+  // builds a fresh, caller owned array each call, see the *ArrayView() getters
+  // for the cached read-only arrays owned by the block.
   // should return a uint64_t array containing an in-order list of positive
   // coordinate start positions for all sequence lines.
   uint64_t *a = (uint64_t*) de_malloc(sizeof(*a) * maf_mafBlock_getNumberOfSequences(mb));
@@ -607,14 +1633,15 @@ uint64_t* maf_mafBlock_getSourceLengthArray(mafBlock_t *mb) {
   unsigned i = 0;
   while (ml != NULL) {
     if (ml->type == 's') {
-      a[i++] = ml->sourceLength;
+      a[i++] = maf_mafLine_getSourceLength(ml);
     }
     ml = ml->next;
   }
   return a;
 }
 uint64_t* maf_mafBlock_getSequenceLengthArray(mafBlock_t *mb) {
-  // currently this is not stored and must be built
+  // builds a fresh, caller owned array each call, see the *ArrayView() getters
+  // for the cached read-only arrays owned by the block.
   // should return a uint64_t array containing an in-order list of
   // sequence length field values
   uint64_t *a = (uint64_t*) de_malloc(sizeof(*a) * maf_mafBlock_getNumberOfSequences(mb));
@@ -622,14 +1649,15 @@ uint64_t* maf_mafBlock_getSequenceLengthArray(mafBlock_t *mb) {
   unsigned i = 0;
   while (ml != NULL) {
     if (ml->type == 's') {
-      a[i++] = ml->length;
+      a[i++] = maf_mafLine_getLength(ml);
     }
     ml = ml->next;
   }
   return a;
 }
 char** maf_mafBlock_getSpeciesArray(mafBlock_t *mb) {
-  // currently this is not stored and must be built
+  // builds a fresh, caller owned array each call, see the *ArrayView() getters
+  // for the cached read-only arrays owned by the block.
   // should return an array of char pointers containing an in-order list of
   // sequence name fields for all sequences.
   char** m = NULL;
@@ -638,11 +1666,242 @@ char** maf_mafBlock_getSpeciesArray(mafBlock_t *mb) {
   unsigned i = 0;
   while (ml != NULL) {
     if (ml->type == 's')
-      m[i++] = de_strdup(ml->species);
+      m[i++] = de_strdup(maf_mafLine_getSpecies(ml));
     ml = ml->next;
   }
   return m;
 }
+static void maf_mafBlockColumns_reserve(mafBlockColumns_t *cols, uint64_t n) {
+  if (n == 0) {
+    n = 1; // room for the strand array's terminator
+  }
+  if (n <= cols->capacity) {
+    return;
+  }
+  free(cols->lines);
+  free(cols->species);
+  free(cols->strands);
+  free(cols->strandInts);
+  free(cols->starts);
+  free(cols->nameIds);
+  cols->lines = (mafLine_t**) de_malloc(sizeof(*(cols->lines)) * n);
+  cols->species = (char**) de_malloc(sizeof(*(cols->species)) * n);
+  cols->strands = (char*) de_malloc(sizeof(*(cols->strands)) * (n + 1));
+  cols->strandInts = (int*) de_malloc(sizeof(*(cols->strandInts)) * n);
+  // the five uint64_t fields share one allocation
+  cols->starts = (uint64_t*) de_malloc(sizeof(*(cols->starts)) * n * 5);
+  cols->nameIds = (uint32_t*) de_malloc(sizeof(*(cols->nameIds)) * n * 2);
+  cols->capacity = n;
+}
+static mafBlockColumns_t* maf_mafBlock_getColumns(mafBlock_t *mb) {
+  // build (or reuse) the block owned columnar view of mb's s lines.
+  if (mb->columns == NULL) {
+    mb->columns = (mafBlockColumns_t*) de_malloc(sizeof(*(mb->columns)));
+    memset(mb->columns, 0, sizeof(*(mb->columns)));
+  }
+  mafBlockColumns_t *cols = mb->columns;
+  if (cols->valid) {
+    return cols;
+  }
+  uint64_t n = 0;
+  for (mafLine_t *ml = mb->headLine; ml != NULL; ml = ml->next) {
+    if (ml->type == 's') {
+      ++n;
+    }
+  }
+  maf_mafBlockColumns_reserve(cols, n);
+  cols->posCoordStarts = cols->starts + cols->capacity;
+  cols->posCoordLefts = cols->posCoordStarts + cols->capacity;
+  cols->sourceLengths = cols->posCoordLefts + cols->capacity;
+  cols->sequenceLengths = cols->sourceLengths + cols->capacity;
+  cols->speciesIds = cols->nameIds + cols->capacity;
+  uint64_t i = 0;
+  for (mafLine_t *ml = mb->headLine; ml != NULL; ml = ml->next) {
+    if (ml->type != 's') {
+      continue;
+    }
+    maf_mafLine_convertFields(ml);
+    cols->lines[i] = ml;
+    cols->species[i] = maf_mafLine_getSpecies(ml);
+    cols->strands[i] = ml->strand;
+    cols->strandInts[i] = (ml->strand == '+') ? 1 : -1;
+    cols->starts[i] = ml->start;
+    cols->sourceLengths[i] = ml->sourceLength;
+    cols->sequenceLengths[i] = ml->length;
+    cols->nameIds[i] = ml->nameId;
+    cols->speciesIds[i] = ml->speciesId;
+    if (ml->strand == '+') {
+      cols->posCoordStarts[i] = ml->start;
+      cols->posCoordLefts[i] = ml->start;
+    } else {
+      cols->posCoordStarts[i] = ml->sourceLength - ml->start - 1;
+      cols->posCoordLefts[i] = ml->sourceLength - (ml->start + ml->length);
+    }
+    ++i;
+  }
+  cols->strands[n] = '\0';
+  cols->n = n;
+  cols->valid = true;
+  return cols;
+}
+void maf_mafBlock_invalidateArrayViews(mafBlock_t *mb) {
+  // the *ArrayView() arrays are rebuilt on their next use. Block level setters
+  // call this themselves, code that changes the fields of a block's lines
+  // directly must call it before asking for a view again.
+  if (mb->columns != NULL) {
+    mb->columns->valid = false;
+  }
+  if (mb->matrix != NULL) {
+    mb->matrix->valid = false;
+    mb->matrix->columnsValid = false;
+  }
+}
+static void maf_mafSequenceMatrix_transpose(mafSequenceMatrix_t *mat) {
+  // fill the column-major copy a tile at a time so that both the rows being
+  // read and the columns being written stay in cache.
+  const uint64_t tile = 64;
+  uint64_t size = mat->n * mat->m;
+  if (size > mat->columnsCapacity) {
+    free(mat->columns);
+    mat->columns = (char*) de_malloc(sizeof(char) * size);
+    mat->columnsCapacity = size;
+  }
+  for (uint64_t r0 = 0; r0 < mat->n; r0 += tile) {
+    uint64_t r1 = (r0 + tile < mat->n) ? r0 + tile : mat->n;
+    for (uint64_t c0 = 0; c0 < mat->m; c0 += tile) {
+      uint64_t c1 = (c0 + tile < mat->m) ? c0 + tile : mat->m;
+      for (uint64_t r = r0; r < r1; ++r) {
+        const char *row = mat->rows[r];
+        for (uint64_t c = c0; c < c1; ++c) {
+          mat->columns[c * mat->n + r] = row[c];
+        }
+      }
+    }
+  }
+  mat->columnsValid = true;
+}
+mafSequenceMatrix_t* maf_mafBlock_getSequenceMatrixView(mafBlock_t *mb) {
+  // return the block owned, read-only matrix of mb's sequences, one row per
+  // s line and maf_mafBlock_getSequenceFieldLength() columns. Rows are the
+  // lines' own sequences wherever they are already the full width, so in the
+  // usual case nothing is copied. Valid until the block is changed or destroyed.
+  if (mb->matrix == NULL) {
+    mb->matrix = (mafSequenceMatrix_t*) de_malloc(sizeof(*(mb->matrix)));
+    memset(mb->matrix, 0, sizeof(*(mb->matrix)));
+  }
+  mafSequenceMatrix_t *mat = mb->matrix;
+  if (mat->valid) {
+    return mat;
+  }
+  uint64_t m = maf_mafBlock_getSequenceFieldLength(mb);
+  uint64_t n = 0, copied = 0;
+  for (mafLine_t *ml = mb->headLine; ml != NULL; ml = ml->next) {
+    if (ml->type == 's') {
+      ++n;
+      if (maf_mafLine_getSequenceFieldLength(ml) != m) {
+        ++copied;
+      }
+    }
+  }
+  if (n > mat->rowsCapacity) {
+    free(mat->rows);
+    mat->rows = (char**) de_malloc(sizeof(*(mat->rows)) * n);
+    mat->rowsCapacity = n;
+  }
+  if (copied * (m + 1) > mat->copiesCapacity) {
+    free(mat->copies);
+    mat->copies = (char*) de_malloc(sizeof(char) * copied * (m + 1));
+    mat->copiesCapacity = copied * (m + 1);
+  }
+  uint64_t i = 0;
+  char *copy = mat->copies;
+  for (mafLine_t *ml = mb->headLine; ml != NULL; ml = ml->next) {
+    if (ml->type != 's') {
+      continue;
+    }
+    if (ml->sequenceFieldLength == m) {
+      mat->rows[i++] = ml->sequence;
+    } else {
+      // a malformed row, truncated or padded with '\0' as in maf_mafBlock_getSequenceMatrix()
+      strncpy(copy, ml->sequence, m);
+      copy[m] = '\0';
+      mat->rows[i++] = copy;
+      copy += m + 1;
+    }
+  }
+  mat->n = n;
+  mat->m = m;
+  mat->valid = true;
+  mat->columnsValid = false;
+  return mat;
+}
+uint64_t maf_mafSequenceMatrix_getNumberOfRows(mafSequenceMatrix_t *mat) {
+  return mat->n;
+}
+uint64_t maf_mafSequenceMatrix_getNumberOfColumns(mafSequenceMatrix_t *mat) {
+  return mat->m;
+}
+char** maf_mafSequenceMatrix_getRows(mafSequenceMatrix_t *mat) {
+  // row-major access, rows[r][c]. The rows belong to the block and must not be changed.
+  return mat->rows;
+}
+const char* maf_mafSequenceMatrix_getColumn(mafSequenceMatrix_t *mat, uint64_t c) {
+  // column-major access, the n characters of column c are contiguous. The
+  // transpose is built on the first call and kept until the block changes.
+  if (!mat->columnsValid) {
+    maf_mafSequenceMatrix_transpose(mat);
+  }
+  if (mat->columns == NULL) {
+    return NULL;
+  }
+  return mat->columns + c * mat->n;
+}
+const char* maf_mafBlock_getStrandArrayView(mafBlock_t *mb) {
+  // as maf_mafBlock_getStrandArray(), but the array is built once and owned by mb.
+  mafBlockColumns_t *cols = maf_mafBlock_getColumns(mb);
+  return (cols->n == 0) ? NULL : cols->strands;
+}
+const int* maf_mafBlock_getStrandIntArrayView(mafBlock_t *mb) {
+  mafBlockColumns_t *cols = maf_mafBlock_getColumns(mb);
+  return (cols->n == 0) ? NULL : cols->strandInts;
+}
+const uint32_t* maf_mafBlock_getNameIdArrayView(mafBlock_t *mb) {
+  mafBlockColumns_t *cols = maf_mafBlock_getColumns(mb);
+  return (cols->n == 0) ? NULL : cols->nameIds;
+}
+const uint32_t* maf_mafBlock_getSpeciesIdArrayView(mafBlock_t *mb) {
+  mafBlockColumns_t *cols = maf_mafBlock_getColumns(mb);
+  return (cols->n == 0) ? NULL : cols->speciesIds;
+}
+const uint64_t* maf_mafBlock_getStartArrayView(mafBlock_t *mb) {
+  mafBlockColumns_t *cols = maf_mafBlock_getColumns(mb);
+  return (cols->n == 0) ? NULL : cols->starts;
+}
+const uint64_t* maf_mafBlock_getPosCoordStartArrayView(mafBlock_t *mb) {
+  mafBlockColumns_t *cols = maf_mafBlock_getColumns(mb);
+  return (cols->n == 0) ? NULL : cols->posCoordStarts;
+}
+const uint64_t* maf_mafBlock_getPosCoordLeftArrayView(mafBlock_t *mb) {
+  mafBlockColumns_t *cols = maf_mafBlock_getColumns(mb);
+  return (cols->n == 0) ? NULL : cols->posCoordLefts;
+}
+const uint64_t* maf_mafBlock_getSourceLengthArrayView(mafBlock_t *mb) {
+  mafBlockColumns_t *cols = maf_mafBlock_getColumns(mb);
+  return (cols->n == 0) ? NULL : cols->sourceLengths;
+}
+const uint64_t* maf_mafBlock_getSequenceLengthArrayView(mafBlock_t *mb) {
+  mafBlockColumns_t *cols = maf_mafBlock_getColumns(mb);
+  return (cols->n == 0) ? NULL : cols->sequenceLengths;
+}
+char* const* maf_mafBlock_getSpeciesArrayView(mafBlock_t *mb) {
+  // the names are those of the lines themselves and are not copied.
+  mafBlockColumns_t *cols = maf_mafBlock_getColumns(mb);
+  return (cols->n == 0) ? NULL : cols->species;
+}
+mafLine_t* const* maf_mafBlock_getMafLineArrayView_seqOnly(mafBlock_t *mb) {
+  mafBlockColumns_t *cols = maf_mafBlock_getColumns(mb);
+  return (cols->n == 0) ? NULL : cols->lines;
+}
 char* maf_mafLine_getLine(mafLine_t *ml) {
   return ml->line;
 }
@@ -653,30 +1912,68 @@ char maf_mafLine_getType(mafLine_t *ml) {
   return ml->type;
 }
 char* maf_mafLine_getSpecies(mafLine_t *ml) {
+  maf_mafLine_readSpecies(ml);
   return ml->species;
 }
 uint64_t maf_mafLine_getStart(mafLine_t *ml) {
+  maf_mafLine_convertFields(ml);
   return ml->start;
 }
 uint64_t maf_mafLine_getLength(mafLine_t *ml) {
+  maf_mafLine_convertFields(ml);
   return ml->length;
 }
 char maf_mafLine_getStrand(mafLine_t *ml) {
+  maf_mafLine_convertFields(ml);
   return ml->strand;
 }
 uint64_t maf_mafLine_getSourceLength(mafLine_t *ml) {
+  maf_mafLine_convertFields(ml);
   return ml->sourceLength;
 }
 char* maf_mafLine_getSequence(mafLine_t *ml) {
+  maf_mafLine_readSequence(ml);
+  return ml->sequence;
+}
+char* maf_mafLine_getMutableSequence(mafLine_t *ml) {
+  // return the sequence for in-place modification. The sequence is normally a
+  // view into the line, so it is copied out first (once) to leave the line
+  // text as it was read.
+  maf_mafLine_readSequence(ml);
+  if (ml->storage & kMafLineSequenceInLine) {
+    ml->sequence = de_strndup(ml->sequence, ml->sequenceFieldLength);
+    ml->storage |= kMafLineOwnsSequence;
+    ml->storage &= ~kMafLineSequenceInLine;
+  }
+  // the caller may move gaps about
+  maf_mafLine_invalidateCoordinateMap(ml);
   return ml->sequence;
 }
 uint64_t maf_mafLine_getSequenceFieldLength(mafLine_t *ml) {
+  maf_mafLine_readSequence(ml);
   return ml->sequenceFieldLength;
 }
 mafLine_t* maf_mafLine_getNext(mafLine_t *ml) {
   return ml->next;
 }
+uint32_t maf_mafLine_getNameId(mafLine_t *ml) {
+  // the id of the line's name in its file's mafNameDict_t, or kMafNoNameId
+  // unless the line was read with maf_mafFileApi_setNameInterning() on
+  return ml->nameId;
+}
+uint32_t maf_mafLine_getSpeciesId(mafLine_t *ml) {
+  return ml->speciesId;
+}
 uint64_t maf_mafBlock_getSequenceFieldLength(mafBlock_t *mb) {
+  if (mb->lazySequenceFieldLength) {
+    mb->lazySequenceFieldLength = false;
+    for (mafLine_t *ml = mb->headLine; ml != NULL; ml = ml->next) {
+      if (ml->type == 's') {
+        mb->sequenceFieldLength = maf_mafLine_getSequenceFieldLength(ml);
+        break;
+      }
+    }
+  }
   return mb->sequenceFieldLength;
 }
 unsigned maf_mafBlock_getNumberOfBlocks(mafBlock_t *b) {
@@ -716,6 +2013,7 @@ uint64_t maf_mafLine_getPositiveCoord(mafLine_t *ml) {
   // NOTE THAT FOR - STRANDS, THIS COORDINATE WILL BE THE RIGHT-MOST (END POINT)
   // OF THE SEQUENCE. TO GET THE LEFT-MOST (START POINT) YOU WOULD NEED TO SUBTRACT
   //
+  maf_mafLine_convertFields(ml);
   if (ml->strand == '+') {
     return ml->start;
   } else {
@@ -725,6 +2023,7 @@ uint64_t maf_mafLine_getPositiveCoord(mafLine_t *ml) {
 uint64_t maf_mafLine_getPositiveLeftCoord(mafLine_t *ml) {
   // return the left most coordinate in postive zero based coordinates.
   // for - strands this includes the length of the sequence.
+  maf_mafLine_convertFields(ml);
   if (ml->strand == '+') {
     return ml->start;
   } else {
@@ -733,18 +2032,23 @@ uint64_t maf_mafLine_getPositiveLeftCoord(mafLine_t *ml) {
 }
 void maf_mafBlock_setHeadLine(mafBlock_t *mb, mafLine_t *ml) {
   mb->headLine = ml;
+  maf_mafBlock_invalidateArrayViews(mb);
 }
 void maf_mafBlock_setTailLine(mafBlock_t *mb, mafLine_t *ml) {
   mb->tailLine = ml;
+  maf_mafBlock_invalidateArrayViews(mb);
 }
 void maf_mafBlock_setNumberOfSequences(mafBlock_t *mb, uint64_t n) {
   mb->numberOfSequences = n;
+  maf_mafBlock_invalidateArrayViews(mb);
 }
 void maf_mafBlock_incrementNumberOfSequences(mafBlock_t *mb) {
   ++(mb->numberOfSequences);
+  maf_mafBlock_invalidateArrayViews(mb);
 }
 void maf_mafBlock_decrementNumberOfSequences(mafBlock_t *mb) {
   --(mb->numberOfSequences);
+  maf_mafBlock_invalidateArrayViews(mb);
 }
 void maf_mafBlock_setNumberOfLines(mafBlock_t *mb, uint64_t n) {
   mb->numberOfLines = n;
@@ -766,12 +2070,16 @@ void maf_mafBlock_decrementLineNumber(mafBlock_t *mb) {
 }
 void maf_mafBlock_setSequenceFieldLength(mafBlock_t *mb, uint64_t sfl) {
   mb->sequenceFieldLength = sfl;
+  mb->lazySequenceFieldLength = false;
 }
 void maf_mafBlock_setNext(mafBlock_t *mb, mafBlock_t *next) {
   mb->next = next;
 }
 void maf_mafLine_setLine(mafLine_t *ml, char *line) {
+  maf_mafLine_parseFields(ml);
   ml->line = line;
+  ml->storage |= kMafLineOwnsLine;
+  ml->storage &= ~kMafLineSequenceInLine;
 }
 void maf_mafLine_setLineNumber(mafLine_t *ml, uint64_t n) {
   ml->lineNumber = n;
@@ -780,60 +2088,73 @@ void maf_mafLine_setType(mafLine_t *ml, char c) {
   ml->type = c;
 }
 void maf_mafLine_setSpecies(mafLine_t *ml, char *s) {
+  // an unread species was never copied out of the line, so is simply replaced
+  ml->storage &= ~kMafLineSpeciesUnread;
   ml->species = s;
+  ml->storage |= kMafLineOwnsSpecies;
+  // the ids were those of the old name
+  ml->nameId = kMafNoNameId;
+  ml->speciesId = kMafNoNameId;
 }
 void maf_mafLine_setStrand(mafLine_t *ml, char c) {
+  maf_mafLine_convertFields(ml);
   ml->strand = c;
 }
 void maf_mafLine_setStart(mafLine_t *ml, uint64_t n) {
+  maf_mafLine_convertFields(ml);
   ml->start = n;
 }
 void maf_mafLine_setLength(mafLine_t *ml, uint64_t n) {
+  maf_mafLine_convertFields(ml);
   ml->length = n;
 }
 void maf_mafLine_setSourceLength(mafLine_t *ml, uint64_t n) {
+  maf_mafLine_convertFields(ml);
   ml->sourceLength = n;
 }
 void maf_mafLine_setSequence(mafLine_t *ml, char *s) {
+  maf_mafLine_readSequence(ml);
   ml->sequence = s;
   ml->sequenceFieldLength = strlen(ml->sequence);
+  ml->storage |= kMafLineOwnsSequence;
+  ml->storage &= ~kMafLineSequenceInLine;
+  maf_mafLine_invalidateCoordinateMap(ml);
 }
 void maf_mafLine_setNext(mafLine_t *ml, mafLine_t *next) {
   ml->next = next;
 }
 mafBlock_t* maf_readBlockHeader(mafFileApi_t *mfa) {
-  extern const int kMaxStringLength;
-  int64_t n = kMaxStringLength;
-  char *line = (char*) de_malloc(n);
+  if (maf_mafFileApi_isBinary(mfa)) {
+    // the header is stored as any other block
+    mafBlock_t *header = maf_mafFileApi_readBinaryBlock(mfa, NULL);
+    return (header != NULL) ? header : maf_newMafBlock();
+  }
+  char *line = NULL;
   mafBlock_t *header = maf_newMafBlock();
-  int status = de_getline(&line, &n, mfa->mfp);
+  int64_t status = maf_mafFileApi_readLine(mfa, &line);
   bool validHeader = false;
   ++(mfa->lineNumber);
-  maf_checkForPrematureMafEnd(maf_mafFileApi_getFilename(mfa), status, line);
+  maf_checkForPrematureMafEnd(maf_mafFileApi_getFilename(mfa), status);
   if (strncmp(line, "track", 5) == 0) {
     // possible first line of a maf
     validHeader = true;
     mafLine_t *ml = maf_newMafLine();
-    char *copy = (char *) de_malloc(n + 1); // freed in destroy lines
-    strcpy(copy, line);
-    ml->line = copy;
+    ml->line = de_strdup(line); // freed in destroy lines
     ml->type = 'h';
     ml->lineNumber = mfa->lineNumber;
     header->headLine = ml;
     header->tailLine = ml;
-    status = de_getline(&line, &n, mfa->mfp);
+    status = maf_mafFileApi_readLine(mfa, &line);
     ++(mfa->lineNumber);
     header->lineNumber = mfa->lineNumber;
     ++(header->numberOfLines);
-    maf_checkForPrematureMafEnd(maf_mafFileApi_getFilename(mfa), status, line);
+    maf_checkForPrematureMafEnd(maf_mafFileApi_getFilename(mfa), status);
   }
   if (strncmp(line, "##maf", 5) == 0) {
     // possible first or second line of maf
     validHeader = true;
     mafLine_t *ml = maf_newMafLine();
-    char *copy = (char *) de_malloc(n + 1); // freed in destroy lines
-    strcpy(copy, line);
-    ml->line = copy;
+    ml->line = de_strdup(line); // freed in destroy lines
     ml->type = 'h';
     ml->lineNumber = mfa->lineNumber;
     if (header->headLine == NULL) {
@@ -843,68 +2164,74 @@ mafBlock_t* maf_readBlockHeader(mafFileApi_t *mfa) {
       header->headLine->next = ml;
       header->tailLine = ml;
     }
-    status = de_getline(&line, &n, mfa->mfp);
+    status = maf_mafFileApi_readLine(mfa, &line);
     ++(mfa->lineNumber);
     header->lineNumber = mfa->lineNumber;
     ++(header->numberOfLines);
-    maf_checkForPrematureMafEnd(maf_mafFileApi_getFilename(mfa), status, line);
+    maf_checkForPrematureMafEnd(maf_mafFileApi_getFilename(mfa), status);
   }
   if (!validHeader) {
     fprintf(stderr, "Error, maf file %s does not contain a valid header!\n", mfa->filename);
     exit(EXIT_FAILURE);
   }
   mafLine_t *thisMl = header->tailLine;
-  while(line[0] != 'a' && !maf_isBlankLine(line)) {
+  while(line[0] != 'a' && !maf_isBlankLine(line, status)) {
     // eat up the file until we hit the first alignment block
     mafLine_t *ml = maf_newMafLine();
-    char *copy = (char *) de_malloc(n + 1); // freed in destroy lines
-    strcpy(copy, line);
-    ml->line = copy;
+    ml->line = de_strdup(line); // freed in destroy lines
     ml->type = 'h';
     ml->lineNumber = mfa->lineNumber;
     thisMl->next = ml;
     thisMl = ml;
     header->tailLine = thisMl;
-    status = de_getline(&line, &n, mfa->mfp);
+    status = maf_mafFileApi_readLine(mfa, &line);
     ++(mfa->lineNumber);
     header->lineNumber = mfa->lineNumber;
     ++(header->numberOfLines);
-    maf_checkForPrematureMafEnd(maf_mafFileApi_getFilename(mfa), status, line);
+    maf_checkForPrematureMafEnd(maf_mafFileApi_getFilename(mfa), status);
   }
   if (line[0] == 'a') {
     // stuff this line in ->lastLine for processesing
-    char *copy = (char *) de_malloc(n + 1); // freed in destroy lines
-    strcpy(copy, line);
-    mfa->lastLine = copy;
+    mfa->lastLine = de_strdup(line);
+    mfa->lastLineOffset = mfa->lineOffset;
   }
-  free(line);
-  line = NULL;
+  PROFILE_COUNT(kProfileLinesParsed, header->numberOfLines);
   return header;
 }
+static mafLine_t* maf_mafFileApi_newMafLine(mafFileApi_t *mfa, const char *s, uint64_t lineNumber) {
+  if (mfa->lazyParsing) {
+    return maf_newLazyMafLineFromString(s, lineNumber);
+  }
+  return maf_newMafLineFromString(s, lineNumber);
+}
 mafBlock_t* maf_readBlockBody(mafFileApi_t *mfa) {
-  extern const int kMaxStringLength;
+  if (maf_mafFileApi_isBinary(mfa)) {
+    mafBlock_t *mb = maf_mafFileApi_readBinaryBlock(mfa, NULL);
+    return (mb != NULL) ? mb : maf_newMafBlock();
+  }
   mafBlock_t *thisBlock = maf_newMafBlock();
   if (mfa->lastLine != NULL) {
     // this is only invoked when the header is not followed by a blank line
-    mafLine_t *ml = maf_newMafLineFromString(mfa->lastLine, mfa->lineNumber);
+    mafLine_t *ml = maf_mafFileApi_newMafLine(mfa, mfa->lastLine, mfa->lineNumber);
     if (ml->type == 's') {
       ++(thisBlock->numberOfSequences);
-      if (thisBlock->sequenceFieldLength == 0) {
+      if (thisBlock->sequenceFieldLength == 0 && !mfa->lazyParsing) {
         thisBlock->sequenceFieldLength = maf_mafLine_getSequenceFieldLength(ml);
       }
     }
     ++(thisBlock->numberOfLines);
     thisBlock->headLine = ml;
     thisBlock->tailLine = ml;
+    mfa->blockOffset = mfa->lastLineOffset;
     free(mfa->lastLine);
     mfa->lastLine = NULL;
   }
-  int64_t n = kMaxStringLength;
-  char *line = (char*) de_malloc(n);
+  char *line = NULL;
+  int64_t n = 0;
   thisBlock->lineNumber = mfa->lineNumber;
-  while(de_getline(&line, &n, mfa->mfp) != -1) {
+  while((n = maf_mafFileApi_readLine(mfa, &line)) != -1) {
     ++(mfa->lineNumber);
-    if (maf_isBlankLine(line)) {
+    if (maf_isBlankLine(line, n)) {
       if (thisBlock->headLine == NULL) {
         // this handles multiple blank lines in a row
         continue;
@@ -912,8 +2239,9 @@ mafBlock_t* maf_readBlockBody(mafFileApi_t *mfa) {
         break;
       }
     }
-    mafLine_t *ml = maf_newMafLineFromString(line, mfa->lineNumber);
+    mafLine_t *ml = maf_mafFileApi_newMafLine(mfa, line, mfa->lineNumber);
     if (thisBlock->headLine == NULL) {
+      mfa->blockOffset = mfa->lineOffset;
       thisBlock->headLine = ml;
       thisBlock->tailLine = ml;
     } else {
@@ -922,19 +2250,24 @@ mafBlock_t* maf_readBlockBody(mafFileApi_t *mfa) {
     }
     if (ml->type == 's') {
       ++(thisBlock->numberOfSequences);
-      if (thisBlock->sequenceFieldLength == 0) {
+      if (thisBlock->sequenceFieldLength == 0 && !mfa->lazyParsing) {
         thisBlock->sequenceFieldLength = maf_mafLine_getSequenceFieldLength(ml);
       }
     }
     ++(thisBlock->numberOfLines);
   }
-  free(line);
-  line = NULL;
+  thisBlock->lazySequenceFieldLength = mfa->lazyParsing;
+  maf_mafFileApi_internNames(mfa, thisBlock);
+  PROFILE_COUNT(kProfileBlocksParsed, (thisBlock->headLine != NULL) ? 1 : 0);
+  PROFILE_COUNT(kProfileLinesParsed, thisBlock->numberOfLines);
   return thisBlock;
 }
 mafBlock_t* maf_readBlock(mafFileApi_t *mfa) {
   // either returns a pointer to the next mafBlock in the maf file,
   // or a NULL pointer if the end of the file has been reached.
+  if (maf_mafFileApi_isBinary(mfa)) {
+    return maf_mafFileApi_readBinaryBlock(mfa, NULL);
+  }
   if (mfa->lineNumber == 0) {
     // header
     mafBlock_t *header = maf_readBlockHeader(mfa);
@@ -955,6 +2288,214 @@ mafBlock_t* maf_readBlock(mafFileApi_t *mfa) {
     }
   }
 }
+static mafBlockArena_t* maf_newMafBlockArena(void) {
+  mafBlockArena_t *arena = (mafBlockArena_t *) de_malloc(sizeof(*arena));
+  arena->textSize = kMafReadBufferSize;
+  arena->text = (char *) de_malloc(arena->textSize);
+  arena->textUsed = 0;
+  arena->linesSize = 64;
+  arena->lines = (mafLine_t *) de_malloc(sizeof(*(arena->lines)) * arena->linesSize);
+  memset(arena->lines, 0, sizeof(*(arena->lines)) * arena->linesSize);
+  arena->offsetsSize = 3 * arena->linesSize;
+  arena->offsets = (size_t *) de_malloc(sizeof(*(arena->offsets)) * arena->offsetsSize);
+  PROFILE_COUNT(kProfileParseAllocations, 4);
+  return arena;
+}
+static size_t maf_mafBlockArena_appendText(mafBlockArena_t *arena, const char *s, size_t n) {
+  // copy n characters of s and a terminating '\0' into the arena, returning their offset
+  if (arena->textUsed + n + 1 > arena->textSize) {
+    while (arena->textUsed + n + 1 > arena->textSize) {
+      arena->textSize *= 2;
+    }
+    arena->text = (char *) realloc(arena->text, arena->textSize);
+    assert(arena->text != NULL);
+    PROFILE_COUNT(kProfileParseAllocations, 1);
+  }
+  size_t offset = arena->textUsed;
+  memcpy(arena->text + offset, s, n);
+  arena->text[offset + n] = '\0';
+  arena->textUsed += n + 1;
+  return offset;
+}
+static mafLine_t* maf_mafBlockArena_startLine(mafBlockArena_t *arena, uint64_t i, const char *s, size_t n,
+                                              uint64_t lineNumber) {
+  // copy line s of length n into the i-th arena line, leaving its fields unset.
+  // The text pointers are left unset because the text buffer may still move,
+  // see maf_mafBlock_linkArenaLines().
+  if (i == arena->linesSize) {
+    arena->linesSize *= 2;
+    arena->lines = (mafLine_t *) realloc(arena->lines, sizeof(*(arena->lines)) * arena->linesSize);
+    assert(arena->lines != NULL);
+    memset(arena->lines + i, 0, sizeof(*(arena->lines)) * (arena->linesSize - i));
+    arena->offsetsSize = 3 * arena->linesSize;
+    arena->offsets = (size_t *) realloc(arena->offsets, sizeof(*(arena->offsets)) * arena->offsetsSize);
+    assert(arena->offsets != NULL);
+    PROFILE_COUNT(kProfileParseAllocations, 2);
+  }
+  mafLine_t *ml = arena->lines + i;
+  size_t *offsets = arena->offsets + 3 * i;
+  ml->line = NULL;
+  ml->lineNumber = lineNumber;
+  ml->type = s[0];
+  ml->species = NULL;
+  ml->start = 0;
+  ml->length = 0;
+  ml->strand = 0;
+  ml->sourceLength = 0;
+  ml->sequence = NULL;
+  ml->sequenceFieldLength = 0;
+  ml->storage = kMafLineInArena;
+  ml->nameId = kMafNoNameId;
+  ml->speciesId = kMafNoNameId;
+  // a coordinate map left by the line's last use in the arena is kept for reuse
+  if (ml->coordinates != NULL) {
+    ml->coordinates->valid = false;
+  }
+  ml->next = NULL;
+  offsets[0] = maf_mafBlockArena_appendText(arena, s, n);
+  offsets[1] = offsets[2] = SIZE_MAX;
+  return ml;
+}
+static void maf_mafBlockArena_setFields(mafBlockArena_t *arena, uint64_t i, const char *s, size_t n,
+                                        const mafLineFields_t *f) {
+  // give the i-th arena line, started from s, the fields f of s
+  mafLine_t *ml = arena->lines + i;
+  size_t *offsets = arena->offsets + 3 * i;
+  // appending may move the text buffer, so copy out of the caller's string
+  offsets[1] = maf_mafBlockArena_appendText(arena, s + f->species, f->speciesLength);
+  if (f->sequence + f->sequenceLength == n) {
+    offsets[2] = offsets[0] + f->sequence;
+    ml->storage |= kMafLineSequenceInLine;
+  } else {
+    offsets[2] = maf_mafBlockArena_appendText(arena, s + f->sequence, f->sequenceLength);
+  }
+  ml->start = f->start;
+  ml->length = f->length;
+  ml->strand = f->strand;
+  ml->sourceLength = f->sourceLength;
+  ml->sequenceFieldLength = f->sequenceLength;
+}
+static mafLine_t* maf_mafBlockArena_addLine(mafBlockArena_t *arena, uint64_t i, const char *s, size_t n,
+                                            uint64_t lineNumber, bool lazy) {
+  // parse line s of length n into the i-th arena line, or only copy it if lazy
+  mafLine_t *ml = maf_mafBlockArena_startLine(arena, i, s, n, lineNumber);
+  if (ml->type == 's' && lazy) {
+    ml->storage |= kMafLineUnread;
+  } else if (ml->type == 's') {
+    mafLineFields_t f;
+    maf_parseSequenceLine(arena->text + arena->offsets[3 * i], lineNumber, &f, true);
+    maf_mafBlockArena_setFields(arena, i, s, n, &f);
+  }
+  return ml;
+}
+static void maf_mafBlock_linkArenaLines(mafBlock_t *mb) {
+  // point every arena line at its text and chain the lines together
+  mafBlockArena_t *arena = mb->arena;
+  for (uint64_t i = 0; i < mb->numberOfLines; ++i) {
+    mafLine_t *ml = arena->lines + i;
+    size_t *offsets = arena->offsets + 3 * i;
+    ml->line = arena->text + offsets[0];
+    if (offsets[1] != SIZE_MAX) {
+      ml->species = arena->text + offsets[1];
+      ml->sequence = arena->text + offsets[2];
+    }
+    ml->next = (i + 1 < mb->numberOfLines) ? ml + 1 : NULL;
+  }
+  if (mb->numberOfLines > 0) {
+    mb->headLine = arena->lines;
+    mb->tailLine = arena->lines + mb->numberOfLines - 1;
+  }
+}
+static void maf_mafBlock_resetForReuse(mafBlock_t *mb) {
+  // empty mb while keeping its arena. Lines that were linked into the block
+  // from elsewhere, and anything the arena lines were given since the last
+  // read, are not arena storage and are destroyed here.
+  mafLine_t *ml = mb->headLine, *next = NULL;
+  while (ml != NULL) {
+    next = ml->next;
+    maf_destroyMafLine(ml);
+    ml = next;
+  }
+  mb->headLine = NULL;
+  mb->tailLine = NULL;
+  mb->lineNumber = 0;
+  mb->numberOfLines = 0;
+  mb->numberOfSequences = 0;
+  mb->sequenceFieldLength = 0;
+  mb->lazySequenceFieldLength = false;
+  maf_mafBlock_invalidateArrayViews(mb);
+  if (mb->arena == NULL) {
+    mb->arena = maf_newMafBlockArena();
+  }
+  mb->arena->textUsed = 0;
+}
+static void maf_mafBlock_countArenaLine(mafBlock_t *mb, mafLine_t *ml) {
+  if (ml->type == 's') {
+    ++(mb->numberOfSequences);
+    if (mb->sequenceFieldLength == 0 && !(ml->storage & kMafLineSequenceUnread)) {
+      mb->sequenceFieldLength = ml->sequenceFieldLength;
+    }
+  }
+  ++(mb->numberOfLines);
+}
+mafBlock_t* maf_readBlockInto(mafFileApi_t *mfa, mafBlock_t *mb) {
+  // like maf_readBlock(), but instead of building a fresh block the next block
+  // of the file is read into mb, a block from maf_newMafBlock() that is reused
+  // from call to call. The block's lines share one reusable allocation, so they
+  // (and the strings they return) are only valid until the next call and must
+  // not be unlinked from the block. Returns mb, or NULL at the end of the file.
+  // mb is still owned by the caller and is released by maf_destroyMafBlockList().
+  maf_mafBlock_resetForReuse(mb);
+  if (maf_mafFileApi_isBinary(mfa)) {
+    return maf_mafFileApi_readBinaryBlock(mfa, mb);
+  }
+  if (mfa->lineNumber == 0) {
+    // header, which is read once per file and so is not worth pooling
+    mafBlock_t *header = maf_readBlockHeader(mfa);
+    mb->headLine = header->headLine;
+    mb->tailLine = header->tailLine;
+    mb->lineNumber = header->lineNumber;
+    mb->numberOfLines = header->numberOfLines;
+    free(header);
+    return (mb->headLine != NULL) ? mb : NULL;
+  }
+  mafBlockArena_t *arena = mb->arena;
+  if (mfa->lastLine != NULL) {
+    // this is only invoked when the header is not followed by a blank line
+    mafLine_t *ml = maf_mafBlockArena_addLine(arena, 0, mfa->lastLine, strlen(mfa->lastLine),
+                                              mfa->lineNumber, mfa->lazyParsing);
+    maf_mafBlock_countArenaLine(mb, ml);
+    mfa->blockOffset = mfa->lastLineOffset;
+    free(mfa->lastLine);
+    mfa->lastLine = NULL;
+  }
+  char *line = NULL;
+  int64_t n = 0;
+  mb->lineNumber = mfa->lineNumber;
+  while ((n = maf_mafFileApi_readLineView(mfa, &line)) != -1) {
+    ++(mfa->lineNumber);
+    if (maf_isBlankLine(line, n)) {
+      if (mb->numberOfLines == 0) {
+        // this handles multiple blank lines in a row
+        continue;
+      } else {
+        break;
+      }
+    }
+    if (mb->numberOfLines == 0) {
+      mfa->blockOffset = mfa->lineOffset;
+    }
+    mafLine_t *ml = maf_mafBlockArena_addLine(arena, mb->numberOfLines, line, n, mfa->lineNumber,
+                                              mfa->lazyParsing);
+    maf_mafBlock_countArenaLine(mb, ml);
+  }
+  maf_mafBlock_linkArenaLines(mb);
+  mb->lazySequenceFieldLength = mfa->lazyParsing;
+  maf_mafFileApi_internNames(mfa, mb);
+  PROFILE_COUNT(kProfileBlocksParsed, (mb->headLine != NULL) ? 1 : 0);
+  PROFILE_COUNT(kProfileLinesParsed, mb->numberOfLines);
+  return (mb->headLine != NULL) ? mb : NULL;
+}
 mafBlock_t* maf_readAll(mafFileApi_t *mfa) {
   // read an entire mfa, creating a linked list of mafBlock_t, returning the head.
   mafBlock_t *head = maf_readBlock(mfa);
@@ -966,25 +2507,208 @@ mafBlock_t* maf_readAll(mafFileApi_t *mfa) {
   }
   return head;
 }
+struct mafBlockCursor {
+  // a file read a line at a time, see maf_newMafBlockCursor()
+  mafFileApi_t *mfa;
+  mafBlock_t *line; // holds the line last read, its arena is reused for every line
+  mafBlock_t *whole; // the header block, or a .mafb block, which are read whole
+  mafLine_t *nextWholeLine;
+  bool readWhole; // the current block is in whole
+  bool inBlock; // lines of the current block may be left
+  bool firstLinePending; // the first line of the current block is in line, not yet returned
+  uint64_t lineNumber; // of the current block, as maf_mafBlock_getLineNumber()
+  uint64_t numberOfLines; // returned so far from the current block
+  uint64_t numberOfSequences;
+};
+mafBlockCursor_t* maf_newMafBlockCursor(mafFileApi_t *mfa) {
+  // read mfa a line at a time, so that blocks of any number of rows are read
+  // in bounded memory. maf_blockCursor_nextBlock() moves to the start of the
+  // next block and maf_blockCursor_next() then returns its lines in order,
+  // starting with the `a' line. Blocks are numbered and lines parsed,
+  // lazily or not, just as maf_readBlock() would. The header, and blocks of
+  // a .mafb file, are read whole and then handed out a line at a time.
+  // mfa is not to be read from any other way while the cursor is in use.
+  mafBlockCursor_t *bc = (mafBlockCursor_t *) de_malloc(sizeof(*bc));
+  memset(bc, 0, sizeof(*bc));
+  bc->mfa = mfa;
+  bc->line = maf_newMafBlock();
+  bc->whole = maf_newMafBlock();
+  maf_mafBlock_resetForReuse(bc->line);
+  return bc;
+}
+void maf_destroyMafBlockCursor(mafBlockCursor_t *bc) {
+  // mfa is left open
+  if (bc == NULL) {
+    return;
+  }
+  maf_destroyMafBlockList(bc->line);
+  maf_destroyMafBlockList(bc->whole);
+  free(bc);
+}
+static mafLine_t* maf_mafBlockCursor_hold(mafBlockCursor_t *bc, const char *s, size_t n, uint64_t lineNumber) {
+  // read line s, n characters long, into bc->line in place of the line held before
+  mafBlock_t *mb = bc->line;
+  maf_mafBlock_resetForReuse(mb);
+  mafLine_t *ml = maf_mafBlockArena_addLine(mb->arena, 0, s, n, lineNumber, bc->mfa->lazyParsing);
+  maf_mafBlock_countArenaLine(mb, ml);
+  maf_mafBlock_linkArenaLines(mb);
+  mb->lineNumber = lineNumber;
+  mb->lazySequenceFieldLength = bc->mfa->lazyParsing;
+  maf_mafFileApi_internNames(bc->mfa, mb);
+  PROFILE_COUNT(kProfileLinesParsed, 1);
+  return ml;
+}
+static void maf_mafBlockCursor_skipBlock(mafBlockCursor_t *bc) {
+  // pass over the lines of the current block that have not been read, without parsing them
+  mafFileApi_t *mfa = bc->mfa;
+  if (bc->inBlock && !bc->readWhole) {
+    char *line = NULL;
+    int64_t n = 0;
+    while ((n = maf_mafFileApi_readLineView(mfa, &line)) != -1) {
+      ++(mfa->lineNumber);
+      if (maf_isBlankLine(line, n)) {
+        break;
+      }
+    }
+  }
+  bc->inBlock = false;
+  bc->firstLinePending = false;
+  bc->nextWholeLine = NULL;
+}
+bool maf_blockCursor_nextBlock(mafBlockCursor_t *bc) {
+  // move to the next block, skipping whatever is left of the current one.
+  // Returns false at the end of the file.
+  mafFileApi_t *mfa = bc->mfa;
+  maf_mafBlockCursor_skipBlock(bc);
+  bc->numberOfLines = 0;
+  bc->numberOfSequences = 0;
+  if (mfa->lineNumber == 0 || maf_mafFileApi_isBinary(mfa)) {
+    if (maf_readBlockInto(mfa, bc->whole) == NULL) {
+      return false;
+    }
+    bc->readWhole = true;
+    bc->inBlock = true;
+    bc->nextWholeLine = bc->whole->headLine;
+    bc->lineNumber = bc->whole->lineNumber;
+    return true;
+  }
+  bc->readWhole = false;
+  if (mfa->lastLine != NULL) {
+    // this is only invoked when the header is not followed by a blank line
+    maf_mafBlockCursor_hold(bc, mfa->lastLine, strlen(mfa->lastLine), mfa->lineNumber);
+    mfa->blockOffset = mfa->lastLineOffset;
+    free(mfa->lastLine);
+    mfa->lastLine = NULL;
+    bc->lineNumber = mfa->lineNumber;
+    bc->inBlock = true;
+    bc->firstLinePending = true;
+    PROFILE_COUNT(kProfileBlocksParsed, 1);
+    return true;
+  }
+  char *line = NULL;
+  int64_t n = 0;
+  bc->lineNumber = mfa->lineNumber;
+  while ((n = maf_mafFileApi_readLineView(mfa, &line)) != -1) {
+    ++(mfa->lineNumber);
+    if (maf_isBlankLine(line, n)) {
+      continue;
+    }
+    mfa->blockOffset = mfa->lineOffset;
+    maf_mafBlockCursor_hold(bc, line, (size_t) n, mfa->lineNumber);
+    bc->inBlock = true;
+    bc->firstLinePending = true;
+    PROFILE_COUNT(kProfileBlocksParsed, 1);
+    return true;
+  }
+  return false;
+}
+mafLine_t* maf_blockCursor_next(mafBlockCursor_t *bc) {
+  // the next line of the current block, or NULL once the block ends. The
+  // line belongs to the cursor and is only valid until the next call, its
+  // ->next is not to be followed.
+  mafLine_t *ml = NULL;
+  if (!bc->inBlock) {
+    return NULL;
+  }
+  if (bc->readWhole) {
+    ml = bc->nextWholeLine;
+    if (ml != NULL) {
+      bc->nextWholeLine = ml->next;
+    }
+  } else if (bc->firstLinePending) {
+    bc->firstLinePending = false;
+    ml = bc->line->headLine;
+  } else {
+    mafFileApi_t *mfa = bc->mfa;
+    char *line = NULL;
+    int64_t n = maf_mafFileApi_readLineView(mfa, &line);
+    if (n != -1) {
+      ++(mfa->lineNumber);
+      if (!maf_isBlankLine(line, n)) {
+        ml = maf_mafBlockCursor_hold(bc, line, (size_t) n, mfa->lineNumber);
+      }
+    }
+  }
+  if (ml == NULL) {
+    bc->inBlock = false;
+    return NULL;
+  }
+  ++(bc->numberOfLines);
+  if (ml->type == 's') {
+    ++(bc->numberOfSequences);
+  }
+  return ml;
+}
+uint64_t maf_blockCursor_getLineNumber(mafBlockCursor_t *bc) {
+  return bc->lineNumber;
+}
+uint64_t maf_blockCursor_getNumberOfLines(mafBlockCursor_t *bc) {
+  // of the current block, so far
+  return bc->numberOfLines;
+}
+uint64_t maf_blockCursor_getNumberOfSequences(mafBlockCursor_t *bc) {
+  // of the current block, so far
+  return bc->numberOfSequences;
+}
+static void maf_mafFileApi_write(mafFileApi_t *mfa, const char *s, size_t n) {
+  if (mfa->bgzfOut != NULL) {
+    bgzf_write(mfa->bgzfOut, s, n);
+  } else {
+    maf_mafWriter_write(mfa->out, s, n);
+  }
+}
 void maf_writeAll(mafFileApi_t *mfa, mafBlock_t *mb) {
   // write an entire mfa, creating a linked list of mafBlock_t, returning the head.
   while (mb != NULL) {
     maf_writeBlock(mfa, mb);
     mb = mb->next;
   }
-  fprintf(mfa->mfp, "\n");
+  if (mfa->binaryOut == NULL) {
+    maf_mafFileApi_write(mfa, "\n", 1);
+  }
   ++(mfa->lineNumber);
+  bgzf_destroyWriter(mfa->bgzfOut);
+  mfa->bgzfOut = NULL;
+  maf_destroyMafWriter(mfa->out);
+  mfa->out = NULL;
+  maf_destroyMafBinaryWriter(mfa->binaryOut);
+  mfa->binaryOut = NULL;
   fclose(mfa->mfp);
   mfa->mfp = NULL;
 }
 void maf_writeBlock(mafFileApi_t *mfa, mafBlock_t *mb) {
+  if (mfa->binaryOut != NULL) {
+    maf_mafFileApi_writeBinaryBlock(mfa, mb);
+    return;
+  }
   mafLine_t *ml = mb->headLine;
   while (ml != NULL) {
-    fprintf(mfa->mfp, "%s\n", ml->line);
+    maf_mafFileApi_write(mfa, ml->line, strlen(ml->line));
+    maf_mafFileApi_write(mfa, "\n", 1);
     ++(mfa->lineNumber);
     ml = ml->next;
   }
-  fprintf(mfa->mfp, "\n");
+  maf_mafFileApi_write(mfa, "\n", 1);
   ++(mfa->lineNumber);
 }
 void maf_mafBlock_appendToAlignmentBlock(mafBlock_t *m, char *s) {
@@ -995,8 +2719,11 @@ void maf_mafBlock_appendToAlignmentBlock(mafBlock_t *m, char *s) {
   newline[0] = '\0';
   strcat(newline, line);
   strcat(newline, s);
-  free(ml->line);
+  if (ml->storage & kMafLineOwnsLine) {
+    free(ml->line);
+  }
   ml->line = newline;
+  ml->storage |= kMafLineOwnsLine;
 }
 void maf_mafBlock_printList(mafBlock_t *m) {
   while (m != NULL) {
@@ -1005,26 +2732,228 @@ void maf_mafBlock_printList(mafBlock_t *m) {
   }
 }
 void maf_mafBlock_print(mafBlock_t *m) {
-  // pretty print a mafBlock.
+  // pretty print a mafBlock to stdout.
+  maf_mafBlock_fprint(stdout, m);
+}
+/*
+ * buffered output
+ */
+static void maf_initMafWriter(mafWriter_t *w, FILE *f, char *buffer, size_t size) {
+  w->f = f;
+  w->buffer = buffer;
+  w->size = size;
+  w->used = 0;
+  w->ownsBuffer = false;
+  w->threaded = false;
+  w->spare = NULL;
+  w->spareUsed = 0;
+  w->spareFull = false;
+  w->stop = false;
+}
+static void maf_mafWriter_fwrite(FILE *f, const char *s, size_t n) {
+  if (n > 0 && fwrite(s, sizeof(char), n, f) != n) {
+    fprintf(stderr, "Error, unable to write output\n");
+    exit(EXIT_FAILURE);
+  }
+}
+static void* maf_mafWriter_run(void *p) {
+  // writer thread, write out each buffer handed over by maf_mafWriter_drain()
+  mafWriter_t *w = (mafWriter_t *) p;
+  pthread_mutex_lock(&(w->lock));
+  while (true) {
+    while (!w->spareFull && !w->stop) {
+      pthread_cond_wait(&(w->cond), &(w->lock));
+    }
+    if (!w->spareFull) {
+      break;
+    }
+    pthread_mutex_unlock(&(w->lock));
+    maf_mafWriter_fwrite(w->f, w->spare, w->spareUsed);
+    pthread_mutex_lock(&(w->lock));
+    w->spareFull = false;
+    pthread_cond_broadcast(&(w->cond));
+  }
+  pthread_mutex_unlock(&(w->lock));
+  return NULL;
+}
+static void maf_mafWriter_drain(mafWriter_t *w) {
+  // pass everything buffered on to the FILE, or to the writer thread
+  if (w->used == 0) {
+    return;
+  }
+  if (!w->threaded) {
+    maf_mafWriter_fwrite(w->f, w->buffer, w->used);
+    w->used = 0;
+    return;
+  }
+  pthread_mutex_lock(&(w->lock));
+  while (w->spareFull) {
+    pthread_cond_wait(&(w->cond), &(w->lock));
+  }
+  char *tmp = w->spare;
+  w->spare = w->buffer;
+  w->spareUsed = w->used;
+  w->spareFull = true;
+  w->buffer = tmp;
+  w->used = 0;
+  pthread_cond_broadcast(&(w->cond));
+  pthread_mutex_unlock(&(w->lock));
+}
+mafWriter_t* maf_newMafWriter(FILE *f, bool threaded) {
+  // buffered output to f. With threaded set the actual writing is done on a
+  // separate thread while the caller carries on filling the next buffer.
+  // Nothing else may write to f until the writer is flushed or destroyed.
+  mafWriter_t *w = (mafWriter_t *) de_malloc(sizeof(*w));
+  maf_initMafWriter(w, f, (char *) de_malloc(kMafWriterBufferSize), kMafWriterBufferSize);
+  w->ownsBuffer = true;
+  if (threaded) {
+    w->threaded = true;
+    w->spare = (char *) de_malloc(kMafWriterBufferSize);
+    pthread_mutex_init(&(w->lock), NULL);
+    pthread_cond_init(&(w->cond), NULL);
+    if (pthread_create(&(w->thread), NULL, maf_mafWriter_run, w) != 0) {
+      fprintf(stderr, "Error, unable to start a thread\n");
+      exit(EXIT_FAILURE);
+    }
+  }
+  return w;
+}
+void maf_mafWriter_flush(mafWriter_t *w) {
+  // write out everything buffered so far and wait for it to reach the FILE
+  maf_mafWriter_drain(w);
+  if (w->threaded) {
+    pthread_mutex_lock(&(w->lock));
+    while (w->spareFull) {
+      pthread_cond_wait(&(w->cond), &(w->lock));
+    }
+    pthread_mutex_unlock(&(w->lock));
+  }
+  fflush(w->f);
+}
+void maf_destroyMafWriter(mafWriter_t *w) {
+  // flush and free the writer, leaving its FILE open
+  if (w == NULL) {
+    return;
+  }
+  maf_mafWriter_flush(w);
+  if (w->threaded) {
+    pthread_mutex_lock(&(w->lock));
+    w->stop = true;
+    pthread_cond_broadcast(&(w->cond));
+    pthread_mutex_unlock(&(w->lock));
+    pthread_join(w->thread, NULL);
+    pthread_mutex_destroy(&(w->lock));
+    pthread_cond_destroy(&(w->cond));
+    free(w->spare);
+  }
+  if (w->ownsBuffer) {
+    free(w->buffer);
+  }
+  free(w);
+}
+void maf_mafWriter_write(mafWriter_t *w, const char *s, size_t n) {
+  if (w->used + n > w->size) {
+    maf_mafWriter_drain(w);
+    if (n > w->size) {
+      // too big to be worth buffering
+      if (w->threaded) {
+        maf_mafWriter_flush(w);
+      }
+      maf_mafWriter_fwrite(w->f, s, n);
+      return;
+    }
+  }
+  memcpy(w->buffer + w->used, s, n);
+  w->used += n;
+}
+void maf_mafWriter_writeString(mafWriter_t *w, const char *s) {
+  maf_mafWriter_write(w, s, strlen(s));
+}
+void maf_mafWriter_writeChar(mafWriter_t *w, char c) {
+  if (w->used == w->size) {
+    maf_mafWriter_drain(w);
+  }
+  w->buffer[w->used++] = c;
+}
+static void maf_mafWriter_writeSpaces(mafWriter_t *w, size_t n) {
+  while (n > 0) {
+    if (w->used == w->size) {
+      maf_mafWriter_drain(w);
+    }
+    size_t k = (n < w->size - w->used) ? n : w->size - w->used;
+    memset(w->buffer + w->used, ' ', k);
+    w->used += k;
+    n -= k;
+  }
+}
+void maf_mafWriter_writePadded(mafWriter_t *w, const char *s, size_t width) {
+  // s left aligned in a field of at least width characters, as printf("%-*s")
+  size_t n = strlen(s);
+  maf_mafWriter_write(w, s, n);
+  if (n < width) {
+    maf_mafWriter_writeSpaces(w, width - n);
+  }
+}
+static unsigned maf_countDigits(uint64_t x) {
+  unsigned n = 1;
+  while (x >= 10) {
+    x /= 10;
+    ++n;
+  }
+  return n;
+}
+void maf_mafWriter_writeUInt(mafWriter_t *w, uint64_t x, size_t width) {
+  // x right aligned in a field of at least width characters, as printf("%*" PRIu64)
+  char digits[20];
+  unsigned n = 0;
+  do {
+    digits[sizeof(digits) - 1 - n++] = '0' + (x % 10);
+    x /= 10;
+  } while (x > 0);
+  if (n < width) {
+    maf_mafWriter_writeSpaces(w, width - n);
+  }
+  maf_mafWriter_write(w, digits + sizeof(digits) - n, n);
+}
+void maf_mafWriter_writeInt(mafWriter_t *w, int64_t x, size_t width) {
+  // x right aligned in a field of at least width characters, as printf("%*" PRIi64)
+  if (x >= 0) {
+    maf_mafWriter_writeUInt(w, (uint64_t) x, width);
+    return;
+  }
+  uint64_t magnitude = (uint64_t) (-(x + 1)) + 1;
+  unsigned n = maf_countDigits(magnitude) + 1;
+  if (n < width) {
+    maf_mafWriter_writeSpaces(w, width - n);
+  }
+  maf_mafWriter_writeChar(w, '-');
+  maf_mafWriter_writeUInt(w, magnitude, 0);
+}
+void maf_mafWriter_writeBlock(mafWriter_t *w, mafBlock_t *mb) {
+  // write the lines of a block exactly as they are, followed by a blank line
+  for (mafLine_t *ml = mb->headLine; ml != NULL; ml = ml->next) {
+    maf_mafWriter_writeString(w, ml->line);
+    maf_mafWriter_writeChar(w, '\n');
+  }
+  maf_mafWriter_writeChar(w, '\n');
+}
+void maf_mafWriter_printBlock(mafWriter_t *w, mafBlock_t *m) {
+  // write a block laid out as maf_mafBlock_print() does, with the fields of the
+  // `s' lines in aligned columns
   if (m == NULL) {
-    printf("..block NULL\n");
+    maf_mafWriter_writeString(w, "..block NULL\n");
     return;
   }
-  mafLine_t* ml = maf_mafBlock_getHeadLine(m);
-  char *line = NULL;
+  mafLine_t* ml = NULL;
   uint64_t maxName = 1, maxStart = 1, maxLen = 1, maxSource = 1;
-  char fmtName[32] = "\0", fmtStart[32] = "\0", fmtLen[32] = "\0", fmtSource[32] = "\0", fmtLine[256] = "\0";
-  while (ml != NULL) {
-    line = maf_mafLine_getLine(ml);
-    if (line == NULL) {
-      break;
-    }
+  for (ml = maf_mafBlock_getHeadLine(m); ml != NULL && maf_mafLine_getLine(ml) != NULL;
+       ml = maf_mafLine_getNext(ml)) {
     if (maf_mafLine_getType(ml) != 's') {
-      ml = maf_mafLine_getNext(ml);
       continue;
     }
-    if (maxName < strlen(maf_mafLine_getSpecies(ml))) {
-      maxName = strlen(maf_mafLine_getSpecies(ml));
+    size_t nameLength = strlen(maf_mafLine_getSpecies(ml));
+    if (maxName < nameLength) {
+      maxName = nameLength;
     }
     if (maxStart < maf_mafLine_getStart(ml)) {
       maxStart = maf_mafLine_getStart(ml);
@@ -1035,37 +2964,44 @@ void maf_mafBlock_print(mafBlock_t *m) {
     if (maxSource < maf_mafLine_getSourceLength(ml)) {
       maxSource = maf_mafLine_getSourceLength(ml);
     }
-    ml = maf_mafLine_getNext(ml);
   }
-  ml = maf_mafBlock_getHeadLine(m);
-  if (ml != NULL) {
-    sprintf(fmtName, " %%-%"PRIu64"s", maxName + 2);
-    sprintf(fmtStart, " %%%d"PRIu64, (int)log10(maxStart) + 2);
-    sprintf(fmtLen, " %%%d"PRIu64, (int)log10(maxLen) + 2);
-    sprintf(fmtSource, " %%%d"PRIu64, (int)log10(maxSource) + 2);
-    strcat(fmtLine, "s");
-    strcat(fmtLine, fmtName);
-    strcat(fmtLine, fmtStart);
-    strcat(fmtLine, fmtLen);
-    strcat(fmtLine, " %c");
-    strcat(fmtLine, fmtSource);
-    strcat(fmtLine, " %s\n");
+  // names are padded to two more than the longest, numbers to one more digit than the largest
+  size_t nameWidth = maxName + 2;
+  size_t startWidth = maf_countDigits(maxStart) + 1;
+  size_t lenWidth = maf_countDigits(maxLen) + 1;
+  size_t sourceWidth = maf_countDigits(maxSource) + 1;
+  for (ml = maf_mafBlock_getHeadLine(m); ml != NULL && maf_mafLine_getLine(ml) != NULL;
+       ml = maf_mafLine_getNext(ml)) {
+    if (maf_mafLine_getType(ml) != 's') {
+      // everything but `s' lines passes through verbatim
+      maf_mafWriter_writeString(w, maf_mafLine_getLine(ml));
+      maf_mafWriter_writeChar(w, '\n');
+      continue;
+    }
+    maf_mafWriter_write(w, "s ", 2);
+    maf_mafWriter_writePadded(w, maf_mafLine_getSpecies(ml), nameWidth);
+    maf_mafWriter_writeChar(w, ' ');
+    maf_mafWriter_writeUInt(w, maf_mafLine_getStart(ml), startWidth);
+    maf_mafWriter_writeChar(w, ' ');
+    maf_mafWriter_writeUInt(w, maf_mafLine_getLength(ml), lenWidth);
+    maf_mafWriter_writeChar(w, ' ');
+    maf_mafWriter_writeChar(w, maf_mafLine_getStrand(ml));
+    maf_mafWriter_writeChar(w, ' ');
+    maf_mafWriter_writeUInt(w, maf_mafLine_getSourceLength(ml), sourceWidth);
+    maf_mafWriter_writeChar(w, ' ');
+    maf_mafWriter_writeString(w, maf_mafLine_getSequence(ml));
+    maf_mafWriter_writeChar(w, '\n');
   }
-  while (ml != NULL) {
-    line = maf_mafLine_getLine(ml);
-    if (line == NULL) {
-      // printf("..line NULL\n");
-      break;
-    }
-    if (maf_mafLine_getType(ml) != 's') {
-      printf("%s\n", line);
-    } else {
-      printf(fmtLine, maf_mafLine_getSpecies(ml), maf_mafLine_getStart(ml), maf_mafLine_getLength(ml),
-             maf_mafLine_getStrand(ml), maf_mafLine_getSourceLength(ml), maf_mafLine_getSequence(ml));
-    }
-    ml = maf_mafLine_getNext(ml);
-  }
-  printf("\n");
+  maf_mafWriter_writeChar(w, '\n');
+}
+void maf_mafBlock_fprint(FILE *f, mafBlock_t *m) {
+  // pretty print a mafBlock. The block is formatted into a buffer on the stack
+  // and written with as few calls to fwrite() as possible.
+  char buffer[kMafPrintBufferSize];
+  mafWriter_t w;
+  maf_initMafWriter(&w, f, buffer, sizeof(buffer));
+  maf_mafWriter_printBlock(&w, m);
+  maf_mafWriter_flush(&w);
 }
 static int intmax(int a, int b) {
   if (a > b) {
@@ -1096,13 +3032,7 @@ char* maf_mafLine_imputeLine(mafLine_t* ml) {
 }
 uint64_t countNonGaps(char *seq) {
   uint64_t n = strlen(seq);
-  uint64_t m = 0;
-  for (uint64_t i = 0; i < n; ++i) {
-    if (seq[i] != '-') {
-      ++m;
-    }
-  }
-  return m;
+  return n - seq_countGaps(seq, n);
 }
 void maf_mafBlock_flipStrand(mafBlock_t *mb) {
   // take a maf block and perform an in-place strand flip (including reverse complementing the
@@ -1114,7 +3044,7 @@ void maf_mafBlock_flipStrand(mafBlock_t *mb) {
       continue;
     }
     // rc sequence
-    reverseComplementSequence(maf_mafLine_getSequence(ml), maf_mafBlock_getSequenceFieldLength(mb));
+    reverseComplementSequence(maf_mafLine_getMutableSequence(ml), maf_mafBlock_getSequenceFieldLength(mb));
     // coordinate transform
     maf_mafLine_setStart(ml, maf_mafLine_getSourceLength(ml) -
                          (maf_mafLine_getStart(ml) + maf_mafLine_getLength(ml)));
@@ -1126,85 +3056,20 @@ void maf_mafBlock_flipStrand(mafBlock_t *mb) {
     }
     ml = maf_mafLine_getNext(ml);
   }
+  maf_mafBlock_invalidateArrayViews(mb);
 }
 void reverseComplementSequence(char *s, size_t n) {
   // accepts upper and lower case, full iupac
-  int c, i, j;
-  for (i = 0, j = n - 1; i < j; ++i, j--) {
-    c = s[i];
-    s[i] = s[j];
-    s[j] = c;
-  }
-  complementSequence(s, n);
+  seq_reverseComplement(s, n);
 }
 void complementSequence(char *s, size_t n) {
   // accepts upper and lower case, full iupac
-  for (unsigned i = 0; i < n; ++i)
-    s[i] = complementChar(s[i]);
+  seq_complement(s, n);
 }
 char complementChar(char c) {
   // accepts upper and lower case, full iupac
-  bool wasUpper = false;
-  char a = '\0';
-  if (toupper(c) == c) {
-    wasUpper = true;
-  }
-  switch (toupper(c)) {
-  case 'A':
-    a = 't';
-    break;
-  case 'C':
-    a = 'g';
-    break;
-  case 'G':
-    a = 'c';
-    break;
-  case 'T':
-    a = 'a';
-    break;
-  case 'M':
-    a = 'k';
-    break;
-  case 'R':
-    a = 'y';
-    break;
-  case 'W':
-    a = 'w';
-    break;
-  case 'S':
-    a = 's';
-    break;
-  case 'Y':
-    a = 'r';
-    break;
-  case 'K':
-    a = 'm';
-    break;
-  case 'V':
-    a = 'b';
-    break;
-  case 'H':
-    a = 'd';
-    break;
-  case 'D':
-    a = 'h';
-    break;
-  case 'B':
-    a = 'v';
-    break;
-  case 'N':
-  case '-':
-  case 'X':
-    a = c;
-  break;
-  default:
-    fprintf(stderr, "Error, unanticipated character in DNA sequence: %c\n", c);
-    exit(EXIT_FAILURE);
-  }
-  if (wasUpper) {
-    a = toupper(a);
-  }
-  return a;
+  seq_complement(&c, 1);
+  return c;
 }
 char *copySpeciesName(const char *s) {
   // return a copy of the string, minus chromosome / contig information
@@ -1245,3 +3110,1872 @@ char *copyChromosomeName(const char *s) {
     return copy;
   }
 }
+/*
+ * .mafb binary maf
+ *
+ * A .mafb file holds the blocks of a maf in a form that is read back without
+ * any text parsing. It is written by a mafBinaryWriter_t, or by maf_newMfa()
+ * for an output name ending in .mafb, and every reader in this file recognises
+ * it by its magic number, so tools take .mafb input without knowing it.
+ * Reading gives back exactly the blocks reading the text would have, the text
+ * of every line and every line number included.
+ *
+ * The file is the magic number, a record per block, a table record and a
+ * trailer. A record is a tag byte, the length of its payload as a varint
+ * (LEB128) and the payload. A block record holds the block's line number, the
+ * number of its first line and its number of lines, followed by its lines,
+ * each a kind byte and then either
+ *   - raw text, for header lines, lines other than `s' lines and `s' lines
+ *     that would not be rebuilt byte for byte from their fields, or
+ *   - the fields of an `s' line: a name reference, a flags byte, the widths
+ *     of the six field separators unless all are single spaces, the start,
+ *     the length, the source length unless it is the one the name was defined
+ *     with, the length of the sequence field, its runs of gaps, its runs of
+ *     lower case bases and finally its bases, two to a byte as 4 bit IUPAC
+ *     codes. Sequences that this would not shrink by much, or that hold
+ *     other characters, are stored as they are instead of as runs and bases.
+ * Names are numbered in order of first use and defined, along with their
+ * source length, inside the block that first uses them. A line's number is
+ * only stored when it does not follow the line before. The table record lists
+ * every name and the offset of every block record, and the trailer holds the
+ * table's offset (8 bytes, little endian) and an end marker. Files that can be
+ * seeked in have their table read when they are opened, so that reading can
+ * start at any block, see maf_newMfaChunks() and maf_mafIndex_readBlock().
+ */
+static const char kMafBinaryMagic[8] = "\211mafb1\n";
+static const char kMafBinaryEndMagic[8] = "mafbend";
+static const size_t kMafBinaryTrailerSize = 16;
+static const uint8_t kMafBinaryBlockRecord = 'B';
+static const uint8_t kMafBinaryTableRecord = 'T';
+enum mafBinaryLineKind {
+  kMafBinaryRawLine = 0,
+  kMafBinaryHeaderLine = 1,
+  kMafBinarySequenceLine = 2,
+  kMafBinaryExplicitLineNumber = 0x80, // or'ed into the kind, a zigzag varint difference follows
+};
+enum mafBinarySequenceFlags {
+  kMafBinaryMinusStrand = 1 << 0,
+  kMafBinaryOwnSourceLength = 1 << 1,
+  kMafBinaryWideSeparators = 1 << 2,
+  kMafBinaryCaseRuns = 1 << 3,
+  kMafBinaryPlainSequence = 1 << 4, // the sequence field follows as it is, instead of runs and bases
+};
+static const char kMafBinaryBases[16] = {'A', 'C', 'G', 'T', 'N', 'R', 'Y', 'S',
+                                         'W', 'K', 'M', 'B', 'D', 'H', 'V', 'X'};
+static const uint8_t kMafBinaryBaseCodes[256] = {
+  // one more than the code of each base of either case, 0 for anything else
+  ['A'] = 1, ['C'] = 2, ['G'] = 3, ['T'] = 4, ['N'] = 5, ['R'] = 6, ['Y'] = 7, ['S'] = 8,
+  ['W'] = 9, ['K'] = 10, ['M'] = 11, ['B'] = 12, ['D'] = 13, ['H'] = 14, ['V'] = 15, ['X'] = 16,
+  ['a'] = 1, ['c'] = 2, ['g'] = 3, ['t'] = 4, ['n'] = 5, ['r'] = 6, ['y'] = 7, ['s'] = 8,
+  ['w'] = 9, ['k'] = 10, ['m'] = 11, ['b'] = 12, ['d'] = 13, ['h'] = 14, ['v'] = 15, ['x'] = 16,
+};
+typedef struct mafByteBuffer {
+  uint8_t *bytes;
+  size_t size;
+  size_t used;
+} mafByteBuffer_t;
+struct mafBinaryInput {
+  // the names and block offsets of a .mafb file being read, and room to
+  // rebuild its lines in
+  char **names;
+  size_t *nameLengths;
+  uint64_t *sourceLengths;
+  uint64_t numberOfNames;
+  uint64_t namesSize;
+  uint64_t *blockOffsets; // only if the table could be read
+  uint64_t numberOfBlocks;
+  char *text;
+  size_t textSize;
+  char *bases;
+  size_t basesSize;
+};
+struct mafBinaryWriter {
+  // a .mafb file being written, see maf_newMafBinaryWriter()
+  mafWriter_t *out;
+  uint64_t offset; // bytes written so far
+  mafNameTable_t names; // a name's number is its position here
+  uint64_t *sourceLengths; // the source length each name was defined with, names.capacity long
+  mafByteBuffer_t record; // the payload of the record being written
+  mafByteBuffer_t runs; // the gap runs, lower case runs and bases of the line being written
+  mafByteBuffer_t cases;
+  mafByteBuffer_t bases;
+  uint64_t *blockOffsets;
+  uint64_t numberOfBlocks;
+  uint64_t blocksSize;
+};
+typedef struct mafBinaryLine {
+  // the fields of an `s' line being written, see maf_mafBinaryWriter_splitSequenceLine()
+  uint8_t widths[6]; // of the separators before each field
+  const char *name;
+  size_t nameLength;
+  uint64_t start;
+  uint64_t length;
+  char strand;
+  uint64_t sourceLength;
+  const char *sequence;
+  uint64_t sequenceLength;
+  bool plain; // the sequence is stored as it is rather than packed
+  uint64_t numberOfRuns;
+  uint64_t numberOfCaseRuns;
+} mafBinaryLine_t;
+typedef struct mafBinaryCursor {
+  // a position in a record that has been read into memory
+  const uint8_t *p;
+  const uint8_t *end;
+  const char *filename;
+} mafBinaryCursor_t;
+static void maf_mafByteBuffer_reserve(mafByteBuffer_t *b, size_t n) {
+  // make room for n more bytes
+  if (b->used + n > b->size) {
+    while (b->used + n > b->size) {
+      b->size = (b->size == 0) ? 4096 : 2 * b->size;
+    }
+    b->bytes = (uint8_t *) realloc(b->bytes, b->size);
+    assert(b->bytes != NULL);
+  }
+}
+static void maf_mafByteBuffer_put(mafByteBuffer_t *b, const void *s, size_t n) {
+  maf_mafByteBuffer_reserve(b, n);
+  memcpy(b->bytes + b->used, s, n);
+  b->used += n;
+}
+static void maf_mafByteBuffer_putByte(mafByteBuffer_t *b, uint8_t x) {
+  maf_mafByteBuffer_reserve(b, 1);
+  b->bytes[(b->used)++] = x;
+}
+static size_t maf_encodeVarint(uint8_t *s, uint64_t x) {
+  // write x at s seven bits at a time, low bits first, returning the number of bytes (at most 10)
+  size_t n = 0;
+  while (x >= 0x80) {
+    s[n++] = (uint8_t) (x | 0x80);
+    x >>= 7;
+  }
+  s[n++] = (uint8_t) x;
+  return n;
+}
+static void maf_mafByteBuffer_putVarint(mafByteBuffer_t *b, uint64_t x) {
+  maf_mafByteBuffer_reserve(b, 10);
+  b->used += maf_encodeVarint(b->bytes + b->used, x);
+}
+static uint64_t maf_zigzag(int64_t x) {
+  // small magnitudes of either sign to small unsigned values
+  return (x < 0) ? (((uint64_t) (-(x + 1))) << 1) | 1 : ((uint64_t) x) << 1;
+}
+static int64_t maf_unzigzag(uint64_t x) {
+  return (x & 1) ? -(int64_t) (x >> 1) - 1 : (int64_t) (x >> 1);
+}
+static void maf_failCorruptBinary(const char *filename) {
+  fprintf(stderr, "Error, binary maf file %s is corrupt\n", filename);
+  exit(EXIT_FAILURE);
+}
+static const uint8_t* maf_mafBinaryCursor_take(mafBinaryCursor_t *c, uint64_t n) {
+  if ((uint64_t) (c->end - c->p) < n) {
+    maf_failCorruptBinary(c->filename);
+  }
+  const uint8_t *p = c->p;
+  c->p += n;
+  return p;
+}
+static uint8_t maf_mafBinaryCursor_byte(mafBinaryCursor_t *c) {
+  return *maf_mafBinaryCursor_take(c, 1);
+}
+static uint64_t maf_mafBinaryCursor_varint(mafBinaryCursor_t *c) {
+  uint64_t x = 0;
+  for (unsigned shift = 0; shift < 64 && c->p < c->end; shift += 7) {
+    uint8_t b = *(c->p)++;
+    x |= ((uint64_t) (b & 0x7f)) << shift;
+    if (!(b & 0x80)) {
+      return x;
+    }
+  }
+  maf_failCorruptBinary(c->filename);
+  return 0;
+}
+static size_t maf_putSpaces(char *s, size_t n) {
+  memset(s, ' ', n);
+  return n;
+}
+static size_t maf_putUInt(char *s, uint64_t x) {
+  // write the digits of x at s, returning how many there are
+  size_t n = maf_countDigits(x);
+  for (size_t i = n; i > 0; --i) {
+    s[i - 1] = '0' + (x % 10);
+    x /= 10;
+  }
+  return n;
+}
+static bool maf_parseCanonicalUInt(const char *s, size_t n, uint64_t *x) {
+  // read the n digits at s, only if printing the number gives them back
+  if (n == 0 || n > 19 || (s[0] == '0' && n > 1)) {
+    return false;
+  }
+  *x = 0;
+  for (size_t i = 0; i < n; ++i) {
+    if (s[i] < '0' || s[i] > '9') {
+      return false;
+    }
+    *x = 10 * (*x) + (uint64_t) (s[i] - '0');
+  }
+  return true;
+}
+mafBinaryWriter_t* maf_newMafBinaryWriter(FILE *f) {
+  // start a .mafb file on f. Blocks are written as they are given, with their
+  // own line numbers, and the tables once the writer is destroyed, which
+  // leaves f open.
+  mafBinaryWriter_t *w = (mafBinaryWriter_t *) de_malloc(sizeof(*w));
+  memset(w, 0, sizeof(*w));
+  w->out = maf_newMafWriter(f, false);
+  maf_mafNameTable_init(&(w->names));
+  maf_mafWriter_write(w->out, kMafBinaryMagic, sizeof(kMafBinaryMagic));
+  w->offset = sizeof(kMafBinaryMagic);
+  return w;
+}
+static void maf_mafBinaryWriter_putRecord(mafBinaryWriter_t *w, uint8_t tag) {
+  // write the record held in w->record
+  uint8_t head[11];
+  head[0] = tag;
+  size_t n = 1 + maf_encodeVarint(head + 1, w->record.used);
+  maf_mafWriter_write(w->out, (const char *) head, n);
+  maf_mafWriter_write(w->out, (const char *) w->record.bytes, w->record.used);
+  w->offset += n + w->record.used;
+}
+static bool maf_mafBinaryWriter_packSequence(mafBinaryWriter_t *w, mafBinaryLine_t *bl) {
+  // encode the sequence of bl into w->runs, w->cases and w->bases, returning
+  // false if it holds a character that has no code. Gap runs are (columns
+  // since the last run, length), lower case runs the same counted in bases.
+  const char *seq = bl->sequence;
+  uint64_t m = bl->sequenceLength, bases = 0, runStart = 0, runEnd = 0, caseStart = 0, caseEnd = 0;
+  bool inRun = false, inCase = false;
+  w->runs.used = 0;
+  w->cases.used = 0;
+  w->bases.used = 0;
+  maf_mafByteBuffer_reserve(&(w->bases), m / 2 + 1);
+  bl->numberOfRuns = 0;
+  bl->numberOfCaseRuns = 0;
+  for (uint64_t i = 0; i <= m; ++i) {
+    bool gap = (i < m && seq[i] == '-');
+    if (gap && !inRun) {
+      runStart = i;
+      inRun = true;
+    } else if (!gap && inRun) {
+      maf_mafByteBuffer_putVarint(&(w->runs), runStart - runEnd);
+      maf_mafByteBuffer_putVarint(&(w->runs), i - runStart);
+      runEnd = i;
+      ++(bl->numberOfRuns);
+      inRun = false;
+    }
+    if (gap) {
+      continue;
+    }
+    uint8_t code = (i < m) ? kMafBinaryBaseCodes[(unsigned char) seq[i]] : 0;
+    if (i < m && code == 0) {
+      return false;
+    }
+    bool lower = (i < m && seq[i] >= 'a');
+    if (lower && !inCase) {
+      caseStart = bases;
+      inCase = true;
+    } else if (!lower && inCase) {
+      maf_mafByteBuffer_putVarint(&(w->cases), caseStart - caseEnd);
+      maf_mafByteBuffer_putVarint(&(w->cases), bases - caseStart);
+      caseEnd = bases;
+      ++(bl->numberOfCaseRuns);
+      inCase = false;
+    }
+    if (i == m) {
+      break;
+    }
+    if (bases & 1) {
+      w->bases.bytes[w->bases.used - 1] |= (uint8_t) ((code - 1) << 4);
+    } else {
+      w->bases.bytes[(w->bases.used)++] = code - 1;
+    }
+    ++bases;
+  }
+  return true;
+}
+static bool maf_mafBinaryWriter_splitSequenceLine(mafBinaryWriter_t *w, const char *s, size_t n,
+                                                  mafBinaryLine_t *bl) {
+  // split s, an `s' line n characters long, into its fields and encode its
+  // sequence, see maf_mafBinaryWriter_packSequence(). Returns false for a line
+  // that would not be rebuilt byte for byte from its fields, to be kept raw.
+  const char *field[6];
+  size_t fieldLength[6], pos = 1;
+  for (unsigned k = 0; k < 6; ++k) {
+    size_t width = 0, start = 0;
+    while (pos < n && s[pos] == ' ') {
+      ++pos;
+      ++width;
+    }
+    start = pos;
+    while (pos < n && s[pos] != ' ' && s[pos] != '\t') {
+      ++pos;
+    }
+    if (width == 0 || width > UINT8_MAX || pos == start) {
+      return false;
+    }
+    bl->widths[k] = (uint8_t) width;
+    field[k] = s + start;
+    fieldLength[k] = pos - start;
+  }
+  if (pos != n || fieldLength[3] != 1 || (field[3][0] != '+' && field[3][0] != '-') ||
+      !maf_parseCanonicalUInt(field[1], fieldLength[1], &(bl->start)) ||
+      !maf_parseCanonicalUInt(field[2], fieldLength[2], &(bl->length)) ||
+      !maf_parseCanonicalUInt(field[4], fieldLength[4], &(bl->sourceLength))) {
+    return false;
+  }
+  bl->name = field[0];
+  bl->nameLength = fieldLength[0];
+  bl->strand = field[3][0];
+  bl->sequence = field[5];
+  bl->sequenceLength = fieldLength[5];
+  // packing pays off for real alignments, where gaps and lower case come in
+  // long runs. Sequences it does not shrink by a quarter are kept as they are,
+  // which is also the quickest to read back.
+  bl->plain = (!maf_mafBinaryWriter_packSequence(w, bl) ||
+               4 * (w->runs.used + w->cases.used + w->bases.used) > 3 * bl->sequenceLength);
+  return true;
+}
+static void maf_mafBinaryWriter_putSequenceLine(mafBinaryWriter_t *w, const mafBinaryLine_t *bl) {
+  // append the fields of an `s' line, and the name if it is new, to w->record
+  mafByteBuffer_t *r = &(w->record);
+  bool added = false;
+  uint32_t capacity = w->names.capacity;
+  uint32_t id = maf_mafNameTable_intern(&(w->names), bl->name, bl->nameLength, &added);
+  if (w->names.capacity != capacity) {
+    w->sourceLengths = (uint64_t *) realloc(w->sourceLengths, sizeof(*(w->sourceLengths)) * w->names.capacity);
+    assert(w->sourceLengths != NULL);
+  }
+  if (added) {
+    w->sourceLengths[id] = bl->sourceLength;
+    maf_mafByteBuffer_putVarint(r, ((uint64_t) id << 1) | 1);
+    maf_mafByteBuffer_putVarint(r, bl->nameLength);
+    maf_mafByteBuffer_put(r, bl->name, bl->nameLength);
+    maf_mafByteBuffer_putVarint(r, bl->sourceLength);
+  } else {
+    maf_mafByteBuffer_putVarint(r, (uint64_t) id << 1);
+  }
+  uint8_t flags = 0;
+  if (bl->strand == '-') {
+    flags |= kMafBinaryMinusStrand;
+  }
+  if (bl->sourceLength != w->sourceLengths[id]) {
+    flags |= kMafBinaryOwnSourceLength;
+  }
+  for (unsigned k = 0; k < 6; ++k) {
+    if (bl->widths[k] != 1) {
+      flags |= kMafBinaryWideSeparators;
+    }
+  }
+  if (bl->plain) {
+    flags |= kMafBinaryPlainSequence;
+  } else if (bl->numberOfCaseRuns > 0) {
+    flags |= kMafBinaryCaseRuns;
+  }
+  maf_mafByteBuffer_putByte(r, flags);
+  if (flags & kMafBinaryWideSeparators) {
+    maf_mafByteBuffer_put(r, bl->widths, 6);
+  }
+  maf_mafByteBuffer_putVarint(r, bl->start);
+  maf_mafByteBuffer_putVarint(r, bl->length);
+  if (flags & kMafBinaryOwnSourceLength) {
+    maf_mafByteBuffer_putVarint(r, bl->sourceLength);
+  }
+  maf_mafByteBuffer_putVarint(r, bl->sequenceLength);
+  if (bl->plain) {
+    maf_mafByteBuffer_put(r, bl->sequence, bl->sequenceLength);
+    return;
+  }
+  maf_mafByteBuffer_putVarint(r, bl->numberOfRuns);
+  maf_mafByteBuffer_put(r, w->runs.bytes, w->runs.used);
+  if (flags & kMafBinaryCaseRuns) {
+    maf_mafByteBuffer_putVarint(r, bl->numberOfCaseRuns);
+    maf_mafByteBuffer_put(r, w->cases.bytes, w->cases.used);
+  }
+  maf_mafByteBuffer_put(r, w->bases.bytes, w->bases.used);
+}
+static void maf_mafBinaryWriter_putBlock(mafBinaryWriter_t *w, mafBlock_t *mb, uint64_t blockLineNumber,
+                                         uint64_t firstLineNumber, bool renumber) {
+  // write the lines of mb as a block record, numbering them on from
+  // firstLineNumber if renumber is true and with their own numbers otherwise
+  mafByteBuffer_t *r = &(w->record);
+  uint64_t numberOfLines = 0;
+  for (mafLine_t *ml = mb->headLine; ml != NULL; ml = ml->next) {
+    ++numberOfLines;
+  }
+  r->used = 0;
+  maf_mafByteBuffer_putVarint(r, blockLineNumber);
+  maf_mafByteBuffer_putVarint(r, firstLineNumber);
+  maf_mafByteBuffer_putVarint(r, numberOfLines);
+  uint64_t expected = firstLineNumber;
+  for (mafLine_t *ml = mb->headLine; ml != NULL; ml = ml->next, ++expected) {
+    uint64_t lineNumber = renumber ? expected : ml->lineNumber;
+    size_t n = strlen(ml->line);
+    uint8_t kind = (ml->type == 'h') ? kMafBinaryHeaderLine : kMafBinaryRawLine;
+    mafBinaryLine_t bl;
+    memset(&bl, 0, sizeof(bl));
+    if (ml->type == 's' && maf_mafBinaryWriter_splitSequenceLine(w, ml->line, n, &bl)) {
+      kind = kMafBinarySequenceLine;
+    }
+    if (lineNumber != expected) {
+      maf_mafByteBuffer_putByte(r, kind | kMafBinaryExplicitLineNumber);
+      maf_mafByteBuffer_putVarint(r, maf_zigzag((int64_t) (lineNumber - expected)));
+      expected = lineNumber;
+    } else {
+      maf_mafByteBuffer_putByte(r, kind);
+    }
+    if (kind == kMafBinarySequenceLine) {
+      maf_mafBinaryWriter_putSequenceLine(w, &bl);
+    } else {
+      maf_mafByteBuffer_putVarint(r, n);
+      maf_mafByteBuffer_put(r, ml->line, n);
+    }
+  }
+  if (w->numberOfBlocks == w->blocksSize) {
+    w->blocksSize = (w->blocksSize == 0) ? 1024 : 2 * w->blocksSize;
+    w->blockOffsets = (uint64_t *) realloc(w->blockOffsets, sizeof(*(w->blockOffsets)) * w->blocksSize);
+    assert(w->blockOffsets != NULL);
+  }
+  w->blockOffsets[(w->numberOfBlocks)++] = w->offset;
+  maf_mafBinaryWriter_putRecord(w, kMafBinaryBlockRecord);
+}
+void maf_mafBinaryWriter_writeBlock(mafBinaryWriter_t *w, mafBlock_t *mb) {
+  // write mb and its line numbers. A block without lines is skipped, as it
+  // would not be read back from text either.
+  if (mb->headLine == NULL) {
+    return;
+  }
+  maf_mafBinaryWriter_putBlock(w, mb, mb->lineNumber, mb->headLine->lineNumber, false);
+}
+void maf_destroyMafBinaryWriter(mafBinaryWriter_t *w) {
+  // finish the file with the name and block tables and the trailer. The file
+  // is flushed but left open.
+  if (w == NULL) {
+    return;
+  }
+  mafByteBuffer_t *r = &(w->record);
+  r->used = 0;
+  maf_mafByteBuffer_putVarint(r, w->names.n);
+  for (uint32_t i = 0; i < w->names.n; ++i) {
+    size_t n = strlen(w->names.strings[i]);
+    maf_mafByteBuffer_putVarint(r, n);
+    maf_mafByteBuffer_put(r, w->names.strings[i], n);
+    maf_mafByteBuffer_putVarint(r, w->sourceLengths[i]);
+  }
+  maf_mafByteBuffer_putVarint(r, w->numberOfBlocks);
+  for (uint64_t i = 0; i < w->numberOfBlocks; ++i) {
+    maf_mafByteBuffer_putVarint(r, w->blockOffsets[i] - ((i == 0) ? 0 : w->blockOffsets[i - 1]));
+  }
+  uint64_t tableOffset = w->offset;
+  maf_mafBinaryWriter_putRecord(w, kMafBinaryTableRecord);
+  char trailer[16];
+  for (unsigned i = 0; i < 8; ++i) {
+    trailer[i] = (char) ((tableOffset >> (8 * i)) & 0xff);
+  }
+  memcpy(trailer + 8, kMafBinaryEndMagic, sizeof(kMafBinaryEndMagic));
+  maf_mafWriter_write(w->out, trailer, kMafBinaryTrailerSize);
+  maf_destroyMafWriter(w->out);
+  maf_mafNameTable_destroy(&(w->names));
+  free(w->sourceLengths);
+  free(w->record.bytes);
+  free(w->runs.bytes);
+  free(w->cases.bytes);
+  free(w->bases.bytes);
+  free(w->blockOffsets);
+  free(w);
+}
+static void maf_mafFileApi_writeBinaryBlock(mafFileApi_t *mfa, mafBlock_t *mb) {
+  // maf_writeBlock() to a .mafb file. Lines are numbered as they would be
+  // when reading back the text maf_writeBlock() writes: a header block from
+  // the first line, taking the number of the blank line after it, and other
+  // blocks on from the blank line before them.
+  uint64_t n = 0;
+  for (mafLine_t *ml = mb->headLine; ml != NULL; ml = ml->next) {
+    ++n;
+  }
+  if (n > 0 && mb->headLine->type == 'h') {
+    maf_mafBinaryWriter_putBlock(mfa->binaryOut, mb, mfa->lineNumber + n + 1, mfa->lineNumber + 1, true);
+  } else if (n > 0) {
+    maf_mafBinaryWriter_putBlock(mfa->binaryOut, mb, mfa->lineNumber, mfa->lineNumber + 1, true);
+  }
+  mfa->lineNumber += n + 1;
+}
+static mafBinaryInput_t* maf_newMafBinaryInput(void) {
+  mafBinaryInput_t *in = (mafBinaryInput_t *) de_malloc(sizeof(*in));
+  memset(in, 0, sizeof(*in));
+  return in;
+}
+static void maf_destroyMafBinaryInput(mafBinaryInput_t *in) {
+  if (in == NULL) {
+    return;
+  }
+  for (uint64_t i = 0; i < in->numberOfNames; ++i) {
+    free(in->names[i]);
+  }
+  free(in->names);
+  free(in->nameLengths);
+  free(in->sourceLengths);
+  free(in->blockOffsets);
+  free(in->text);
+  free(in->bases);
+  free(in);
+}
+static void maf_mafBinaryInput_addName(mafBinaryInput_t *in, const uint8_t *s, size_t n, uint64_t sourceLength) {
+  if (in->numberOfNames == in->namesSize) {
+    in->namesSize = (in->namesSize == 0) ? 256 : 2 * in->namesSize;
+    in->names = (char **) realloc(in->names, sizeof(*(in->names)) * in->namesSize);
+    in->nameLengths = (size_t *) realloc(in->nameLengths, sizeof(*(in->nameLengths)) * in->namesSize);
+    in->sourceLengths = (uint64_t *) realloc(in->sourceLengths, sizeof(*(in->sourceLengths)) * in->namesSize);
+    assert(in->names != NULL && in->nameLengths != NULL && in->sourceLengths != NULL);
+  }
+  in->names[in->numberOfNames] = de_strndup((const char *) s, n);
+  in->nameLengths[in->numberOfNames] = n;
+  in->sourceLengths[in->numberOfNames] = sourceLength;
+  ++(in->numberOfNames);
+}
+static bool maf_mafFileApi_readAt(mafFileApi_t *mfa, uint64_t offset, void *dest, size_t n) {
+  // copy the n bytes at offset of a mapped or regular, uncompressed, file
+  if (mfa->map != NULL) {
+    if (offset > mfa->mapSize || n > mfa->mapSize - offset) {
+      return false;
+    }
+    memcpy(dest, mfa->map + offset, n);
+    return true;
+  }
+  for (size_t done = 0; done < n;) {
+    ssize_t k = pread(fileno(mfa->mfp), (char *) dest + done, n - done, (off_t) (offset + done));
+    if (k <= 0) {
+      return false;
+    }
+    done += (size_t) k;
+  }
+  return true;
+}
+static void maf_mafFileApi_readBinaryTable(mafFileApi_t *mfa) {
+  // read the name and block tables at the end of a .mafb file, if it can be
+  // seeked in. Input that is streamed learns the names as it goes instead.
+  mafBinaryInput_t *in = mfa->binary;
+  uint64_t size = mfa->mapSize;
+  if (mfa->map == NULL) {
+    struct stat st;
+    if (mfa->bgzf != NULL || mfa->mfp == stdin || fstat(fileno(mfa->mfp), &st) != 0 || !S_ISREG(st.st_mode)) {
+      return;
+    }
+    size = (uint64_t) st.st_size;
+  }
+  uint8_t trailer[16];
+  if (size < sizeof(kMafBinaryMagic) + kMafBinaryTrailerSize ||
+      !maf_mafFileApi_readAt(mfa, size - kMafBinaryTrailerSize, trailer, kMafBinaryTrailerSize) ||
+      memcmp(trailer + 8, kMafBinaryEndMagic, sizeof(kMafBinaryEndMagic)) != 0) {
+    // unfinished, it can still be read from the start
+    return;
+  }
+  uint64_t tableOffset = 0;
+  for (unsigned i = 0; i < 8; ++i) {
+    tableOffset |= ((uint64_t) trailer[i]) << (8 * i);
+  }
+  if (tableOffset < sizeof(kMafBinaryMagic) || tableOffset > size - kMafBinaryTrailerSize) {
+    maf_failCorruptBinary(mfa->filename);
+  }
+  size_t n = (size_t) (size - kMafBinaryTrailerSize - tableOffset);
+  uint8_t *table = (uint8_t *) de_malloc(n + 1);
+  if (!maf_mafFileApi_readAt(mfa, tableOffset, table, n)) {
+    maf_failCorruptBinary(mfa->filename);
+  }
+  mafBinaryCursor_t c = {table, table + n, mfa->filename};
+  if (maf_mafBinaryCursor_byte(&c) != kMafBinaryTableRecord ||
+      maf_mafBinaryCursor_varint(&c) != (uint64_t) (c.end - c.p)) {
+    maf_failCorruptBinary(mfa->filename);
+  }
+  uint64_t numberOfNames = maf_mafBinaryCursor_varint(&c);
+  for (uint64_t i = 0; i < numberOfNames; ++i) {
+    uint64_t length = maf_mafBinaryCursor_varint(&c);
+    const uint8_t *name = maf_mafBinaryCursor_take(&c, length);
+    maf_mafBinaryInput_addName(in, name, length, maf_mafBinaryCursor_varint(&c));
+  }
+  in->numberOfBlocks = maf_mafBinaryCursor_varint(&c);
+  if (in->numberOfBlocks > (uint64_t) (c.end - c.p)) {
+    maf_failCorruptBinary(mfa->filename);
+  }
+  in->blockOffsets = (uint64_t *) de_malloc(sizeof(*(in->blockOffsets)) * (in->numberOfBlocks + 1));
+  for (uint64_t i = 0, offset = 0; i < in->numberOfBlocks; ++i) {
+    offset += maf_mafBinaryCursor_varint(&c);
+    in->blockOffsets[i] = offset;
+  }
+  free(table);
+}
+static bool maf_mafFileApi_isBinary(mafFileApi_t *mfa) {
+  // whether mfa reads a .mafb file, found out from its first bytes the first time it is asked
+  if (!mfa->formatKnown) {
+    mfa->formatKnown = true;
+    while (mfa->bufferEnd - mfa->bufferStart < sizeof(kMafBinaryMagic) && !mfa->eof) {
+      maf_mafFileApi_fillBuffer(mfa);
+    }
+    if (mfa->bufferEnd - mfa->bufferStart >= sizeof(kMafBinaryMagic) &&
+        memcmp(mfa->buffer + mfa->bufferStart, kMafBinaryMagic, sizeof(kMafBinaryMagic)) == 0) {
+      mfa->bufferStart += sizeof(kMafBinaryMagic);
+      mfa->binary = maf_newMafBinaryInput();
+      maf_mafFileApi_readBinaryTable(mfa);
+    }
+  }
+  return mfa->binary != NULL;
+}
+static const uint8_t* maf_mafFileApi_takeBytes(mafFileApi_t *mfa, size_t n) {
+  // the next n bytes of the file, valid until the next read, or NULL if the file ends first
+  while (mfa->bufferEnd - mfa->bufferStart < n) {
+    if (mfa->eof) {
+      return NULL;
+    }
+    maf_mafFileApi_fillBuffer(mfa);
+  }
+  const uint8_t *p = (const uint8_t *) mfa->buffer + mfa->bufferStart;
+  mfa->bufferStart += n;
+  return p;
+}
+static void maf_mafBinaryInput_unpackBases(mafBinaryInput_t *in, mafBinaryCursor_t *c, uint64_t m,
+                                           uint64_t numberOfRuns, uint8_t flags) {
+  // check the gap runs of a packed sequence m columns long, leaving them to
+  // be read again, and unpack its bases, lower case runs applied, into in->bases
+  uint64_t end = 0, gaps = 0;
+  for (uint64_t r = 0; r < numberOfRuns; ++r) {
+    uint64_t skip = maf_mafBinaryCursor_varint(c), length = maf_mafBinaryCursor_varint(c);
+    if (skip > m - end || length == 0 || length > m - end - skip) {
+      maf_failCorruptBinary(c->filename);
+    }
+    end += skip + length;
+    gaps += length;
+  }
+  uint64_t bases = m - gaps, numberOfCaseRuns = 0;
+  if (flags & kMafBinaryCaseRuns) {
+    numberOfCaseRuns = maf_mafBinaryCursor_varint(c);
+  }
+  mafBinaryCursor_t cases = *c;
+  end = 0;
+  for (uint64_t r = 0; r < numberOfCaseRuns; ++r) {
+    uint64_t skip = maf_mafBinaryCursor_varint(c), length = maf_mafBinaryCursor_varint(c);
+    if (skip > bases - end || length == 0 || length > bases - end - skip) {
+      maf_failCorruptBinary(c->filename);
+    }
+    end += skip + length;
+  }
+  const uint8_t *packed = maf_mafBinaryCursor_take(c, (bases + 1) / 2);
+  if (in->basesSize < bases) {
+    free(in->bases);
+    in->basesSize = bases;
+    in->bases = (char *) de_malloc(in->basesSize);
+  }
+  char *b = in->bases;
+  seq_unpackNibbles(b, packed, bases, kMafBinaryBases);
+  for (uint64_t r = 0, k = 0; r < numberOfCaseRuns; ++r) {
+    k += maf_mafBinaryCursor_varint(&cases);
+    for (uint64_t e = k + maf_mafBinaryCursor_varint(&cases); k < e; ++k) {
+      b[k] = (char) (b[k] | 0x20); // every base code is a letter
+    }
+  }
+}
+static size_t maf_mafBinaryInput_decodeSequenceLine(mafBinaryInput_t *in, mafBinaryCursor_t *c,
+                                                    mafLineFields_t *f) {
+  // rebuild the text of an `s' line in in->text and find its fields, returning its length
+  uint64_t ref = maf_mafBinaryCursor_varint(c), id = ref >> 1;
+  if (ref & 1) {
+    uint64_t length = maf_mafBinaryCursor_varint(c);
+    const uint8_t *name = maf_mafBinaryCursor_take(c, length);
+    uint64_t sourceLength = maf_mafBinaryCursor_varint(c);
+    if (id == in->numberOfNames) {
+      maf_mafBinaryInput_addName(in, name, length, sourceLength);
+    }
+  }
+  if (id >= in->numberOfNames) {
+    fprintf(stderr, "Error, binary maf file %s uses a name before defining it, "
+            "it can only be read from the start\n", c->filename);
+    exit(EXIT_FAILURE);
+  }
+  uint8_t flags = maf_mafBinaryCursor_byte(c);
+  uint8_t widths[6] = {1, 1, 1, 1, 1, 1};
+  if (flags & kMafBinaryWideSeparators) {
+    memcpy(widths, maf_mafBinaryCursor_take(c, 6), 6);
+  }
+  f->start = maf_mafBinaryCursor_varint(c);
+  f->length = maf_mafBinaryCursor_varint(c);
+  f->strand = (flags & kMafBinaryMinusStrand) ? '-' : '+';
+  f->sourceLength = (flags & kMafBinaryOwnSourceLength) ? maf_mafBinaryCursor_varint(c) : in->sourceLengths[id];
+  uint64_t m = maf_mafBinaryCursor_varint(c);
+  const uint8_t *plain = NULL;
+  uint64_t numberOfRuns = 0;
+  mafBinaryCursor_t runs = *c;
+  if (flags & kMafBinaryPlainSequence) {
+    plain = maf_mafBinaryCursor_take(c, m);
+  } else {
+    numberOfRuns = maf_mafBinaryCursor_varint(c);
+    runs = *c;
+    maf_mafBinaryInput_unpackBases(in, c, m, numberOfRuns, flags);
+  }
+  // the line, each field after its separator
+  size_t nameLength = in->nameLengths[id];
+  size_t n = 1 + nameLength + maf_countDigits(f->start) + maf_countDigits(f->length) + 1 +
+    maf_countDigits(f->sourceLength) + m;
+  for (unsigned k = 0; k < 6; ++k) {
+    n += widths[k];
+  }
+  if (in->textSize < n + 1) {
+    free(in->text);
+    in->textSize = n + 1;
+    in->text = (char *) de_malloc(in->textSize);
+  }
+  char *t = in->text;
+  size_t pos = 0;
+  t[pos++] = 's';
+  pos += maf_putSpaces(t + pos, widths[0]);
+  f->species = pos;
+  f->speciesLength = nameLength;
+  memcpy(t + pos, in->names[id], nameLength);
+  pos += nameLength;
+  pos += maf_putSpaces(t + pos, widths[1]);
+  pos += maf_putUInt(t + pos, f->start);
+  pos += maf_putSpaces(t + pos, widths[2]);
+  pos += maf_putUInt(t + pos, f->length);
+  pos += maf_putSpaces(t + pos, widths[3]);
+  t[pos++] = f->strand;
+  pos += maf_putSpaces(t + pos, widths[4]);
+  pos += maf_putUInt(t + pos, f->sourceLength);
+  pos += maf_putSpaces(t + pos, widths[5]);
+  f->sequence = pos;
+  f->sequenceLength = m;
+  // the bases, with the gaps put back between them
+  char *seq = t + pos;
+  if (plain != NULL) {
+    memcpy(seq, plain, m);
+    t[n] = '\0';
+    return n;
+  }
+  const char *b = in->bases;
+  uint64_t column = 0, k = 0;
+  for (uint64_t r = 0; r < numberOfRuns; ++r) {
+    uint64_t start = column + maf_mafBinaryCursor_varint(&runs);
+    uint64_t length = maf_mafBinaryCursor_varint(&runs);
+    memcpy(seq + column, b + k, start - column);
+    k += start - column;
+    memset(seq + start, '-', length);
+    column = start + length;
+  }
+  memcpy(seq + column, b + k, m - column);
+  t[n] = '\0';
+  return n;
+}
+static void maf_mafFileApi_decodeBinaryBlock(mafFileApi_t *mfa, mafBinaryCursor_t *c, mafBlock_t *mb) {
+  // rebuild the lines of a block record in mb, in its arena if it has one
+  mafBinaryInput_t *in = mfa->binary;
+  mafBlockArena_t *arena = mb->arena;
+  mb->lineNumber = maf_mafBinaryCursor_varint(c);
+  uint64_t lineNumber = maf_mafBinaryCursor_varint(c);
+  uint64_t numberOfLines = maf_mafBinaryCursor_varint(c);
+  if (numberOfLines == 0) {
+    maf_failCorruptBinary(mfa->filename);
+  }
+  bool firstSequenceUnread = false;
+  for (uint64_t i = 0; i < numberOfLines; ++i, ++lineNumber) {
+    uint8_t kind = maf_mafBinaryCursor_byte(c);
+    if (kind & kMafBinaryExplicitLineNumber) {
+      lineNumber += (uint64_t) maf_unzigzag(maf_mafBinaryCursor_varint(c));
+      kind &= (uint8_t) ~kMafBinaryExplicitLineNumber;
+    }
+    mafLineFields_t f;
+    size_t n = 0;
+    if (kind == kMafBinarySequenceLine) {
+      n = maf_mafBinaryInput_decodeSequenceLine(in, c, &f);
+    } else if (kind == kMafBinaryRawLine || kind == kMafBinaryHeaderLine) {
+      n = maf_mafBinaryCursor_varint(c);
+      const uint8_t *s = maf_mafBinaryCursor_take(c, n);
+      if (n == 0) {
+        maf_failCorruptBinary(mfa->filename);
+      }
+      if (in->textSize < n + 1) {
+        free(in->text);
+        in->textSize = n + 1;
+        in->text = (char *) de_malloc(in->textSize);
+      }
+      memcpy(in->text, s, n);
+      in->text[n] = '\0';
+    } else {
+      maf_failCorruptBinary(mfa->filename);
+    }
+    mafLine_t *ml = NULL;
+    if (arena != NULL && kind == kMafBinaryRawLine) {
+      ml = maf_mafBlockArena_addLine(arena, i, in->text, n, lineNumber, mfa->lazyParsing);
+    } else if (arena != NULL) {
+      ml = maf_mafBlockArena_startLine(arena, i, in->text, n, lineNumber);
+      if (kind == kMafBinarySequenceLine) {
+        maf_mafBlockArena_setFields(arena, i, in->text, n, &f);
+      } else {
+        ml->type = 'h';
+      }
+    } else {
+      if (kind == kMafBinaryRawLine) {
+        ml = maf_mafFileApi_newMafLine(mfa, in->text, lineNumber);
+      } else if (kind == kMafBinaryHeaderLine) {
+        ml = maf_newMafLine();
+        ml->line = de_strdup(in->text);
+        ml->type = 'h';
+        ml->lineNumber = lineNumber;
+      } else {
+        ml = maf_newMafLine();
+        ml->lineNumber = lineNumber;
+        ml->type = 's';
+        maf_mafLine_packText(ml, in->text, n, in->text + f.species, f.speciesLength,
+                             in->text + f.sequence, f.sequenceLength, true);
+        ml->start = f.start;
+        ml->length = f.length;
+        ml->strand = f.strand;
+        ml->sourceLength = f.sourceLength;
+        ml->sequenceFieldLength = f.sequenceLength;
+      }
+      if (mb->headLine == NULL) {
+        mb->headLine = ml;
+      } else {
+        mb->tailLine->next = ml;
+      }
+      mb->tailLine = ml;
+    }
+    if (ml->type == 's' && ++(mb->numberOfSequences) == 1) {
+      firstSequenceUnread = (ml->storage & kMafLineSequenceUnread) != 0;
+      mb->sequenceFieldLength = firstSequenceUnread ? 0 : ml->sequenceFieldLength;
+    }
+    ++(mb->numberOfLines);
+  }
+  if (c->p != c->end) {
+    maf_failCorruptBinary(mfa->filename);
+  }
+  if (arena != NULL) {
+    maf_mafBlock_linkArenaLines(mb);
+  }
+  mb->lazySequenceFieldLength = firstSequenceUnread;
+  mfa->lineNumber = lineNumber;
+  maf_mafFileApi_internNames(mfa, mb);
+  PROFILE_COUNT(kProfileBlocksParsed, 1);
+  PROFILE_COUNT(kProfileLinesParsed, mb->numberOfLines);
+}
+static mafBlock_t* maf_mafFileApi_readBinaryBlock(mafFileApi_t *mfa, mafBlock_t *mb) {
+  // read the next block of a .mafb file into mb, emptied for reuse by
+  // maf_readBlockInto(), or into a new block if mb is NULL. Returns NULL once
+  // the blocks run out.
+  uint64_t offset = mfa->bufferOffset + mfa->bufferStart;
+  const uint8_t *tag = maf_mafFileApi_takeBytes(mfa, 1);
+  if (tag == NULL) {
+    return NULL;
+  }
+  if (*tag == kMafBinaryTableRecord) {
+    // left unread, so that any later read ends here too
+    --(mfa->bufferStart);
+    return NULL;
+  }
+  if (*tag != kMafBinaryBlockRecord) {
+    maf_failCorruptBinary(mfa->filename);
+  }
+  uint64_t n = 0;
+  for (unsigned shift = 0; ; shift += 7) {
+    const uint8_t *b = maf_mafFileApi_takeBytes(mfa, 1);
+    if (b == NULL || shift >= 64) {
+      maf_failCorruptBinary(mfa->filename);
+    }
+    n |= ((uint64_t) (*b & 0x7f)) << shift;
+    if (!(*b & 0x80)) {
+      break;
+    }
+  }
+  const uint8_t *p = maf_mafFileApi_takeBytes(mfa, (size_t) n);
+  if (p == NULL) {
+    maf_checkForPrematureMafEnd(mfa->filename, -1);
+  }
+  mfa->blockOffset = offset;
+  mafBinaryCursor_t c = {p, p + n, mfa->filename};
+  if (mb == NULL) {
+    mb = maf_newMafBlock();
+  }
+  maf_mafFileApi_decodeBinaryBlock(mfa, &c, mb);
+  return mb;
+}
+static mafFileApi_t** maf_newMfaBinaryChunks(mafFileApi_t *whole, const char *filename, unsigned n,
+                                             unsigned *numberOfChunks) {
+  // maf_newMfaChunks() for a mapped .mafb file, cut at the blocks in its table
+  // nearest to n equal ranges. Lines carry their own numbers, so there is
+  // nothing to count.
+  mafBinaryInput_t *in = whole->binary;
+  uint64_t size = whole->mapSize;
+  uint64_t *starts = (uint64_t *) de_malloc(sizeof(*starts) * (n + 1));
+  unsigned m = 1;
+  starts[0] = whole->bufferStart;
+  for (unsigned i = 1, b = 0; i < n; ++i) {
+    uint64_t from = (size / n) * i;
+    while (b < in->numberOfBlocks && in->blockOffsets[b] < from) {
+      ++b;
+    }
+    if (b == in->numberOfBlocks) {
+      break;
+    }
+    if (in->blockOffsets[b] > starts[m - 1]) {
+      starts[m++] = in->blockOffsets[b];
+    }
+  }
+  starts[m] = size;
+  mafFileApi_t **chunks = (mafFileApi_t **) de_malloc(sizeof(*chunks) * m);
+  for (unsigned i = 0; i < m; ++i) {
+    chunks[i] = (i == 0) ? whole : maf_newMfa(filename, "rm");
+    if (chunks[i]->map == NULL || chunks[i]->mapSize != size || !maf_mafFileApi_isBinary(chunks[i])) {
+      fprintf(stderr, "Error, %s changed while being read\n", filename);
+      exit(EXIT_FAILURE);
+    }
+    if (i > 0) {
+      maf_destroyMafNameDict(chunks[i]->names);
+      chunks[i]->names = maf_mafNameDict_share(whole->names);
+    }
+    chunks[i]->bufferStart = starts[i];
+    chunks[i]->bufferEnd = starts[i + 1];
+  }
+  *numberOfChunks = m;
+  free(starts);
+  return chunks;
+}
+static uint64_t maf_mafFileApi_getBlockOffset(mafFileApi_t *mfa) {
+  // where the block last read starts, as an offset maf_mafFileApi_seek() can go to
+  if (mfa->bgzf != NULL) {
+    return bgzf_virtualOffset(mfa->bgzf, mfa->blockOffset);
+  }
+  return mfa->blockOffset;
+}
+/*
+ * .mafidx block index
+ *
+ * An index is a sidecar file, filename.mafidx, written by maf_writeMafIndex().
+ * For each sequence name it holds the positive strand interval of every s line
+ * with that name, sorted by start, along with where its block is in the maf.
+ * The file is laid out as a mafIndexHeader_t, the mafIndexName_t table sorted
+ * by name, the mafIndexEntry_t table and finally the name characters, all in
+ * native byte order. The size and modification time of the maf are recorded
+ * so that an index that no longer matches its maf is not used. Offsets into
+ * blocked gzip mafs are virtual offsets, see bgzf.h.
+ */
+static const char kMafIndexMagic[8] = "mafidx1";
+static const char *kMafIndexSuffix = ".mafidx";
+typedef struct mafIndexHeader {
+  char magic[8];
+  uint64_t mafSize;
+  int64_t mafModificationTime;
+  uint64_t numberOfNames;
+  uint64_t numberOfEntries;
+  uint64_t nameCharacters;
+} mafIndexHeader_t;
+typedef struct mafIndexName {
+  uint64_t nameOffset; // into the name characters
+  uint64_t nameLength;
+  uint64_t firstEntry;
+  uint64_t numberOfEntries;
+} mafIndexName_t;
+typedef struct mafIndexEntry {
+  uint64_t start; // positive strand, zero based, half open
+  uint64_t end;
+  uint64_t maxEnd; // largest end of this and all earlier entries of the same name
+  uint64_t blockOffset; // file offset of the first line of the block
+  uint64_t lineNumber; // line number of the first line of the block
+  uint64_t blockLineNumber; // as given by maf_mafBlock_getLineNumber()
+  uint64_t blockNumber; // counting the header as block 0, as maf_readBlock() does
+} mafIndexEntry_t;
+struct mafIndex {
+  // a mafIndex struct is an open .mafidx file and the blocks found by the
+  // queries made of it so far.
+  char *map;
+  size_t mapSize;
+  const mafIndexHeader_t *header;
+  const mafIndexName_t *names;
+  const mafIndexEntry_t *entries;
+  const char *nameCharacters;
+  const mafIndexEntry_t **hits; // sorted by block offset, without repeats
+  uint64_t numberOfHits;
+  uint64_t hitsSize;
+};
+typedef struct mafIndexBuildEntry {
+  uint64_t name;
+  mafIndexEntry_t entry;
+} mafIndexBuildEntry_t;
+static char* maf_mafIndex_createFilename(const char *filename) {
+  char *indexFilename = (char *) de_malloc(strlen(filename) + strlen(kMafIndexSuffix) + 1);
+  sprintf(indexFilename, "%s%s", filename, kMafIndexSuffix);
+  return indexFilename;
+}
+static uint64_t maf_internName(const char *name, char ***names, uint64_t *numberOfNames,
+                               uint64_t *namesSize, uint64_t **table, uint64_t *tableSize) {
+  // return the id of name in names, adding it if it is new. table is an open
+  // addressing hash of ids + 1, 0 marking an empty slot.
+  if (2 * (*numberOfNames + 1) > *tableSize) {
+    uint64_t newSize = (*tableSize == 0) ? 1024 : 2 * (*tableSize);
+    uint64_t *newTable = (uint64_t *) de_malloc(sizeof(*newTable) * newSize);
+    memset(newTable, 0, sizeof(*newTable) * newSize);
+    for (uint64_t i = 0; i < *numberOfNames; ++i) {
+      uint64_t j = maf_hashName((*names)[i], strlen((*names)[i])) & (newSize - 1);
+      while (newTable[j] != 0) {
+        j = (j + 1) & (newSize - 1);
+      }
+      newTable[j] = i + 1;
+    }
+    free(*table);
+    *table = newTable;
+    *tableSize = newSize;
+  }
+  uint64_t j = maf_hashName(name, strlen(name)) & (*tableSize - 1);
+  while ((*table)[j] != 0) {
+    if (strcmp((*names)[(*table)[j] - 1], name) == 0) {
+      return (*table)[j] - 1;
+    }
+    j = (j + 1) & (*tableSize - 1);
+  }
+  if (*numberOfNames == *namesSize) {
+    *namesSize = (*namesSize == 0) ? 256 : 2 * (*namesSize);
+    *names = (char **) realloc(*names, sizeof(char *) * (*namesSize));
+    assert(*names != NULL);
+  }
+  (*names)[*numberOfNames] = de_strdup(name);
+  (*table)[j] = *numberOfNames + 1;
+  return (*numberOfNames)++;
+}
+static char **g_mafIndexSortNames = NULL;
+static int maf_mafIndex_cmpNameIds(const void *a, const void *b) {
+  return strcmp(g_mafIndexSortNames[*(const uint64_t *) a], g_mafIndexSortNames[*(const uint64_t *) b]);
+}
+static int maf_mafIndex_cmpBuildEntries(const void *a, const void *b) {
+  const mafIndexBuildEntry_t *x = (const mafIndexBuildEntry_t *) a;
+  const mafIndexBuildEntry_t *y = (const mafIndexBuildEntry_t *) b;
+  if (x->name != y->name) {
+    return (x->name < y->name) ? -1 : 1;
+  }
+  if (x->entry.start != y->entry.start) {
+    return (x->entry.start < y->entry.start) ? -1 : 1;
+  }
+  if (x->entry.blockOffset != y->entry.blockOffset) {
+    return (x->entry.blockOffset < y->entry.blockOffset) ? -1 : 1;
+  }
+  return 0;
+}
+static void maf_statMaf(const char *filename, uint64_t *size, int64_t *modificationTime) {
+  struct stat st;
+  if (stat(filename, &st) != 0) {
+    fprintf(stderr, "Error, unable to stat maf file: %s\n", filename);
+    exit(EXIT_FAILURE);
+  }
+  *size = (uint64_t) st.st_size;
+  *modificationTime = (int64_t) st.st_mtime;
+}
+static void maf_fwriteOrDie(const void *p, size_t size, size_t n, FILE *f, const char *filename) {
+  if (fwrite(p, size, n, f) != n) {
+    fprintf(stderr, "Error, unable to write to index file: %s\n", filename);
+    exit(EXIT_FAILURE);
+  }
+}
+void maf_writeMafIndex(const char *filename) {
+  // read the maf filename and write its index to filename.mafidx
+  if (strcmp(filename, "-") == 0) {
+    fprintf(stderr, "Error, an index can only be built for a maf file, not for stdin\n");
+    exit(EXIT_FAILURE);
+  }
+  mafIndexHeader_t header;
+  memset(&header, 0, sizeof(header));
+  memcpy(header.magic, kMafIndexMagic, sizeof(header.magic));
+  maf_statMaf(filename, &header.mafSize, &header.mafModificationTime);
+  char **names = NULL;
+  uint64_t numberOfNames = 0, namesSize = 0, *table = NULL, tableSize = 0;
+  mafIndexBuildEntry_t *entries = NULL;
+  uint64_t numberOfEntries = 0, entriesSize = 0, blockNumber = 0;
+  mafFileApi_t *mfa = maf_newMfa(filename, "rm");
+  if (mfa->bgzf != NULL && !bgzf_isSeekable(mfa->bgzf)) {
+    fprintf(stderr, "Error, %s is gzip but not blocked gzip, recompress it with bgzip to index it\n",
+            filename);
+    exit(EXIT_FAILURE);
+  }
+  maf_mafFileApi_setLazyParsing(mfa, true);
+  mafBlock_t *mb = maf_newMafBlock();
+  while (maf_readBlockInto(mfa, mb) != NULL) {
+    for (mafLine_t *ml = mb->headLine; blockNumber > 0 && ml != NULL; ml = ml->next) {
+      if (ml->type != 's') {
+        continue;
+      }
+      if (numberOfEntries == entriesSize) {
+        entriesSize = (entriesSize == 0) ? 4096 : 2 * entriesSize;
+        entries = (mafIndexBuildEntry_t *) realloc(entries, sizeof(*entries) * entriesSize);
+        assert(entries != NULL);
+      }
+      mafIndexBuildEntry_t *b = entries + numberOfEntries++;
+      b->name = maf_internName(maf_mafLine_getSpecies(ml), &names, &numberOfNames, &namesSize,
+                               &table, &tableSize);
+      b->entry.start = maf_mafLine_getPositiveLeftCoord(ml);
+      b->entry.end = b->entry.start + maf_mafLine_getLength(ml);
+      if (maf_mafLine_getLength(ml) == 0) {
+        // tools differ on where an empty row is, so it is found by every query
+        b->entry.start = 0;
+        b->entry.end = UINT64_MAX;
+      }
+      b->entry.blockOffset = maf_mafFileApi_getBlockOffset(mfa);
+      b->entry.lineNumber = mb->headLine->lineNumber;
+      b->entry.blockLineNumber = mb->lineNumber;
+      b->entry.blockNumber = blockNumber;
+    }
+    ++blockNumber;
+  }
+  maf_destroyMafBlockList(mb);
+  maf_destroyMfa(mfa);
+  free(table);
+  // number the names in sorted order, then sort the entries by name and start
+  uint64_t *order = (uint64_t *) de_malloc(sizeof(*order) * (numberOfNames + 1));
+  uint64_t *rank = (uint64_t *) de_malloc(sizeof(*rank) * (numberOfNames + 1));
+  for (uint64_t i = 0; i < numberOfNames; ++i) {
+    order[i] = i;
+  }
+  g_mafIndexSortNames = names;
+  qsort(order, numberOfNames, sizeof(*order), maf_mafIndex_cmpNameIds);
+  g_mafIndexSortNames = NULL;
+  for (uint64_t i = 0; i < numberOfNames; ++i) {
+    rank[order[i]] = i;
+  }
+  for (uint64_t i = 0; i < numberOfEntries; ++i) {
+    entries[i].name = rank[entries[i].name];
+  }
+  qsort(entries, numberOfEntries, sizeof(*entries), maf_mafIndex_cmpBuildEntries);
+  mafIndexName_t *nameTable = (mafIndexName_t *) de_malloc(sizeof(*nameTable) * (numberOfNames + 1));
+  for (uint64_t i = 0; i < numberOfNames; ++i) {
+    nameTable[i].nameOffset = header.nameCharacters;
+    nameTable[i].nameLength = strlen(names[order[i]]);
+    nameTable[i].firstEntry = 0;
+    nameTable[i].numberOfEntries = 0;
+    header.nameCharacters += nameTable[i].nameLength;
+  }
+  for (uint64_t i = 0; i < numberOfEntries; ++i) {
+    mafIndexName_t *n = nameTable + entries[i].name;
+    if (n->numberOfEntries == 0) {
+      n->firstEntry = i;
+      entries[i].entry.maxEnd = entries[i].entry.end;
+    } else {
+      entries[i].entry.maxEnd = (entries[i - 1].entry.maxEnd > entries[i].entry.end) ?
+        entries[i - 1].entry.maxEnd : entries[i].entry.end;
+    }
+    ++(n->numberOfEntries);
+  }
+  header.numberOfNames = numberOfNames;
+  header.numberOfEntries = numberOfEntries;
+  // write to a temporary file so that a partial index is never picked up
+  char *indexFilename = maf_mafIndex_createFilename(filename);
+  char *tmpFilename = (char *) de_malloc(strlen(indexFilename) + 5);
+  sprintf(tmpFilename, "%s.tmp", indexFilename);
+  FILE *f = de_fopen(tmpFilename, "wb");
+  maf_fwriteOrDie(&header, sizeof(header), 1, f, tmpFilename);
+  maf_fwriteOrDie(nameTable, sizeof(*nameTable), numberOfNames, f, tmpFilename);
+  for (uint64_t i = 0; i < numberOfEntries; ++i) {
+    maf_fwriteOrDie(&(entries[i].entry), sizeof(entries[i].entry), 1, f, tmpFilename);
+  }
+  for (uint64_t i = 0; i < numberOfNames; ++i) {
+    maf_fwriteOrDie(names[order[i]], sizeof(char), nameTable[i].nameLength, f, tmpFilename);
+  }
+  if (fclose(f) != 0 || rename(tmpFilename, indexFilename) != 0) {
+    fprintf(stderr, "Error, unable to write index file: %s\n", indexFilename);
+    exit(EXIT_FAILURE);
+  }
+  for (uint64_t i = 0; i < numberOfNames; ++i) {
+    free(names[i]);
+  }
+  free(names);
+  free(order);
+  free(rank);
+  free(nameTable);
+  free(entries);
+  free(tmpFilename);
+  free(indexFilename);
+}
+mafIndex_t* maf_newMafIndex(const char *filename) {
+  // open the index of the maf filename. Returns NULL if there is no index, or
+  // if the maf has changed size or been modified since the index was written.
+  if (strcmp(filename, "-") == 0) {
+    return NULL;
+  }
+  char *indexFilename = maf_mafIndex_createFilename(filename);
+  int fd = open(indexFilename, O_RDONLY);
+  if (fd == -1) {
+    free(indexFilename);
+    return NULL;
+  }
+  struct stat st;
+  void *map = MAP_FAILED;
+  if (fstat(fd, &st) == 0 && (size_t) st.st_size >= sizeof(mafIndexHeader_t)) {
+    map = mmap(NULL, (size_t) st.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
+  }
+  close(fd);
+  if (map == MAP_FAILED) {
+    fprintf(stderr, "Warning, ignoring unreadable index %s\n", indexFilename);
+    free(indexFilename);
+    return NULL;
+  }
+  mafIndex_t *idx = (mafIndex_t *) de_malloc(sizeof(*idx));
+  idx->map = (char *) map;
+  idx->mapSize = (size_t) st.st_size;
+  idx->header = (const mafIndexHeader_t *) idx->map;
+  idx->names = (const mafIndexName_t *) (idx->header + 1);
+  idx->entries = (const mafIndexEntry_t *) (idx->names + idx->header->numberOfNames);
+  idx->nameCharacters = (const char *) (idx->entries + idx->header->numberOfEntries);
+  idx->hits = NULL;
+  idx->numberOfHits = 0;
+  idx->hitsSize = 0;
+  uint64_t mafSize = 0;
+  int64_t mafModificationTime = 0;
+  maf_statMaf(filename, &mafSize, &mafModificationTime);
+  if (memcmp(idx->header->magic, kMafIndexMagic, sizeof(kMafIndexMagic)) != 0 ||
+      idx->nameCharacters + idx->header->nameCharacters != idx->map + idx->mapSize) {
+    fprintf(stderr, "Warning, ignoring unreadable index %s\n", indexFilename);
+    maf_destroyMafIndex(idx);
+    idx = NULL;
+  } else if (idx->header->mafSize != mafSize || idx->header->mafModificationTime != mafModificationTime) {
+    fprintf(stderr, "Warning, ignoring out of date index %s, rebuild it with mafIndex\n", indexFilename);
+    maf_destroyMafIndex(idx);
+    idx = NULL;
+  }
+  free(indexFilename);
+  return idx;
+}
+void maf_destroyMafIndex(mafIndex_t *idx) {
+  if (idx == NULL) {
+    return;
+  }
+  munmap(idx->map, idx->mapSize);
+  free(idx->hits);
+  free(idx);
+}
+static int maf_mafIndex_cmpName(const mafIndex_t *idx, uint64_t i, const char *name, size_t n) {
+  // compare the first n characters of the i-th name with name, a name that is
+  // longer than n but otherwise the same comparing greater
+  const mafIndexName_t *x = idx->names + i;
+  size_t m = (x->nameLength < n) ? x->nameLength : n;
+  int c = memcmp(idx->nameCharacters + x->nameOffset, name, m);
+  if (c != 0) {
+    return c;
+  }
+  return (x->nameLength < n) ? -1 : ((x->nameLength > n) ? 1 : 0);
+}
+static uint64_t maf_mafIndex_lowerBoundName(const mafIndex_t *idx, const char *name, size_t n) {
+  // index of the first name that is not less than the n characters of name
+  uint64_t lo = 0, hi = idx->header->numberOfNames;
+  while (lo < hi) {
+    uint64_t mid = lo + (hi - lo) / 2;
+    if (maf_mafIndex_cmpName(idx, mid, name, n) < 0) {
+      lo = mid + 1;
+    } else {
+      hi = mid;
+    }
+  }
+  return lo;
+}
+static void maf_mafIndex_addHit(mafIndex_t *idx, const mafIndexEntry_t *e) {
+  if (idx->numberOfHits == idx->hitsSize) {
+    idx->hitsSize = (idx->hitsSize == 0) ? 64 : 2 * idx->hitsSize;
+    idx->hits = (const mafIndexEntry_t **) realloc(idx->hits, sizeof(*(idx->hits)) * idx->hitsSize);
+    assert(idx->hits != NULL);
+  }
+  idx->hits[idx->numberOfHits++] = e;
+}
+static void maf_mafIndex_queryName(mafIndex_t *idx, uint64_t i, uint64_t start, uint64_t stop) {
+  // add the blocks where the i-th name overlaps [start, stop]. Entries are
+  // sorted by start, so candidates end at the last entry starting at or before
+  // stop, and the running maximum of the ends says when to stop looking back.
+  const mafIndexName_t *name = idx->names + i;
+  const mafIndexEntry_t *entries = idx->entries + name->firstEntry;
+  uint64_t lo = 0, hi = name->numberOfEntries;
+  while (lo < hi) {
+    uint64_t mid = lo + (hi - lo) / 2;
+    if (entries[mid].start <= stop) {
+      lo = mid + 1;
+    } else {
+      hi = mid;
+    }
+  }
+  for (uint64_t j = lo; j > 0 && entries[j - 1].maxEnd > start; --j) {
+    if (entries[j - 1].end > start) {
+      maf_mafIndex_addHit(idx, entries + j - 1);
+    }
+  }
+}
+static int maf_mafIndex_cmpHits(const void *a, const void *b) {
+  const mafIndexEntry_t *x = *(const mafIndexEntry_t * const *) a;
+  const mafIndexEntry_t *y = *(const mafIndexEntry_t * const *) b;
+  if (x->blockOffset != y->blockOffset) {
+    return (x->blockOffset < y->blockOffset) ? -1 : 1;
+  }
+  return 0;
+}
+static void maf_mafIndex_sortHits(mafIndex_t *idx) {
+  // put the hits in file order and drop blocks found more than once
+  qsort(idx->hits, idx->numberOfHits, sizeof(*(idx->hits)), maf_mafIndex_cmpHits);
+  uint64_t n = 0;
+  for (uint64_t i = 0; i < idx->numberOfHits; ++i) {
+    if (n == 0 || idx->hits[n - 1]->blockOffset != idx->hits[i]->blockOffset) {
+      idx->hits[n++] = idx->hits[i];
+    }
+  }
+  idx->numberOfHits = n;
+}
+uint64_t maf_mafIndex_query(mafIndex_t *idx, const char *name, uint64_t start, uint64_t stop) {
+  // add the blocks with an s line named name that overlaps the positive strand,
+  // zero based, inclusive region [start, stop] to the hits of idx. Returns
+  // the number of hits, which are kept in file order.
+  size_t n = strlen(name);
+  uint64_t i = maf_mafIndex_lowerBoundName(idx, name, n);
+  if (i < idx->header->numberOfNames && maf_mafIndex_cmpName(idx, i, name, n) == 0) {
+    maf_mafIndex_queryName(idx, i, start, stop);
+  }
+  maf_mafIndex_sortHits(idx);
+  return idx->numberOfHits;
+}
+uint64_t maf_mafIndex_queryPrefix(mafIndex_t *idx, const char *prefix, uint64_t start, uint64_t stop) {
+  // as maf_mafIndex_query(), for every name that starts with prefix
+  size_t n = strlen(prefix);
+  for (uint64_t i = maf_mafIndex_lowerBoundName(idx, prefix, n); i < idx->header->numberOfNames; ++i) {
+    const mafIndexName_t *name = idx->names + i;
+    if (name->nameLength < n || memcmp(idx->nameCharacters + name->nameOffset, prefix, n) != 0) {
+      break;
+    }
+    maf_mafIndex_queryName(idx, i, start, stop);
+  }
+  maf_mafIndex_sortHits(idx);
+  return idx->numberOfHits;
+}
+void maf_mafIndex_clearHits(mafIndex_t *idx) {
+  idx->numberOfHits = 0;
+}
+uint64_t maf_mafIndex_getNumberOfHits(mafIndex_t *idx) {
+  return idx->numberOfHits;
+}
+uint64_t maf_mafIndex_getBlockNumber(mafIndex_t *idx, uint64_t i) {
+  // the number maf_readBlock() would have counted the i-th hit as, the header being 0
+  return idx->hits[i]->blockNumber;
+}
+static void maf_mafFileApi_seek(mafFileApi_t *mfa, uint64_t offset, uint64_t lineNumber) {
+  // position mfa so that the next line read starts at offset and is line lineNumber
+  maf_mafFileApi_isBinary(mfa);
+  free(mfa->lastLine);
+  mfa->lastLine = NULL;
+  if (mfa->map != NULL) {
+    assert(offset <= mfa->mapSize);
+    mfa->bufferStart = offset;
+  } else if (mfa->bgzf != NULL) {
+    // offset is a virtual offset
+    mfa->bufferOffset = bgzf_seek(mfa->bgzf, offset);
+    mfa->bufferStart = 0;
+    mfa->bufferEnd = 0;
+    mfa->eof = false;
+  } else {
+    if (mfa->mfp == stdin || fseeko(mfa->mfp, (off_t) offset, SEEK_SET) != 0) {
+      fprintf(stderr, "Error, unable to seek in maf file: %s\n", mfa->filename);
+      exit(EXIT_FAILURE);
+    }
+    mfa->bufferStart = 0;
+    mfa->bufferEnd = 0;
+    mfa->bufferOffset = offset;
+    mfa->eof = false;
+  }
+  mfa->blockOffset = mfa->bufferOffset + mfa->bufferStart;
+  mfa->lineNumber = lineNumber - 1;
+}
+static void maf_mafIndex_seekToHit(mafIndex_t *idx, mafFileApi_t *mfa, uint64_t i) {
+  assert(i < idx->numberOfHits);
+  maf_mafFileApi_seek(mfa, idx->hits[i]->blockOffset, idx->hits[i]->lineNumber);
+}
+static void maf_mafIndex_checkHitBlock(mafIndex_t *idx, mafFileApi_t *mfa, mafBlock_t *mb, uint64_t i) {
+  if (mb == NULL || maf_mafFileApi_getBlockOffset(mfa) != idx->hits[i]->blockOffset) {
+    fprintf(stderr, "Error, the index of maf file %s does not match it, rebuild it with mafIndex\n",
+            mfa->filename);
+    exit(EXIT_FAILURE);
+  }
+  mb->lineNumber = idx->hits[i]->blockLineNumber;
+}
+mafBlock_t* maf_mafIndex_readBlock(mafIndex_t *idx, mafFileApi_t *mfa, uint64_t i) {
+  // seek mfa to the i-th hit of idx and read that block, as maf_readBlock() would
+  maf_mafIndex_seekToHit(idx, mfa, i);
+  mafBlock_t *mb = maf_readBlock(mfa);
+  maf_mafIndex_checkHitBlock(idx, mfa, mb, i);
+  return mb;
+}
+mafBlock_t* maf_mafIndex_readBlockInto(mafIndex_t *idx, mafFileApi_t *mfa, uint64_t i, mafBlock_t *mb) {
+  // seek mfa to the i-th hit of idx and read that block into mb, as maf_readBlockInto() would
+  maf_mafIndex_seekToHit(idx, mfa, i);
+  mafBlock_t *b = maf_readBlockInto(mfa, mb);
+  maf_mafIndex_checkHitBlock(idx, mfa, b, i);
+  return b;
+}
+/*
+ * chunked parallel reading
+ *
+ * maf_newMfaChunks() cuts a memory mapped maf into byte ranges that each start
+ * on a block, and gives each range a mafFileApi_t of its own so that ranges can
+ * be read on separate threads. A range ends just after the first blank line
+ * following its last block, which is where maf_readBlock() would have stopped
+ * reading, so blocks and their line numbers come out exactly as they would from
+ * reading the whole file. Line numbers are carried across ranges by counting
+ * the newlines in each range up front, in parallel.
+ */
+typedef struct mafChunkCount {
+  const char *s;
+  uint64_t n;
+  uint64_t newlines;
+} mafChunkCount_t;
+typedef struct mafChunkReader {
+  mafFileApi_t *mfa;
+  unsigned chunk;
+  bool lazy;
+  void (*f)(mafBlock_t *mb, unsigned chunk, void *data);
+  void *data;
+} mafChunkReader_t;
+static bool maf_isBlankSpan(const char *s, const char *e) {
+  for (; s < e; ++s) {
+    if (!isspace((unsigned char) *s)) {
+      return false;
+    }
+  }
+  return true;
+}
+static uint64_t maf_findChunkBoundary(const char *map, uint64_t size, uint64_t from) {
+  // the offset of the first range start at or near from: the start of the line
+  // after the first of the blank lines that come before an `a' line. Returns
+  // size if there is none.
+  uint64_t p = (from > 0) ? from - 1 : 0;
+  while (p < size) {
+    const char *newline = memchr(map + p, '\n', size - p);
+    if (newline == NULL || newline + 1 == map + size) {
+      return size;
+    }
+    uint64_t a = newline - map + 1;
+    p = a;
+    if (map[a] != 'a') {
+      continue;
+    }
+    uint64_t lineStart = a, boundary = size;
+    while (lineStart > 0) {
+      // step back over the blank lines ending at lineStart
+      uint64_t prevStart = lineStart - 1;
+      while (prevStart > 0 && map[prevStart - 1] != '\n') {
+        --prevStart;
+      }
+      if (!maf_isBlankSpan(map + prevStart, map + lineStart - 1)) {
+        break;
+      }
+      boundary = lineStart;
+      lineStart = prevStart;
+    }
+    if (boundary != size) {
+      return boundary;
+    }
+  }
+  return size;
+}
+static uint64_t maf_findFirstBlock(const char *map, uint64_t size) {
+  // the offset of the first `a' line, which ends the header
+  for (uint64_t p = 0; p < size;) {
+    if (map[p] == 'a') {
+      return p;
+    }
+    const char *newline = memchr(map + p, '\n', size - p);
+    if (newline == NULL) {
+      break;
+    }
+    p = newline - map + 1;
+  }
+  return size;
+}
+static void* maf_countChunkNewlines(void *p) {
+  mafChunkCount_t *c = (mafChunkCount_t *) p;
+  const char *s = c->s, *e = c->s + c->n;
+  c->newlines = 0;
+  while ((s = memchr(s, '\n', e - s)) != NULL) {
+    ++(c->newlines);
+    ++s;
+  }
+  return NULL;
+}
+mafFileApi_t** maf_newMfaChunks(const char *filename, unsigned n, unsigned *numberOfChunks) {
+  // open filename for reading as up to n mafFileApi_t, to be read in parallel.
+  // The first reads the header. Anything that cannot be memory mapped, such as
+  // stdin or gzip, is a single chunk.
+  assert(n > 0);
+  mafFileApi_t *whole = maf_newMfa(filename, "rm");
+  if (whole->map == NULL || n == 1) {
+    mafFileApi_t **chunks = (mafFileApi_t **) de_malloc(sizeof(*chunks));
+    chunks[0] = whole;
+    *numberOfChunks = 1;
+    return chunks;
+  }
+  if (maf_mafFileApi_isBinary(whole)) {
+    return maf_newMfaBinaryChunks(whole, filename, n, numberOfChunks);
+  }
+  const char *map = whole->map;
+  uint64_t size = whole->mapSize;
+  uint64_t *starts = (uint64_t *) de_malloc(sizeof(*starts) * (n + 1));
+  unsigned m = 1;
+  starts[0] = 0;
+  uint64_t first = maf_findFirstBlock(map, size);
+  for (unsigned i = 1; i < n; ++i) {
+    uint64_t from = (size / n) * i;
+    uint64_t b = maf_findChunkBoundary(map, size, (from > first + 1) ? from : first + 1);
+    if (b <= first || b <= starts[m - 1] || b >= size) {
+      continue;
+    }
+    starts[m++] = b;
+  }
+  starts[m] = size;
+  // count the newlines in each range to find the line number each starts on
+  mafChunkCount_t *counts = (mafChunkCount_t *) de_malloc(sizeof(*counts) * m);
+  pthread_t *threads = (pthread_t *) de_malloc(sizeof(*threads) * m);
+  for (unsigned i = 0; i < m; ++i) {
+    counts[i].s = map + starts[i];
+    counts[i].n = starts[i + 1] - starts[i];
+    if (pthread_create(threads + i, NULL, maf_countChunkNewlines, counts + i) != 0) {
+      fprintf(stderr, "Error, unable to start a thread\n");
+      exit(EXIT_FAILURE);
+    }
+  }
+  for (unsigned i = 0; i < m; ++i) {
+    pthread_join(threads[i], NULL);
+  }
+  mafFileApi_t **chunks = (mafFileApi_t **) de_malloc(sizeof(*chunks) * m);
+  uint64_t lineNumber = 0;
+  for (unsigned i = 0; i < m; ++i) {
+    chunks[i] = (i == 0) ? whole : maf_newMfa(filename, "rm");
+    if (chunks[i]->map == NULL || chunks[i]->mapSize != size) {
+      fprintf(stderr, "Error, %s changed while being read\n", filename);
+      exit(EXIT_FAILURE);
+    }
+    if (i > 0) {
+      // one dictionary for the whole file, so that ids agree across chunks
+      maf_destroyMafNameDict(chunks[i]->names);
+      chunks[i]->names = maf_mafNameDict_share(whole->names);
+      chunks[i]->formatKnown = true;
+    }
+    chunks[i]->bufferStart = starts[i];
+    chunks[i]->bufferEnd = starts[i + 1];
+    chunks[i]->lineNumber = lineNumber;
+    lineNumber += counts[i].newlines;
+  }
+  *numberOfChunks = m;
+  free(starts);
+  free(counts);
+  free(threads);
+  return chunks;
+}
+void maf_destroyMfaChunks(mafFileApi_t **chunks, unsigned n) {
+  for (unsigned i = 0; i < n; ++i) {
+    maf_destroyMfa(chunks[i]);
+  }
+  free(chunks);
+}
+static void* maf_readChunk(void *p) {
+  mafChunkReader_t *r = (mafChunkReader_t *) p;
+  maf_mafFileApi_setLazyParsing(r->mfa, r->lazy);
+  mafBlock_t *mb = maf_newMafBlock();
+  while (maf_readBlockInto(r->mfa, mb) != NULL) {
+    r->f(mb, r->chunk, r->data);
+  }
+  maf_destroyMafBlockList(mb);
+  return NULL;
+}
+unsigned maf_readBlocksParallel(const char *filename, unsigned n, bool lazy,
+                                void (*f)(mafBlock_t *mb, unsigned chunk, void *data), void *data) {
+  // call f on every block of filename, the header included, reading up to n
+  // chunks on their own threads. Blocks of a chunk are passed to f in order on
+  // that chunk's thread, and are reused once f returns. Returns the number of
+  // chunks, chunk 0 being the start of the file, so that results kept per
+  // chunk can be put back together in order.
+  unsigned m = 0;
+  mafFileApi_t **chunks = maf_newMfaChunks(filename, n, &m);
+  mafChunkReader_t *readers = (mafChunkReader_t *) de_malloc(sizeof(*readers) * m);
+  pthread_t *threads = (pthread_t *) de_malloc(sizeof(*threads) * m);
+  for (unsigned i = 0; i < m; ++i) {
+    readers[i].mfa = chunks[i];
+    readers[i].chunk = i;
+    readers[i].lazy = lazy;
+    readers[i].f = f;
+    readers[i].data = data;
+    if (pthread_create(threads + i, NULL, maf_readChunk, readers + i) != 0) {
+      fprintf(stderr, "Error, unable to start a thread\n");
+      exit(EXIT_FAILURE);
+    }
+  }
+  for (unsigned i = 0; i < m; ++i) {
+    pthread_join(threads[i], NULL);
+  }
+  maf_destroyMfaChunks(chunks, m);
+  free(readers);
+  free(threads);
+  return m;
+}
+/*
+ * pipelined reading
+ */
+const unsigned kMafBlockPipelineDepth = 64;
+struct mafBlockPipeline {
+  // blocks read ahead by a reader thread into a bounded ring, see maf_newMafBlockPipeline()
+  mafFileApi_t *mfa;
+  mafBlock_t **ring;
+  unsigned capacity;
+  unsigned head; // index of the oldest block in ring
+  unsigned count; // number of blocks in ring
+  bool done; // the reader has reached the end of the file
+  bool stop; // the consumer has gone away
+  bool threaded;
+  pthread_mutex_t lock;
+  pthread_cond_t notEmpty;
+  pthread_cond_t notFull;
+  pthread_t thread;
+};
+static void* maf_mafBlockPipeline_read(void *p) {
+  // reader thread, parse blocks into the ring until the end of the file or until told to stop
+  mafBlockPipeline_t *bp = (mafBlockPipeline_t *) p;
+  while (true) {
+    mafBlock_t *mb = maf_readBlock(bp->mfa);
+    pthread_mutex_lock(&(bp->lock));
+    while (mb != NULL && bp->count == bp->capacity && !bp->stop) {
+      pthread_cond_wait(&(bp->notFull), &(bp->lock));
+    }
+    if (mb == NULL || bp->stop) {
+      bp->done = true;
+      pthread_cond_signal(&(bp->notEmpty));
+      pthread_mutex_unlock(&(bp->lock));
+      maf_destroyMafBlockList(mb);
+      return NULL;
+    }
+    bp->ring[(bp->head + bp->count) % bp->capacity] = mb;
+    ++(bp->count);
+    pthread_cond_signal(&(bp->notEmpty));
+    pthread_mutex_unlock(&(bp->lock));
+  }
+}
+mafBlockPipeline_t* maf_newMafBlockPipeline(mafFileApi_t *mfa, unsigned capacity) {
+  // read the blocks of mfa on a separate thread, up to capacity blocks ahead of
+  // the caller, so that reading and parsing overlap with whatever the caller
+  // does with each block. A capacity of 0 reads on the calling thread instead.
+  // mfa must not be used by anything else until the pipeline is destroyed.
+  mafBlockPipeline_t *bp = (mafBlockPipeline_t *) de_malloc(sizeof(*bp));
+  bp->mfa = mfa;
+  bp->capacity = capacity;
+  bp->head = 0;
+  bp->count = 0;
+  bp->done = false;
+  bp->stop = false;
+  bp->threaded = (capacity > 0);
+  bp->ring = NULL;
+  if (!bp->threaded) {
+    return bp;
+  }
+  bp->ring = (mafBlock_t **) de_malloc(sizeof(*(bp->ring)) * capacity);
+  pthread_mutex_init(&(bp->lock), NULL);
+  pthread_cond_init(&(bp->notEmpty), NULL);
+  pthread_cond_init(&(bp->notFull), NULL);
+  if (pthread_create(&(bp->thread), NULL, maf_mafBlockPipeline_read, bp) != 0) {
+    fprintf(stderr, "Error, unable to start a thread\n");
+    exit(EXIT_FAILURE);
+  }
+  return bp;
+}
+mafBlock_t* maf_mafBlockPipeline_readBlock(mafBlockPipeline_t *bp) {
+  // the next block of the file, in order, or NULL at the end. As with
+  // maf_readBlock() the caller owns the block.
+  if (!bp->threaded) {
+    return maf_readBlock(bp->mfa);
+  }
+  pthread_mutex_lock(&(bp->lock));
+  while (bp->count == 0 && !bp->done) {
+    pthread_cond_wait(&(bp->notEmpty), &(bp->lock));
+  }
+  mafBlock_t *mb = NULL;
+  if (bp->count > 0) {
+    mb = bp->ring[bp->head];
+    bp->head = (bp->head + 1) % bp->capacity;
+    --(bp->count);
+    pthread_cond_signal(&(bp->notFull));
+  }
+  pthread_mutex_unlock(&(bp->lock));
+  return mb;
+}
+void maf_destroyMafBlockPipeline(mafBlockPipeline_t *bp) {
+  // stop the reader and free any blocks it read that were never asked for.
+  // The mafFileApi_t is left open.
+  if (bp == NULL) {
+    return;
+  }
+  if (bp->threaded) {
+    pthread_mutex_lock(&(bp->lock));
+    bp->stop = true;
+    pthread_cond_signal(&(bp->notFull));
+    pthread_mutex_unlock(&(bp->lock));
+    pthread_join(bp->thread, NULL);
+    for (unsigned i = 0; i < bp->count; ++i) {
+      maf_destroyMafBlockList(bp->ring[(bp->head + i) % bp->capacity]);
+    }
+    pthread_mutex_destroy(&(bp->lock));
+    pthread_cond_destroy(&(bp->notEmpty));
+    pthread_cond_destroy(&(bp->notFull));
+  }
+  free(bp->ring);
+  free(bp);
+}
+/*
+ * ordered parallel processing
+ */
+typedef struct mafOrderedSlot {
+  // one block in flight, see maf_processBlocksInOrder()
+  mafBlock_t *mb;
+  char *output; // what the callback wrote for mb
+  size_t outputSize;
+  bool done;
+} mafOrderedSlot_t;
+typedef struct mafOrderedPool {
+  mafOrderedSlot_t *slots; // a window of sequence numbers, slot i % window holds block i
+  uint64_t window;
+  uint64_t nextRead; // sequence number of the next block read
+  uint64_t nextProcess; // sequence number of the next block handed to a worker
+  uint64_t nextWrite; // sequence number of the next block written
+  bool eof;
+  void (*f)(mafBlock_t *mb, uint64_t i, FILE *out, void *data);
+  void *data;
+  FILE *out;
+  pthread_mutex_t lock;
+  pthread_cond_t work; // a block has been read, or the input is exhausted
+  pthread_cond_t ready; // a block has been processed
+  pthread_cond_t space; // a block has been written, freeing its slot
+} mafOrderedPool_t;
+static void* maf_orderedPool_work(void *p) {
+  // worker thread, run the callback on blocks in turn with its output captured in memory
+  mafOrderedPool_t *pool = (mafOrderedPool_t *) p;
+  pthread_mutex_lock(&(pool->lock));
+  while (true) {
+    while (pool->nextProcess == pool->nextRead && !pool->eof) {
+      pthread_cond_wait(&(pool->work), &(pool->lock));
+    }
+    if (pool->nextProcess == pool->nextRead) {
+      break;
+    }
+    uint64_t i = pool->nextProcess++;
+    mafOrderedSlot_t *slot = pool->slots + (i % pool->window);
+    pthread_mutex_unlock(&(pool->lock));
+    char *output = NULL;
+    size_t outputSize = 0;
+    FILE *f = open_memstream(&output, &outputSize);
+    if (f == NULL) {
+      fprintf(stderr, "Error, unable to open a memory stream\n");
+      exit(EXIT_FAILURE);
+    }
+    pool->f(slot->mb, i, f, pool->data);
+    fclose(f);
+    maf_destroyMafBlockList(slot->mb);
+    pthread_mutex_lock(&(pool->lock));
+    slot->mb = NULL;
+    slot->output = output;
+    slot->outputSize = outputSize;
+    slot->done = true;
+    if (i == pool->nextWrite) {
+      pthread_cond_signal(&(pool->ready));
+    }
+  }
+  pthread_mutex_unlock(&(pool->lock));
+  return NULL;
+}
+static void* maf_orderedPool_write(void *p) {
+  // writer thread, write the captured output of each block in input order
+  mafOrderedPool_t *pool = (mafOrderedPool_t *) p;
+  pthread_mutex_lock(&(pool->lock));
+  while (true) {
+    mafOrderedSlot_t *slot = pool->slots + (pool->nextWrite % pool->window);
+    while (!(pool->nextWrite < pool->nextRead && slot->done) &&
+           !(pool->eof && pool->nextWrite == pool->nextRead)) {
+      pthread_cond_wait(&(pool->ready), &(pool->lock));
+    }
+    if (pool->nextWrite == pool->nextRead) {
+      break;
+    }
+    pthread_mutex_unlock(&(pool->lock));
+    if (slot->outputSize > 0 && fwrite(slot->output, 1, slot->outputSize, pool->out) != slot->outputSize) {
+      fprintf(stderr, "Error, unable to write output\n");
+      exit(EXIT_FAILURE);
+    }
+    free(slot->output);
+    pthread_mutex_lock(&(pool->lock));
+    slot->output = NULL;
+    slot->done = false;
+    ++(pool->nextWrite);
+    pthread_cond_signal(&(pool->space));
+  }
+  pthread_mutex_unlock(&(pool->lock));
+  return NULL;
+}
+void maf_processBlocksInOrder(mafFileApi_t *mfa, unsigned threads,
+                              void (*f)(mafBlock_t *mb, uint64_t i, FILE *out, void *data), void *data, FILE *out) {
+  // call f on every remaining block of mfa, along with the block's position
+  // amongst them (from 0), with f writing whatever it has to say about a
+  // block to the FILE it is given. With more than one thread f
+  // runs on a pool of workers, each writing to memory, and the output of each
+  // block is written to out in input order, so the result is byte for byte
+  // what a single thread writes. At most a few blocks per thread are held at
+  // any one time. f must not keep the block, nor touch state shared with
+  // other blocks without its own locking.
+  if (threads <= 1) {
+    mafBlock_t *mb = maf_newMafBlock();
+    for (uint64_t i = 0; maf_readBlockInto(mfa, mb) != NULL; ++i) {
+      f(mb, i, out, data);
+    }
+    maf_destroyMafBlockList(mb);
+    return;
+  }
+  mafOrderedPool_t pool;
+  pool.window = 4 * (uint64_t) threads;
+  pool.slots = (mafOrderedSlot_t *) de_malloc(sizeof(*(pool.slots)) * pool.window);
+  memset(pool.slots, 0, sizeof(*(pool.slots)) * pool.window);
+  pool.nextRead = 0;
+  pool.nextProcess = 0;
+  pool.nextWrite = 0;
+  pool.eof = false;
+  pool.f = f;
+  pool.data = data;
+  pool.out = out;
+  pthread_mutex_init(&(pool.lock), NULL);
+  pthread_cond_init(&(pool.work), NULL);
+  pthread_cond_init(&(pool.ready), NULL);
+  pthread_cond_init(&(pool.space), NULL);
+  fflush(out);
+  pthread_t *workers = (pthread_t *) de_malloc(sizeof(*workers) * threads);
+  pthread_t writer;
+  for (unsigned i = 0; i < threads; ++i) {
+    if (pthread_create(workers + i, NULL, maf_orderedPool_work, &pool) != 0) {
+      fprintf(stderr, "Error, unable to start a thread\n");
+      exit(EXIT_FAILURE);
+    }
+  }
+  if (pthread_create(&writer, NULL, maf_orderedPool_write, &pool) != 0) {
+    fprintf(stderr, "Error, unable to start a thread\n");
+    exit(EXIT_FAILURE);
+  }
+  mafBlock_t *mb = NULL;
+  while ((mb = maf_readBlock(mfa)) != NULL) {
+    pthread_mutex_lock(&(pool.lock));
+    while (pool.nextRead - pool.nextWrite == pool.window) {
+      pthread_cond_wait(&(pool.space), &(pool.lock));
+    }
+    pool.slots[pool.nextRead % pool.window].mb = mb;
+    ++(pool.nextRead);
+    pthread_cond_signal(&(pool.work));
+    pthread_mutex_unlock(&(pool.lock));
+  }
+  pthread_mutex_lock(&(pool.lock));
+  pool.eof = true;
+  pthread_cond_broadcast(&(pool.work));
+  pthread_cond_broadcast(&(pool.ready));
+  pthread_mutex_unlock(&(pool.lock));
+  for (unsigned i = 0; i < threads; ++i) {
+    pthread_join(workers[i], NULL);
+  }
+  pthread_join(writer, NULL);
+  pthread_mutex_destroy(&(pool.lock));
+  pthread_cond_destroy(&(pool.work));
+  pthread_cond_destroy(&(pool.ready));
+  pthread_cond_destroy(&(pool.space));
+  free(pool.slots);
+  free(workers);
+}
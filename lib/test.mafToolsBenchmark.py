@@ -0,0 +1,83 @@
+##################################################
+# Copyright (C) 2013 by
+# Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+# ... and other members of the Reconstruction Team of David Haussler's
+# lab (BME Dept. UCSC).
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+##################################################
+import os
+import sys
+import unittest
+import mafToolsTest as mtt
+import mafToolsBenchmark as mtb
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]), '../mafValidator/src/')))
+import mafValidator
+
+def result(tool, tier, wall, rss):
+    return {'tool': tool, 'tier': tier, 'wallSeconds': wall, 'peakResidentBytes': rss}
+
+class BenchmarkTest(unittest.TestCase):
+    def testGenerateMaf(self):
+        """ generateMaf() should write well formed mafs that depend only on its arguments.
+        """
+        mtt.makeTempDirParent()
+        tmpDir = os.path.abspath(mtt.makeTempDir('generateMaf'))
+        options = mafValidator.GenericValidationOptions()
+        options.lookForDuplicateColumns = True
+        for i, args in enumerate([{}, {'numSpecies': 3, 'degree': 9, 'width': 5, 'gapRate': 0.5,
+                                       'reverseRate': 1.0, 'duplicationRate': 0.5}]):
+            paths = [os.path.join(tmpDir, 'synthetic.%d.%d.maf' % (i, j)) for j in xrange(0, 3)]
+            info = mtb.generateMaf(paths[0], 50000, seed=3, **args)
+            mtb.generateMaf(paths[1], 50000, seed=3, **args)
+            mtb.generateMaf(paths[2], 50000, seed=4, **args)
+            self.assertTrue(info['blocks'] > 0)
+            self.assertTrue(info['bytes'] >= 50000)
+            self.assertEqual(info['bytes'], os.path.getsize(paths[0]))
+            self.assertEqual(open(paths[0]).read(), open(paths[1]).read())
+            self.assertNotEqual(open(paths[0]).read(), open(paths[2]).read())
+            self.assertTrue(mafValidator.validateMaf(paths[0], options))
+        mtt.removeDir(tmpDir)
+    def testParseTiers(self):
+        """ parseTiers() should accept tier names and name=bytes.
+        """
+        self.assertEqual(mtb.parseTiers('small,x=3k,y=2M,z=10'),
+                         [('small', 1 << 20), ('x', 3 << 10), ('y', 2 << 20), ('z', 10)])
+        self.assertRaises(ValueError, mtb.parseTiers, 'enormous')
+    def testCompareResults(self):
+        """ compareResults() should flag slow downs and memory growth beyond the threshold.
+        """
+        baseline = {'results': [result('a', 'small', 1.0, 100), result('b', 'small', 1.0, 100),
+                                result('c', 'small', 0.001, 100), result('a', 'large', 10.0, 100),
+                                {'tool': 'd', 'tier': 'small', 'skipped': 'not built'}]}
+        current = {'results': [result('a', 'small', 1.05, 100), result('b', 'small', 2.0, 200),
+                               result('c', 'small', 0.01, 100), result('a', 'large', 5.0, 111),
+                               result('d', 'small', 1.0, 100), result('e', 'small', 1.0, 100)]}
+        comparisons = dict(((c['tool'], c['tier']), c)
+                           for c in mtb.compareResults(baseline, current, threshold=0.1))
+        self.assertEqual(sorted(comparisons.keys()),
+                         [('a', 'large'), ('a', 'small'), ('b', 'small'), ('c', 'small')])
+        self.assertEqual(comparisons[('a', 'small')]['regressions'], [])
+        self.assertEqual(comparisons[('b', 'small')]['regressions'], ['wallSeconds', 'peakResidentBytes'])
+        self.assertEqual(comparisons[('c', 'small')]['regressions'], [])
+        self.assertEqual(comparisons[('a', 'large')]['regressions'], ['peakResidentBytes'])
+        self.assertAlmostEqual(comparisons[('a', 'large')]['wallSeconds'], 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
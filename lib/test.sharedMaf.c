@@ -23,16 +23,20 @@
  * THE SOFTWARE.
  */
 #include <assert.h>
+#include <ctype.h>
 #include <inttypes.h>
+#include <math.h>
 #include <stdbool.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
 #include <sys/stat.h>
 #include <unistd.h>
+#include <zlib.h>
 #include "CuTest.h"
 #include "common.h"
 #include "sharedMaf.h"
+#include "seqKernels.h"
 #include "test.sharedMaf.h"
 
 int createTmpFolder(void) {
@@ -656,6 +660,1642 @@ i panTro4.chr15 N 0 C 0\n\
   maf_destroyMfa(mapi);
   free(input);
 }
+static void test_readLine_0(CuTest *testCase) {
+  // lines come back without their newlines or carriage returns, a line
+  // larger than the read buffer survives intact, and an unterminated final
+  // line is treated as the end of the file, as with de_getline(), whether
+  // the file is streamed or mapped.
+  assert(testCase != NULL);
+  createTmpFolder();
+  size_t longLength = (1 << 21) + 17;
+  char *longLine = (char*) de_malloc(longLength + 1);
+  memset(longLine, 'A', longLength);
+  longLine[longLength] = '\0';
+  FILE *f = de_fopen("test_tmp/test.maf", "w+");
+  fprintf(f, "##maf version=1\r\n\r\na score=0\n%s\nunterminated", longLine);
+  fclose(f);
+  const char *modes[] = {"r", "rm", "rmp"};
+  for (unsigned i = 0; i < sizeof(modes) / sizeof(*modes); ++i) {
+    mafFileApi_t *mfa = maf_newMfa("test_tmp/test.maf", modes[i]);
+    char *line = NULL;
+    CuAssertTrue(testCase, maf_mafFileApi_readLine(mfa, &line) == 15);
+    CuAssertStrEquals(testCase, "##maf version=1", line);
+    CuAssertTrue(testCase, maf_mafFileApi_readLine(mfa, &line) == 0);
+    CuAssertStrEquals(testCase, "", line);
+    CuAssertTrue(testCase, maf_mafFileApi_readLine(mfa, &line) == 9);
+    CuAssertStrEquals(testCase, "a score=0", line);
+    CuAssertTrue(testCase, maf_mafFileApi_readLine(mfa, &line) == (int64_t) longLength);
+    CuAssertStrEquals(testCase, longLine, line);
+    CuAssertTrue(testCase, maf_mafFileApi_readLine(mfa, &line) == -1);
+    CuAssertTrue(testCase, maf_mafFileApi_readLine(mfa, &line) == -1);
+    // the line reader does not count lines, maf_readBlock() does that
+    CuAssertTrue(testCase, maf_mafFileApi_getLineNumber(mfa) == 0);
+    maf_destroyMfa(mfa);
+  }
+  free(longLine);
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+}
+static void test_readBlock_crlf(CuTest *testCase) {
+  // windows line endings should not change what is read or the line numbers
+  assert(testCase != NULL);
+  createTmpFolder();
+  char *input = de_strdup("##maf version=1\r\n"
+                          "\r\n"
+                          "a score=0\r\n"
+                          "s hg18.chr7    27578828 4 + 158545518 AA-GG\r\n"
+                          "s panTro1.chr6 28741140 5 + 161576975 AAGGG\r\n"
+                          "\r\n"
+                          "a score=1\r\n"
+                          "s hg18.chr7    27699739 6 + 158545518 TAAAGA\r\n"
+                          "\r\n");
+  writeStringToTmpFile(input);
+  mafFileApi_t *mfa = maf_newMfa("test_tmp/test.maf", "r");
+  mafBlock_t *mb = maf_readBlock(mfa);
+  CuAssertStrEquals(testCase, "##maf version=1", maf_mafLine_getLine(maf_mafBlock_getHeadLine(mb)));
+  maf_destroyMafBlockList(mb);
+  mb = maf_readBlock(mfa);
+  mafLine_t *ml = maf_mafBlock_getHeadLine(mb);
+  CuAssertStrEquals(testCase, "a score=0", maf_mafLine_getLine(ml));
+  CuAssertTrue(testCase, maf_mafLine_getLineNumber(ml) == 3);
+  ml = maf_mafLine_getNext(ml);
+  CuAssertStrEquals(testCase, "AA-GG", maf_mafLine_getSequence(ml));
+  CuAssertTrue(testCase, maf_mafLine_getLineNumber(ml) == 4);
+  CuAssertTrue(testCase, maf_mafBlock_getNumberOfSequences(mb) == 2);
+  maf_destroyMafBlockList(mb);
+  mb = maf_readBlock(mfa);
+  ml = maf_mafBlock_getHeadLine(mb);
+  CuAssertStrEquals(testCase, "a score=1", maf_mafLine_getLine(ml));
+  CuAssertTrue(testCase, maf_mafLine_getLineNumber(ml) == 7);
+  CuAssertStrEquals(testCase, "TAAAGA", maf_mafLine_getSequence(maf_mafLine_getNext(ml)));
+  maf_destroyMafBlockList(mb);
+  CuAssertTrue(testCase, maf_readBlock(mfa) == NULL);
+  CuAssertTrue(testCase, maf_mafFileApi_getLineNumber(mfa) == 9);
+  maf_destroyMfa(mfa);
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+  free(input);
+}
+static void test_readBlockInto_0(CuTest *testCase) {
+  // reading into a reused block must give the same blocks as maf_readBlock()
+  assert(testCase != NULL);
+  createTmpFolder();
+  char *input = de_strdup("track name=euArc visibility=pack \n\
+##maf version=1 scoring=tba.v8 \n\
+a score=23262.0     \n\
+s hg18.chr7    27578828 38 + 158545518 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG\n\
+# generic comment\n\
+s panTro1.chr6 28741140 38 - 161576975 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG\n\
+i panTro1.chr6 N 0 C 0\n\
+\n\
+\n\
+a score=5062.0                    \n\
+s hg18.chr7    27699739 6 + 158545518 TAAAGA\n\
+s baboon         241163 6 +   4622798 TAAAGA \n\
+e mm4.chr6     53310102 13 + 151104725 I\n\
+\n\
+a score=6636.0\n\
+s hg18.chr7    27707221 13 + 158545518 gcagctgaaaaca\n\
+\n");
+  writeStringToTmpFile(input);
+  mafFileApi_t *mfaA = maf_newMfa("test_tmp/test.maf", "r");
+  mafFileApi_t *mfaB = maf_newMfa("test_tmp/test.maf", "r");
+  mafBlock_t *reused = maf_newMafBlock();
+  mafBlock_t *mb = NULL;
+  unsigned n = 0;
+  while ((mb = maf_readBlock(mfaA)) != NULL) {
+    CuAssertTrue(testCase, maf_readBlockInto(mfaB, reused) == reused);
+    CuAssertTrue(testCase, mafBlocksAreEqual(mb, reused));
+    CuAssertTrue(testCase, maf_mafBlock_getSequenceFieldLength(mb) ==
+                 maf_mafBlock_getSequenceFieldLength(reused));
+    CuAssertStrEquals(testCase, maf_mafLine_getLine(maf_mafBlock_getTailLine(mb)),
+                      maf_mafLine_getLine(maf_mafBlock_getTailLine(reused)));
+    if (n == 1) {
+      // lines linked in by the caller are cleaned up when the block is reused
+      maf_mafLine_setNext(maf_mafBlock_getTailLine(reused), maf_newMafLineFromString("# extra", 0));
+    }
+    maf_destroyMafBlockList(mb);
+    ++n;
+  }
+  CuAssertTrue(testCase, n == 4);
+  CuAssertTrue(testCase, maf_readBlockInto(mfaB, reused) == NULL);
+  CuAssertTrue(testCase, maf_mafFileApi_getLineNumber(mfaA) == maf_mafFileApi_getLineNumber(mfaB));
+  maf_destroyMafBlockList(reused);
+  maf_destroyMfa(mfaA);
+  maf_destroyMfa(mfaB);
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+  free(input);
+}
+static void test_sequenceViews_0(CuTest *testCase) {
+  // sequence fields are views into the line text, and modifying them must
+  // not change the line that was read
+  assert(testCase != NULL);
+  mafLine_t *ml = maf_newMafLineFromString("s hg18.chr7    27578828 4 + 158545518 AC-GT", 1);
+  char *line = maf_mafLine_getLine(ml);
+  char *seq = maf_mafLine_getSequence(ml);
+  CuAssertTrue(testCase, seq >= line && seq < line + strlen(line));
+  CuAssertStrEquals(testCase, "AC-GT", seq);
+  CuAssertStrEquals(testCase, "hg18.chr7", maf_mafLine_getSpecies(ml));
+  mafLine_t *copy = maf_copyMafLine(ml);
+  CuAssertStrEquals(testCase, line, maf_mafLine_getLine(copy));
+  CuAssertStrEquals(testCase, "AC-GT", maf_mafLine_getSequence(copy));
+  char *mutable = maf_mafLine_getMutableSequence(copy);
+  CuAssertTrue(testCase, mutable == maf_mafLine_getMutableSequence(copy));
+  mutable[0] = 'T';
+  CuAssertStrEquals(testCase, "TC-GT", maf_mafLine_getSequence(copy));
+  CuAssertStrEquals(testCase, line, maf_mafLine_getLine(copy));
+  // trailing whitespace means the sequence is not the tail of the line
+  mafLine_t *ml2 = maf_newMafLineFromString("s baboon 241163 6 + 4622798 TAAAGA ", 2);
+  CuAssertStrEquals(testCase, "TAAAGA", maf_mafLine_getSequence(ml2));
+  CuAssertTrue(testCase, maf_mafLine_getSequenceFieldLength(ml2) == 6);
+  maf_destroyMafLineList(ml);
+  maf_destroyMafLineList(copy);
+  maf_destroyMafLineList(ml2);
+}
+static void test_flipBlockStrand_lineText(CuTest *testCase) {
+  // flipping a block read from file reverse complements the sequences but
+  // leaves the original line text alone, in reused blocks as well
+  assert(testCase != NULL);
+  createTmpFolder();
+  char *input = de_strdup("##maf version=1\n\
+\n\
+a score=0\n\
+s hg18.chr7    27578828 5 + 158545518 ACG-TA\n\
+s panTro1.chr6 28741140 5 - 161576975 ACG-TA\n\
+\n\
+a score=1\n\
+s hg18.chr7    27578833 2 + 158545518 gg\n\
+\n");
+  writeStringToTmpFile(input);
+  mafFileApi_t *mfa = maf_newMfa("test_tmp/test.maf", "r");
+  mafBlock_t *mb = maf_newMafBlock();
+  CuAssertTrue(testCase, maf_readBlockInto(mfa, mb) != NULL); // header
+  CuAssertTrue(testCase, maf_readBlockInto(mfa, mb) != NULL);
+  maf_mafBlock_flipStrand(mb);
+  mafLine_t *ml = maf_mafLine_getNext(maf_mafBlock_getHeadLine(mb));
+  CuAssertStrEquals(testCase, "TA-CGT", maf_mafLine_getSequence(ml));
+  CuAssertStrEquals(testCase, "s hg18.chr7    27578828 5 + 158545518 ACG-TA", maf_mafLine_getLine(ml));
+  CuAssertTrue(testCase, maf_readBlockInto(mfa, mb) != NULL);
+  ml = maf_mafLine_getNext(maf_mafBlock_getHeadLine(mb));
+  CuAssertStrEquals(testCase, "gg", maf_mafLine_getSequence(ml));
+  maf_destroyMafBlockList(mb);
+  maf_destroyMfa(mfa);
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+  free(input);
+}
+static void test_lazyParsing_0(CuTest *testCase) {
+  // lazily read blocks must look the same as eagerly read ones through the
+  // getters, whichever reader and whichever order the fields are asked for in
+  assert(testCase != NULL);
+  createTmpFolder();
+  char *input = de_strdup("##maf version=1 scoring=tba.v8 \n\
+a score=23262.0     \n\
+s hg18.chr7    27578828 38 + 158545518 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG\n\
+s panTro1.chr6 28741140 38 - 161576975 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG\n\
+i panTro1.chr6 N 0 C 0\n\
+\n\
+a score=5062.0                    \n\
+s hg18.chr7    27699739 6 + 158545518 TAAAGA\n\
+s baboon         241163 6 +   4622798 TAAAGA \n\
+e mm4.chr6     53310102 13 + 151104725 I\n\
+\n");
+  writeStringToTmpFile(input);
+  mafFileApi_t *eager = maf_newMfa("test_tmp/test.maf", "r");
+  mafFileApi_t *lazyA = maf_newMfa("test_tmp/test.maf", "r");
+  mafFileApi_t *lazyB = maf_newMfa("test_tmp/test.maf", "r");
+  maf_mafFileApi_setLazyParsing(lazyA, true);
+  maf_mafFileApi_setLazyParsing(lazyB, true);
+  mafBlock_t *reused = maf_newMafBlock();
+  mafBlock_t *mb = NULL, *lb = NULL;
+  unsigned n = 0;
+  while ((mb = maf_readBlock(eager)) != NULL) {
+    lb = maf_readBlock(lazyA);
+    CuAssertTrue(testCase, maf_readBlockInto(lazyB, reused) == reused);
+    // the block's sequence field length is worked out on demand
+    CuAssertTrue(testCase, maf_mafBlock_getSequenceFieldLength(mb) ==
+                 maf_mafBlock_getSequenceFieldLength(reused));
+    mafBlock_t *copy = maf_copyMafBlock(lb);
+    CuAssertTrue(testCase, mafBlocksAreEqual(mb, lb));
+    CuAssertTrue(testCase, mafBlocksAreEqual(mb, reused));
+    CuAssertTrue(testCase, mafBlocksAreEqual(mb, copy));
+    CuAssertTrue(testCase, maf_mafBlock_getSequenceFieldLength(mb) == maf_mafBlock_getSequenceFieldLength(lb));
+    maf_destroyMafBlockList(mb);
+    maf_destroyMafBlockList(lb);
+    maf_destroyMafBlockList(copy);
+    ++n;
+  }
+  CuAssertTrue(testCase, n == 3);
+  maf_destroyMafBlockList(reused);
+  maf_destroyMfa(eager);
+  maf_destroyMfa(lazyA);
+  maf_destroyMfa(lazyB);
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+  free(input);
+}
+static void test_lazyParsing_1(CuTest *testCase) {
+  // numeric fields of a lazy line are read independently of the species and
+  // sequence, and setters are not undone by a later lazy parse
+  assert(testCase != NULL);
+  createTmpFolder();
+  char *input = de_strdup("##maf version=1\n\
+\n\
+a score=0\n\
+s hg18.chr7    27578828 5 - 158545518 ACG-TA\n\
+s panTro1.chr6 28741140 5 + 161576975 ACG-TA\n\
+\n");
+  writeStringToTmpFile(input);
+  mafFileApi_t *mfa = maf_newMfa("test_tmp/test.maf", "r");
+  maf_mafFileApi_setLazyParsing(mfa, true);
+  mafBlock_t *mb = maf_newMafBlock();
+  CuAssertTrue(testCase, maf_readBlockInto(mfa, mb) != NULL); // header
+  CuAssertTrue(testCase, maf_readBlockInto(mfa, mb) != NULL);
+  mafLine_t *ml = maf_mafLine_getNext(maf_mafBlock_getHeadLine(mb));
+  CuAssertTrue(testCase, maf_mafLine_getPositiveCoord(ml) == 158545518 - 27578828 - 1);
+  CuAssertTrue(testCase, maf_mafLine_getStrand(ml) == '-');
+  maf_mafLine_setSpecies(ml, de_strdup("hg19.chr7"));
+  CuAssertStrEquals(testCase, "ACG-TA", maf_mafLine_getSequence(ml));
+  CuAssertStrEquals(testCase, "hg19.chr7", maf_mafLine_getSpecies(ml));
+  ml = maf_mafLine_getNext(ml);
+  maf_mafLine_setStart(ml, 7);
+  CuAssertTrue(testCase, maf_mafLine_getStart(ml) == 7);
+  CuAssertTrue(testCase, maf_mafLine_getSourceLength(ml) == 161576975);
+  CuAssertStrEquals(testCase, "panTro1.chr6", maf_mafLine_getSpecies(ml));
+  CuAssertTrue(testCase, maf_readBlockInto(mfa, mb) == NULL);
+  maf_destroyMafBlockList(mb);
+  maf_destroyMfa(mfa);
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+  free(input);
+}
+static void test_mappedInput_0(CuTest *testCase) {
+  // a memory mapped file must read exactly like a streamed one, with either
+  // reader, either parsing mode and mixed line endings
+  assert(testCase != NULL);
+  createTmpFolder();
+  char *input = de_strdup("track name=euArc visibility=pack \n"
+                          "##maf version=1 scoring=tba.v8 \r\n"
+                          "a score=23262.0     \n"
+                          "s hg18.chr7    27578828 38 + 158545518 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG\r\n"
+                          "s panTro1.chr6 28741140 38 - 161576975 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG\n"
+                          "\r\n"
+                          "\n"
+                          "a score=5062.0                    \n"
+                          "s hg18.chr7    27699739 6 + 158545518 TAAAGA\n"
+                          "s baboon         241163 6 +   4622798 TAAAGA \n"
+                          "\n"
+                          "a score=0\n"
+                          "s hg18.chr7    27707221 13 + 158545518 gcagctgaaaaca");
+  writeStringToTmpFile(input);
+  for (unsigned lazy = 0; lazy < 2; ++lazy) {
+    mafFileApi_t *streamed = maf_newMfa("test_tmp/test.maf", "r");
+    mafFileApi_t *mappedA = maf_newMfa("test_tmp/test.maf", "rm");
+    mafFileApi_t *mappedB = maf_newMfa("test_tmp/test.maf", "rmp");
+    maf_mafFileApi_setLazyParsing(mappedA, lazy);
+    maf_mafFileApi_setLazyParsing(mappedB, lazy);
+    mafBlock_t *reused = maf_newMafBlock();
+    mafBlock_t *mb = NULL, *mapped = NULL;
+    unsigned n = 0;
+    while ((mb = maf_readBlock(streamed)) != NULL) {
+      mapped = maf_readBlock(mappedA);
+      CuAssertTrue(testCase, maf_readBlockInto(mappedB, reused) == reused);
+      CuAssertTrue(testCase, mafBlocksAreEqual(mb, mapped));
+      CuAssertTrue(testCase, mafBlocksAreEqual(mb, reused));
+      CuAssertStrEquals(testCase, maf_mafLine_getLine(maf_mafBlock_getTailLine(mb)),
+                        maf_mafLine_getLine(maf_mafBlock_getTailLine(reused)));
+      maf_destroyMafBlockList(mb);
+      maf_destroyMafBlockList(mapped);
+      ++n;
+    }
+    CuAssertTrue(testCase, n == 4);
+    CuAssertTrue(testCase, maf_readBlock(mappedA) == NULL);
+    CuAssertTrue(testCase, maf_readBlockInto(mappedB, reused) == NULL);
+    CuAssertTrue(testCase, maf_mafFileApi_getLineNumber(streamed) == maf_mafFileApi_getLineNumber(mappedB));
+    maf_destroyMafBlockList(reused);
+    maf_destroyMfa(streamed);
+    maf_destroyMfa(mappedA);
+    maf_destroyMfa(mappedB);
+  }
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+  free(input);
+}
+static bool blockOverlaps(mafBlock_t *mb, const char *name, uint64_t start, uint64_t stop) {
+  for (mafLine_t *ml = maf_mafBlock_getHeadLine(mb); ml != NULL; ml = maf_mafLine_getNext(ml)) {
+    if (maf_mafLine_getType(ml) != 's' || strcmp(maf_mafLine_getSpecies(ml), name) != 0) {
+      continue;
+    }
+    uint64_t left = maf_mafLine_getPositiveLeftCoord(ml);
+    if (maf_mafLine_getLength(ml) == 0 || (left <= stop && left + maf_mafLine_getLength(ml) > start)) {
+      return true;
+    }
+  }
+  return false;
+}
+static void test_mafIndex_0(CuTest *testCase) {
+  // index queries must find exactly the blocks a linear scan finds, read them
+  // back identically and stop being used once the maf changes
+  assert(testCase != NULL);
+  createTmpFolder();
+  char *input = de_strdup("##maf version=1 scoring=tba.v8\n"
+                          "a score=23262.0\n"
+                          "s hg18.chr7    27578828 38 + 158545518 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG\n"
+                          "s panTro1.chr6 28741140 38 - 161576975 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG\n"
+                          "\n"
+                          "\n"
+                          "\n"
+                          "a score=5062.0\n"
+                          "s hg18.chr7    27699739 6 + 158545518 TAAAGA\n"
+                          "s baboon         241163 6 +   4622798 TAAAGA\n"
+                          "e panTro1.chr6 28741178 0 - 161576975 I\n"
+                          "\n"
+                          "a score=0\n"
+                          "s hg18.chr7    27578830 13 + 158545518 gcagctgaaaaca\n"
+                          "s hg18.chr70          0 0 +       100 -------------\n"
+                          "s panTro1.chr6 132835784 13 - 161576975 gcagctgaaaaca\n"
+                          "\n");
+  writeStringToTmpFile(input);
+  CuAssertTrue(testCase, maf_newMafIndex("test_tmp/test.maf") == NULL);
+  maf_writeMafIndex("test_tmp/test.maf");
+  const char *names[] = {"hg18.chr7", "panTro1.chr6", "baboon", "hg18.chr70", "hg18", "mm9.chr1"};
+  const uint64_t regions[][2] = {{0, UINT64_MAX}, {27578828, 27578828}, {27578865, 27578865},
+                                 {27578866, 27699739}, {27699745, 27699745}, {28741140, 28741177},
+                                 {241168, 241168}, {0, 0}, {100, 100}};
+  const char *modes[] = {"r", "rm"};
+  for (unsigned m = 0; m < 2; ++m) {
+    mafIndex_t *idx = maf_newMafIndex("test_tmp/test.maf");
+    CuAssertTrue(testCase, idx != NULL);
+    mafFileApi_t *mfa = maf_newMfa("test_tmp/test.maf", modes[m]);
+    mafBlock_t *reused = maf_newMafBlock();
+    for (unsigned i = 0; i < sizeof(names) / sizeof(*names); ++i) {
+      for (unsigned j = 0; j < sizeof(regions) / sizeof(*regions); ++j) {
+        maf_mafIndex_clearHits(idx);
+        uint64_t hits = maf_mafIndex_query(idx, names[i], regions[j][0], regions[j][1]);
+        CuAssertTrue(testCase, hits == maf_mafIndex_getNumberOfHits(idx));
+        mafFileApi_t *linear = maf_newMfa("test_tmp/test.maf", "r");
+        mafBlock_t *mb = NULL;
+        uint64_t blockNumber = 0, h = 0;
+        while ((mb = maf_readBlock(linear)) != NULL) {
+          if (blockNumber > 0 && blockOverlaps(mb, names[i], regions[j][0], regions[j][1])) {
+            CuAssertTrue(testCase, h < hits);
+            CuAssertTrue(testCase, maf_mafIndex_getBlockNumber(idx, h) == blockNumber);
+            mafBlock_t *found = maf_mafIndex_readBlock(idx, mfa, h);
+            CuAssertTrue(testCase, mafBlocksAreEqual(mb, found));
+            CuAssertTrue(testCase, maf_mafBlock_getLineNumber(mb) == maf_mafBlock_getLineNumber(found));
+            CuAssertTrue(testCase, maf_mafIndex_readBlockInto(idx, mfa, h, reused) == reused);
+            CuAssertTrue(testCase, mafBlocksAreEqual(mb, reused));
+            CuAssertTrue(testCase, maf_mafBlock_getLineNumber(mb) == maf_mafBlock_getLineNumber(reused));
+            maf_destroyMafBlockList(found);
+            ++h;
+          }
+          maf_destroyMafBlockList(mb);
+          ++blockNumber;
+        }
+        CuAssertTrue(testCase, h == hits);
+        maf_destroyMfa(linear);
+      }
+    }
+    maf_mafIndex_clearHits(idx);
+    CuAssertTrue(testCase, maf_mafIndex_queryPrefix(idx, "hg18", 27578840, 27578840) == 2);
+    CuAssertTrue(testCase, maf_mafIndex_getBlockNumber(idx, 0) == 1);
+    CuAssertTrue(testCase, maf_mafIndex_getBlockNumber(idx, 1) == 3);
+    maf_destroyMafBlockList(reused);
+    maf_destroyMfa(mfa);
+    maf_destroyMafIndex(idx);
+  }
+  FILE *f = de_fopen("test_tmp/test.maf", "a");
+  fprintf(f, "a score=1\ns baboon 0 1 + 4622798 A\n\n");
+  fclose(f);
+  CuAssertTrue(testCase, maf_newMafIndex("test_tmp/test.maf") == NULL);
+  unlink("test_tmp/test.maf.mafidx");
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+  free(input);
+}
+static void writeRandomMaf(const char *filename, unsigned numBlocks) {
+  // a maf that spans many blocked gzip blocks
+  FILE *f = de_fopen(filename, "w");
+  fprintf(f, "##maf version=1 scoring=test\n\n");
+  srand(7);
+  for (unsigned i = 0; i < numBlocks; ++i) {
+    fprintf(f, "a score=%u\n", i);
+    for (unsigned j = 0; j < 3; ++j) {
+      char seq[61];
+      for (unsigned k = 0; k < 60; ++k) {
+        seq[k] = "ACGT"[rand() % 4];
+      }
+      seq[60] = '\0';
+      fprintf(f, "s species%u.chr%u %u 60 + 100000000 %s\n", j, i % 5, 100 * i + j, seq);
+    }
+    fprintf(f, "\n");
+  }
+  fclose(f);
+}
+static void test_bgzf_0(CuTest *testCase) {
+  // blocked gzip and plain gzip mafs must read exactly like the uncompressed
+  // maf, whatever the mode and number of threads, and blocked gzip must be
+  // indexable
+  assert(testCase != NULL);
+  createTmpFolder();
+  writeRandomMaf("test_tmp/test.maf", 2000);
+  mafFileApi_t *mfa = maf_newMfa("test_tmp/test.maf", "r");
+  mafBlock_t *all = maf_readAll(mfa);
+  maf_destroyMfa(mfa);
+  mfa = maf_newMfa("test_tmp/test.maf.gz", "w");
+  maf_writeAll(mfa, all);
+  maf_destroyMfa(mfa);
+  maf_destroyMafBlockList(all);
+  // any gzip reader reads blocked gzip
+  FILE *plain = de_fopen("test_tmp/test.maf", "r");
+  gzFile gz = gzopen("test_tmp/test.maf.gz", "r");
+  CuAssertTrue(testCase, gz != NULL);
+  char a[4096], b[4096];
+  size_t n = 0;
+  int m = 0;
+  while ((n = fread(a, 1, sizeof(a), plain)) > 0) {
+    m = gzread(gz, b, (unsigned) n);
+    CuAssertTrue(testCase, m == (int) n && memcmp(a, b, n) == 0);
+  }
+  CuAssertTrue(testCase, gzread(gz, b, 1) == 1 && b[0] == '\n' && gzread(gz, b, 1) == 0);
+  gzclose(gz);
+  // and plain gzip, written in two members
+  gz = gzopen("test_tmp/plain.maf.gz", "w");
+  rewind(plain);
+  while ((n = fread(a, 1, sizeof(a), plain)) > 0) {
+    gzwrite(gz, a, (unsigned) n);
+    if (ftell(plain) == 8192) {
+      gzclose(gz);
+      gz = gzopen("test_tmp/plain.maf.gz", "a");
+    }
+  }
+  gzclose(gz);
+  fclose(plain);
+  const char *filenames[] = {"test_tmp/test.maf.gz", "test_tmp/test.maf.gz", "test_tmp/test.maf.gz",
+                             "test_tmp/plain.maf.gz"};
+  const char *modes[] = {"r", "rm", "r", "rm"};
+  const unsigned threads[] = {0, 3, 1, 2};
+  for (unsigned i = 0; i < sizeof(modes) / sizeof(*modes); ++i) {
+    mafFileApi_t *expected = maf_newMfa("test_tmp/test.maf", "r");
+    mafFileApi_t *compressed = maf_newMfa(filenames[i], modes[i]);
+    maf_mafFileApi_setDecompressionThreads(compressed, threads[i]);
+    mafBlock_t *mb = NULL, *reused = maf_newMafBlock();
+    unsigned blocks = 0;
+    while ((mb = maf_readBlock(expected)) != NULL) {
+      CuAssertTrue(testCase, maf_readBlockInto(compressed, reused) == reused);
+      CuAssertTrue(testCase, mafBlocksAreEqual(mb, reused));
+      CuAssertTrue(testCase, maf_mafBlock_getLineNumber(mb) == maf_mafBlock_getLineNumber(reused));
+      maf_destroyMafBlockList(mb);
+      ++blocks;
+    }
+    CuAssertTrue(testCase, blocks == 2001);
+    CuAssertTrue(testCase, maf_readBlockInto(compressed, reused) == NULL);
+    maf_destroyMafBlockList(reused);
+    maf_destroyMfa(expected);
+    maf_destroyMfa(compressed);
+  }
+  // an index of the compressed maf finds what an index of the uncompressed one does
+  maf_writeMafIndex("test_tmp/test.maf");
+  maf_writeMafIndex("test_tmp/test.maf.gz");
+  mafIndex_t *idx = maf_newMafIndex("test_tmp/test.maf");
+  mafIndex_t *gzIdx = maf_newMafIndex("test_tmp/test.maf.gz");
+  CuAssertTrue(testCase, idx != NULL && gzIdx != NULL);
+  mafFileApi_t *mfaA = maf_newMfa("test_tmp/test.maf", "r");
+  mafFileApi_t *mfaB = maf_newMfa("test_tmp/test.maf.gz", "r");
+  uint64_t hits = maf_mafIndex_query(idx, "species1.chr3", 50000, 150000);
+  CuAssertTrue(testCase, hits == 200);
+  CuAssertTrue(testCase, maf_mafIndex_query(gzIdx, "species1.chr3", 50000, 150000) == hits);
+  for (uint64_t j = hits; j > 0; j -= 7) {
+    // backwards and skipping about
+    mafBlock_t *x = maf_mafIndex_readBlock(idx, mfaA, j - 1);
+    mafBlock_t *y = maf_mafIndex_readBlock(gzIdx, mfaB, j - 1);
+    CuAssertTrue(testCase, maf_mafIndex_getBlockNumber(idx, j - 1) == maf_mafIndex_getBlockNumber(gzIdx, j - 1));
+    CuAssertTrue(testCase, mafBlocksAreEqual(x, y));
+    CuAssertTrue(testCase, maf_mafBlock_getLineNumber(x) == maf_mafBlock_getLineNumber(y));
+    maf_destroyMafBlockList(x);
+    maf_destroyMafBlockList(y);
+    if (j < 7) {
+      break;
+    }
+  }
+  maf_destroyMfa(mfaA);
+  maf_destroyMfa(mfaB);
+  maf_destroyMafIndex(idx);
+  maf_destroyMafIndex(gzIdx);
+  unlink("test_tmp/test.maf.mafidx");
+  unlink("test_tmp/test.maf.gz.mafidx");
+  unlink("test_tmp/test.maf.gz");
+  unlink("test_tmp/plain.maf.gz");
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+}
+typedef struct blockRecord {
+  char *s; // block line numbers and lines, one after another
+  size_t n;
+  size_t size;
+} blockRecord_t;
+static void recordBlock(mafBlock_t *mb, unsigned chunk, void *data) {
+  blockRecord_t *r = ((blockRecord_t *) data) + chunk;
+  char number[64];
+  sprintf(number, "block %" PRIu64 "\n", maf_mafBlock_getLineNumber(mb));
+  for (mafLine_t *ml = maf_mafBlock_getHeadLine(mb); ml != NULL || number[0] != '\0'; ml = maf_mafLine_getNext(ml)) {
+    if (ml != NULL) {
+      sprintf(number + strlen(number), "%" PRIu64 " ", maf_mafLine_getLineNumber(ml));
+    }
+    const char *line = (ml != NULL) ? maf_mafLine_getLine(ml) : "";
+    size_t k = strlen(number) + strlen(line) + 2;
+    if (r->n + k >= r->size) {
+      r->size = 2 * (r->size + k);
+      r->s = (char *) realloc(r->s, r->size);
+      assert(r->s != NULL);
+    }
+    r->n += sprintf(r->s + r->n, "%s%s\n", number, line);
+    number[0] = '\0';
+    if (ml == NULL) {
+      break;
+    }
+  }
+}
+static void test_readBlocksParallel_0(CuTest *testCase) {
+  // reading a maf in chunks on several threads must give the same blocks, with
+  // the same line numbers, as reading it in one go
+  assert(testCase != NULL);
+  createTmpFolder();
+  FILE *f = de_fopen("test_tmp/test.maf", "w");
+  fprintf(f, "track name=euArc visibility=pack\n##maf version=1 scoring=test\n"
+          "a score=0\ns hg18.chr7 0 3 + 100 ACG\n\n");
+  srand(11);
+  for (unsigned i = 0; i < 3000; ++i) {
+    fprintf(f, "a score=%u\n", i);
+    for (unsigned j = 0; j < 1 + (unsigned) rand() % 4; ++j) {
+      fprintf(f, "s species%u.chr1 %u 4 + 100000 ACGT%s\n", j, i, (rand() % 7 == 0) ? "\r" : "");
+    }
+    if (rand() % 5 == 0) {
+      fprintf(f, "i species0.chr1 N 0 C 0\n");
+    }
+    for (unsigned j = 0; j < 1 + (unsigned) (rand() % 8 == 0) * 2; ++j) {
+      fprintf(f, (rand() % 3 == 0) ? "  \r\n" : "\n");
+    }
+  }
+  fclose(f);
+  blockRecord_t expected;
+  memset(&expected, 0, sizeof(expected));
+  mafFileApi_t *mfa = maf_newMfa("test_tmp/test.maf", "r");
+  mafBlock_t *mb = NULL;
+  while ((mb = maf_readBlock(mfa)) != NULL) {
+    recordBlock(mb, 0, &expected);
+    maf_destroyMafBlockList(mb);
+  }
+  maf_destroyMfa(mfa);
+  const unsigned threads[] = {1, 2, 3, 8, 64};
+  for (unsigned t = 0; t < sizeof(threads) / sizeof(*threads); ++t) {
+    for (unsigned lazy = 0; lazy < 2; ++lazy) {
+      blockRecord_t *records = (blockRecord_t *) de_malloc(sizeof(*records) * threads[t]);
+      memset(records, 0, sizeof(*records) * threads[t]);
+      unsigned n = maf_readBlocksParallel("test_tmp/test.maf", threads[t], lazy, recordBlock, records);
+      CuAssertTrue(testCase, n >= 1 && n <= threads[t]);
+      if (threads[t] > 1) {
+        CuAssertTrue(testCase, n > 1);
+      }
+      size_t offset = 0;
+      for (unsigned i = 0; i < n; ++i) {
+        CuAssertTrue(testCase, offset + records[i].n <= expected.n);
+        CuAssertTrue(testCase, memcmp(expected.s + offset, records[i].s, records[i].n) == 0);
+        offset += records[i].n;
+        free(records[i].s);
+      }
+      CuAssertTrue(testCase, offset == expected.n);
+      free(records);
+    }
+  }
+  free(expected.s);
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+}
+static void test_mafBlockPipeline_0(CuTest *testCase) {
+  // blocks taken from a pipeline are the blocks maf_readBlock() reads, in order,
+  // and a pipeline may be destroyed before it is drained
+  assert(testCase != NULL);
+  createTmpFolder();
+  FILE *f = de_fopen("test_tmp/test.maf", "w");
+  fprintf(f, "##maf version=1\n\n");
+  for (unsigned i = 0; i < 500; ++i) {
+    fprintf(f, "a score=%u\ns hg18.chr7 %u 4 + 100000 ACGT\ns mm9.chr1 %u 3 - 1000 AC-T\n\n", i, i, 2 * i);
+  }
+  fclose(f);
+  const unsigned capacities[] = {0, 1, 3, 64};
+  for (unsigned c = 0; c < sizeof(capacities) / sizeof(*capacities); ++c) {
+    mafFileApi_t *expectedMfa = maf_newMfa("test_tmp/test.maf", "r");
+    mafFileApi_t *mfa = maf_newMfa("test_tmp/test.maf", "r");
+    mafBlockPipeline_t *bp = maf_newMafBlockPipeline(mfa, capacities[c]);
+    mafBlock_t *expected = NULL, *mb = NULL;
+    unsigned n = 0;
+    do {
+      expected = maf_readBlock(expectedMfa);
+      mb = maf_mafBlockPipeline_readBlock(bp);
+      CuAssertTrue(testCase, (expected == NULL) == (mb == NULL));
+      if (mb != NULL) {
+        CuAssertTrue(testCase, mafBlocksAreEqual(expected, mb));
+        CuAssertTrue(testCase, maf_mafBlock_getLineNumber(expected) == maf_mafBlock_getLineNumber(mb));
+        ++n;
+      }
+      maf_destroyMafBlockList(expected);
+      maf_destroyMafBlockList(mb);
+    } while (mb != NULL);
+    CuAssertTrue(testCase, n == 501);
+    CuAssertTrue(testCase, maf_mafBlockPipeline_readBlock(bp) == NULL);
+    maf_destroyMafBlockPipeline(bp);
+    maf_destroyMfa(mfa);
+    maf_destroyMfa(expectedMfa);
+    // stop part way through
+    mfa = maf_newMfa("test_tmp/test.maf", "r");
+    bp = maf_newMafBlockPipeline(mfa, capacities[c]);
+    for (unsigned i = 0; i < 10; ++i) {
+      mb = maf_mafBlockPipeline_readBlock(bp);
+      CuAssertTrue(testCase, mb != NULL);
+      maf_destroyMafBlockList(mb);
+    }
+    maf_destroyMafBlockPipeline(bp);
+    maf_destroyMfa(mfa);
+  }
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+}
+static void describeBlock(mafBlock_t *mb, uint64_t i, FILE *out, void *data) {
+  (void) data;
+  fprintf(out, "%" PRIu64 " %" PRIu64 " %" PRIu64 "\n", i, maf_mafBlock_getLineNumber(mb),
+          maf_mafBlock_getNumberOfSequences(mb));
+  for (mafLine_t *ml = maf_mafBlock_getHeadLine(mb); ml != NULL; ml = maf_mafLine_getNext(ml)) {
+    fprintf(out, "%s\n", maf_mafLine_getLine(ml));
+  }
+}
+static char* readWholeFile(const char *filename) {
+  FILE *f = de_fopen(filename, "r");
+  fseek(f, 0, SEEK_END);
+  long n = ftell(f);
+  fseek(f, 0, SEEK_SET);
+  char *s = (char *) de_malloc(n + 1);
+  size_t read = fread(s, 1, n, f);
+  s[read] = '\0';
+  fclose(f);
+  return s;
+}
+static void test_processBlocksInOrder_0(CuTest *testCase) {
+  // output written from worker threads comes out in input order, exactly as
+  // it does from a single thread
+  assert(testCase != NULL);
+  createTmpFolder();
+  FILE *f = de_fopen("test_tmp/test.maf", "w");
+  fprintf(f, "##maf version=1\n\n");
+  for (unsigned i = 0; i < 700; ++i) {
+    fprintf(f, "a score=%u\n", i);
+    for (unsigned j = 0; j < 1 + i % 5; ++j) {
+      fprintf(f, "s species%u.chr1 %u 4 + 100000 ACGT\n", j, i);
+    }
+    fprintf(f, "\n");
+  }
+  fclose(f);
+  char *expected = NULL;
+  const unsigned threads[] = {1, 2, 5, 16};
+  for (unsigned t = 0; t < sizeof(threads) / sizeof(*threads); ++t) {
+    mafFileApi_t *mfa = maf_newMfa("test_tmp/test.maf", "r");
+    FILE *out = de_fopen("test_tmp/out.txt", "w");
+    fprintf(out, "before\n");
+    maf_processBlocksInOrder(mfa, threads[t], describeBlock, NULL, out);
+    fprintf(out, "after\n");
+    fclose(out);
+    maf_destroyMfa(mfa);
+    char *observed = readWholeFile("test_tmp/out.txt");
+    CuAssertTrue(testCase, strncmp(observed, "before\n0 ", 9) == 0);
+    CuAssertTrue(testCase, strstr(observed, "\n1 ") < strstr(observed, "\na score=0\n"));
+    CuAssertTrue(testCase, strstr(observed, "\n699 ") < strstr(observed, "\na score=698\n"));
+    CuAssertTrue(testCase, strcmp(observed + strlen(observed) - 6, "after\n") == 0);
+    if (expected == NULL) {
+      expected = observed;
+    } else {
+      CuAssertStrEquals(testCase, expected, observed);
+      free(observed);
+    }
+  }
+  free(expected);
+  unlink("test_tmp/out.txt");
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+}
+static void printBlockWithFormats(FILE *f, mafBlock_t *m) {
+  // maf_mafBlock_print() as it was written with printf formats, to check the
+  // buffered writer against
+  uint64_t maxName = 1, maxStart = 1, maxLen = 1, maxSource = 1;
+  char fmtLine[256];
+  for (mafLine_t *ml = maf_mafBlock_getHeadLine(m); ml != NULL; ml = maf_mafLine_getNext(ml)) {
+    if (maf_mafLine_getType(ml) != 's') {
+      continue;
+    }
+    if (maxName < strlen(maf_mafLine_getSpecies(ml))) {
+      maxName = strlen(maf_mafLine_getSpecies(ml));
+    }
+    if (maxStart < maf_mafLine_getStart(ml)) {
+      maxStart = maf_mafLine_getStart(ml);
+    }
+    if (maxLen < maf_mafLine_getLength(ml)) {
+      maxLen = maf_mafLine_getLength(ml);
+    }
+    if (maxSource < maf_mafLine_getSourceLength(ml)) {
+      maxSource = maf_mafLine_getSourceLength(ml);
+    }
+  }
+  sprintf(fmtLine, "s %%-%" PRIu64 "s %%%d" PRIu64 " %%%d" PRIu64 " %%c %%%d" PRIu64 " %%s\n", maxName + 2,
+          (int) log10(maxStart) + 2, (int) log10(maxLen) + 2, (int) log10(maxSource) + 2);
+  for (mafLine_t *ml = maf_mafBlock_getHeadLine(m); ml != NULL; ml = maf_mafLine_getNext(ml)) {
+    if (maf_mafLine_getType(ml) != 's') {
+      fprintf(f, "%s\n", maf_mafLine_getLine(ml));
+    } else {
+      fprintf(f, fmtLine, maf_mafLine_getSpecies(ml), maf_mafLine_getStart(ml), maf_mafLine_getLength(ml),
+              maf_mafLine_getStrand(ml), maf_mafLine_getSourceLength(ml), maf_mafLine_getSequence(ml));
+    }
+  }
+  fprintf(f, "\n");
+}
+static void test_mafWriter_0(CuTest *testCase) {
+  // the buffered writer formats exactly as printf does, threaded or not
+  assert(testCase != NULL);
+  createTmpFolder();
+  const uint64_t values[] = {0, 1, 9, 10, 99, 100, 12345, 4294967295ULL, 4294967296ULL, UINT64_MAX};
+  const size_t widths[] = {0, 1, 3, 12, 25};
+  char expected[256], observed[256];
+  for (unsigned t = 0; t < 2; ++t) {
+    for (unsigned i = 0; i < sizeof(values) / sizeof(*values); ++i) {
+      for (unsigned j = 0; j < sizeof(widths) / sizeof(*widths); ++j) {
+        FILE *f = de_fopen("test_tmp/out.txt", "w");
+        mafWriter_t *w = maf_newMafWriter(f, t == 1);
+        maf_mafWriter_writeUInt(w, values[i], widths[j]);
+        maf_mafWriter_writeChar(w, '|');
+        maf_mafWriter_writeInt(w, (int64_t) values[i], widths[j]);
+        maf_mafWriter_writeChar(w, '|');
+        maf_mafWriter_writeInt(w, -(int64_t) (values[i] >> 1) - 1, widths[j]);
+        maf_mafWriter_writeChar(w, '|');
+        maf_mafWriter_writePadded(w, "hg18.chr1", widths[j]);
+        maf_destroyMafWriter(w);
+        fclose(f);
+        sprintf(expected, "%*" PRIu64 "|%*" PRIi64 "|%*" PRIi64 "|%-*s", (int) widths[j], values[i],
+                (int) widths[j], (int64_t) values[i], (int) widths[j], -(int64_t) (values[i] >> 1) - 1,
+                (int) widths[j], "hg18.chr1");
+        f = de_fopen("test_tmp/out.txt", "r");
+        size_t n = fread(observed, 1, sizeof(observed) - 1, f);
+        observed[n] = '\0';
+        fclose(f);
+        CuAssertStrEquals(testCase, expected, observed);
+      }
+    }
+  }
+  // blocks, through maf_mafBlock_fprint() and through a threaded writer with many buffers' worth
+  FILE *fExpected = de_fopen("test_tmp/expected.txt", "w");
+  FILE *fPrinted = de_fopen("test_tmp/printed.txt", "w");
+  FILE *fThreaded = de_fopen("test_tmp/threaded.txt", "w");
+  FILE *fVerbatim = de_fopen("test_tmp/verbatim.txt", "w");
+  mafWriter_t *threaded = maf_newMafWriter(fThreaded, true);
+  mafWriter_t *verbatim = maf_newMafWriter(fVerbatim, false);
+  srand(7);
+  char *seq = (char *) de_malloc(5001);
+  char *line = (char *) de_malloc(6000);
+  for (unsigned i = 0; i < 2000; ++i) {
+    unsigned width = 1 + rand() % ((i % 100 == 0) ? 5000 : 60);
+    mafBlock_t *mb = maf_newMafBlock();
+    mafLine_t *tail = maf_newMafLineFromString("a score=1.5 pass=2", 1);
+    maf_mafBlock_setHeadLine(mb, tail);
+    for (unsigned j = 0; j < 1 + (unsigned) rand() % 6; ++j) {
+      for (unsigned k = 0; k < width; ++k) {
+        seq[k] = "ACGT-"[rand() % 5];
+      }
+      seq[width] = '\0';
+      sprintf(line, "s name%u.chr%u %u %u %c %u %s", j, rand() % 30, rand() % (1 + rand() % 100000),
+              width, (rand() % 2) ? '+' : '-', 100000 + rand() % 1000000000, seq);
+      mafLine_t *ml = maf_newMafLineFromString(line, 2 + j);
+      maf_mafLine_setNext(tail, ml);
+      tail = ml;
+      if (rand() % 4 == 0) {
+        ml = maf_newMafLineFromString("i name0.chr1 N 0 C 0", 2 + j);
+        maf_mafLine_setNext(tail, ml);
+        tail = ml;
+      }
+    }
+    maf_mafBlock_setTailLine(mb, tail);
+    printBlockWithFormats(fExpected, mb);
+    maf_mafBlock_fprint(fPrinted, mb);
+    maf_mafWriter_printBlock(threaded, mb);
+    maf_mafWriter_writeBlock(verbatim, mb);
+    for (mafLine_t *ml = maf_mafBlock_getHeadLine(mb); ml != NULL; ml = maf_mafLine_getNext(ml)) {
+      fprintf(fExpected, "%s\n", maf_mafLine_getLine(ml));
+    }
+    fprintf(fExpected, "\n");
+    maf_destroyMafBlockList(mb);
+  }
+  free(seq);
+  free(line);
+  maf_destroyMafWriter(threaded);
+  maf_destroyMafWriter(verbatim);
+  fclose(fExpected);
+  fclose(fPrinted);
+  fclose(fThreaded);
+  fclose(fVerbatim);
+  // expected.txt holds each block printed and then verbatim, split it back apart
+  char *all = readWholeFile("test_tmp/expected.txt");
+  char *printed = readWholeFile("test_tmp/printed.txt");
+  char *threadedText = readWholeFile("test_tmp/threaded.txt");
+  char *verbatimText = readWholeFile("test_tmp/verbatim.txt");
+  size_t np = strlen(printed), nv = strlen(verbatimText);
+  CuAssertTrue(testCase, strlen(all) == np + nv);
+  CuAssertStrEquals(testCase, printed, threadedText);
+  char *p = all, *q = printed, *v = verbatimText;
+  while (*p != '\0') {
+    char *end = strstr(p, "\n\n") + 2;
+    CuAssertTrue(testCase, strncmp(p, q, end - p) == 0);
+    q += end - p;
+    p = end;
+    end = strstr(p, "\n\n") + 2;
+    CuAssertTrue(testCase, strncmp(p, v, end - p) == 0);
+    v += end - p;
+    p = end;
+  }
+  free(all);
+  free(printed);
+  free(threadedText);
+  free(verbatimText);
+  unlink("test_tmp/out.txt");
+  unlink("test_tmp/expected.txt");
+  unlink("test_tmp/printed.txt");
+  unlink("test_tmp/threaded.txt");
+  unlink("test_tmp/verbatim.txt");
+  rmdir("test_tmp");
+}
+static void assertViewsMatchArrays(CuTest *testCase, mafBlock_t *mb) {
+  // the block owned views hold the same values as the freshly built arrays
+  uint64_t n = maf_mafBlock_getNumberOfSequences(mb);
+  char *strands = maf_mafBlock_getStrandArray(mb);
+  int *strandInts = maf_mafBlock_getStrandIntArray(mb);
+  uint64_t *starts = maf_mafBlock_getStartArray(mb);
+  uint64_t *posStarts = maf_mafBlock_getPosCoordStartArray(mb);
+  uint64_t *posLefts = maf_mafBlock_getPosCoordLeftArray(mb);
+  uint64_t *sourceLengths = maf_mafBlock_getSourceLengthArray(mb);
+  uint64_t *lengths = maf_mafBlock_getSequenceLengthArray(mb);
+  char **species = maf_mafBlock_getSpeciesArray(mb);
+  mafLine_t **lines = maf_mafBlock_getMafLineArray_seqOnly(mb);
+  CuAssertStrEquals(testCase, strands, maf_mafBlock_getStrandArrayView(mb));
+  for (uint64_t i = 0; i < n; ++i) {
+    CuAssertIntEquals(testCase, strandInts[i], maf_mafBlock_getStrandIntArrayView(mb)[i]);
+    CuAssertTrue(testCase, starts[i] == maf_mafBlock_getStartArrayView(mb)[i]);
+    CuAssertTrue(testCase, posStarts[i] == maf_mafBlock_getPosCoordStartArrayView(mb)[i]);
+    CuAssertTrue(testCase, posLefts[i] == maf_mafBlock_getPosCoordLeftArrayView(mb)[i]);
+    CuAssertTrue(testCase, sourceLengths[i] == maf_mafBlock_getSourceLengthArrayView(mb)[i]);
+    CuAssertTrue(testCase, lengths[i] == maf_mafBlock_getSequenceLengthArrayView(mb)[i]);
+    CuAssertStrEquals(testCase, species[i], maf_mafBlock_getSpeciesArrayView(mb)[i]);
+    CuAssertPtrEquals(testCase, lines[i], maf_mafBlock_getMafLineArrayView_seqOnly(mb)[i]);
+    free(species[i]);
+  }
+  free(strands);
+  free(strandInts);
+  free(starts);
+  free(posStarts);
+  free(posLefts);
+  free(sourceLengths);
+  free(lengths);
+  free(species);
+  free(lines);
+}
+static void test_arrayViews_0(CuTest *testCase) {
+  // views are built once, handed out until the block changes and then rebuilt
+  assert(testCase != NULL);
+  mafBlock_t *mb = maf_newMafBlockFromString("a score=0\n"
+                                             "s hg18.chr7    27578828 38 + 158545518 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG\n"
+                                             "i hg18.chr7    N 0 C 0\n"
+                                             "s panTro1.chr6 28741140 38 - 161576975 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG\n"
+                                             "s baboon         116834 38 +   4622798 AAA-GGGAATGTTAACCAAATGA---GTTGTCTCTTATGGTG\n"
+                                             "e mm4.chr6     53215344 38 + 151104725 I\n"
+                                             "s rn3.chr4     81344243 40 - 187371129 -AA-GGGGATGCTAAGCCAATGAGTTGTTGTCTCTCAATGTG\n", 1);
+  const uint64_t *starts = maf_mafBlock_getStartArrayView(mb);
+  CuAssertStrEquals(testCase, "+-+-", maf_mafBlock_getStrandArrayView(mb));
+  CuAssertTrue(testCase, starts == maf_mafBlock_getStartArrayView(mb));
+  CuAssertTrue(testCase, starts[1] == 28741140);
+  CuAssertTrue(testCase, maf_mafBlock_getPosCoordStartArrayView(mb)[1] == 161576975 - 28741140 - 1);
+  CuAssertTrue(testCase, maf_mafBlock_getPosCoordLeftArrayView(mb)[3] == 187371129 - (81344243 + 40));
+  CuAssertIntEquals(testCase, -1, maf_mafBlock_getStrandIntArrayView(mb)[3]);
+  CuAssertStrEquals(testCase, "baboon", maf_mafBlock_getSpeciesArrayView(mb)[2]);
+  assertViewsMatchArrays(testCase, mb);
+  maf_mafBlock_flipStrand(mb);
+  CuAssertStrEquals(testCase, "-+-+", maf_mafBlock_getStrandArrayView(mb));
+  assertViewsMatchArrays(testCase, mb);
+  maf_destroyMafBlockList(mb);
+  mb = maf_newMafBlockFromString("a score=0\n", 1);
+  CuAssertTrue(testCase, maf_mafBlock_getStrandArrayView(mb) == NULL);
+  CuAssertTrue(testCase, maf_mafBlock_getSpeciesArrayView(mb) == NULL);
+  maf_destroyMafBlockList(mb);
+  // a reused block, lazily parsed, whose row count changes from block to block
+  createTmpFolder();
+  FILE *f = de_fopen("test_tmp/views.maf", "w");
+  fprintf(f, "##maf version=1\n\n");
+  srand(3);
+  for (unsigned i = 0; i < 200; ++i) {
+    fprintf(f, "a score=%u\n", i);
+    for (unsigned j = 0; j < 1 + (unsigned) rand() % 12; ++j) {
+      fprintf(f, "s species%u.chr%u %u 4 %c %u ACG-T\n", j, i, rand() % 1000,
+              (rand() % 2) ? '+' : '-', 1000 + rand() % 1000);
+    }
+    fprintf(f, "\n");
+  }
+  fclose(f);
+  mafFileApi_t *mfa = maf_newMfa("test_tmp/views.maf", "r");
+  maf_mafFileApi_setLazyParsing(mfa, true);
+  mb = maf_newMafBlock();
+  unsigned blocks = 0;
+  while (maf_readBlockInto(mfa, mb) != NULL) {
+    assertViewsMatchArrays(testCase, mb);
+    ++blocks;
+  }
+  CuAssertIntEquals(testCase, 201, blocks);
+  maf_destroyMafBlockList(mb);
+  maf_destroyMfa(mfa);
+  unlink("test_tmp/views.maf");
+  rmdir("test_tmp");
+}
+static void assertMatrixViewMatchesMatrix(CuTest *testCase, mafBlock_t *mb) {
+  // the borrowed matrix and its transpose hold the same characters as the copied matrix
+  uint64_t n = maf_mafBlock_getNumberOfSequences(mb);
+  uint64_t m = maf_mafBlock_getSequenceFieldLength(mb);
+  char **expected = maf_mafBlock_getSequenceMatrix(mb, n, m);
+  mafSequenceMatrix_t *mat = maf_mafBlock_getSequenceMatrixView(mb);
+  CuAssertTrue(testCase, maf_mafSequenceMatrix_getNumberOfRows(mat) == n);
+  CuAssertTrue(testCase, maf_mafSequenceMatrix_getNumberOfColumns(mat) == m);
+  char **rows = maf_mafSequenceMatrix_getRows(mat);
+  for (uint64_t r = 0; r < n; ++r) {
+    CuAssertStrEquals(testCase, expected[r], rows[r]);
+  }
+  for (uint64_t c = 0; c < m; ++c) {
+    const char *column = maf_mafSequenceMatrix_getColumn(mat, c);
+    for (uint64_t r = 0; r < n; ++r) {
+      CuAssertIntEquals(testCase, expected[r][c], column[r]);
+    }
+  }
+  maf_mafBlock_destroySequenceMatrix(expected, n);
+}
+static void test_sequenceMatrixView_0(CuTest *testCase) {
+  // rows are borrowed from the lines when they are full width, copied when not
+  assert(testCase != NULL);
+  mafBlock_t *mb = maf_newMafBlockFromString("a score=0\n"
+                                             "s hg18.chr7    27578828 10 + 158545518 AAA-GGGAATGT\n"
+                                             "i hg18.chr7    N 0 C 0\n"
+                                             "s panTro1.chr6 28741140 10 - 161576975 CAA-GGGAATGT\n"
+                                             "s baboon         116834 10 +   4622798 GAA--GGAATGT\n", 1);
+  mafSequenceMatrix_t *mat = maf_mafBlock_getSequenceMatrixView(mb);
+  CuAssertTrue(testCase, mat == maf_mafBlock_getSequenceMatrixView(mb));
+  char **rows = maf_mafSequenceMatrix_getRows(mat);
+  mafLine_t *ml = maf_mafLine_getNext(maf_mafBlock_getHeadLine(mb));
+  CuAssertPtrEquals(testCase, maf_mafLine_getSequence(ml), rows[0]);
+  CuAssertStrEquals(testCase, "CAA-GGGAATGT", rows[1]);
+  CuAssertTrue(testCase, strncmp("ACG", maf_mafSequenceMatrix_getColumn(mat, 0), 3) == 0);
+  CuAssertTrue(testCase, strncmp("---", maf_mafSequenceMatrix_getColumn(mat, 3), 3) == 0);
+  assertMatrixViewMatchesMatrix(testCase, mb);
+  maf_mafBlock_flipStrand(mb);
+  CuAssertIntEquals(testCase, 'A', maf_mafSequenceMatrix_getColumn(maf_mafBlock_getSequenceMatrixView(mb), 0)[0]);
+  assertMatrixViewMatchesMatrix(testCase, mb);
+  maf_destroyMafBlockList(mb);
+  // the block width comes from the last line, the rows of other widths are copies
+  mb = maf_newMafBlockFromString("a score=0\n"
+                                 "s hg18.chr7    27578828 10 + 158545518 AAA-GGGAATGTCC\n"
+                                 "s panTro1.chr6 28741140 10 - 161576975 AAA-GGGAATG\n"
+                                 "s baboon         116834 10 +   4622798 AAA-GGGAATGT\n", 1);
+  rows = maf_mafSequenceMatrix_getRows(maf_mafBlock_getSequenceMatrixView(mb));
+  CuAssertStrEquals(testCase, "AAA-GGGAATGT", rows[0]);
+  CuAssertStrEquals(testCase, "AAA-GGGAATG", rows[1]);
+  assertMatrixViewMatchesMatrix(testCase, mb);
+  maf_destroyMafBlockList(mb);
+  // a reused, lazily parsed block with blocks wider and taller than a transpose tile
+  createTmpFolder();
+  FILE *f = de_fopen("test_tmp/matrix.maf", "w");
+  fprintf(f, "##maf version=1\n\n");
+  srand(5);
+  char seq[301];
+  for (unsigned i = 0; i < 40; ++i) {
+    unsigned width = 1 + rand() % 300;
+    fprintf(f, "a score=%u\n", i);
+    for (unsigned j = 0; j < 1 + (unsigned) rand() % 150; ++j) {
+      for (unsigned k = 0; k < width; ++k) {
+        seq[k] = "ACGT-"[rand() % 5];
+      }
+      seq[width] = '\0';
+      fprintf(f, "s species%u.chr1 0 %u + 1000 %s\n", j, width, seq);
+    }
+    fprintf(f, "\n");
+  }
+  fclose(f);
+  mafFileApi_t *mfa = maf_newMfa("test_tmp/matrix.maf", "r");
+  maf_mafFileApi_setLazyParsing(mfa, true);
+  mb = maf_newMafBlock();
+  while (maf_readBlockInto(mfa, mb) != NULL) {
+    if (maf_mafBlock_getNumberOfSequences(mb) > 0) {
+      assertMatrixViewMatchesMatrix(testCase, mb);
+    }
+  }
+  maf_destroyMafBlockList(mb);
+  maf_destroyMfa(mfa);
+  unlink("test_tmp/matrix.maf");
+  rmdir("test_tmp");
+}
+static char referenceComplement(char c) {
+  const char *from = "ACGTMRWSYKVHDBNXacgtmrwsykvhdbnx-", *to = "TGCAKYWSRMBDHVNXtgcakywsrmbdhvnx-";
+  return to[strchr(from, c) - from];
+}
+static void test_seqKernels_0(CuTest *testCase) {
+  // every kernel level gives the same answers as a plain loop, for all lengths
+  // and alignments around the vector widths
+  assert(testCase != NULL);
+  const char *alphabet = "ACGTMRWSYKVHDBNXacgtmrwsykvhdbnx-----NNnn";
+  size_t alphabetSize = strlen(alphabet);
+  char *seq = (char *) de_malloc(1024);
+  char *obs = (char *) de_malloc(1024);
+  char *exp = (char *) de_malloc(1024);
+  uint64_t *sums = (uint64_t *) de_malloc(sizeof(*sums) * 1025);
+  srand(11);
+  for (int level = kSeqKernelsAvx2; level >= kSeqKernelsScalar; --level) {
+    seq_setKernelLevel((seqKernelsLevel_t) level);
+    CuAssertTrue(testCase, seq_getKernelLevel() <= (seqKernelsLevel_t) level);
+    for (unsigned trial = 0; trial < 600; ++trial) {
+      size_t offset = rand() % 33;
+      size_t n = (trial < 200) ? trial : (size_t) (rand() % (1024 - 33));
+      bool runs = (trial % 3 == 0); // long runs of gaps and of bases
+      for (size_t i = 0; i < n; ++i) {
+        if (runs) {
+          seq[offset + i] = ((i / 40) % 2) ? '-' : "ACgt"[rand() % 4];
+        } else {
+          seq[offset + i] = alphabet[rand() % alphabetSize];
+        }
+      }
+      char *s = seq + offset;
+      uint64_t gaps = 0, ns = 0;
+      for (size_t i = 0; i < n; ++i) {
+        gaps += (s[i] == '-');
+        ns += (s[i] == 'N' || s[i] == 'n');
+      }
+      CuAssertTrue(testCase, seq_countGaps(s, n) == gaps);
+      CuAssertTrue(testCase, seq_countNs(s, n) == ns);
+      seq_nonGapPrefixSum(s, n, sums);
+      CuAssertTrue(testCase, sums[0] == 0);
+      for (size_t i = 0; i < n; ++i) {
+        CuAssertTrue(testCase, sums[i + 1] == sums[i] + (s[i] != '-'));
+      }
+      // complement
+      memcpy(obs, s, n);
+      for (size_t i = 0; i < n; ++i) {
+        exp[i] = referenceComplement(s[i]);
+      }
+      seq_complement(obs, n);
+      CuAssertTrue(testCase, memcmp(obs, exp, n) == 0);
+      // reverse complement
+      memcpy(obs + offset, s, n);
+      for (size_t i = 0; i < n; ++i) {
+        exp[i] = referenceComplement(s[n - 1 - i]);
+      }
+      seq_reverseComplement(obs + offset, n);
+      CuAssertTrue(testCase, memcmp(obs + offset, exp, n) == 0);
+      // upper case, including characters outside of the alphabet
+      for (size_t i = 0; i < n; i += 7) {
+        s[i] = (char) (1 + rand() % 255);
+      }
+      memcpy(obs, s, n);
+      for (size_t i = 0; i < n; ++i) {
+        exp[i] = (char) toupper((unsigned char) s[i]);
+      }
+      seq_toUpper(obs, n);
+      CuAssertTrue(testCase, memcmp(obs, exp, n) == 0);
+      // 4 bit codes, the packed bytes taken from the sequence itself
+      const uint8_t *packed = (const uint8_t *) seq + offset;
+      for (size_t i = 0; i < n; ++i) {
+        exp[i] = alphabet[(packed[i / 2] >> (4 * (i % 2))) & 0xf];
+      }
+      seq_unpackNibbles(obs, packed, n, alphabet);
+      CuAssertTrue(testCase, memcmp(obs, exp, n) == 0);
+    }
+  }
+  seq_setKernelLevel(kSeqKernelsAvx2);
+  char c[] = "AcgTn-MrWsYkVhDbX";
+  reverseComplementSequence(c, strlen(c));
+  CuAssertStrEquals(testCase, "XvHdBmRsWyK-nAcgT", c);
+  CuAssertIntEquals(testCase, 'g', complementChar('c'));
+  CuAssertTrue(testCase, countNonGaps(c) == strlen(c) - 1);
+  free(seq);
+  free(obs);
+  free(exp);
+  free(sums);
+}
+static void checkNameIds(CuTest *testCase, mafBlock_t *mb, mafNameDict_t *d, bool interned) {
+  // every named line carries the ids of the name in its text, or none at all
+  char name[256];
+  uint64_t s = 0;
+  const uint32_t *nameIds = maf_mafBlock_getNameIdArrayView(mb);
+  const uint32_t *speciesIds = maf_mafBlock_getSpeciesIdArrayView(mb);
+  for (mafLine_t *ml = maf_mafBlock_getHeadLine(mb); ml != NULL; ml = maf_mafLine_getNext(ml)) {
+    char type = maf_mafLine_getType(ml);
+    if (type != 's' && type != 'i' && type != 'e') {
+      CuAssertTrue(testCase, maf_mafLine_getNameId(ml) == kMafNoNameId);
+      continue;
+    }
+    if (!interned) {
+      CuAssertTrue(testCase, maf_mafLine_getNameId(ml) == kMafNoNameId);
+      CuAssertTrue(testCase, maf_mafLine_getSpeciesId(ml) == kMafNoNameId);
+    } else {
+      CuAssertTrue(testCase, sscanf(maf_mafLine_getLine(ml) + 1, "%255s", name) == 1);
+      CuAssertStrEquals(testCase, name, maf_mafNameDict_getName(d, maf_mafLine_getNameId(ml)));
+      CuAssertTrue(testCase, maf_mafNameDict_lookup(d, name) == maf_mafLine_getNameId(ml));
+      CuAssertTrue(testCase, maf_mafNameDict_getSpeciesId(d, maf_mafLine_getNameId(ml)) ==
+                   maf_mafLine_getSpeciesId(ml));
+      char *species = copySpeciesName(name);
+      CuAssertStrEquals(testCase, species, maf_mafNameDict_getSpecies(d, maf_mafLine_getSpeciesId(ml)));
+      free(species);
+    }
+    if (type == 's') {
+      CuAssertTrue(testCase, nameIds[s] == maf_mafLine_getNameId(ml));
+      CuAssertTrue(testCase, speciesIds[s] == maf_mafLine_getSpeciesId(ml));
+      ++s;
+    }
+  }
+}
+static void test_nameDict_0(CuTest *testCase) {
+  // names are given dense ids in order of first appearance, with their species
+  // prefixes interned alongside, and lines read with interning on carry them
+  // however they are read. The chunks of a file share one dictionary.
+  assert(testCase != NULL);
+  mafNameDict_t *d = maf_newMafNameDict();
+  CuAssertTrue(testCase, maf_mafNameDict_lookup(d, "hg18.chr1") == kMafNoNameId);
+  CuAssertTrue(testCase, maf_mafNameDict_intern(d, "hg18.chr1") == 0);
+  CuAssertTrue(testCase, maf_mafNameDict_intern(d, "mm9.chr2") == 1);
+  CuAssertTrue(testCase, maf_mafNameDict_intern(d, "hg18.chr2") == 2);
+  CuAssertTrue(testCase, maf_mafNameDict_intern(d, "hg18.chr1") == 0);
+  CuAssertTrue(testCase, maf_mafNameDict_intern(d, "panTro2") == 3);
+  CuAssertTrue(testCase, maf_mafNameDict_getSpeciesId(d, 0) == 0);
+  CuAssertTrue(testCase, maf_mafNameDict_getSpeciesId(d, 1) == 1);
+  CuAssertTrue(testCase, maf_mafNameDict_getSpeciesId(d, 2) == 0);
+  CuAssertTrue(testCase, maf_mafNameDict_getSpeciesId(d, 4) == kMafNoNameId);
+  CuAssertStrEquals(testCase, "panTro2", maf_mafNameDict_getSpecies(d, maf_mafNameDict_getSpeciesId(d, 3)));
+  CuAssertTrue(testCase, maf_mafNameDict_lookupSpecies(d, "mm9") == 1);
+  CuAssertTrue(testCase, maf_mafNameDict_lookupSpecies(d, "mm9.chr2") == kMafNoNameId);
+  CuAssertTrue(testCase, maf_mafNameDict_getName(d, 4) == NULL);
+  const char *first = maf_mafNameDict_getName(d, 0);
+  char name[64];
+  for (unsigned i = 0; i < 5000; ++i) {
+    sprintf(name, "species%u.chr%u", i % 37, i);
+    CuAssertTrue(testCase, maf_mafNameDict_intern(d, name) == 4 + i);
+  }
+  for (unsigned i = 0; i < 5000; ++i) {
+    sprintf(name, "species%u.chr%u", i % 37, i);
+    CuAssertTrue(testCase, maf_mafNameDict_lookup(d, name) == 4 + i);
+    CuAssertStrEquals(testCase, name, maf_mafNameDict_getName(d, 4 + i));
+  }
+  CuAssertTrue(testCase, maf_mafNameDict_getNumberOfNames(d) == 5004);
+  CuAssertTrue(testCase, maf_mafNameDict_getNumberOfSpecies(d) == 3 + 37);
+  CuAssertTrue(testCase, first == maf_mafNameDict_getName(d, 0));
+  CuAssertStrEquals(testCase, "hg18.chr1", first);
+  maf_destroyMafNameDict(d);
+  createTmpFolder();
+  FILE *f = de_fopen("test_tmp/test.maf", "w");
+  fprintf(f, "##maf version=1\n\n");
+  srand(5);
+  for (unsigned i = 0; i < 2000; ++i) {
+    fprintf(f, "a score=%u\n", i);
+    for (unsigned j = 0; j < 1 + (unsigned) rand() % 5; ++j) {
+      fprintf(f, "s species%u.chr%u %u 4 + 100000 ACGT\n", j, (unsigned) rand() % 20, i);
+      if (rand() % 4 == 0) {
+        fprintf(f, "i species%u.chr%u N 0 C 0\n", j, (unsigned) rand() % 20);
+      }
+    }
+    if (rand() % 5 == 0) {
+      fprintf(f, "e other.chr1 0 10 + 100 I\n");
+    }
+    fprintf(f, "\n");
+  }
+  fclose(f);
+  for (unsigned mode = 0; mode < 6; ++mode) {
+    // interning off and on, eager and lazy, fresh and reused blocks
+    bool interned = mode > 0, lazy = mode % 2 == 0, reuse = mode > 3;
+    mafFileApi_t *mfa = maf_newMfa("test_tmp/test.maf", (mode == 3) ? "rm" : "r");
+    maf_mafFileApi_setLazyParsing(mfa, lazy);
+    maf_mafFileApi_setNameInterning(mfa, interned);
+    mafNameDict_t *names = maf_mafFileApi_getNameDict(mfa);
+    mafBlock_t *mb = reuse ? maf_newMafBlock() : NULL;
+    mafBlock_t *next = NULL;
+    while ((next = reuse ? maf_readBlockInto(mfa, mb) : maf_readBlock(mfa)) != NULL) {
+      checkNameIds(testCase, next, names, interned);
+      if (!reuse) {
+        mafBlock_t *copy = maf_copyMafBlock(next);
+        checkNameIds(testCase, copy, names, interned);
+        maf_destroyMafBlockList(copy);
+        maf_destroyMafBlockList(next);
+      }
+    }
+    maf_destroyMafBlockList(mb);
+    CuAssertTrue(testCase, maf_mafNameDict_getNumberOfNames(names) == (interned ? 5 * 20 + 1 : 0));
+    CuAssertTrue(testCase, maf_mafNameDict_getNumberOfSpecies(names) == (interned ? 6 : 0));
+    maf_destroyMfa(mfa);
+  }
+  unsigned m = 0;
+  mafFileApi_t **chunks = maf_newMfaChunks("test_tmp/test.maf", 4, &m);
+  CuAssertTrue(testCase, m > 1);
+  mafBlock_t *mb = maf_newMafBlock();
+  for (unsigned i = 0; i < m; ++i) {
+    CuAssertTrue(testCase, maf_mafFileApi_getNameDict(chunks[i]) == maf_mafFileApi_getNameDict(chunks[0]));
+    maf_mafFileApi_setNameInterning(chunks[i], true);
+    while (maf_readBlockInto(chunks[i], mb) != NULL) {
+      checkNameIds(testCase, mb, maf_mafFileApi_getNameDict(chunks[i]), true);
+    }
+  }
+  CuAssertTrue(testCase, maf_mafNameDict_getNumberOfNames(maf_mafFileApi_getNameDict(chunks[0])) == 5 * 20 + 1);
+  maf_destroyMafBlockList(mb);
+  maf_destroyMfaChunks(chunks, m);
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+}
+static void checkCoordinateMap(CuTest *testCase, mafLine_t *ml) {
+  // compare every answer of ml's coordinate map with a walk along its sequence
+  const char *seq = maf_mafLine_getSequence(ml);
+  uint64_t m = strlen(seq);
+  mafCoordinateMap_t *map = maf_mafLine_getCoordinateMap(ml);
+  CuAssertTrue(testCase, maf_mafCoordinateMap_getNumberOfColumns(map) == m);
+  uint64_t k = 0;
+  uint64_t *posOfBase = (uint64_t *) de_malloc(sizeof(*posOfBase) * (m + 1));
+  for (uint64_t c = 0; c <= m; ++c) {
+    CuAssertTrue(testCase, maf_mafCoordinateMap_getBasesBefore(map, c) == k);
+    if (c == m) {
+      break;
+    }
+    int64_t pos = -1;
+    if (seq[c] != '-') {
+      pos = (maf_mafLine_getStrand(ml) == '+') ? (int64_t) (maf_mafLine_getStart(ml) + k) :
+        (int64_t) (maf_mafLine_getSourceLength(ml) - 1 - maf_mafLine_getStart(ml) - k);
+      CuAssertTrue(testCase, maf_mafCoordinateMap_getColumnOfBase(map, k) == (int64_t) c);
+      CuAssertTrue(testCase, maf_mafLine_getColumnOfPositiveCoord(ml, (uint64_t) pos) == (int64_t) c);
+      posOfBase[k++] = (uint64_t) pos;
+    }
+    CuAssertTrue(testCase, maf_mafLine_getPositiveCoordOfColumn(ml, c) == pos);
+  }
+  CuAssertTrue(testCase, maf_mafCoordinateMap_getNumberOfBases(map) == k);
+  CuAssertTrue(testCase, maf_mafCoordinateMap_getColumnOfBase(map, k) == -1);
+  CuAssertTrue(testCase, maf_mafLine_getPositiveCoordOfColumn(ml, m) == -1);
+  // the length field is left alone when gaps are changed, so is not used here
+  uint64_t lo = (maf_mafLine_getStrand(ml) == '+') ? maf_mafLine_getStart(ml) :
+    maf_mafLine_getSourceLength(ml) - maf_mafLine_getStart(ml) - k;
+  if (lo > 0) {
+    CuAssertTrue(testCase, maf_mafLine_getColumnOfPositiveCoord(ml, lo - 1) == -1);
+  }
+  CuAssertTrue(testCase, maf_mafLine_getColumnOfPositiveCoord(ml, lo + k) == -1);
+  for (unsigned t = 0; t < 50; ++t) {
+    uint64_t start = lo + (uint64_t) (rand() % (int) (k + 10)), stop = start + (uint64_t) (rand() % 20);
+    start = (start >= 5) ? start - 5 : 0;
+    int64_t first = -1, last = -1;
+    for (uint64_t i = 0; i < k; ++i) {
+      if (start <= posOfBase[i] && posOfBase[i] <= stop) {
+        int64_t c = maf_mafCoordinateMap_getColumnOfBase(map, i);
+        first = (first == -1) ? c : first;
+        last = c;
+      }
+    }
+    uint64_t firstColumn = 0, lastColumn = 0;
+    bool found = maf_mafLine_getColumnRange(ml, start, stop, &firstColumn, &lastColumn);
+    CuAssertTrue(testCase, found == (first != -1));
+    if (found) {
+      CuAssertTrue(testCase, (int64_t) firstColumn == first);
+      CuAssertTrue(testCase, (int64_t) lastColumn == last);
+    }
+  }
+  free(posOfBase);
+}
+static void test_coordinateMap_0(CuTest *testCase) {
+  // column to coordinate maps agree with walking the sequence, whether they
+  // keep prefix sums (many gaps) or runs of gaps (few), on either strand, and
+  // are rebuilt when the sequence changes
+  assert(testCase != NULL);
+  srand(17);
+  char *seq = (char *) de_malloc(1001);
+  char line[1200];
+  for (unsigned t = 0; t < 200; ++t) {
+    unsigned m = 1 + (unsigned) rand() % 1000;
+    unsigned gapEvery = 1 + (unsigned) rand() % ((t % 2 == 0) ? 4 : 400);
+    uint64_t n = 0;
+    for (unsigned c = 0; c < m; ++c) {
+      bool gap = (unsigned) rand() % gapEvery == 0;
+      // runs of gaps, as alignments have
+      if (c > 0 && seq[c - 1] == '-' && rand() % 3 != 0) {
+        gap = true;
+      }
+      seq[c] = gap ? '-' : "ACGTNacgtn"[rand() % 10];
+      n += !gap;
+    }
+    seq[m] = '\0';
+    sprintf(line, "s hg18.chr1 %u %" PRIu64 " %c %" PRIu64 " %s", (unsigned) rand() % 100, n,
+            (rand() % 2) ? '+' : '-', n + 200, seq);
+    mafLine_t *ml = maf_newMafLineFromString(line, 1);
+    checkCoordinateMap(testCase, ml);
+    // change the gaps, through both ways of changing a sequence
+    char *mutable = maf_mafLine_getMutableSequence(ml);
+    mutable[rand() % m] = '-';
+    checkCoordinateMap(testCase, ml);
+    free(mutable); // setSequence() leaves the old sequence to the caller
+    maf_mafLine_setSequence(ml, de_strdup("--AC-GT---"));
+    checkCoordinateMap(testCase, ml);
+    maf_destroyMafLineList(ml);
+  }
+  free(seq);
+  // maps of reused blocks are reused, and rebuilt for the new lines
+  createTmpFolder();
+  FILE *f = de_fopen("test_tmp/test.maf", "w");
+  fprintf(f, "##maf version=1\n\n"
+          "a score=0\ns hg18.chr1 10 5 + 100 AC-G-TA\ns mm9.chr1 0 3 - 50 A---GT-\n\n"
+          "a score=0\ns hg18.chr1 20 7 - 100 ACGTACG\ns mm9.chr1 5 2 + 50 ---A--C\n\n");
+  fclose(f);
+  mafFileApi_t *mfa = maf_newMfa("test_tmp/test.maf", "r");
+  mafBlock_t *mb = maf_newMafBlock();
+  while (maf_readBlockInto(mfa, mb) != NULL) {
+    for (mafLine_t *ml = maf_mafBlock_getHeadLine(mb); ml != NULL; ml = maf_mafLine_getNext(ml)) {
+      if (maf_mafLine_getType(ml) == 's') {
+        checkCoordinateMap(testCase, ml);
+      }
+    }
+  }
+  maf_destroyMafBlockList(mb);
+  maf_destroyMfa(mfa);
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+}
+static bool blocksMatchExactly(mafBlock_t *mb1, mafBlock_t *mb2) {
+  // equal blocks whose lines also have the same text
+  if (mb1 == NULL || mb2 == NULL) {
+    return mb1 == mb2;
+  }
+  if (!mafBlocksAreEqual(mb1, mb2) ||
+      maf_mafBlock_getSequenceFieldLength(mb1) != maf_mafBlock_getSequenceFieldLength(mb2)) {
+    return false;
+  }
+  for (mafLine_t *ml1 = maf_mafBlock_getHeadLine(mb1), *ml2 = maf_mafBlock_getHeadLine(mb2);
+       ml1 != NULL; ml1 = maf_mafLine_getNext(ml1), ml2 = maf_mafLine_getNext(ml2)) {
+    if (strcmp(maf_mafLine_getLine(ml1), maf_mafLine_getLine(ml2)) != 0) {
+      fprintf(stderr, "mafLines differ in text:\n  [%s]\n  [%s]\n",
+              maf_mafLine_getLine(ml1), maf_mafLine_getLine(ml2));
+      return false;
+    }
+    if (maf_mafLine_getType(ml1) == 's' &&
+        maf_mafLine_getSequenceFieldLength(ml1) != maf_mafLine_getSequenceFieldLength(ml2)) {
+      return false;
+    }
+  }
+  return true;
+}
+static void test_binaryMaf_0(CuTest *testCase) {
+  // a .mafb must read back as exactly the blocks, lines and line numbers of
+  // the maf it was written from, with every reader, in chunks and through an
+  // index, whether it was written block by block or through a mafFileApi_t
+  assert(testCase != NULL);
+  createTmpFolder();
+  FILE *f = de_fopen("test_tmp/test.maf", "w");
+  fprintf(f, "track name=euArc visibility=pack\n##maf version=1 scoring=tba.v8\n# a comment\n\n"
+          "a score=23262.0\n"
+          "s hg18.chr7    27578828 38 + 158545518 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG\n"
+          "s panTro1.chr6 28741140 38 - 161576975 aaa-GGGaatgttaaccaaatga---ATTGTCTCTTACGGTG\n"
+          "i panTro1.chr6 N 0 C 0\n"
+          "e mm4.chr6     53310102 13 + 151104725 I\n"
+          "q panTro1.chr6                         99999999999999999-999999999999999999999999\n"
+          "\n\n\n"
+          "a score=5062.0\n"
+          "s hg18.chr7\t27699739 6 + 158545518 TAAAGA\n"
+          "s baboon         241163 6 +   4622798 TAA.GA\n"
+          "s baboon         241163 6 +   4622798 TAAAGA  \n"
+          "s baboon         0241163 6 +  4622798 TAAAGA\n"
+          "s baboon         241163 6 +   4622799 NRYSWK\n"
+          "s hg18.chr7    27699739 0 + 158545518 ------\n"
+          "\n"
+          "a score=0\n"
+          "s hg18.chr7    27707221 13 + 158545518 gcagctgaaaaca\n"
+          "s hg18.chr7    27707221 13 - 158545518 MBDHVnnnnACGT\n"
+          "\n");
+  srand(23);
+  for (unsigned i = 0; i < 500; ++i) {
+    fprintf(f, "a score=%u\n", i);
+    for (unsigned j = 0; j < 1 + (unsigned) rand() % 5; ++j) {
+      char seq[81];
+      unsigned m = 1 + (unsigned) rand() % 80, n = 0;
+      for (unsigned k = 0; k < m; ++k) {
+        seq[k] = (rand() % 4 == 0) ? '-' : "ACGTNacgtnRY"[rand() % 12];
+        n += seq[k] != '-';
+      }
+      seq[m] = '\0';
+      fprintf(f, "s species%u.chr%u %*u %u %c %u %s\n", j, (unsigned) rand() % 3, (int) (rand() % 12),
+              (unsigned) rand() % 100000, n, (rand() % 2) ? '+' : '-', 100000 + (unsigned) rand() % 2, seq);
+    }
+    if (rand() % 4 == 0) {
+      fprintf(f, "i species0.chr1 C 0 I 12\n");
+    }
+    fprintf(f, (rand() % 5 == 0) ? "\n\n" : "\n");
+  }
+  fclose(f);
+  mafFileApi_t *mfa = maf_newMfa("test_tmp/test.maf", "r");
+  mafBlock_t *expected = maf_readAll(mfa);
+  maf_destroyMfa(mfa);
+  f = de_fopen("test_tmp/test.mafb", "w");
+  mafBinaryWriter_t *w = maf_newMafBinaryWriter(f);
+  for (mafBlock_t *mb = expected; mb != NULL; mb = maf_mafBlock_getNext(mb)) {
+    maf_mafBinaryWriter_writeBlock(w, mb);
+  }
+  maf_destroyMafBinaryWriter(w);
+  fclose(f);
+  const char *modes[] = {"r", "rm"};
+  for (unsigned m = 0; m < 2; ++m) {
+    for (unsigned lazy = 0; lazy < 2; ++lazy) {
+      mafFileApi_t *copied = maf_newMfa("test_tmp/test.mafb", modes[m]);
+      mafFileApi_t *reusing = maf_newMfa("test_tmp/test.mafb", modes[m]);
+      maf_mafFileApi_setLazyParsing(copied, lazy);
+      maf_mafFileApi_setLazyParsing(reusing, lazy);
+      mafBlock_t *reused = maf_newMafBlock();
+      for (mafBlock_t *mb = expected; mb != NULL; mb = maf_mafBlock_getNext(mb)) {
+        mafBlock_t *read = maf_readBlock(copied);
+        CuAssertTrue(testCase, blocksMatchExactly(mb, read));
+        CuAssertTrue(testCase, maf_readBlockInto(reusing, reused) == reused);
+        CuAssertTrue(testCase, blocksMatchExactly(mb, reused));
+        maf_destroyMafBlockList(read);
+      }
+      CuAssertTrue(testCase, maf_readBlock(copied) == NULL);
+      CuAssertTrue(testCase, maf_readBlockInto(reusing, reused) == NULL);
+      maf_destroyMafBlockList(reused);
+      maf_destroyMfa(copied);
+      maf_destroyMfa(reusing);
+    }
+  }
+  // written through a mafFileApi_t, a .mafb is renumbered just as a maf is
+  mafFileApi_t *binaryOut = maf_newMfa("test_tmp/out.mafb", "w");
+  mafFileApi_t *textOut = maf_newMfa("test_tmp/out.maf", "w");
+  for (mafBlock_t *mb = expected; mb != NULL; mb = maf_mafBlock_getNext(mb)) {
+    maf_writeBlock(binaryOut, mb);
+    maf_writeBlock(textOut, mb);
+  }
+  maf_destroyMfa(binaryOut);
+  maf_destroyMfa(textOut);
+  mafFileApi_t *binaryIn = maf_newMfa("test_tmp/out.mafb", "r");
+  mafFileApi_t *textIn = maf_newMfa("test_tmp/out.maf", "r");
+  mafBlock_t *a = NULL, *b = NULL;
+  unsigned n = 0;
+  do {
+    a = maf_readBlock(textIn);
+    b = maf_readBlock(binaryIn);
+    CuAssertTrue(testCase, blocksMatchExactly(a, b));
+    maf_destroyMafBlockList(a);
+    maf_destroyMafBlockList(b);
+    ++n;
+  } while (a != NULL);
+  CuAssertTrue(testCase, n > 500);
+  maf_destroyMfa(binaryIn);
+  maf_destroyMfa(textIn);
+  // chunks are cut at block boundaries from the block offset table
+  unsigned numberOfChunks = 0;
+  mafFileApi_t **chunks = maf_newMfaChunks("test_tmp/test.mafb", 4, &numberOfChunks);
+  CuAssertTrue(testCase, numberOfChunks > 1);
+  mafBlock_t *mb = expected;
+  for (unsigned i = 0; i < numberOfChunks; ++i) {
+    mafBlock_t *read = NULL;
+    while ((read = maf_readBlock(chunks[i])) != NULL) {
+      CuAssertTrue(testCase, blocksMatchExactly(mb, read));
+      maf_destroyMafBlockList(read);
+      mb = maf_mafBlock_getNext(mb);
+    }
+  }
+  CuAssertTrue(testCase, mb == NULL);
+  maf_destroyMfaChunks(chunks, numberOfChunks);
+  // an index of a .mafb finds and reads back the same blocks
+  maf_writeMafIndex("test_tmp/test.mafb");
+  mafIndex_t *idx = maf_newMafIndex("test_tmp/test.mafb");
+  CuAssertTrue(testCase, idx != NULL);
+  mfa = maf_newMfa("test_tmp/test.mafb", "r");
+  uint64_t hits = maf_mafIndex_query(idx, "species1.chr2", 0, UINT64_MAX);
+  CuAssertTrue(testCase, hits > 0);
+  for (uint64_t h = 0; h < hits; ++h) {
+    uint64_t blockNumber = maf_mafIndex_getBlockNumber(idx, h);
+    mb = expected;
+    for (uint64_t i = 0; i < blockNumber; ++i) {
+      mb = maf_mafBlock_getNext(mb);
+    }
+    mafBlock_t *found = maf_mafIndex_readBlock(idx, mfa, h);
+    CuAssertTrue(testCase, blocksMatchExactly(mb, found));
+    maf_destroyMafBlockList(found);
+  }
+  maf_destroyMfa(mfa);
+  maf_destroyMafIndex(idx);
+  maf_destroyMafBlockList(expected);
+  unlink("test_tmp/test.mafb.mafidx");
+  unlink("test_tmp/test.mafb");
+  unlink("test_tmp/out.mafb");
+  unlink("test_tmp/out.maf");
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+}
+static void checkBlockCursor(CuTest *testCase, const char *filename, const char *mode, bool lazy, bool skip) {
+  // a cursor gives the lines of every block maf_readBlock() gives, or with
+  // skip only the first line of each, and leaves the file at the same line
+  mafFileApi_t *blocks = maf_newMfa(filename, "r");
+  mafFileApi_t *lines = maf_newMfa(filename, mode);
+  maf_mafFileApi_setLazyParsing(lines, lazy);
+  maf_mafFileApi_setNameInterning(lines, true);
+  mafBlockCursor_t *bc = maf_newMafBlockCursor(lines);
+  mafBlock_t *mb = NULL;
+  while ((mb = maf_readBlock(blocks)) != NULL) {
+    CuAssertTrue(testCase, maf_blockCursor_nextBlock(bc));
+    CuAssertTrue(testCase, maf_blockCursor_getLineNumber(bc) == maf_mafBlock_getLineNumber(mb));
+    mafLine_t *expected = maf_mafBlock_getHeadLine(mb), *ml = NULL;
+    while ((ml = maf_blockCursor_next(bc)) != NULL) {
+      CuAssertTrue(testCase, expected != NULL);
+      CuAssertTrue(testCase, mafLinesAreEqual(expected, ml));
+      CuAssertStrEquals(testCase, maf_mafLine_getLine(expected), maf_mafLine_getLine(ml));
+      if (maf_mafLine_getType(ml) == 's') {
+        CuAssertStrEquals(testCase, maf_mafLine_getSpecies(expected),
+                          maf_mafNameDict_getName(maf_mafFileApi_getNameDict(lines), maf_mafLine_getNameId(ml)));
+      }
+      expected = maf_mafLine_getNext(expected);
+      if (skip) {
+        break;
+      }
+    }
+    if (!skip) {
+      CuAssertTrue(testCase, expected == NULL);
+      CuAssertTrue(testCase, maf_blockCursor_getNumberOfLines(bc) == maf_mafBlock_getNumberOfLines(mb));
+      CuAssertTrue(testCase, maf_blockCursor_getNumberOfSequences(bc) == maf_mafBlock_getNumberOfSequences(mb));
+      CuAssertTrue(testCase, maf_blockCursor_next(bc) == NULL);
+    }
+    maf_destroyMafBlockList(mb);
+  }
+  CuAssertTrue(testCase, !maf_blockCursor_nextBlock(bc));
+  CuAssertTrue(testCase, maf_blockCursor_next(bc) == NULL);
+  CuAssertTrue(testCase, maf_mafFileApi_getLineNumber(blocks) == maf_mafFileApi_getLineNumber(lines));
+  maf_destroyMafBlockCursor(bc);
+  maf_destroyMfa(blocks);
+  maf_destroyMfa(lines);
+}
+static void test_blockCursor_0(CuTest *testCase) {
+  // reading a line at a time gives what reading a block at a time does, for
+  // text and .mafb files, mapped or not, parsed lazily or not
+  assert(testCase != NULL);
+  createTmpFolder();
+  FILE *f = de_fopen("test_tmp/test.maf", "w");
+  fprintf(f, "track name=euArc visibility=pack\n##maf version=1 scoring=tba.v8\n"
+          "a score=23262.0\r\n"
+          "s hg18.chr7    27578828 38 + 158545518 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG\n"
+          "s panTro1.chr6 28741140 38 - 161576975 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG\r\n"
+          "i panTro1.chr6 N 0 C 0\n"
+          "\n  \r\n\n");
+  srand(29);
+  for (unsigned i = 0; i < 300; ++i) {
+    fprintf(f, "a score=%u\n", i);
+    // some blocks hold many more rows than the others
+    unsigned rows = (i % 50 == 0) ? 2000 : 1 + (unsigned) rand() % 5;
+    for (unsigned j = 0; j < rows; ++j) {
+      fprintf(f, "s species%u.chr1 %u 4 %c 100000 AC%sGT\n", j % 7, i, (rand() % 2) ? '+' : '-',
+              (rand() % 3 == 0) ? "--" : "");
+      if (rand() % 9 == 0) {
+        fprintf(f, "e species%u.chr1 %u 0 + 100000 I\n", j % 7, i);
+      }
+    }
+    fprintf(f, (rand() % 4 == 0) ? "\n\n" : "\n");
+  }
+  fprintf(f, "a score=last\ns hg18.chr7 0 3 + 100 ACG");
+  fclose(f);
+  mafFileApi_t *in = maf_newMfa("test_tmp/test.maf", "r");
+  mafFileApi_t *out = maf_newMfa("test_tmp/test.mafb", "w");
+  mafBlock_t *mb = maf_newMafBlock();
+  while (maf_readBlockInto(in, mb) != NULL) {
+    maf_writeBlock(out, mb);
+  }
+  maf_destroyMafBlockList(mb);
+  maf_destroyMfa(in);
+  maf_destroyMfa(out);
+  const char *filenames[] = {"test_tmp/test.maf", "test_tmp/test.mafb"};
+  const char *modes[] = {"r", "rm"};
+  for (unsigned i = 0; i < 2; ++i) {
+    for (unsigned m = 0; m < 2; ++m) {
+      for (unsigned lazy = 0; lazy < 2; ++lazy) {
+        checkBlockCursor(testCase, filenames[i], modes[m], lazy, false);
+        checkBlockCursor(testCase, filenames[i], modes[m], lazy, true);
+      }
+    }
+  }
+  unlink("test_tmp/test.mafb");
+  unlink("test_tmp/test.maf");
+  rmdir("test_tmp");
+}
+static void test_parseThreads_0(CuTest *testCase) {
+  // --threads takes an integer from 1 to kMaxThreads and nothing else
+  unsigned threads = 7;
+  CuAssertTrue(testCase, parseThreads("1", &threads) && threads == 1);
+  CuAssertTrue(testCase, parseThreads("256", &threads) && threads == 256);
+  const char *bad[] = {"-3", "0", "257", "4294967293", "99999999999999999999", "2x", "", "x"};
+  for (unsigned i = 0; i < sizeof(bad) / sizeof(*bad); ++i) {
+    threads = 7;
+    CuAssertTrue(testCase, !parseThreads(bad[i], &threads));
+    CuAssertTrue(testCase, threads == 7);
+  }
+}
 CuSuite* mafShared_TestSuite(void) {
   CuSuite* suite = CuSuiteNew();
   SUITE_ADD_TEST(suite, test_newMafLineFromString);
@@ -669,5 +2309,27 @@ CuSuite* mafShared_TestSuite(void) {
   SUITE_ADD_TEST(suite, test_copySpeciesName_0);
   SUITE_ADD_TEST(suite, test_copyChromosomeName_0);
   SUITE_ADD_TEST(suite, test_getSequenceMatrix_0);
+  SUITE_ADD_TEST(suite, test_readLine_0);
+  SUITE_ADD_TEST(suite, test_readBlock_crlf);
+  SUITE_ADD_TEST(suite, test_readBlockInto_0);
+  SUITE_ADD_TEST(suite, test_sequenceViews_0);
+  SUITE_ADD_TEST(suite, test_flipBlockStrand_lineText);
+  SUITE_ADD_TEST(suite, test_lazyParsing_0);
+  SUITE_ADD_TEST(suite, test_lazyParsing_1);
+  SUITE_ADD_TEST(suite, test_mappedInput_0);
+  SUITE_ADD_TEST(suite, test_mafIndex_0);
+  SUITE_ADD_TEST(suite, test_bgzf_0);
+  SUITE_ADD_TEST(suite, test_readBlocksParallel_0);
+  SUITE_ADD_TEST(suite, test_mafBlockPipeline_0);
+  SUITE_ADD_TEST(suite, test_processBlocksInOrder_0);
+  SUITE_ADD_TEST(suite, test_mafWriter_0);
+  SUITE_ADD_TEST(suite, test_arrayViews_0);
+  SUITE_ADD_TEST(suite, test_sequenceMatrixView_0);
+  SUITE_ADD_TEST(suite, test_seqKernels_0);
+  SUITE_ADD_TEST(suite, test_nameDict_0);
+  SUITE_ADD_TEST(suite, test_coordinateMap_0);
+  SUITE_ADD_TEST(suite, test_binaryMaf_0);
+  SUITE_ADD_TEST(suite, test_blockCursor_0);
+  SUITE_ADD_TEST(suite, test_parseThreads_0);
   return suite;
 }
@@ -398,7 +398,7 @@ void arrayIndexToPairIndices(uint64_t i, uint64_t n, uint64_t *r, uint64_t *c) {
     assert((*r) < n);
     assert((*c) < n);
 }
-bool* getLegitRows(char **names, uint64_t numSeqs, stSet *legitSequences) {
+bool* getLegitRows(char *const *names, uint64_t numSeqs, stSet *legitSequences) {
     bool *legitRows = (bool *) st_malloc(sizeof(*legitRows) * numSeqs);
     for (uint64_t i = 0; i < numSeqs; ++i) {
         if (legitSequences != NULL) {
@@ -413,14 +413,15 @@ bool* getLegitRows(char **names, uint64_t numSeqs, stSet *legitSequences) {
     }
     return legitRows;
 }
-uint64_t countPairsInColumn(char **mat, uint64_t c, uint64_t numSeqs,
+uint64_t countPairsInColumn(const char *column, uint64_t numSeqs,
                             bool *legitRows, uint64_t *chooseTwoArray) {
+    // column is one column of the block in column-major order, see maf_mafSequenceMatrix_getColumn()
     uint64_t possiblePartners = 0;
     for (uint64_t r = 0; r < numSeqs; ++r) {
         if (!legitRows[r]) {
             continue;
         }
-        if (mat[r][c] != '-') {
+        if (column[r] != '-') {
             ++possiblePartners;
         }
     }
@@ -438,18 +439,13 @@ uint64_t walkBlockCountingPairs(mafBlock_t *mb, stSet *legitSequences, uint64_t
         return 0;
     }
     uint64_t seqFieldLength = maf_mafBlock_getSequenceFieldLength(mb);
-    char **names = maf_mafBlock_getSpeciesArray(mb);
-    char **mat = maf_mafBlock_getSequenceMatrix(mb, numSeqs, seqFieldLength);
+    char *const *names = maf_mafBlock_getSpeciesArrayView(mb);
+    mafSequenceMatrix_t *mat = maf_mafBlock_getSequenceMatrixView(mb);
     bool *legitRows = getLegitRows(names, numSeqs, legitSequences);
     for (uint64_t c = 0; c < seqFieldLength; ++c) {
-        count += countPairsInColumn(mat, c, numSeqs, legitRows, chooseTwoArray);
+        count += countPairsInColumn(maf_mafSequenceMatrix_getColumn(mat, c), numSeqs, legitRows, chooseTwoArray);
     }
     // clean up
-    for (uint64_t i = 0; i < numSeqs; ++i) {
-        free(names[i]);
-    }
-    free(names);
-    maf_mafBlock_destroySequenceMatrix(mat, numSeqs);
     free(legitRows);
     return count;
 }
@@ -469,6 +465,7 @@ uint64_t* buildChooseTwoArray(void) {
     return cta;
 }
 uint64_t countPairsInMaf(const char *filename, stSet *legitSequences) {
+    PROFILE_BEGIN("countPairsInMaf");
     mafFileApi_t *mfa = maf_newMfa(filename, "r");
     mafBlock_t *mb = NULL;
     uint64_t counter = 0;
@@ -480,6 +477,7 @@ uint64_t countPairsInMaf(const char *filename, stSet *legitSequences) {
     // clean up
     free(chooseTwoArray);
     maf_destroyMfa(mfa);
+    PROFILE_END("countPairsInMaf");
     return counter;
 }
 static uint64_t uint64Key(const void *k) {
@@ -505,13 +503,14 @@ void printmlarray(mafLine_t **mlArray, uint64_t n) {
     }
     printf("\n");
 }
-uint64_t countLegitGaplessPositions(char **mat, uint64_t c, uint64_t numRows, bool *legitRows) {
+uint64_t countLegitGaplessPositions(const char *column, uint64_t numRows, bool *legitRows) {
+    // column is one column of the block in column-major order, see maf_mafSequenceMatrix_getColumn()
     uint64_t a = 0;
     for (uint64_t r = 0; r < numRows; ++r) {
         if (!legitRows[r]) {
             continue;
         }
-        if (mat[r][c] != '-') {
+        if (column[r] != '-') {
             ++a;
         }
     }
@@ -696,7 +695,7 @@ mafLine_t** createMafLineArray(mafBlock_t *mb, uint64_t numLegit, bool *legitRow
     }
     return mlArray;
 }
-void updatePositions(char **mat, uint64_t c, uint64_t *allPositions, int *allStrandInts, uint64_t numSeqs) {
+void updatePositions(char **mat, uint64_t c, uint64_t *allPositions, const int *allStrandInts, uint64_t numSeqs) {
     for (uint64_t i = 0; i < numSeqs; ++i) {
         if (mat[i][c] != '-') {
             allPositions[i] += allStrandInts[i];
@@ -814,8 +813,9 @@ void walkBlockSamplingPairs(const char *filename, mafBlock_t *mb, stSortedSet *s
     validateMafBlockSourceLengths(filename, mb, sequenceLengthHash);
 
     uint64_t seqFieldLength = maf_mafBlock_getSequenceFieldLength(mb);
-    char **names = maf_mafBlock_getSpeciesArray(mb);
-    char **mat = maf_mafBlock_getSequenceMatrix(mb, numSeqs, seqFieldLength);
+    char *const *names = maf_mafBlock_getSpeciesArrayView(mb);
+    mafSequenceMatrix_t *matrix = maf_mafBlock_getSequenceMatrixView(mb);
+    char **mat = maf_mafSequenceMatrix_getRows(matrix);
     bool *legitRows = getLegitRows(names, numSeqs, legitSequences);
     uint64_t numLegit = sumBoolArray(legitRows, numSeqs);
     if (numLegit < 2) {
@@ -823,12 +823,13 @@ void walkBlockSamplingPairs(const char *filename, mafBlock_t *mb, stSortedSet *s
     }
     mafLine_t **mlArray = maf_mafBlock_getMafLineArray_seqOnly(mb);
     uint64_t *allPositions = maf_mafBlock_getPosCoordStartArray(mb);
-    int *allStrandInts = maf_mafBlock_getStrandIntArray(mb);
+    const int *allStrandInts = maf_mafBlock_getStrandIntArrayView(mb);
     char **gaplessNameArray = NULL;
     uint64_t *gaplessPositions = NULL;
     // walk over each column in the block
     for (uint64_t c = 0; c < seqFieldLength; ++c) {
-        numLegitGaplessPositions = countLegitGaplessPositions(mat, c, numSeqs, legitRows);
+        numLegitGaplessPositions = countLegitGaplessPositions(maf_mafSequenceMatrix_getColumn(matrix, c),
+                                                              numSeqs, legitRows);
         // create arrays that contain *only* the valid (legit and non gap) sequences for this column
         gaplessNameArray = extractLegitGaplessNamesFromMlArrayByColumn(mat, c, mlArray, legitRows,
                                                                        numSeqs, numLegitGaplessPositions);
@@ -847,16 +848,11 @@ void walkBlockSamplingPairs(const char *filename, mafBlock_t *mb, stSortedSet *s
     // clean up
     free(mlArray);
     free(allPositions);
-    free(allStrandInts);
-    for (uint64_t i = 0; i < numSeqs; ++i) {
-         free(names[i]);
-    }
-    free(names);
-    maf_mafBlock_destroySequenceMatrix(mat, numSeqs);
     free(legitRows);
 }
 void samplePairsFromMaf(const char *filename, stSortedSet *pairs, double acceptProbability,
                         stSet *legitSequences, uint64_t *numPairs, stHash *sequenceLengthHash) {
+    PROFILE_BEGIN("samplePairsFromMaf");
     mafFileApi_t *mfa = maf_newMfa(filename, "r");
     mafBlock_t *mb = NULL;
     uint64_t *chooseTwoArray = buildChooseTwoArray();
@@ -868,6 +864,7 @@ void samplePairsFromMaf(const char *filename, stSortedSet *pairs, double acceptP
     // clean up
     free(chooseTwoArray);
     maf_destroyMfa(mfa);
+    PROFILE_END("samplePairsFromMaf");
 }
 void countPairs(APair *pair, stHash *intervalsHash, int64_t *counter,
                 stSortedSet *legitPairs, void *a, uint64_t near) {
@@ -1100,7 +1097,7 @@ void walkBlockTestingHomology(mafBlock_t *mb, stSortedSet *sampledPairs, stSet *
     }
     uint64_t seqFieldLength = maf_mafBlock_getSequenceFieldLength(mb);
     char **names = maf_mafBlock_getSpeciesArray(mb);
-    char **mat = maf_mafBlock_getSequenceMatrix(mb, numSeqs, seqFieldLength);
+    char **mat = maf_mafSequenceMatrix_getRows(maf_mafBlock_getSequenceMatrixView(mb));
     bool *legitRows = getLegitRows(names, numSeqs, legitSequences);
     uint64_t numLegit = sumBoolArray(legitRows, numSeqs);
     if (numLegit < 2) {
@@ -1108,7 +1105,7 @@ void walkBlockTestingHomology(mafBlock_t *mb, stSortedSet *sampledPairs, stSet *
     }
     mafLine_t **mlArray = createMafLineArray(mb, numLegit, legitRows);
     uint64_t *allPositions = maf_mafBlock_getPosCoordStartArray(mb);
-    int *allStrandInts = maf_mafBlock_getStrandIntArray(mb);
+    const int *allStrandInts = maf_mafBlock_getStrandIntArrayView(mb);
     for (uint64_t c = 0; c < seqFieldLength; ++c) {
         testHomologyOnColumn(mat, c, numSeqs, legitRows, names, sampledPairs, positivePairs,
                              mlArray, allPositions, intervalsHash, near);
@@ -1117,16 +1114,15 @@ void walkBlockTestingHomology(mafBlock_t *mb, stSortedSet *sampledPairs, stSet *
     // clean up
     free(mlArray);
     free(allPositions);
-    free(allStrandInts);
     for (uint64_t i = 0; i < numSeqs; ++i) {
          free(names[i]);
     }
     free(names);
-    maf_mafBlock_destroySequenceMatrix(mat, numSeqs);
     free(legitRows);
 }
 void performHomologyTests(const char *filename, stSortedSet *sampledPairs, stSet *positivePairs,
                           stSet *legitSequences, stHash *intervalsHash, uint64_t near) {
+    PROFILE_BEGIN("performHomologyTests");
     mafFileApi_t *mfa = maf_newMfa(filename, "r");
     mafBlock_t *mb = NULL;
     while ((mb = maf_readBlock(mfa)) != NULL) {
@@ -1135,6 +1131,7 @@ void performHomologyTests(const char *filename, stSortedSet *sampledPairs, stSet
     }
     // clean up
     maf_destroyMfa(mfa);
+    PROFILE_END("performHomologyTests");
 }
 void homologyTests1(APair *thisPair, stHash *intervalsHash, stSortedSet *pairs,
                     stSet *positivePairs, stSet *legitPairs, int64_t near) {
@@ -1171,6 +1168,7 @@ void enumerateHomologyResults(stSortedSet *sampledPairs, stSortedSet *resultPair
      * For every pair in 'sampledPairs', add 1 to the total number of homology tests for the sequence-pair
      * (the ResultPair).
      */
+    PROFILE_BEGIN("enumerateHomologyResults");
     static stSortedSetIterator *sit;
     sit = stSortedSet_getIterator(sampledPairs);
     APair *pair = NULL;
@@ -1260,6 +1258,7 @@ void enumerateHomologyResults(stSortedSet *sampledPairs, stSortedSet *resultPair
         }
     }
     stSortedSet_destructIterator(sit);
+    PROFILE_END("enumerateHomologyResults");
 }
 stSortedSet *compareMAFs_AB(const char *mafFileA, const char *mafFileB, uint64_t *numberOfPairs,
                             stSet *legitSequences, stHash *intervalsHash, stHash *wigglePairHash,
@@ -1503,6 +1502,7 @@ void populateNames(const char *filename, stSet *set, stHash *sequenceLengthHash)
     /*
      * populates a set with the names of sequences from a MAF file.
      */
+    PROFILE_BEGIN("populateNames");
     mafFileApi_t *mfa = maf_newMfa(filename, "r");
     mafBlock_t *mb = NULL;
     mafLine_t *ml = NULL;
@@ -1535,6 +1535,7 @@ void populateNames(const char *filename, stSet *set, stHash *sequenceLengthHash)
     }
     // clean up
     maf_destroyMfa(mfa);
+    PROFILE_END("populateNames");
 }
 void writeXMLHeader(FILE *fileHandle){
     fprintf(fileHandle, "<?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"yes\" ?>\n");
@@ -137,7 +137,7 @@ int aPositionEqualKey(const void *k1, const void *k2);
 bool closeEnough(uint64_t p1, uint64_t p2, uint64_t near);
 void wiggleContainer_destruct(WiggleContainer *wc);
 void writeXMLHeader( FILE *fileHandle );
-bool* getLegitRows(char **names, uint64_t numSeqs, stSet *legitPairs);
+bool* getLegitRows(char *const *names, uint64_t numSeqs, stSet *legitPairs);
 uint64_t walkBlockCountingPairs(mafBlock_t *mb, stSet *legitPairs, uint64_t *chooseTwoArray);
 int64_t* buildInt(int64_t n);
 int64_t* buildInt64(int64_t n);
@@ -146,8 +146,8 @@ uint64_t* uint64Copy(uint64_t *i);
 uint64_t chooseTwo(uint64_t n);
 uint64_t* buildChooseTwoArray(void);
 uint64_t countPairsInMaf(const char *filename, stSet *legitPairs);
-uint64_t countPairsInColumn(char **mat, uint64_t c, uint64_t numSeqs, bool *legitRows, uint64_t *chooseTwoArray);
-uint64_t countLegitGaplessPositions(char **mat, uint64_t c, uint64_t numRows, bool *legitRows);
+uint64_t countPairsInColumn(const char *column, uint64_t numSeqs, bool *legitRows, uint64_t *chooseTwoArray);
+uint64_t countLegitGaplessPositions(const char *column, uint64_t numRows, bool *legitRows);
 void countPairs(APair *pair, stHash *intervalsHash, int64_t *counter,
                 stSortedSet *legitPairs, void *a, uint64_t near);
 
@@ -212,7 +212,7 @@ void walkBlockSamplingPairs(const char *filename, mafBlock_t *mb, stSortedSet *s
 int aPair_cmpFunction(APair *aPair1, APair *aPair2);
 uint64_t sumBoolArray(bool *legitRows, uint64_t numSeqs);
 mafLine_t** createMafLineArray(mafBlock_t *mb, uint64_t numLegit, bool *legitRows);
-void updatePositions(char **mat, uint64_t c, uint64_t *positions, int *strandInts, uint64_t numSeqs);
+void updatePositions(char **mat, uint64_t c, uint64_t *positions, const int *strandInts, uint64_t numSeqs);
 void printSortedSet(stSortedSet *pairs);
 unsigned countChars(char *s, char c);
 bool patternMatches(char *a, char *b);
@@ -120,7 +120,9 @@ static void parseOptions(int argc, char **argv) {
 int main(int argc, char **argv) {
     parseOptions(argc, argv);
     //Work out the structure of the chromosomes of the query sequence
+    PROFILE_BEGIN("getSequenceSizes");
     stHash *sequenceNamesToSequenceSizes = getMapOfSequenceNamesToSizesFromMaf(mafFileName);
+    PROFILE_END("getSequenceSizes");
     stHashIterator *sequenceNameIt = stHash_getIterator(sequenceNamesToSequenceSizes);
     char *sequenceName;
     while ((sequenceName = stHash_getNext(sequenceNameIt)) != NULL) {
@@ -161,7 +163,9 @@ int main(int argc, char **argv) {
         st_logInfo("Computing the coverages for species/chr: %s\n", speciesOrChrName);
         //Build the coverage data structure
         NGenomeCoverage *nGC = nGenomeCoverage_construct(sequenceNamesToSequenceSizes, speciesOrChrName, ignoreSpecies);
+        PROFILE_BEGIN("populateCoverage");
         nGenomeCoverage_populate(nGC, mafFileName, identity);
+        PROFILE_END("populateCoverage");
         //Report
         nGenomeCoverage_report(nGC, stdout, nCoverage);
         //cleanup loop
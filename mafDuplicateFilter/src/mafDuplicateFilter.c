@@ -52,7 +52,7 @@ typedef struct duplicate {
     uint64_t numSequences; // number of elements in the headScoredMaf ll
 } duplicate_t;
 
-void parseOptions(int argc, char **argv, char *filename);
+void parseOptions(int argc, char **argv, char *filename, unsigned *threads);
 void version(void);
 void usage(void);
 scoredMafLine_t* newScoredMafLine(void);
@@ -65,8 +65,8 @@ unsigned maxRes(unsigned residues[]);
 char consensusResidue(unsigned residues[]);
 void buildConsensus(char *consensus, char **sequences, int numSeqs, unsigned lineno);
 bool checkForDupes(char **species, int index, mafLine_t *m);
-void reportBlock(mafBlock_t *b);
-void reportBlockWithDuplicates(mafBlock_t *mb, duplicate_t *dupHead);
+void reportBlock(mafBlock_t *b, FILE *out);
+void reportBlockWithDuplicates(mafBlock_t *mb, duplicate_t *dupHead, FILE *out);
 void reportDuplicates(duplicate_t *dup);
 duplicate_t* findDuplicate(duplicate_t *dup, char *species);
 double bitScore(char a, char b);
@@ -75,13 +75,14 @@ void populateMafLineArray(scoredMafLine_t *head, scoredMafLine_t **array);
 void findBestDupes(mafBlock_t *block, duplicate_t *head, char *consensus);
 int cmp_by_score(const void *a, const void *b);
 void correctSpeciesNames(mafBlock_t *block);
-void checkBlock(mafBlock_t *block);
+void checkBlock(mafBlock_t *block, FILE *out);
+void filterBlock(mafBlock_t *block, uint64_t i, FILE *out, void *data);
 void destroyDuplicates(duplicate_t *d);
 void destroyScoredMafLineList(scoredMafLine_t *sml);
 void destroyStringArray(char **sArray, int n);
-void processBody(mafFileApi_t *mfa);
+void processBody(mafFileApi_t *mfa, unsigned threads);
 
-void parseOptions(int argc, char **argv, char *filename) {
+void parseOptions(int argc, char **argv, char *filename, unsigned *threads) {
     int c;
     int setMName = 0;
     while (1) {
@@ -92,10 +93,11 @@ void parseOptions(int argc, char **argv, char *filename) {
             {"version", no_argument, 0, 0},
             {"maf",  required_argument, 0, 'm'},
             {"keep-first", no_argument, 0, 'k'},
+            {"threads", required_argument, 0, 't'},
             {0, 0, 0, 0}
         };
         int longIndex = 0;
-        c = getopt_long(argc, argv, "d:m:kh:v",
+        c = getopt_long(argc, argv, "d:m:kh:vt:",
                         longOptions, &longIndex);
         if (c == -1)
             break;
@@ -119,6 +121,11 @@ void parseOptions(int argc, char **argv, char *filename) {
         case 'd':
             g_debug_flag = 1;
             break;
+        case 't':
+            if (!parseThreads(optarg, threads)) {
+                usage();
+            }
+            break;
         case 'h':
         case '?':
             usage();
@@ -166,6 +173,8 @@ void usage(void) {
     usageMessage('m', "maf", "path to maf file. use - for stdin.");
     usageMessage('v', "verbose", "turns on verbose output.");
     usageMessage('k', "keep-first", "never filter the first line of a block.");
+    usageMessage('t', "threads", "number of threads to filter blocks with, output is identical "
+                 "whatever the number. default=1.");
     exit(EXIT_FAILURE);
 }
 scoredMafLine_t* newScoredMafLine(void) {
@@ -331,19 +340,19 @@ bool checkForDupes(char **species, int index, mafLine_t *m) {
     }
     return false;
 }
-void reportBlock(mafBlock_t *b) {
+void reportBlock(mafBlock_t *b, FILE *out) {
     // print out a maf block in the form of the mafline linked list
     // We *MUST* use this function instead of the convience function maf_mafBlock_print()
     // because we have screwed with the structure field "species" and removed the chromosome
     // information. Using _print() will omitt the chromosome information in the printed block.
     mafLine_t *ml = maf_mafBlock_getHeadLine(b);
     while (ml != NULL) {
-        printf("%s\n", maf_mafLine_getLine(ml));
+        fprintf(out, "%s\n", maf_mafLine_getLine(ml));
         ml = maf_mafLine_getNext(ml);
     }
-    printf("\n");
+    fprintf(out, "\n");
 }
-void reportBlockWithDuplicates(mafBlock_t *mb, duplicate_t *dupHead) {
+void reportBlockWithDuplicates(mafBlock_t *mb, duplicate_t *dupHead, FILE *out) {
     // report the block represented by mb. If a given line
     // is a member of the duplicate linked list, report only the top scoring duplicate
     // which will be the one stored at the head of the mafline linkeded list (dup->headScoredMaf).
@@ -358,7 +367,7 @@ void reportBlockWithDuplicates(mafBlock_t *mb, duplicate_t *dupHead) {
                     isDup = true;
                     if (!strcmp(maf_mafLine_getLine(m), maf_mafLine_getLine(d->headScoredMaf->mafLine))
                         && !d->reported) {
-                        printf("%s\n", maf_mafLine_getLine(d->headScoredMaf->mafLine));
+                        fprintf(out, "%s\n", maf_mafLine_getLine(d->headScoredMaf->mafLine));
                         d->reported = true;
                         break;
                     }
@@ -367,10 +376,10 @@ void reportBlockWithDuplicates(mafBlock_t *mb, duplicate_t *dupHead) {
             d = d->next;
         }
         if (!isDup)
-            printf("%s\n", maf_mafLine_getLine(m));
+            fprintf(out, "%s\n", maf_mafLine_getLine(m));
         m = maf_mafLine_getNext(m);
     }
-    printf("\n");
+    fprintf(out, "\n");
 }
 void reportDuplicates(duplicate_t *dup) {
     // debugging function
@@ -532,7 +541,7 @@ void correctSpeciesNames(mafBlock_t *block) {
         m = maf_mafLine_getNext(m);
     }
 }
-void checkBlock(mafBlock_t *block) {
+void checkBlock(mafBlock_t *block, FILE *out) {
     // read through each line of a mafBlock and filter duplicates.
     // Report the top scoring duplication only.
     mafLine_t *ml = maf_mafBlock_getHeadLine(block);
@@ -579,7 +588,7 @@ void checkBlock(mafBlock_t *block) {
         ml = maf_mafLine_getNext(ml);
     }
     if (!containsDuplicates) {
-        reportBlock(block);
+        reportBlock(block, out);
         destroyStringArray(species, n);
         destroyStringArray(sequences, n);
         destroyDuplicates(dupSpeciesHead);
@@ -591,7 +600,7 @@ void checkBlock(mafBlock_t *block) {
     buildConsensus(consensus, sequences, n,
                    maf_mafLine_getLineNumber(maf_mafBlock_getHeadLine(block))); // lineno used for error reporting
     findBestDupes(block, dupSpeciesHead, consensus);
-    reportBlockWithDuplicates(block, dupSpeciesHead);
+    reportBlockWithDuplicates(block, dupSpeciesHead, out);
     // clean up
     destroyStringArray(species, n);
     destroyStringArray(sequences, n);
@@ -625,23 +634,44 @@ void destroyStringArray(char **sArray, int n) {
     }
     free(sArray);
 }
-void processBody(mafFileApi_t *mfa) {
+void filterBlock(mafBlock_t *block, uint64_t i, FILE *out, void *data) {
+    // filter and report one block, possibly on a worker thread.
+    (void) i;
+    (void) data;
+    correctSpeciesNames(block);
+    checkBlock(block, out);
+}
+void processBody(mafFileApi_t *mfa, unsigned threads) {
     // walk the body of the maf file and process it, block by block.
     mafBlock_t *thisBlock = NULL;
-    thisBlock = maf_readBlock(mfa); // header block, unused
+    if (threads > 1) {
+        thisBlock = maf_readBlock(mfa); // header block, unused
+        printHeader();
+        if (thisBlock != NULL) {
+            maf_destroyMafBlockList(thisBlock);
+            maf_processBlocksInOrder(mfa, threads, filterBlock, NULL, stdout);
+        }
+        return;
+    }
+    // blocks are read and parsed on a separate thread while this one checks them.
+    mafBlockPipeline_t *bp = maf_newMafBlockPipeline(mfa, kMafBlockPipelineDepth);
+    thisBlock = maf_mafBlockPipeline_readBlock(bp); // header block, unused
     maf_destroyMafBlockList(thisBlock);
     printHeader();
-    while((thisBlock = maf_readBlock(mfa)) != NULL) {
-        correctSpeciesNames(thisBlock);
-        checkBlock(thisBlock);
+    while((thisBlock = maf_mafBlockPipeline_readBlock(bp)) != NULL) {
+        filterBlock(thisBlock, 0, stdout, NULL);
         maf_destroyMafBlockList(thisBlock);
     }
+    maf_destroyMafBlockPipeline(bp);
 }
 int main(int argc, char **argv) {
     char filename[kMaxStringLength];
-    parseOptions(argc, argv, filename);
+    unsigned threads = 1;
+    parseOptions(argc, argv, filename, &threads);
     mafFileApi_t *mfa = maf_newMfa(filename, "r");
-    processBody(mfa);
+    PROFILE_BEGIN("processBody");
+    processBody(mfa, threads);
+    PROFILE_END("processBody");
     maf_destroyMfa(mfa);
     return EXIT_SUCCESS;
 }
@@ -56,11 +56,13 @@ void usage(void) {
     usageMessage('\0', "stop", "end of region, inclusive, 0 based.");
     usageMessage('\0', "soft", "include entire block even if it has gaps or over-hangs. default=false.");
     usageMessage('\0', "first", "only check the first line of each block.");
+    usageMessage('t', "threads", "number of threads to extract blocks with, output is identical "
+                 "whatever the number. not used when there is a .mafidx index. default=1.");
     usageMessage('v', "verbose", "turns on verbose output.");
     exit(EXIT_FAILURE);
 }
 void parseOptions(int argc, char **argv, char *filename, char *seqName, uint64_t *start, 
-                  uint64_t *stop, bool *isSoft, bool *checkFirstLineOnly) {
+                  uint64_t *stop, bool *isSoft, bool *checkFirstLineOnly, unsigned *threads) {
     extern int g_debug_flag;
     extern int g_verbose_flag;
     int c;
@@ -78,10 +80,11 @@ void parseOptions(int argc, char **argv, char *filename, char *seqName, uint64_t
             {"stop", required_argument, 0, 0},
             {"soft", no_argument, 0, 0},
             {"first", no_argument, 0, 0},            
+            {"threads", required_argument, 0, 't'},
             {0, 0, 0, 0}
         };
         int longIndex = 0;
-        c = getopt_long(argc, argv, "m:s:h:v:d",
+        c = getopt_long(argc, argv, "m:s:h:v:dt:",
                         longOptions, &longIndex);
         if (c == -1)
             break;
@@ -126,6 +129,11 @@ void parseOptions(int argc, char **argv, char *filename, char *seqName, uint64_t
         case 'd':
             g_debug_flag = 1;
             break;
+        case 't':
+            if (!parseThreads(optarg, threads)) {
+                usage();
+            }
+            break;
         case 'h':
         case '?':
             usage();
@@ -163,10 +171,13 @@ int main(int argc, char **argv) {
     uint64_t start, stop;
     bool isSoft = false;
     bool checkFirstLineOnly = false;
-    parseOptions(argc, argv, filename, seq, &start, &stop, &isSoft, &checkFirstLineOnly);
-    mafFileApi_t *mfa = maf_newMfa(filename, "r");
+    unsigned threads = 1;
+    parseOptions(argc, argv, filename, seq, &start, &stop, &isSoft, &checkFirstLineOnly, &threads);
+    mafFileApi_t *mfa = maf_newMfa(filename, "rm");
 
-    processBody(mfa, seq, start, stop, isSoft, checkFirstLineOnly);
+    PROFILE_BEGIN("processBody");
+    processBody(mfa, seq, start, stop, isSoft, checkFirstLineOnly, threads);
+    PROFILE_END("processBody");
     maf_destroyMfa(mfa);
     
     return EXIT_SUCCESS;
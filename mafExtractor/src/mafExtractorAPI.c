@@ -94,6 +94,7 @@ uint64_t getTargetColumns(bool **targetColumns, uint64_t *len, mafBlock_t *b, co
         ml = maf_mafLine_getNext(ml);
     }
     char *seq = NULL;
+    uint64_t first = 0, last = 0;
     *len = maf_mafBlock_getSequenceFieldLength(b);
     // printf("target columns len: %" PRIu64 "\n", *len);
     if (*len == 0) {
@@ -103,8 +104,6 @@ uint64_t getTargetColumns(bool **targetColumns, uint64_t *len, mafBlock_t *b, co
     *targetColumns = (bool*) de_malloc(sizeof(bool*) * (*len));
     memset(*targetColumns, false, sizeof(bool*) * (*len));
     // printf("target columns len: %" PRIu64 "\n", *len);
-    int it = 0;
-    uint64_t pos = 0;
     while (ml != NULL) {
         if (maf_mafLine_getType(ml) != 's') {
             ml = maf_mafLine_getNext(ml);
@@ -121,24 +120,17 @@ uint64_t getTargetColumns(bool **targetColumns, uint64_t *len, mafBlock_t *b, co
             continue;
         }
         // printf("match: %s\n", maf_mafLine_getSpecies(ml));
-        // establish sign of iterator
-        if (maf_mafLine_getStrand(ml) == '+') {
-            it = 1;
-        } else {
-            it = -1;
+        // the line's coordinate map gives the columns at either end of the target
+        // region, every base between them is inside it
+        if (!maf_mafLine_getColumnRange(ml, start, stop, &first, &last)) {
+            ml = maf_mafLine_getNext(ml);
+            continue;
         }
         seq = maf_mafLine_getSequence(ml);
-        pos = maf_mafLine_getPositiveCoord(ml);
-        for (uint64_t i = 0; i < (*len); ++i) {
-            if (seq[i] != '-') {
-                // if not gap, check to see if in target region
-                if ((start <= pos) && (pos <= stop)) {
-                    if ((*targetColumns)[i] == 0) {
-                        ++sum;
-                        (*targetColumns)[i] = 1;
-                    }
-                }
-                pos += it;
+        for (uint64_t i = first; i <= last && i < (*len); ++i) {
+            if (seq[i] != '-' && (*targetColumns)[i] == 0) {
+                ++sum;
+                (*targetColumns)[i] = 1;
             }
         }
         ml = maf_mafLine_getNext(ml);
@@ -180,10 +172,11 @@ void destroyOffsets(int64_t **offs, uint64_t n) {
     offs = NULL;
 }
 mafBlock_t *processBlockForSplice(mafBlock_t *b, uint64_t blockNumber, const char *seq,
-                                  uint64_t start, uint64_t stop, bool store) {
+                                  uint64_t start, uint64_t stop, bool store, FILE *out) {
     // walks mafBlock_t b, returns a mafBlock_t (using the linked list feature) of all spliced out bits.
     // if store is true, will return a mafBlock_t linked list of all sub-blocks. If store is false,
-    // will report each sub-block (maf_mafBlock_print()) as it comes in and immediatly destroy that block.
+    // will report each sub-block (maf_mafBlock_fprint()) to out as it comes in and immediatly
+    // destroy that block.
     /*
     printf("\n\nprocessBlockForSplice(block=%"PRIu64", seq=%s, start=%"PRIu64", stop=%"PRIu64")\n",
            blockNumber, seq, start, stop);
@@ -233,7 +226,7 @@ mafBlock_t *processBlockForSplice(mafBlock_t *b, uint64_t blockNumber, const cha
                 sprintf(id, " splice_id=%" PRIu64 "_%" PRIu64, blockNumber, spliceNumber);
                 maf_mafBlock_appendToAlignmentBlock(mb, id);
             }
-            maf_mafBlock_print(mb);
+            maf_mafBlock_fprint(out, mb);
             if (mb != b) {
                 maf_destroyMafBlockList(mb);
             }
@@ -277,8 +270,9 @@ mafBlock_t *spliceBlock(mafBlock_t *b, uint64_t l, uint64_t r, int64_t **offsetA
     ml2 = maf_mafBlock_getHeadLine(mb);
     maf_mafBlock_setLineNumber(mb, lineNumber);
     maf_mafBlock_incrementNumberOfLines(mb);
-    uint64_t len;
+    uint64_t len, basesBefore, basesInside;
     char *seq = NULL;
+    mafCoordinateMap_t *map = NULL;
     bool prevLineUsed = true; // used when a mafline is dropped because it's length becomes 0
     bool emptyBlock = true;
     uint64_t si = 0; // sequence index, for addressing into offsetArray
@@ -312,43 +306,14 @@ mafBlock_t *spliceBlock(mafBlock_t *b, uint64_t l, uint64_t r, int64_t **offsetA
         if (maf_mafBlock_getSequenceFieldLength(mb) == 0) {
             maf_mafBlock_setSequenceFieldLength(mb, len);
         }
-        // printf(" [%2"PRIi64", %2"PRIi64"] pre: %s\n", offsetArray[si][0], offsetArray[si][1], maf_mafLine_getSpecies(ml1));
-        // find first non-gap position OR the left edge, update offset
-        while (seq[offsetArray[si][0]] == '-' &&
-               offsetArray[si][0] <= (int64_t)l) {
-            ++offsetArray[si][0];
-            if (seq[offsetArray[si][0]] != '-' && offsetArray[si][1] >= 0) {
-                // if we've advanced to a non-gap char and the local offset
-                // is not 0 (i.e. these aren't simply leading gaps), then
-                // advance the offset
-                ++offsetArray[si][1]; // advance offset
-            }
-        }
-        // printf(" [%2"PRIi64", %2"PRIi64"] post-initial gap / left edge discovery: %s \n", offsetArray[si][0], offsetArray[si][1], maf_mafLine_getSpecies(ml1));
-        // we normally ignore the initial value because it's already been set. however if -1 it must be set
-        if (seq[offsetArray[si][0]] != '-' && offsetArray[si][1] == -1) {
-            offsetArray[si][1] = 0;
-        }
-        // offsets
-        for (int64_t i = offsetArray[si][0] + 1; i <= (int64_t)l; ++i) {
-            // figure out the non-gap offset for the splice-in point, `l'
-            offsetArray[si][0] = i; // local pos
-            if (seq[i] != '-') {
-                if (offsetArray[si][1] == -1) {
-                    offsetArray[si][1] = 0;
-                }
-                ++offsetArray[si][1]; // advance offset
-            }
-        }
-        // printf(" [%2"PRIi64", %2"PRIi64"] post-gaps: %s \n", offsetArray[si][0], offsetArray[si][1], maf_mafLine_getSpecies(ml1));
-        bool allGaps = true;
-        for (uint64_t i = l; i <= r; ++i) {
-            if (seq[i] != '-') {
-                allGaps = false;
-                break;
-            }
-        }
-        if (allGaps) {
+        // bases before and inside [l, r], from the line's coordinate map
+        map = maf_mafLine_getCoordinateMap(ml1);
+        basesBefore = maf_mafCoordinateMap_getBasesBefore(map, l);
+        basesInside = maf_mafCoordinateMap_getBasesBefore(map, r + 1) - basesBefore;
+        // record where this sequence was left, for callers that walk on
+        offsetArray[si][0] = r;
+        offsetArray[si][1] = maf_mafCoordinateMap_getBasesBefore(map, r);
+        if (basesInside == 0) {
             // this sequence is all gaps in this region, exclude it
             ml1 = maf_mafLine_getNext(ml1);
             prevLineUsed = false;
@@ -359,37 +324,9 @@ mafBlock_t *spliceBlock(mafBlock_t *b, uint64_t l, uint64_t r, int64_t **offsetA
             ++si;
             continue;
         }
-        // Walk up beyond the `l' point if the left edge falls on a gap character
-        while (seq[offsetArray[si][0]] == '-' && offsetArray[si][0] < (int64_t) r) {
-            ++offsetArray[si][0];
-            if (seq[offsetArray[si][0]] != '-') { //  && offsetArray[si][1] >= 0) {
-                ++offsetArray[si][1];
-            }
-        }
-        // printf(" [%2"PRIi64", %2"PRIi64"] walk past left: %s\n", offsetArray[si][0], offsetArray[si][1], maf_mafLine_getSpecies(ml1));
-        // ensure local offset is set properly
-        int64_t seqCoords = offsetArray[si][1];
-        if (offsetArray[si][1] == -1) {
-            seqCoords = 0;
-            if (seq[offsetArray[si][0]] != '-') {
-                offsetArray[si][1] = 0;
-            }
-        }
-        // printf(" [%2"PRIi64", %2"PRIi64"] seqCoords:%"PRIi64" set properly: %s\n", offsetArray[si][0], offsetArray[si][1], seqCoords, maf_mafLine_getSpecies(ml1));
-        maf_mafLine_setStart(ml2, maf_mafLine_getStart(ml1) + seqCoords);
-        // update offsetArray:
-        for (uint64_t i = offsetArray[si][0] + 1; i <= r; ++i) {
-            offsetArray[si][0] = i;
-            if (seq[i] != '-') {
-                if (offsetArray[si][1] == -1) {
-                    offsetArray[si][1] = 0;
-                }
-                ++offsetArray[si][1];
-            }
-        }
-        // printf(" [%2"PRIi64", %2"PRIi64"] post update: %s\n", offsetArray[si][0], offsetArray[si][1], maf_mafLine_getSpecies(ml1));
+        maf_mafLine_setStart(ml2, maf_mafLine_getStart(ml1) + basesBefore);
         maf_mafLine_setSequence(ml2, de_strndup(seq + l, 1 + r - l));
-        maf_mafLine_setLength(ml2, countNonGaps(maf_mafLine_getSequence(ml2)));
+        maf_mafLine_setLength(ml2, basesInside);
         maf_mafBlock_setSequenceFieldLength(mb, maf_mafLine_getSequenceFieldLength(ml2));
         maf_mafLine_setStrand(ml2, maf_mafLine_getStrand(ml1));
         maf_mafLine_setSourceLength(ml2, maf_mafLine_getSourceLength(ml1));
@@ -416,7 +353,7 @@ mafBlock_t *spliceBlock(mafBlock_t *b, uint64_t l, uint64_t r, int64_t **offsetA
     }
 }
 void checkBlock(mafBlock_t *b, uint64_t blockNumber, const char *seq, uint64_t start,
-                uint64_t stop, bool *printedHeader, bool isSoft, bool checkFirstLineOnly) {
+                uint64_t stop, bool *printedHeader, bool isSoft, bool checkFirstLineOnly, FILE *out) {
     // read through each line of a mafBlock and if the sequence matches the region
     // we're looking for, report the block.
     mafLine_t *ml = maf_mafBlock_getHeadLine(b);
@@ -427,11 +364,11 @@ void checkBlock(mafBlock_t *b, uint64_t blockNumber, const char *seq, uint64_t s
                 *printedHeader = true;
             }
             if (isSoft) {
-                maf_mafBlock_print(b);
+                maf_mafBlock_fprint(out, b);
                 break;
             } else {
                 mafBlock_t *dummy = NULL;
-                dummy = processBlockForSplice(b, blockNumber, seq, start, stop, false);
+                dummy = processBlockForSplice(b, blockNumber, seq, start, stop, false, out);
                 assert(dummy == NULL);
                 break;
             }
@@ -442,15 +379,42 @@ void checkBlock(mafBlock_t *b, uint64_t blockNumber, const char *seq, uint64_t s
         ml = maf_mafLine_getNext(ml);        
     }
 }
+void extractBlock(mafBlock_t *b, uint64_t blockNumber, FILE *out, void *data) {
+    // check one block, possibly on a worker thread. The header has already been printed.
+    extractRegion_t *r = (extractRegion_t *) data;
+    bool printedHeader = true;
+    checkBlock(b, blockNumber, r->seq, r->start, r->stop, &printedHeader, r->isSoft,
+               r->checkFirstLineOnly, out);
+}
 void processBody(mafFileApi_t *mfa, char *seq, uint64_t start, uint64_t stop, bool isSoft,
-                 bool checkFirstLineOnly) {
+                 bool checkFirstLineOnly, unsigned threads) {
     mafBlock_t *thisBlock = NULL;
     bool printedHeader = false;
     uint64_t blockNumber = 0;
-    while ((thisBlock = maf_readBlock(mfa)) != NULL) {
-        checkBlock(thisBlock, blockNumber, seq, start, stop, &printedHeader, isSoft, checkFirstLineOnly);
-        maf_destroyMafBlockList(thisBlock);
-        ++blockNumber;
+    mafIndex_t *idx = maf_newMafIndex(maf_mafFileApi_getFilename(mfa));
+    if (idx != NULL) {
+        // only read the blocks the index says may overlap the region
+        uint64_t n = maf_mafIndex_query(idx, seq, start, stop);
+        for (uint64_t i = 0; i < n; ++i) {
+            thisBlock = maf_mafIndex_readBlock(idx, mfa, i);
+            checkBlock(thisBlock, maf_mafIndex_getBlockNumber(idx, i), seq, start, stop,
+                       &printedHeader, isSoft, checkFirstLineOnly, stdout);
+            maf_destroyMafBlockList(thisBlock);
+        }
+        maf_destroyMafIndex(idx);
+    } else if (threads > 1) {
+        // nothing but the blocks follows the header, so it may as well come first
+        extractRegion_t r = {seq, start, stop, isSoft, checkFirstLineOnly};
+        printHeader();
+        printedHeader = true;
+        maf_processBlocksInOrder(mfa, threads, extractBlock, &r, stdout);
+    } else {
+        while ((thisBlock = maf_readBlock(mfa)) != NULL) {
+            checkBlock(thisBlock, blockNumber, seq, start, stop, &printedHeader, isSoft, checkFirstLineOnly,
+                       stdout);
+            maf_destroyMafBlockList(thisBlock);
+            ++blockNumber;
+        }
     }
     if (!printedHeader) {
         // this makes the output valid even when no data was output
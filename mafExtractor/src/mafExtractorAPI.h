@@ -31,6 +31,15 @@
 #include "common.h"
 #include "sharedMaf.h"
 
+typedef struct extractRegion {
+    // the region being extracted, shared by all worker threads
+    const char *seq;
+    uint64_t start;
+    uint64_t stop;
+    bool isSoft;
+    bool checkFirstLineOnly;
+} extractRegion_t;
+
 bool checkRegion(uint64_t targetStart, uint64_t targetStop, uint64_t lineStart,
                  uint64_t length, uint64_t sourceLength, char strand);
 bool searchMatched(mafLine_t *ml, const char *seq, uint64_t start, uint64_t stop);
@@ -41,12 +50,13 @@ void printTargetColumns(bool *targetColumns, uint64_t n);
 int64_t **createOffsets(uint64_t n);
 void destroyOffsets(int64_t **offs, uint64_t n);
 mafBlock_t *processBlockForSplice(mafBlock_t *b, uint64_t blockNumber, const char *seq,
-                                  uint64_t start, uint64_t stop, bool store);
+                                  uint64_t start, uint64_t stop, bool store, FILE *out);
 mafBlock_t *spliceBlock(mafBlock_t *mb, uint64_t l, uint64_t r, int64_t **offsetArray);
 void checkBlock(mafBlock_t *b, uint64_t blockNumber, const char *seq, uint64_t start,
-                uint64_t stop, bool *printedHeader, bool isSoft, bool checkFirstLineOnly);
+                uint64_t stop, bool *printedHeader, bool isSoft, bool checkFirstLineOnly, FILE *out);
+void extractBlock(mafBlock_t *b, uint64_t blockNumber, FILE *out, void *data);
 void processBody(mafFileApi_t *mfa, char *seq, uint64_t start, uint64_t stop, bool isSoft,
-                 bool checkFirstLineOnly);
+                 bool checkFirstLineOnly, unsigned threads);
 uint64_t sumBool(bool *array, uint64_t n);
 void printOffsetArray(int64_t **offsetArray, uint64_t n);
 
@@ -527,7 +527,7 @@ static void processSpliceTest(CuTest *testCase, const char *seq, uint64_t start,
     va_end(argp);
     while (ib != NULL) {
         // process each member of the maf block linked list individiually
-        tmp = processBlockForSplice(ib, 1, seq, start, stop, true);
+        tmp = processBlockForSplice(ib, 1, seq, start, stop, true, stdout);
         if (obhead == NULL) {
             ob = tmp;
             obhead = ob;
@@ -36,25 +36,44 @@
 #include <unistd.h>
 #include "common.h"
 #include "sharedMaf.h"
+#include "seqKernels.h"
 #include "buildVersion.h"
 
 const char *g_version = "version 0.1 September 2012";
 
+typedef struct filterOptions {
+    // the settings a block is checked against, shared by all worker threads
+    char **names;
+    unsigned n;
+    bool isInclude;
+    int64_t excludeBlockDegreeGT;
+    int64_t excludeBlockDegreeLT;
+    double maxRefNFrac;
+} filterOptions_t;
+typedef struct heldLines {
+    // lines of a block held back until it is known whether the block is reported
+    char *s;
+    size_t n;
+    size_t size;
+} heldLines_t;
+
 void version(void);
 void usage(void);
 void parseOptions(int argc, char **argv, char *filename, char *nameList,
                   bool *isInclude, int64_t *blockDegLT, int64_t *blockDegGT,
-                  double *maxRefNFrac);
+                  double *maxRefNFrac, unsigned *threads);
 void checkRegion(unsigned lineno, char *fullname, uint64_t pos, uint64_t start,
                  uint64_t length, uint64_t sourceLength, char strand);
 bool nameOnList(char *name, char **namelist, unsigned n);
-void reportBlock(mafBlock_t *mb, char **names, unsigned n, bool isInclude);
+void reportBlock(mafBlock_t *mb, char **names, unsigned n, bool isInclude, FILE *out);
 void checkBlock(mafBlock_t *mb, char **names, unsigned n, bool isInclude,
                 int64_t excludeBlockDegreeGT, int64_t excludeBlockDegreeLT,
-                double maxRefNFrac);
-void filterInput(mafFileApi_t *mfa, char **names, unsigned n,
-                 bool isInclude, int64_t excludeBlockDegreeGT,
-                 int64_t excludeBlockDegreeLT, double maxRefNFrac);
+                double maxRefNFrac, FILE *out);
+void filterBlock(mafBlock_t *mb, uint64_t i, FILE *out, void *data);
+bool refNFracPasses(mafLine_t *ml, double maxRefNFrac);
+void holdLine(heldLines_t *held, const char *line);
+void filterLines(mafFileApi_t *mfa, filterOptions_t *o);
+void filterInput(mafFileApi_t *mfa, filterOptions_t *options, unsigned threads);
 unsigned countNames(char *s);
 char** extractNames(char *nameList, unsigned n);
 void destroyNameList(char **names, unsigned n);
@@ -83,10 +102,12 @@ void usage(void) {
     usageMessage('g', "noDegreeGT", "filter out all blocks with degree greater than this value.");
     usageMessage('l', "noDegreeLT", "filter out all blocks with degree less than this value.");
     usageMessage('N', "maxRefNFrac", "filter out all blocks whose reference sequence is more than this fraction of Ns");    
+    usageMessage('t', "threads", "number of threads to filter blocks with, output is identical "
+                 "whatever the number. default=1.");
     usageMessage('v', "verbose", "turns on verbose output.");
     exit(EXIT_FAILURE);
 }
-void parseOptions(int argc, char **argv, char *filename, char *nameList, bool *isInclude, int64_t *blockDegGt, int64_t *blockDegLt, double *maxRefNFrac) {
+void parseOptions(int argc, char **argv, char *filename, char *nameList, bool *isInclude, int64_t *blockDegGt, int64_t *blockDegLt, double *maxRefNFrac, unsigned *threads) {
     extern int g_debug_flag;
     extern int g_verbose_flag;
     int c;
@@ -103,10 +124,11 @@ void parseOptions(int argc, char **argv, char *filename, char *nameList, bool *i
             {"noDegreeGT", required_argument, 0, 'g'},
             {"noDegreeLT", required_argument, 0, 'l'},
             {"maxRefNFrac", required_argument, 0, 'N'},
+            {"threads", required_argument, 0, 't'},
             {0, 0, 0, 0}
         };
         int longIndex = 0;
-        c = getopt_long(argc, argv, "m:i:e:g:l:v:N:h",
+        c = getopt_long(argc, argv, "m:i:e:g:l:v:N:t:h",
                         longOptions, &longIndex);
         if (c == -1) {
             break;
@@ -147,6 +169,11 @@ void parseOptions(int argc, char **argv, char *filename, char *nameList, bool *i
             setRefGap = true;
             sscanf(optarg, "%lf", maxRefNFrac);
             break;
+        case 't':
+            if (!parseThreads(optarg, threads)) {
+                usage();
+            }
+            break;
         case 'h':
         case '?':
             usage();
@@ -183,41 +210,49 @@ bool nameOnList(char *name, char **namelist, unsigned n) {
     }
     return false;
 }
-void reportBlock(mafBlock_t *mb, char **names, unsigned n, bool isInclude) {
+void reportBlock(mafBlock_t *mb, char **names, unsigned n, bool isInclude, FILE *out) {
     // report the block being mindful of only including or excluding.
     mafLine_t *ml = maf_mafBlock_getHeadLine(mb);
     while (ml != NULL) {
         if (maf_mafLine_getType(ml) != 's') {
             // report all sequence lines
-            printf("%s\n", maf_mafLine_getLine(ml));
+            fprintf(out, "%s\n", maf_mafLine_getLine(ml));
             ml = maf_mafLine_getNext(ml);
             continue;
         }
         if (n > 0) {
             if (isInclude) {
                 if (nameOnList(maf_mafLine_getSpecies(ml), names, n)) {
-                    printf("%s\n", maf_mafLine_getLine(ml));
+                    fprintf(out, "%s\n", maf_mafLine_getLine(ml));
                     ml = maf_mafLine_getNext(ml);
                     continue;
                 }
             } else {
                 if (!nameOnList(maf_mafLine_getSpecies(ml), names, n)) {
-                    printf("%s\n", maf_mafLine_getLine(ml));
+                    fprintf(out, "%s\n", maf_mafLine_getLine(ml));
                     ml = maf_mafLine_getNext(ml);
                     continue;
                 }
             }
         } else {
             // report entire block, this came from one of the blockDegree options
-            printf("%s\n", maf_mafLine_getLine(ml));
+            fprintf(out, "%s\n", maf_mafLine_getLine(ml));
         }
         ml = maf_mafLine_getNext(ml);
     }
-    printf("\n");
+    fprintf(out, "\n");
+}
+bool refNFracPasses(mafLine_t *ml, double maxRefNFrac) {
+    // whether the reference, the first sequence of a block, has few enough Ns
+    char *sequence = maf_mafLine_getSequence(ml);
+    int64_t length = strlen(sequence);
+    int64_t bases = length - (int64_t) seq_countGaps(sequence, length);
+    int64_t Ns = (int64_t) seq_countNs(sequence, length);
+    return (double)Ns / (double)bases <= maxRefNFrac;
 }
 void checkBlock(mafBlock_t *mb, char **names, unsigned n, bool isInclude,
                 int64_t excludeBlockDegreeGT, int64_t excludeBlockDegreeLT,
-                double maxRefNFrac) {
+                double maxRefNFrac, FILE *out) {
     // walk through the maf lines and see if this block should be reported
     mafLine_t *ml = maf_mafBlock_getHeadLine(mb);
     while (ml != NULL) {
@@ -226,32 +261,20 @@ void checkBlock(mafBlock_t *mb, char **names, unsigned n, bool isInclude,
             continue;
         }
         if (maxRefNFrac >= 0.) {
-            char *sequence = maf_mafLine_getSequence(ml);
-            int64_t length = strlen(sequence);
-            int64_t bases = 0;
-            int64_t Ns = 0;
-            for (int64_t i = 0; i < length; ++i) {
-                if (sequence[i] == 'N' || sequence[i] == 'n') {
-                    ++Ns;
-                }
-                if (sequence[i] != '-') {
-                    ++bases;
-                }
-            }
-            if ((double)Ns / (double)bases <= maxRefNFrac) {
-                reportBlock(mb, names, n, isInclude);
+            if (refNFracPasses(ml, maxRefNFrac)) {
+                reportBlock(mb, names, n, isInclude, out);
             } 
             return;
         } else if (n > 0) {
             // filtering on names
             if (isInclude) {
                 if (nameOnList(maf_mafLine_getSpecies(ml), names, n)) {
-                    reportBlock(mb, names, n, isInclude);
+                    reportBlock(mb, names, n, isInclude, out);
                     return;
                 }
             } else {
                 if (!nameOnList(maf_mafLine_getSpecies(ml), names, n)) {
-                    reportBlock(mb, names, n, isInclude);
+                    reportBlock(mb, names, n, isInclude, out);
                     return;
                 }
             }
@@ -260,17 +283,17 @@ void checkBlock(mafBlock_t *mb, char **names, unsigned n, bool isInclude,
             int64_t m = maf_mafBlock_getNumberOfSequences(mb);
             if (excludeBlockDegreeGT != -1 && excludeBlockDegreeLT != -1) {
                 if (m >= excludeBlockDegreeLT && m <= excludeBlockDegreeGT) {
-                    reportBlock(mb, names, n, isInclude);
+                    reportBlock(mb, names, n, isInclude, out);
                     return;
                 }
             } else if (excludeBlockDegreeGT != -1) {
                 if (m <= excludeBlockDegreeGT) {
-                    reportBlock(mb, names, n, isInclude);
+                    reportBlock(mb, names, n, isInclude, out);
                     return;
                 }
             } else {
                 if (m >= excludeBlockDegreeLT) {
-                    reportBlock(mb, names, n, isInclude);
+                    reportBlock(mb, names, n, isInclude, out);
                     return;
                 }
             }
@@ -278,21 +301,79 @@ void checkBlock(mafBlock_t *mb, char **names, unsigned n, bool isInclude,
         ml = maf_mafLine_getNext(ml);
     }
 }
-void filterInput(mafFileApi_t *mfa, char **names, unsigned n,
-                 bool isInclude, int64_t excludeBlockDegreeGT,
-                 int64_t excludeBlockDegreeLT, double maxRefNFrac) {
-    mafBlock_t *thisBlock = NULL;
-    bool headBlock = true;
-    while ((thisBlock = maf_readBlock(mfa)) != NULL) {
-        if (headBlock) {
-            reportBlock(thisBlock, names, n, isInclude);
-            headBlock = false;
-            maf_destroyMafBlockList(thisBlock);
-            continue;
+void filterBlock(mafBlock_t *mb, uint64_t i, FILE *out, void *data) {
+    // called on every block after the header, possibly on a worker thread.
+    (void) i;
+    filterOptions_t *o = (filterOptions_t *) data;
+    checkBlock(mb, o->names, o->n, o->isInclude, o->excludeBlockDegreeGT, o->excludeBlockDegreeLT,
+               o->maxRefNFrac, out);
+}
+void holdLine(heldLines_t *held, const char *line) {
+    size_t n = strlen(line);
+    if (held->n + n + 1 > held->size) {
+        held->size = 2 * (held->n + n + 1);
+        held->s = (char *) realloc(held->s, held->size);
+        assert(held->s != NULL);
+    }
+    memcpy(held->s + held->n, line, n);
+    held->s[held->n + n] = '\n';
+    held->n += n + 1;
+}
+void filterLines(mafFileApi_t *mfa, filterOptions_t *o) {
+    // filter on names or on Ns a line at a time, giving the same output as
+    // checkBlock(). Whether a block is reported is known from its first
+    // sequence line that passes (names) or from its first sequence line (Ns),
+    // so only the other lines before that one are held and blocks of any
+    // number of rows are filtered in bounded memory.
+    mafBlockCursor_t *bc = maf_newMafBlockCursor(mfa);
+    heldLines_t held = {NULL, 0, 0};
+    bool header = true;
+    while (maf_blockCursor_nextBlock(bc)) {
+        // the header is reported whole
+        bool reported = header, rejected = false;
+        header = false;
+        held.n = 0;
+        mafLine_t *ml = NULL;
+        while (!rejected && (ml = maf_blockCursor_next(bc)) != NULL) {
+            bool sequence = (maf_mafLine_getType(ml) == 's');
+            bool passes = !sequence || o->n == 0 ||
+                (nameOnList(maf_mafLine_getSpecies(ml), o->names, o->n) == o->isInclude);
+            if (sequence && !reported) {
+                if (o->maxRefNFrac >= 0.) {
+                    reported = refNFracPasses(ml, o->maxRefNFrac);
+                    rejected = !reported;
+                } else {
+                    reported = passes;
+                }
+                if (reported) {
+                    fwrite(held.s, 1, held.n, stdout);
+                }
+            }
+            if (reported && passes) {
+                fprintf(stdout, "%s\n", maf_mafLine_getLine(ml));
+            } else if (!reported && !sequence) {
+                holdLine(&held, maf_mafLine_getLine(ml));
+            }
         }
-        checkBlock(thisBlock, names, n, isInclude, excludeBlockDegreeGT, excludeBlockDegreeLT, maxRefNFrac);
-        maf_destroyMafBlockList(thisBlock);
+        if (reported) {
+            fprintf(stdout, "\n");
+        }
+    }
+    free(held.s);
+    maf_destroyMafBlockCursor(bc);
+}
+void filterInput(mafFileApi_t *mfa, filterOptions_t *options, unsigned threads) {
+    if (threads == 1 && (options->n > 0 || options->maxRefNFrac >= 0.)) {
+        filterLines(mfa, options);
+        return;
+    }
+    mafBlock_t *headBlock = maf_readBlock(mfa);
+    if (headBlock == NULL) {
+        return;
     }
+    reportBlock(headBlock, options->names, options->n, options->isInclude, stdout);
+    maf_destroyMafBlockList(headBlock);
+    maf_processBlocksInOrder(mfa, threads, filterBlock, options, stdout);
 }
 unsigned countNames(char *s) {
     unsigned i, n;
@@ -345,12 +426,18 @@ int main(int argc, char **argv) {
     int64_t excludeBlockDegreeLT = -1;
     bool isInclude = true; // if 0 then we are in exclude mode. 1 is include mode.
     double maxRefNFrac = -1.;
-    parseOptions(argc, argv,  filename, nameList, &isInclude, &excludeBlockDegreeGT, &excludeBlockDegreeLT, &maxRefNFrac);
+    unsigned threads = 1;
+    parseOptions(argc, argv,  filename, nameList, &isInclude, &excludeBlockDegreeGT, &excludeBlockDegreeLT, &maxRefNFrac, &threads);
     unsigned n = countNames(nameList);
     char **names = extractNames(nameList, n);
     mafFileApi_t *mfa = maf_newMfa(filename, "r");
+    // most lines are only matched on name and echoed back out
+    maf_mafFileApi_setLazyParsing(mfa, true);
 
-    filterInput(mfa, names, n, isInclude, excludeBlockDegreeGT, excludeBlockDegreeLT, maxRefNFrac);
+    filterOptions_t options = {names, n, isInclude, excludeBlockDegreeGT, excludeBlockDegreeLT, maxRefNFrac};
+    PROFILE_BEGIN("filterInput");
+    filterInput(mfa, &options, threads);
+    PROFILE_END("filterInput");
 
     maf_destroyMfa(mfa);
     destroyNameList(names, n);
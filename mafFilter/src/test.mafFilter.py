@@ -25,6 +25,7 @@
 import os
 import random
 import re
+import subprocess
 import sys
 import unittest
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]), '../../lib/')))
@@ -493,6 +494,82 @@ class FilterTest(unittest.TestCase):
             self.assertTrue(filtered)
             if filtered:
                 mtt.removeDir(tmpDir)
+    def testThreads(self):
+        """ mafFilter should give byte identical output whatever the number of --threads.
+        """
+        mtt.makeTempDirParent()
+        tmpDir = os.path.abspath(mtt.makeTempDir('threads'))
+        body = mtt.randomMafBody(500, ['target0.chr0', 'target1.chr0', 'mm4.chr6', 'baboon', 'rn3.chr4'])
+        testMafPath, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')),
+                                           body, g_headers)
+        parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for options in [['--includeSeq', g_sequenceList], ['--excludeSeq', g_sequenceList],
+                        ['--noDegreeLT=3'], ['--noDegreeGT=3'], ['--maxRefNFrac=0.1']]:
+            outputs = []
+            for threads in ['1', '2', '7']:
+                cmd = [os.path.abspath(os.path.join(parent, 'test', 'mafFilter'))]
+                cmd += ['--maf', testMafPath, '--threads', threads] + options
+                outpipes = [os.path.abspath(os.path.join(tmpDir, 'filtered.%s.maf' % threads))]
+                mtt.recordCommands([cmd], tmpDir, outPipes=outpipes)
+                mtt.runCommandsS([cmd], tmpDir, outPipes=outpipes)
+                outputs.append(open(outpipes[0]).read())
+            self.assertTrue(outputs[0].count('\na score') > 0)
+            for o in outputs[1:]:
+                self.assertEqual(outputs[0], o)
+        mtt.removeDir(tmpDir)
+    def testThreadsOutOfRange(self):
+        """ mafFilter should refuse a --threads value that is negative or too large.
+        """
+        mtt.makeTempDirParent()
+        tmpDir = os.path.abspath(mtt.makeTempDir('threadsOutOfRange'))
+        body = mtt.randomMafBody(10, ['hg18.chr1', 'mm9.chr2'])
+        testMafPath, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')),
+                                           body, g_headers)
+        parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for threads in ['-3', '100000']:
+            cmd = [os.path.abspath(os.path.join(parent, 'test', 'mafFilter'))]
+            cmd += ['--maf', testMafPath, '--threads', threads] + ['--includeSeq', g_sequenceList]
+            mtt.recordCommands([cmd], tmpDir)
+            p = subprocess.Popen(cmd, cwd=tmpDir, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            out, err = p.communicate()
+            self.assertEqual(p.returncode, 1)
+            self.assertTrue('--threads must be an integer from 1 to 256, not %s' % threads in err)
+        mtt.removeDir(tmpDir)
+    def testLargeBlocks(self):
+        """ Filtering a line at a time should give the same output for blocks with very many rows.
+        """
+        mtt.makeTempDirParent()
+        tmpDir = os.path.abspath(mtt.makeTempDir('largeBlocks'))
+        rng = random.Random(5)
+        names = ['target0.chr0', 'target1.chr0', 'mm4.chr6', 'baboon', 'rn3.chr4']
+        body = ''
+        for b in xrange(0, 12):
+            body += 'a score=%d\n' % b
+            for r in xrange(0, rng.choice([1, 3, 4000])):
+                # some blocks only hold names that are filtered out
+                name = rng.choice(names[2:] if b % 4 == 0 else names)
+                body += 's %s %d 4 + 100000 %s\n' % (name, r, rng.choice(['ACGT', 'ANNT', 'NN-NN']))
+                if rng.random() < 0.1:
+                    body += 'e %s %d 0 + 100000 I\n' % (name, r)
+                if rng.random() < 0.1:
+                    body += 'i %s C 0 C 0\n' % name
+            body += '\n'
+        testMafPath, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')),
+                                           body, g_headers)
+        parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for options in [['--includeSeq', g_sequenceList], ['--excludeSeq', g_sequenceList],
+                        ['--maxRefNFrac=0.3']]:
+            outputs = []
+            for threads in ['1', '2']:
+                cmd = [os.path.abspath(os.path.join(parent, 'test', 'mafFilter'))]
+                cmd += ['--maf', testMafPath, '--threads', threads] + options
+                outpipes = [os.path.abspath(os.path.join(tmpDir, 'filtered.%s.maf' % threads))]
+                mtt.recordCommands([cmd], tmpDir, outPipes=outpipes)
+                mtt.runCommandsS([cmd], tmpDir, outPipes=outpipes)
+                outputs.append(open(outpipes[0]).read())
+            self.assertTrue(outputs[0].count('\na score') > 0)
+            self.assertEqual(outputs[0], outputs[1])
+        mtt.removeDir(tmpDir)
     def testMemory1(self):
         """ If valgrind is installed on the system, check for memory related errors (1).
         """
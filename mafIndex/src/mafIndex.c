@@ -0,0 +1,132 @@
+/*
+ * Copyright (C) 2011-2014 by
+ * Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+ * ... and other members of the Reconstruction Team of David Haussler's
+ * lab (BME Dept. UCSC).
+ *
+ * Permission is hereby granted, free of charge, to any person obtaining a copy
+ * of this software and associated documentation files (the "Software"), to deal
+ * in the Software without restriction, including without limitation the rights
+ * to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+ * copies of the Software, and to permit persons to whom the Software is
+ * furnished to do so, subject to the following conditions:
+ *
+ * The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+ *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+ * AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+ * LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+ * OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+ * THE SOFTWARE.
+ */
+#include <assert.h>
+#include <getopt.h>
+#include <stdbool.h>
+#include <stdlib.h>
+#include <stdio.h>
+#include <string.h>
+#include "common.h"
+#include "sharedMaf.h"
+#include "buildVersion.h"
+
+const char *g_version = "version 0.1 October 2026";
+
+void version(void);
+void usage(void);
+void parseOptions(int argc, char **argv, char *filename);
+
+void version(void) {
+    fprintf(stderr, "mafIndex, %s\nbuild: %s, %s, %s\n\n", g_version, g_build_date,
+            g_build_git_branch, g_build_git_sha);
+}
+void usage(void) {
+    version();
+    fprintf(stderr, "Usage: mafIndex --maf [path to maf] [options]\n\n"
+            "mafIndex is a program that will read a maf file and write an index of\n"
+            "its blocks to [path to maf].mafidx. mafExtractor, mafPositionFinder and\n"
+            "mafPairCoverage use the index when it exists, reading only the blocks\n"
+            "that contain the region asked for. An index is ignored once the maf\n"
+            "file changes and must then be rebuilt.\n"
+            );
+    fprintf(stderr, "Options: \n");
+    usageMessage('h', "help", "show this help message and exit.");
+    usageMessage('m', "maf", "path to maf file.");
+    usageMessage('v', "verbose", "turns on verbose output.");
+    exit(EXIT_FAILURE);
+}
+void parseOptions(int argc, char **argv, char *filename) {
+    extern int g_debug_flag;
+    extern int g_verbose_flag;
+    int c;
+    bool setMafName = false;
+    while (1) {
+        static struct option longOptions[] = {
+            {"debug", no_argument, &g_debug_flag, 1},
+            {"verbose", no_argument, 0, 'v'},
+            {"help", no_argument, 0, 'h'},
+            {"version", no_argument, 0, 0},
+            {"maf",  required_argument, 0, 'm'},
+            {0, 0, 0, 0}
+        };
+        int longIndex = 0;
+        c = getopt_long(argc, argv, "m:vh",
+                        longOptions, &longIndex);
+        if (c == -1) {
+            break;
+        }
+        switch (c) {
+        case 0:
+            if (strcmp("version", longOptions[longIndex].name) == 0) {
+                version();
+                exit(EXIT_SUCCESS);
+            }
+            break;
+        case 'm':
+            setMafName = true;
+            sscanf(optarg, "%s", filename);
+            break;
+        case 'v':
+            g_verbose_flag++;
+            break;
+        case 'h':
+        case '?':
+            usage();
+            break;
+        default:
+            abort();
+        }
+    }
+    if (!setMafName) {
+        fprintf(stderr, "specify --maf\n");
+        usage();
+    }
+    if (strcmp(filename, "-") == 0) {
+        fprintf(stderr, "Error, --maf must be a file, stdin can not be indexed\n");
+        usage();
+    }
+    // Check there's nothing left over on the command line
+    if (optind < argc) {
+        char errorString[30] = "Unexpected arguments:";
+        while (optind < argc) {
+            strcat(errorString, " ");
+            strcat(errorString, argv[optind++]);
+        }
+        fprintf(stderr, "%s\n", errorString);
+        usage();
+    }
+}
+int main(int argc, char **argv) {
+    extern int g_verbose_flag;
+    char filename[kMaxStringLength];
+    parseOptions(argc, argv, filename);
+    PROFILE_BEGIN("writeMafIndex");
+    maf_writeMafIndex(filename);
+    PROFILE_END("writeMafIndex");
+    if (g_verbose_flag) {
+        fprintf(stderr, "wrote %s.mafidx\n", filename);
+    }
+    return EXIT_SUCCESS;
+}
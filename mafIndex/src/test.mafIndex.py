@@ -0,0 +1,168 @@
+##################################################
+# Copyright (C) 2012 by 
+# Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+# ... and other members of the Reconstruction Team of David Haussler's 
+# lab (BME Dept. UCSC).
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE. 
+##################################################
+import gzip
+import os
+import subprocess
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]), '../../lib/')))
+import mafToolsTest as mtt
+
+g_header = '''##maf version=1 scoring=tba.v8
+# tba.v8 (((human chimp) baboon) (mouse rat))
+
+'''
+g_body = '''a score=0
+s hg18.chr7    27578828 38 + 158545518 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG
+s panTro1.chr6 28741140 38 + 161576975 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG
+s baboon         116834 38 +   4622798 AAA-GGGAATGTTAACCAAATGA---GTTGTCTCTTATGGTG
+
+a score=0
+s hg18.chr7    27699739 6 + 158545518 TAAAGA
+s panTro1.chr6 28862317 6 + 161576975 TAAAGA
+s baboon         241163 6 +   4622798 TAAAGA
+
+
+a score=0
+s hg18.chr7      130976000 10 - 158545518 AGTC-TCCGTA
+s panTro1.chr6   132835784 10 - 161576975 AGTCTTCC-TA
+
+a score=0
+s baboon         241169 4 +   4622798 TAAA
+s hg18.chr7    27578850 6 + 158545518 TA-AAGA
+
+'''
+g_queries = [('hg18.chr7', 27578828, 27578828),
+             ('hg18.chr7', 27578840, 27699740),
+             ('hg18.chr7', 27560000, 27579000),
+             ('hg18.chr7', 27569000, 27569010),
+             ('hg18.chr7', 27578830, 27578830),
+             ('panTro1.chr6', 28741140, 28741140),
+             ('baboon', 241165, 241170),
+             ('mm9.chr1', 0, 1000),
+             ]
+
+
+def binary(name):
+    parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if name == 'mafIndex':
+        return os.path.abspath(os.path.join(parent, 'test', 'mafIndex'))
+    return os.path.abspath(os.path.join(parent, '..', 'bin', name))
+def queryCommands(mafFile, name, start, stop):
+    extract = [binary('mafExtractor'), '--maf', mafFile, '--seq', name,
+               '--start', '%d' % start, '--stop', '%d' % stop]
+    return [extract, extract + ['--soft'],
+            [binary('mafPositionFinder'), '--maf', mafFile, '--seq', name, '--pos', '%d' % start],
+            [binary('mafPositionFinder'), '--maf', mafFile, '--seq', name, '--pos', '%d' % stop],
+            ]
+def runQueries(tmpDir, mafFile, suffix):
+    """ run every query against mafFile, returning the list of output files
+    """
+    outputs = []
+    for i, (name, start, stop) in enumerate(g_queries):
+        cmds = queryCommands(mafFile, name, start, stop)
+        outpipes = [os.path.join(tmpDir, 'out.%d.%d.%s' % (i, j, suffix)) for j in xrange(len(cmds))]
+        mtt.recordCommands(cmds, tmpDir, outPipes=outpipes)
+        mtt.runCommandsS(cmds, tmpDir, outPipes=outpipes)
+        outputs += outpipes
+    return outputs
+def readFile(filename):
+    f = open(filename, 'r')
+    s = f.read()
+    f.close()
+    return s
+def buildIndex(tmpDir, mafFile):
+    cmd = [binary('mafIndex'), '--maf', mafFile]
+    mtt.recordCommands([cmd], tmpDir)
+    mtt.runCommandsS([cmd], tmpDir)
+
+class IndexTest(unittest.TestCase):
+    def testIndexedOutput(self):
+        """ mafExtractor and mafPositionFinder should give the same output with and without an index.
+        """
+        mtt.makeTempDirParent()
+        tmpDir = os.path.abspath(mtt.makeTempDir('indexed'))
+        testMafPath, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')),
+                                           g_body, [g_header])
+        linear = runQueries(tmpDir, testMafPath, 'linear')
+        buildIndex(tmpDir, testMafPath)
+        self.assertTrue(os.path.exists(testMafPath + '.mafidx'))
+        indexed = runQueries(tmpDir, testMafPath, 'indexed')
+        for a, b in zip(linear, indexed):
+            self.assertEqual(readFile(a), readFile(b))
+        mtt.removeDir(tmpDir)
+    def testOutOfDateIndex(self):
+        """ An index should be ignored once its maf has changed.
+        """
+        mtt.makeTempDirParent()
+        tmpDir = os.path.abspath(mtt.makeTempDir('outOfDate'))
+        testMafPath, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')),
+                                           g_body, [g_header])
+        buildIndex(tmpDir, testMafPath)
+        f = open(testMafPath, 'a')
+        f.write('a score=0\ns hg18.chr7 27578828 2 + 158545518 AA\n\n')
+        f.close()
+        cmd = [binary('mafPositionFinder'), '--maf', testMafPath, '--seq', 'hg18.chr7', '--pos', '27578829']
+        mtt.recordCommands([cmd], tmpDir)
+        p = subprocess.Popen(cmd, cwd=tmpDir, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = p.communicate()
+        self.assertEqual(p.returncode, 0)
+        self.assertTrue('out of date index' in err)
+        self.assertEqual(len(out.splitlines()), 2)
+        mtt.removeDir(tmpDir)
+    def testCompressedInput(self):
+        """ gzip compressed mafs should give the same output as uncompressed ones.
+        """
+        mtt.makeTempDirParent()
+        tmpDir = os.path.abspath(mtt.makeTempDir('compressed'))
+        testMafPath, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')),
+                                           g_body, [g_header])
+        f = gzip.open(testMafPath + '.gz', 'wb')
+        f.write(readFile(testMafPath))
+        f.close()
+        linear = runQueries(tmpDir, testMafPath, 'linear')
+        compressed = runQueries(tmpDir, testMafPath + '.gz', 'compressed')
+        for a, b in zip(linear, compressed):
+            self.assertEqual(readFile(a), readFile(b))
+        mtt.removeDir(tmpDir)
+    def testMemory1(self):
+        """ If valgrind is installed on the system, check for memory related errors (1).
+        """
+        mtt.makeTempDirParent()
+        valgrind = mtt.which('valgrind')
+        if valgrind is None:
+            return
+        tmpDir = os.path.abspath(mtt.makeTempDir('memory1'))
+        testMafPath, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')),
+                                           g_body, [g_header])
+        cmd = mtt.genericValgrind(tmpDir)
+        cmd += [binary('mafIndex'), '--maf', testMafPath]
+        mtt.recordCommands([cmd], tmpDir)
+        mtt.runCommandsS([cmd], tmpDir)
+        self.assertTrue(mtt.noMemoryErrors(os.path.join(tmpDir, 'valgrind.xml')))
+        mtt.removeDir(tmpDir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -413,8 +413,10 @@ int main(int argc, char **argv) {
   stHash *seq2Hash = stHash_construct3(stHash_stringKey, stHash_stringEqualKey,
                                        free, free);
   uint64_t alignedPositions = 0;
+  PROFILE_BEGIN("processBody");
   processBody(mfa, seq1, seq2, seq1Hash, seq2Hash, &alignedPositions,
               intervalsHash, bin_container);
+  PROFILE_END("processBody");
   reportResults(seq1, seq2, seq1Hash, seq2Hash, &alignedPositions);
   reportResultsRegion(seq1, seq2, seq1Hash, seq2Hash, &alignedPositions,
                       intervalsHash);
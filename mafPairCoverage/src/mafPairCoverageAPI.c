@@ -289,97 +289,127 @@ void compareLines(mafLine_t *ml1, mafLine_t *ml2, stHash *seq1Hash,
 void wrapDestroyMafLine(void *p) {
   maf_destroyMafLineList((mafLine_t *) p);
 }
+static void countMatch(mafLine_t *ml, stHash *seqHash, stList *seqList) {
+  // keep a copy of ml, a row matching one of the sequences, and add its
+  // length to the sequence's entry in seqHash
+  stList_append(seqList, maf_copyMafLine(ml));
+  mafCoverageCount_t *mcct = NULL;
+  if ((mcct = stHash_search(seqHash, maf_mafLine_getSpecies(ml))) == NULL) {
+    // new sequence, add to the hash
+    mcct = createMafCoverageCount();
+    mcct->sourceLength = maf_mafLine_getSourceLength(ml);
+    mcct->observedLength = maf_mafLine_getLength(ml);
+    stHash_insert(seqHash, stString_copy(maf_mafLine_getSpecies(ml)), mcct);
+  } else {
+    assert(mcct->sourceLength == maf_mafLine_getSourceLength(ml));
+    mcct->observedLength += maf_mafLine_getLength(ml);
+  }
+}
+static void scanLine(mafLine_t *ml, const char *seq1, const char *seq2,
+                     stHash *seq1Hash, stHash *seq2Hash,
+                     stList *seq1List, stList *seq2List) {
+  if (searchMatched(ml, seq1)) {
+    countMatch(ml, seq1Hash, seq1List);
+  }
+  if (searchMatched(ml, seq2)) {
+    countMatch(ml, seq2Hash, seq2List);
+  }
+}
+static void compareMatches(stList *seq1List, stList *seq2List,
+                           stHash *seq1Hash, stHash *seq2Hash,
+                           uint64_t *alignedPositions, stHash *intervalsHash,
+                           BinContainer *bin_container) {
+  // perform the full n^2 scan on the instances of seq1 and seq2 matches,
+  // if the block contained both seq1 and seq2. Both lists are destroyed.
+  if (stList_length(seq1List) > 0 && stList_length(seq2List) > 0) {
+    mafLine_t *ml1 = NULL, *ml2 = NULL;
+    stListIterator *sl_it1 = stList_getIterator(seq1List);
+    stListIterator *sl_it2 = NULL;
+    while ((ml1 = stList_getNext(sl_it1)) != NULL) {
+      sl_it2 = stList_getIterator(seq2List);
+      while ((ml2 = stList_getNext(sl_it2)) != NULL) {
+        compareLines(ml1, ml2, seq1Hash, seq2Hash,
+                     alignedPositions, intervalsHash, bin_container);
+      }
+      stList_destructIterator(sl_it2);
+    }
+    stList_destructIterator(sl_it1);
+  }
+  stList_destruct(seq1List);
+  stList_destruct(seq2List);
+}
 void checkBlock(mafBlock_t *b, const char *seq1, const char *seq2,
                 stHash *seq1Hash, stHash *seq2Hash, uint64_t *alignedPositions,
                 stHash *intervalsHash, BinContainer *bin_container) {
   // read through each line of a mafBlock and if the sequence matches the
   // region we're looking for, report the block.
-  mafLine_t *ml1 = maf_mafBlock_getHeadLine(b);
   // do a quick scan for either seq before doing the full n^2 comparison.
   // i'm doing this because i know there are some transitively closed mafs
   // that contain upwards of tens of millions of rows... :/
   //
-  bool has1 = false, has2 = false;
   stList *seq1List = stList_construct3(0, wrapDestroyMafLine);
   stList *seq2List = stList_construct3(0, wrapDestroyMafLine);
-  mafCoverageCount_t *mcct1 = NULL, *mcct2 = NULL;
-  while (ml1 != NULL) {
-    if (searchMatched(ml1, seq1)) {
-      has1 = true;
-      stList_append(seq1List, maf_copyMafLine(ml1));
-      // create an item in the hash for this sequence
-      mcct1 = NULL;
-      if ((mcct1 = stHash_search(seq1Hash, maf_mafLine_getSpecies(ml1)))
-          == NULL) {
-        // new sequence, add to the hash
-        mcct1 = createMafCoverageCount();
-        mcct1->sourceLength = maf_mafLine_getSourceLength(ml1);
-        mcct1->observedLength = maf_mafLine_getLength(ml1);
-        stHash_insert(seq1Hash,
-                      stString_copy(maf_mafLine_getSpecies(ml1)),
-                      mcct1);
-      } else {
-        assert(mcct1->sourceLength == maf_mafLine_getSourceLength(ml1));
-        mcct1->observedLength += maf_mafLine_getLength(ml1);
-      }
-    }
-    if (searchMatched(ml1, seq2)) {
-      has2 = true;
-      stList_append(seq2List, maf_copyMafLine(ml1));
-      // create an item in the hash for this sequence
-      mcct2 = NULL;
-      if ((mcct2 = stHash_search(seq2Hash, maf_mafLine_getSpecies(ml1)))
-          == NULL) {
-        // new sequence, add to the hash
-        mcct2 = createMafCoverageCount();
-        mcct2->sourceLength = maf_mafLine_getSourceLength(ml1);
-        mcct2->observedLength = maf_mafLine_getLength(ml1);
-        stHash_insert(seq2Hash,
-                      stString_copy(maf_mafLine_getSpecies(ml1)),
-                      mcct2);
-      } else {
-        assert(mcct2->sourceLength == maf_mafLine_getSourceLength(ml1));
-        mcct2->observedLength += maf_mafLine_getLength(ml1);
-      }
-    }
-    ml1 = maf_mafLine_getNext(ml1);
-  }
-  if (!(has1 && has2)) {
-    // if this block does not contain both seq1 and seq2, do nothing
-    stList_destruct(seq1List);
-    stList_destruct(seq2List);
-    return;
+  for (mafLine_t *ml = maf_mafBlock_getHeadLine(b); ml != NULL; ml = maf_mafLine_getNext(ml)) {
+    scanLine(ml, seq1, seq2, seq1Hash, seq2Hash, seq1List, seq2List);
   }
-  // perform the full n^2 scan on the instances of seq1 and seq2 matches
-  ml1 = NULL;
-  mafLine_t *ml2 = NULL;
-  stListIterator *sl_it1 = stList_getIterator(seq1List);
-  stListIterator *sl_it2 = NULL;
-  while ((ml1 = stList_getNext(sl_it1)) != NULL) {
-    sl_it2 = stList_getIterator(seq2List);
-    while ((ml2 = stList_getNext(sl_it2)) != NULL) {
-      compareLines(ml1, ml2, seq1Hash, seq2Hash,
-                   alignedPositions, intervalsHash, bin_container);
-    }
-    stList_destructIterator(sl_it2);
+  compareMatches(seq1List, seq2List, seq1Hash, seq2Hash,
+                 alignedPositions, intervalsHash, bin_container);
+}
+void checkBlockLines(mafBlockCursor_t *bc, const char *seq1, const char *seq2,
+                     stHash *seq1Hash, stHash *seq2Hash, uint64_t *alignedPositions,
+                     stHash *intervalsHash, BinContainer *bin_container) {
+  // as checkBlock(), for the current block of bc read a line at a time, so
+  // that only the rows matching seq1 or seq2 of those very large blocks are
+  // ever held in memory
+  stList *seq1List = stList_construct3(0, wrapDestroyMafLine);
+  stList *seq2List = stList_construct3(0, wrapDestroyMafLine);
+  mafLine_t *ml = NULL;
+  while ((ml = maf_blockCursor_next(bc)) != NULL) {
+    scanLine(ml, seq1, seq2, seq1Hash, seq2Hash, seq1List, seq2List);
   }
-  stList_destructIterator(sl_it1);
-  stList_destruct(seq1List);
-  stList_destruct(seq2List);
+  compareMatches(seq1List, seq2List, seq1Hash, seq2Hash,
+                 alignedPositions, intervalsHash, bin_container);
 }
 
 
+static uint64_t queryIndex(mafIndex_t *idx, const char *seq) {
+  // add every block with a row matching seq, which may end in a wildcard,
+  // to the hits of idx
+  if (is_wild(seq)) {
+    char *prefix = stString_copy(seq);
+    prefix[strlen(prefix) - 1] = '\0';
+    uint64_t n = maf_mafIndex_queryPrefix(idx, prefix, 0, UINT64_MAX);
+    free(prefix);
+    return n;
+  }
+  return maf_mafIndex_query(idx, seq, 0, UINT64_MAX);
+}
 void processBody(mafFileApi_t *mfa, char *seq1, char *seq2, stHash *seq1Hash,
                  stHash *seq2Hash,
                  uint64_t *alignedPositions, stHash *intervalsHash,
                  BinContainer *bin_container) {
   mafBlock_t *thisBlock = NULL;
   *alignedPositions = 0;
-  while ((thisBlock = maf_readBlock(mfa)) != NULL) {
-    checkBlock(thisBlock, seq1, seq2, seq1Hash, seq2Hash,
-               alignedPositions, intervalsHash, bin_container);
-    maf_destroyMafBlockList(thisBlock);
+  mafIndex_t *idx = maf_newMafIndex(maf_mafFileApi_getFilename(mfa));
+  if (idx != NULL) {
+    // only blocks containing seq1 or seq2 contribute to the counts
+    queryIndex(idx, seq1);
+    uint64_t n = queryIndex(idx, seq2);
+    for (uint64_t i = 0; i < n; ++i) {
+      thisBlock = maf_mafIndex_readBlock(idx, mfa, i);
+      checkBlock(thisBlock, seq1, seq2, seq1Hash, seq2Hash,
+                 alignedPositions, intervalsHash, bin_container);
+      maf_destroyMafBlockList(thisBlock);
+    }
+    maf_destroyMafIndex(idx);
+    return;
+  }
+  mafBlockCursor_t *bc = maf_newMafBlockCursor(mfa);
+  while (maf_blockCursor_nextBlock(bc)) {
+    checkBlockLines(bc, seq1, seq2, seq1Hash, seq2Hash,
+                    alignedPositions, intervalsHash, bin_container);
   }
+  maf_destroyMafBlockCursor(bc);
 }
 
 
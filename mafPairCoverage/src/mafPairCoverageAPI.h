@@ -69,6 +69,9 @@ void wrapDestroyMafLine(void *p);
 void checkBlock(mafBlock_t *b, const char *seq1, const char *seq2,
                 stHash *seq1Hash, stHash *seq2Hash, uint64_t *alignedPositions,
                 stHash *intervalsHash, BinContainer *bc);
+void checkBlockLines(mafBlockCursor_t *cursor, const char *seq1, const char *seq2,
+                     stHash *seq1Hash, stHash *seq2Hash, uint64_t *alignedPositions,
+                     stHash *intervalsHash, BinContainer *bc);
 void processBody(mafFileApi_t *mfa, char *seq1, char *seq2, stHash *seq1Hash,
                  stHash *seq2Hash,
                  uint64_t *alignedPositions, stHash *intervalsHash,
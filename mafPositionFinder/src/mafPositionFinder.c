@@ -179,7 +179,7 @@ char* extractVignette(mafLine_t *ml, uint64_t targetPos) {
     memset(base, '\0', 2);
     unsigned leftIndex = 0, rightIndex = 0;
     uint64_t absStart, absEnd;
-    uint64_t start, end, pos;
+    uint64_t start, end;
     getAbsStartEnd(ml, &absStart, &absEnd);
     int strand = 0;
     if (maf_mafLine_getStrand(ml) == '+') {
@@ -191,30 +191,20 @@ char* extractVignette(mafLine_t *ml, uint64_t targetPos) {
         start = absEnd;
         end = absStart;
     }
-    pos = start - strand;
-    for (unsigned i = 0; i < strlen(seq); ++i) {
-        if (seq[i] != '-') {
-            pos += strand;
-            if (pos == targetPos)
-                base[0] = seq[i];
-            if (strand == 1) {
-                if (pos >= targetPos - 5 && pos < targetPos) {
-                    left[leftIndex++] = seq[i];
-                }
-                if (pos <= targetPos + 5 && pos > targetPos) {
-                    right[rightIndex++] = seq[i];
-                }
-            } else {
-                // negative strand,
-                if (pos <= targetPos + 5 && pos > targetPos) {
-                    left[leftIndex++] = seq[i];
-                }
-                if (pos >= targetPos - 5 && pos < targetPos) {
-                    right[rightIndex++] = seq[i];
-                }
-            }
+    // the bases either side of the target are its neighbours in column order,
+    // whichever the strand, so they are found through the line's coordinate map
+    mafCoordinateMap_t *map = maf_mafLine_getCoordinateMap(ml);
+    int64_t c = maf_mafLine_getColumnOfPositiveCoord(ml, targetPos);
+    if (c != -1) {
+        uint64_t k = maf_mafCoordinateMap_getBasesBefore(map, (uint64_t) c);
+        uint64_t n = maf_mafCoordinateMap_getNumberOfBases(map);
+        base[0] = seq[c];
+        for (uint64_t i = (k > 5) ? k - 5 : 0; i < k; ++i) {
+            left[leftIndex++] = seq[maf_mafCoordinateMap_getColumnOfBase(map, i)];
+        }
+        for (uint64_t i = k + 1; i <= k + 5 && i < n; ++i) {
+            right[rightIndex++] = seq[maf_mafCoordinateMap_getColumnOfBase(map, i)];
         }
-
     }
     vig = (char*) de_malloc(kMaxStringLength);
     vig[0] = '\0';
@@ -258,11 +248,21 @@ void checkBlock(mafBlock_t *mb, char *fullname, uint64_t pos) {
     }
 }
 void searchInput(mafFileApi_t *mfa, char *fullname, unsigned long pos) {
-    mafBlock_t *thisBlock = NULL;
-    while ((thisBlock = maf_readBlock(mfa)) != NULL) {
-        checkBlock(thisBlock, fullname, pos);
-        maf_destroyMafBlockList(thisBlock);
+    mafBlock_t *thisBlock = maf_newMafBlock();
+    mafIndex_t *idx = maf_newMafIndex(maf_mafFileApi_getFilename(mfa));
+    if (idx != NULL) {
+        // only read the blocks the index says may contain the position
+        uint64_t n = maf_mafIndex_query(idx, fullname, pos, pos);
+        for (uint64_t i = 0; i < n; ++i) {
+            checkBlock(maf_mafIndex_readBlockInto(idx, mfa, i, thisBlock), fullname, pos);
+        }
+        maf_destroyMafIndex(idx);
+    } else {
+        while (maf_readBlockInto(mfa, thisBlock) != NULL) {
+            checkBlock(thisBlock, fullname, pos);
+        }
     }
+    maf_destroyMafBlockList(thisBlock);
 }
 
 int main(int argc, char **argv) {
@@ -270,9 +270,11 @@ int main(int argc, char **argv) {
     char targetName[kMaxStringLength];
     uint64_t targetPos;
     parseOptions(argc, argv,  filename, targetName, &targetPos);
-    mafFileApi_t *mfa = maf_newMfa(filename, "r");
+    mafFileApi_t *mfa = maf_newMfa(filename, "rm");
 
+    PROFILE_BEGIN("searchInput");
     searchInput(mfa, targetName, targetPos);
+    PROFILE_END("searchInput");
     maf_destroyMfa(mfa);
 
     return EXIT_SUCCESS;
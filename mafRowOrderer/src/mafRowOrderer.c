@@ -40,14 +40,21 @@
 
 const char *g_version = "version 0.1 October 2012";
 
+typedef struct orderList {
+    // the order rows are put in, shared by all worker threads
+    char **order;
+    unsigned n;
+} orderList_t;
+
 void version(void);
 void usage(void);
-void parseOptions(int argc, char **argv, char *filename, char *orderlist);
+void parseOptions(int argc, char **argv, char *filename, char *orderlist, unsigned *threads);
 void checkRegion(unsigned lineno, char *fullname, uint64_t pos, uint64_t start,
                  uint64_t length, uint64_t sourceLength, char strand);
 void printHeader(void);
-void checkBlock(mafBlock_t *mb, char **order, unsigned n);
-void orderInput(mafFileApi_t *mfa, char **order, unsigned n);
+void checkBlock(mafBlock_t *mb, char **order, unsigned n, FILE *out);
+void orderBlock(mafBlock_t *mb, uint64_t i, FILE *out, void *data);
+void orderInput(mafFileApi_t *mfa, char **order, unsigned n, unsigned threads);
 void destroyNameList(char **names, unsigned n);
 
 void version(void) {
@@ -67,6 +74,8 @@ void usage(void) {
     usageMessage('m', "maf", "path to maf file. use - for stdin.");
     usageMessage('\0', "order", "comma separated list of sequence names.");
     usageMessage('\0', "order-file", "file with order list of sequence names, one per line.");
+    usageMessage('t', "threads", "number of threads to order blocks with, output is identical "
+                 "whatever the number. default=1.");
     usageMessage('v', "verbose", "turns on verbose output.");
     exit(EXIT_FAILURE);
 }
@@ -92,7 +101,7 @@ static void parseOrderList(char *filename, char *orderlist) {
     free(line_buffer);
 }
 
-void parseOptions(int argc, char **argv, char *filename, char *orderlist) {
+void parseOptions(int argc, char **argv, char *filename, char *orderlist, unsigned *threads) {
     extern int g_debug_flag;
     extern int g_verbose_flag;
     int c;
@@ -106,10 +115,11 @@ void parseOptions(int argc, char **argv, char *filename, char *orderlist) {
             {"maf",  required_argument, 0, 'm'},
             {"order",  required_argument, 0, 0},
             {"order-file",  required_argument, 0, 0},            
+            {"threads", required_argument, 0, 't'},
             {0, 0, 0, 0}
         };
         int longIndex = 0;
-        c = getopt_long(argc, argv, "m:f:i:e:g:l:v:h",
+        c = getopt_long(argc, argv, "m:f:i:e:g:l:v:t:h",
                         longOptions, &longIndex);
         if (c == -1) {
             break;
@@ -139,6 +149,11 @@ void parseOptions(int argc, char **argv, char *filename, char *orderlist) {
         case 'v':
             g_verbose_flag++;
             break;
+        case 't':
+            if (!parseThreads(optarg, threads)) {
+                usage();
+            }
+            break;
         case 'h':
         case '?':
             usage();
@@ -169,7 +184,7 @@ void parseOptions(int argc, char **argv, char *filename, char *orderlist) {
 void printHeader(void) {
     printf("##maf version=1\n\n");
 }
-void checkBlock(mafBlock_t *mb, char **order, unsigned n) {
+void checkBlock(mafBlock_t *mb, char **order, unsigned n, FILE *out) {
     // the plan:
     // create an array of mafLine_t linked lists, of length n
     // walk the block, *copying* mafLines into the linked list at the coresponding array element
@@ -226,25 +241,27 @@ void checkBlock(mafBlock_t *mb, char **order, unsigned n) {
     maf_mafLine_setNext(maf_mafBlock_getHeadLine(orderedBlock), head);
     // report block
     if (reportBlock) {
-        maf_mafBlock_print(orderedBlock);
+        maf_mafBlock_fprint(out, orderedBlock);
     }
     maf_destroyMafBlockList(orderedBlock);
     free(lineArrayHeads);
     free(lineArrayTails);
 }
-void orderInput(mafFileApi_t *mfa, char **order, unsigned n) {
-    mafBlock_t *thisBlock = NULL;
-    bool headBlock = true;
+void orderBlock(mafBlock_t *mb, uint64_t i, FILE *out, void *data) {
+    // called on every block after the header, possibly on a worker thread.
+    (void) i;
+    orderList_t *o = (orderList_t *) data;
+    checkBlock(mb, o->order, o->n, out);
+}
+void orderInput(mafFileApi_t *mfa, char **order, unsigned n, unsigned threads) {
+    orderList_t o = {order, n};
     printHeader();
-    while ((thisBlock = maf_readBlock(mfa)) != NULL) {
-        if (headBlock) {
-            headBlock = false;
-            maf_destroyMafBlockList(thisBlock);
-            continue;
-        }
-        checkBlock(thisBlock, order, n);
-        maf_destroyMafBlockList(thisBlock);
+    mafBlock_t *headBlock = maf_readBlock(mfa); // header block, unused
+    if (headBlock == NULL) {
+        return;
     }
+    maf_destroyMafBlockList(headBlock);
+    maf_processBlocksInOrder(mfa, threads, orderBlock, &o, stdout);
 }
 void destroyNameList(char **names, unsigned n) {
     for (unsigned i = 0; i < n; ++i) {
@@ -256,11 +273,16 @@ int main(int argc, char **argv) {
     char filename[kMaxStringLength];
     char *orderlist = (char*)malloc(1000000 * sizeof(char));
     orderlist[0] = '\0';
-    parseOptions(argc, argv,  filename, orderlist);
+    unsigned threads = 1;
+    parseOptions(argc, argv,  filename, orderlist, &threads);
     unsigned n = 1 + countChar(orderlist, ',');
     char **order = extractSubStrings(orderlist, n, ',');
     mafFileApi_t *mfa = maf_newMfa(filename, "r");
-    orderInput(mfa, order, n);
+    // rows not on the order list are only ever matched on name
+    maf_mafFileApi_setLazyParsing(mfa, true);
+    PROFILE_BEGIN("orderInput");
+    orderInput(mfa, order, n, threads);
+    PROFILE_END("orderInput");
     maf_destroyMfa(mfa);
     destroyNameList(order, n);
     free(orderlist);
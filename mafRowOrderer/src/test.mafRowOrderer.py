@@ -25,6 +25,7 @@
 import os
 import random
 import re
+import subprocess
 import sys
 import unittest
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]), '../../lib/')))
@@ -230,6 +231,45 @@ class OrderTest(unittest.TestCase):
             self.assertTrue(ordered)
             if ordered:
                 mtt.removeDir(tmpDir)
+    def testThreads(self):
+        """ mafRowOrderer should give byte identical output whatever the number of --threads.
+        """
+        mtt.makeTempDirParent()
+        tmpDir = os.path.abspath(mtt.makeTempDir('threads'))
+        body = mtt.randomMafBody(500, ['hg18.chr1', 'mm9.chr2', 'rn4.chr3', 'panTro1.chr1', 'hg18.chr7'])
+        testMafPath, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')),
+                                           body, g_headers)
+        parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        outputs = []
+        for threads in ['1', '2', '7']:
+            cmd = [os.path.abspath(os.path.join(parent, 'test', 'mafRowOrderer'))]
+            cmd += ['--maf', testMafPath, '--order', 'rn4,hg18,mm9', '--threads', threads]
+            outpipes = [os.path.abspath(os.path.join(tmpDir, 'ordered.%s.maf' % threads))]
+            mtt.recordCommands([cmd], tmpDir, outPipes=outpipes)
+            mtt.runCommandsS([cmd], tmpDir, outPipes=outpipes)
+            outputs.append(open(outpipes[0]).read())
+        self.assertTrue(outputs[0].count('\na ordered') > 0)
+        for o in outputs[1:]:
+            self.assertEqual(outputs[0], o)
+        mtt.removeDir(tmpDir)
+    def testThreadsOutOfRange(self):
+        """ mafRowOrderer should refuse a --threads value that is negative or too large.
+        """
+        mtt.makeTempDirParent()
+        tmpDir = os.path.abspath(mtt.makeTempDir('threadsOutOfRange'))
+        body = mtt.randomMafBody(10, ['hg18.chr1', 'mm9.chr2'])
+        testMafPath, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')),
+                                           body, g_headers)
+        parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for threads in ['-3', '100000']:
+            cmd = [os.path.abspath(os.path.join(parent, 'test', 'mafRowOrderer'))]
+            cmd += ['--maf', testMafPath, '--threads', threads] + ['--order', 'rn4,hg18,mm9']
+            mtt.recordCommands([cmd], tmpDir)
+            p = subprocess.Popen(cmd, cwd=tmpDir, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            out, err = p.communicate()
+            self.assertEqual(p.returncode, 1)
+            self.assertTrue('--threads must be an integer from 1 to 256, not %s' % threads in err)
+        mtt.removeDir(tmpDir)
     def testMemory1(self):
         """ If valgrind is installed on the system, check for memory related errors (1).
         """
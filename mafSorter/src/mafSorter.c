@@ -217,12 +217,18 @@ int main(int argc, char **argv) {
 
     mafFileApi_t *mfa = maf_newMfa(filename, "r");
     mafBlock_t *mb = NULL;
+    PROFILE_BEGIN("processBody");
     unsigned numBlocks = processBody(mfa, &mb);
+    PROFILE_END("processBody");
     sortingMafBlock_t *blockArray[numBlocks];
     populateArray(mb, blockArray, targetSequence);
 
+    PROFILE_BEGIN("sortBlocks");
     qsort(blockArray, numBlocks, sizeof(sortingMafBlock_t *), cmp_by_targetStart);
+    PROFILE_END("sortBlocks");
+    PROFILE_BEGIN("reportBlocks");
     reportBlocks(blockArray, numBlocks);
+    PROFILE_END("reportBlocks");
     destroyArray(blockArray, numBlocks);
     maf_destroyMfa(mfa);
     maf_destroyMafBlockList(mb);
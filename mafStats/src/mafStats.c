@@ -32,6 +32,7 @@
 #include "sonLib.h"
 #include "common.h"
 #include "sharedMaf.h"
+#include "seqKernels.h"
 #include "mafStats.h"
 #include "buildVersion.h"
 
@@ -142,27 +143,29 @@ void stats_destroy(stats_t *stats) {
 }
 void countCharacters(char *seq, stats_t *stats) {
     size_t len = strlen(seq);
-    for (size_t i = 0; i < len; ++i) {
-        if (seq[i] == '-') {
-            ++(stats->numGapCharacters);
-        } else {
-            ++(stats->numSeqCharacters);
-        }
-    }
+    uint64_t gaps = seq_countGaps(seq, len);
+    stats->numGapCharacters += gaps;
+    stats->numSeqCharacters += len - gaps;
 }
-void processBlock(mafBlock_t *mb, stats_t *stats) {
-    mafLine_t *ml = maf_mafBlock_getHeadLine(mb);
+void processBlock(mafBlockCursor_t *bc, stats_t *stats) {
+    // the block is read a line at a time, so that blocks with very many rows
+    // need not be held in memory
+    mafLine_t *ml = maf_blockCursor_next(bc);
     char t = '\0';
     char *name = NULL;
     uint64_t *v = NULL;
     uint64_t blockSeqFieldLength = 0;
+    uint64_t numSeqs = 0;
+    if (ml == NULL) {
+        return;
+    }
     t = maf_mafLine_getType(ml);
     if (t == '#') {
         ++(stats->numCommentLines);
     } else if (t == 'a') {
         ++(stats->numBlocks);
     }
-    while ((ml = maf_mafLine_getNext(ml)) != NULL) {
+    while ((ml = maf_blockCursor_next(bc)) != NULL) {
         t = maf_mafLine_getType(ml);
         if (t == 's') {
             ++(stats->numSeqLines);
@@ -196,21 +199,22 @@ void processBlock(mafBlock_t *mb, stats_t *stats) {
             ++(stats->numHeaderLines);
         }
     }
-    if (stats->maxBlockArea < maf_mafBlock_getNumberOfSequences(mb) * blockSeqFieldLength) {
-        stats->maxBlockArea = maf_mafBlock_getNumberOfSequences(mb) * blockSeqFieldLength;
+    numSeqs = maf_blockCursor_getNumberOfSequences(bc);
+    if (stats->maxBlockArea < numSeqs * blockSeqFieldLength) {
+        stats->maxBlockArea = numSeqs * blockSeqFieldLength;
     }
-    stats->sumBlockArea += maf_mafBlock_getNumberOfSequences(mb) * blockSeqFieldLength;
-    if (stats->maxNumSpeciesInBlock < maf_mafBlock_getNumberOfSequences(mb)) {
-        stats->maxNumSpeciesInBlock = maf_mafBlock_getNumberOfSequences(mb);
+    stats->sumBlockArea += numSeqs * blockSeqFieldLength;
+    if (stats->maxNumSpeciesInBlock < numSeqs) {
+        stats->maxNumSpeciesInBlock = numSeqs;
     }
-    stats->sumNumSpeciesInBlock += maf_mafBlock_getNumberOfSequences(mb);
+    stats->sumNumSpeciesInBlock += numSeqs;
 }
 void recordStats(mafFileApi_t *mfa, stats_t *stats) {
-    mafBlock_t *mb = NULL;
-    while ((mb = maf_readBlock(mfa)) != NULL) {
-        processBlock(mb, stats);
-        maf_destroyMafBlockList(mb);
+    mafBlockCursor_t *bc = maf_newMafBlockCursor(mfa);
+    while (maf_blockCursor_nextBlock(bc)) {
+        processBlock(bc, stats);
     }
+    maf_destroyMafBlockCursor(bc);
     stats->numLines = maf_mafFileApi_getLineNumber(mfa);
 }
 void readFilesize(struct stat *fileStat, char **filesizeString) {
@@ -311,10 +315,12 @@ void reportStats(stats_t *stats) {
 int main(int argc, char **argv) {
     char *maf = NULL;
     parseOptions(argc, argv, &maf);
-    mafFileApi_t *mfa = maf_newMfa(maf, "r");
+    mafFileApi_t *mfa = maf_newMfa(maf, "rm");
     stats_t *stats = stats_create(maf);
 
+    PROFILE_BEGIN("recordStats");
     recordStats(mfa, stats);
+    PROFILE_END("recordStats");
     reportStats(stats);
 
     // clean up
@@ -60,7 +60,7 @@ void parseOptions(int argc, char **argv, char **filename);
 stats_t* stats_create(char *filename);
 void stats_destroy(stats_t *stats);
 void countCharacters(char *seq, stats_t *stats);
-void processBlock(mafBlock_t *mb, stats_t *stats);
+void processBlock(mafBlockCursor_t *bc, stats_t *stats);
 void recordStats(mafFileApi_t *mfa, stats_t *stats);
 void readFilesize(struct stat *fileStat, char **filesizeString);
 int cmp_seq(const void *a, const void *b);
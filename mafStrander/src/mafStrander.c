@@ -50,13 +50,19 @@ typedef struct duplicate {
     struct duplicate *next;
     uint64_t numSequences; // number of elements in the headScoredMaf ll
 } duplicate_t;
+typedef struct strandOptions {
+    // the strand to coerce blocks to, shared by all worker threads
+    char *seq;
+    char strand;
+} strandOptions_t;
 
-void parseOptions(int argc, char **argv, char *filename, char *seq, char *strand);
+void parseOptions(int argc, char **argv, char *filename, char *seq, char *strand, unsigned *threads);
 void usage(void);
 void version(void);
 void printHeader(void);
-void processBody(mafFileApi_t *mfa, char *seq, char strand);
+void processBody(mafFileApi_t *mfa, char *seq, char strand, unsigned threads);
 void checkBlock(mafBlock_t *block, char *seq, char strand);
+void strandBlock(mafBlock_t *block, uint64_t i, FILE *out, void *data);
 // void destroyBlock(mafLine_t *m);
 void destroyScoredMafLineList(scoredMafLine_t *sml);
 void destroyDuplicates(duplicate_t *d);
@@ -69,7 +75,7 @@ int cmp_by_score(const void *a, const void *b);
 duplicate_t* newDuplicate(void);
 
 
-void parseOptions(int argc, char **argv, char *filename, char *seq, char *strand) {
+void parseOptions(int argc, char **argv, char *filename, char *seq, char *strand, unsigned *threads) {
     int c;
     bool setMaf = false;
     bool setSeq = false;
@@ -82,10 +88,11 @@ void parseOptions(int argc, char **argv, char *filename, char *seq, char *strand
             {"maf",  required_argument, 0, 'm'},
             {"seq",  required_argument, 0, 0},
             {"strand",  required_argument, 0, 0},
+            {"threads", required_argument, 0, 't'},
             {0, 0, 0, 0}
         };
         int longIndex = 0;
-        c = getopt_long(argc, argv, "d:m:h:v",
+        c = getopt_long(argc, argv, "d:m:h:vt:",
                         longOptions, &longIndex);
         if (c == -1)
             break;
@@ -119,6 +126,11 @@ void parseOptions(int argc, char **argv, char *filename, char *seq, char *strand
         case 'd':
             g_debug_flag = 1;
             break;
+        case 't':
+            if (!parseThreads(optarg, threads)) {
+                usage();
+            }
+            break;
         case 'h':
         case '?':
             usage();
@@ -166,6 +178,8 @@ void usage(void) {
     usageMessage('m', "maf", "input alignment maf file.");
     usageMessage('\0', "seq", "sequence to base block strandedness upon. (string comparison only done for length of input, i.e. --seq=hg18 will match hg18.chr1, hg18.chr2, etc etc)");
     usageMessage('\0', "strand", "strand to enforce, when possible. may be + or -, defaults to +.");
+    usageMessage('t', "threads", "number of threads to strand blocks with, output is identical "
+                 "whatever the number. default=1.");
     exit(EXIT_FAILURE);
 }
 scoredMafLine_t* newScoredMafLine(void) {
@@ -217,25 +231,51 @@ void checkBlock(mafBlock_t *block, char *seq, char strand) {
         maf_mafBlock_flipStrand(block);
     }
 }
-void processBody(mafFileApi_t *mfa, char *seq, char strand) {
+void strandBlock(mafBlock_t *block, uint64_t i, FILE *out, void *data) {
+    // check and report one block, possibly on a worker thread.
+    (void) i;
+    strandOptions_t *o = (strandOptions_t *) data;
+    checkBlock(block, o->seq, o->strand);
+    maf_mafBlock_fprint(out, block);
+}
+void processBody(mafFileApi_t *mfa, char *seq, char strand, unsigned threads) {
     // walk the body of the maf file and process it, block by block.
+    strandOptions_t o = {seq, strand};
     mafBlock_t *thisBlock = NULL;
-    thisBlock = maf_readBlock(mfa); // header block, unused
+    if (threads > 1) {
+        thisBlock = maf_readBlock(mfa); // header block, unused
+        printHeader();
+        if (thisBlock != NULL) {
+            maf_destroyMafBlockList(thisBlock);
+            maf_processBlocksInOrder(mfa, threads, strandBlock, &o, stdout);
+        }
+        return;
+    }
+    // blocks are read and parsed on a separate thread while this one checks them,
+    // and written out on a third.
+    mafBlockPipeline_t *bp = maf_newMafBlockPipeline(mfa, kMafBlockPipelineDepth);
+    thisBlock = maf_mafBlockPipeline_readBlock(bp); // header block, unused
     maf_destroyMafBlockList(thisBlock);
     printHeader();
-    while((thisBlock = maf_readBlock(mfa)) != NULL) {
+    mafWriter_t *w = maf_newMafWriter(stdout, true);
+    while((thisBlock = maf_mafBlockPipeline_readBlock(bp)) != NULL) {
         checkBlock(thisBlock, seq, strand);
-        maf_mafBlock_print(thisBlock);
+        maf_mafWriter_printBlock(w, thisBlock);
         maf_destroyMafBlockList(thisBlock);
     }
+    maf_destroyMafWriter(w);
+    maf_destroyMafBlockPipeline(bp);
 }
 int main(int argc, char **argv) {
     char filename[kMaxStringLength];
     char seq[kMaxStringLength];
     char strand = '+';
-    parseOptions(argc, argv, filename, seq, &strand);
+    unsigned threads = 1;
+    parseOptions(argc, argv, filename, seq, &strand, &threads);
     mafFileApi_t *mfa = maf_newMfa(filename, "r");
-    processBody(mfa, seq, strand);
+    PROFILE_BEGIN("processBody");
+    processBody(mfa, seq, strand, threads);
+    PROFILE_END("processBody");
     maf_destroyMfa(mfa);
     return EXIT_SUCCESS;
 }
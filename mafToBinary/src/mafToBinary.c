@@ -0,0 +1,185 @@
+/*
+ * Copyright (C) 2011-2014 by
+ * Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+ * ... and other members of the Reconstruction Team of David Haussler's
+ * lab (BME Dept. UCSC).
+ *
+ * Permission is hereby granted, free of charge, to any person obtaining a copy
+ * of this software and associated documentation files (the "Software"), to deal
+ * in the Software without restriction, including without limitation the rights
+ * to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+ * copies of the Software, and to permit persons to whom the Software is
+ * furnished to do so, subject to the following conditions:
+ *
+ * The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+ *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+ * AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+ * LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+ * OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+ * THE SOFTWARE.
+ */
+#include <assert.h>
+#include <getopt.h>
+#include <inttypes.h>
+#include <stdbool.h>
+#include <stdlib.h>
+#include <stdio.h>
+#include <string.h>
+#include "common.h"
+#include "sharedMaf.h"
+#include "buildVersion.h"
+
+const char *g_version = "version 0.1 October 2026";
+
+void version(void);
+void usage(void);
+void parseOptions(int argc, char **argv, char *filename, char *outFilename, bool *toText);
+void writeText(mafFileApi_t *mfa, FILE *out);
+void writeBinary(mafFileApi_t *mfa, FILE *out);
+
+void version(void) {
+    fprintf(stderr, "mafToBinary, %s\nbuild: %s, %s, %s\n\n", g_version, g_build_date,
+            g_build_git_branch, g_build_git_sha);
+}
+void usage(void) {
+    version();
+    fprintf(stderr, "Usage: mafToBinary --maf [path to maf] --out [path to mafb] [options]\n\n"
+            "mafToBinary is a program that will convert a maf file into the compact\n"
+            "binary .mafb format, or with --toText convert a .mafb file back into a\n"
+            "maf. Every tool reads .mafb files directly, giving exactly the blocks,\n"
+            "lines and line numbers of the maf it was made from.\n"
+            );
+    fprintf(stderr, "Options: \n");
+    usageMessage('h', "help", "show this help message and exit.");
+    usageMessage('m', "maf", "path to the maf (or .mafb) file, - for stdin.");
+    usageMessage('o', "out", "path to the output file, - for stdout. default: -");
+    usageMessage('t', "toText", "write a maf rather than a .mafb.");
+    usageMessage('v', "verbose", "turns on verbose output.");
+    exit(EXIT_FAILURE);
+}
+void parseOptions(int argc, char **argv, char *filename, char *outFilename, bool *toText) {
+    extern int g_debug_flag;
+    extern int g_verbose_flag;
+    int c;
+    bool setMafName = false;
+    strcpy(outFilename, "-");
+    while (1) {
+        static struct option longOptions[] = {
+            {"debug", no_argument, &g_debug_flag, 1},
+            {"verbose", no_argument, 0, 'v'},
+            {"help", no_argument, 0, 'h'},
+            {"version", no_argument, 0, 0},
+            {"maf",  required_argument, 0, 'm'},
+            {"out",  required_argument, 0, 'o'},
+            {"toText",  no_argument, 0, 't'},
+            {0, 0, 0, 0}
+        };
+        int longIndex = 0;
+        c = getopt_long(argc, argv, "m:o:tvh",
+                        longOptions, &longIndex);
+        if (c == -1) {
+            break;
+        }
+        switch (c) {
+        case 0:
+            if (strcmp("version", longOptions[longIndex].name) == 0) {
+                version();
+                exit(EXIT_SUCCESS);
+            }
+            break;
+        case 'm':
+            setMafName = true;
+            sscanf(optarg, "%s", filename);
+            break;
+        case 'o':
+            sscanf(optarg, "%s", outFilename);
+            break;
+        case 't':
+            *toText = true;
+            break;
+        case 'v':
+            g_verbose_flag++;
+            break;
+        case 'h':
+        case '?':
+            usage();
+            break;
+        default:
+            abort();
+        }
+    }
+    if (!setMafName) {
+        fprintf(stderr, "specify --maf\n");
+        usage();
+    }
+    // Check there's nothing left over on the command line
+    if (optind < argc) {
+        char errorString[30] = "Unexpected arguments:";
+        while (optind < argc) {
+            strcat(errorString, " ");
+            strcat(errorString, argv[optind++]);
+        }
+        fprintf(stderr, "%s\n", errorString);
+        usage();
+    }
+}
+void writeText(mafFileApi_t *mfa, FILE *out) {
+    // write every line on its own line number, putting back the blank lines
+    // between blocks
+    mafWriter_t *w = maf_newMafWriter(out, true);
+    mafBlock_t *mb = maf_newMafBlock();
+    uint64_t next = 1;
+    while (maf_readBlockInto(mfa, mb) != NULL) {
+        for (mafLine_t *ml = maf_mafBlock_getHeadLine(mb); ml != NULL; ml = maf_mafLine_getNext(ml)) {
+            for (; next < maf_mafLine_getLineNumber(ml); ++next) {
+                maf_mafWriter_writeChar(w, '\n');
+            }
+            maf_mafWriter_writeString(w, maf_mafLine_getLine(ml));
+            maf_mafWriter_writeChar(w, '\n');
+            ++next;
+        }
+    }
+    if (next > 1) {
+        maf_mafWriter_writeChar(w, '\n');
+    }
+    maf_destroyMafBlockList(mb);
+    maf_destroyMafWriter(w);
+}
+void writeBinary(mafFileApi_t *mfa, FILE *out) {
+    mafBinaryWriter_t *w = maf_newMafBinaryWriter(out);
+    mafBlock_t *mb = maf_newMafBlock();
+    uint64_t n = 0;
+    while (maf_readBlockInto(mfa, mb) != NULL) {
+        maf_mafBinaryWriter_writeBlock(w, mb);
+        ++n;
+    }
+    maf_destroyMafBlockList(mb);
+    maf_destroyMafBinaryWriter(w);
+    de_verbose("wrote %" PRIu64 " blocks\n", n);
+}
+int main(int argc, char **argv) {
+    char filename[kMaxStringLength];
+    char outFilename[kMaxStringLength];
+    bool toText = false;
+    parseOptions(argc, argv, filename, outFilename, &toText);
+    mafFileApi_t *mfa = maf_newMfa(filename, "r");
+    FILE *out = (strcmp(outFilename, "-") == 0) ? stdout : de_fopen(outFilename, "w");
+    if (toText) {
+        PROFILE_BEGIN("writeText");
+        writeText(mfa, out);
+        PROFILE_END("writeText");
+    } else {
+        PROFILE_BEGIN("writeBinary");
+        writeBinary(mfa, out);
+        PROFILE_END("writeBinary");
+    }
+    if (out != stdout) {
+        fclose(out);
+    }
+    maf_destroyMfa(mfa);
+    return EXIT_SUCCESS;
+}
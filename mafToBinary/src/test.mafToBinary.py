@@ -0,0 +1,148 @@
+##################################################
+# Copyright (C) 2012 by 
+# Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+# ... and other members of the Reconstruction Team of David Haussler's 
+# lab (BME Dept. UCSC).
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE. 
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]), '../../lib/')))
+import mafToolsTest as mtt
+
+g_header = '''track name=euArc visibility=pack
+##maf version=1 scoring=tba.v8
+# tba.v8 (((human chimp) baboon) (mouse rat))
+
+'''
+g_body = '''a score=0
+s hg18.chr7    27578828 38 + 158545518 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG
+s panTro1.chr6 28741140 38 + 161576975 AAA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG
+s baboon         116834 38 +   4622798 AAA-GGGAATGTTAACCAAATGA---GTTGTCTCTTATGGTG
+i baboon       C 0 I 12
+e mm4.chr6     53310102 13 + 151104725 I
+
+a score=0
+s hg18.chr7    27699739 6 + 158545518 TAAAGA
+s panTro1.chr6 28862317 6 + 161576975 taaaga
+s baboon         241163 6 +   4622798 TA.AGA
+
+
+a score=0
+s hg18.chr7      130976000 10 - 158545518 AGTC-TCCGTA
+s panTro1.chr6   132835784 10 - 161576975 AGTCTTCC-TA
+q panTro1.chr6                            99999999-99
+
+'''
+
+
+def binary(name):
+    parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if name == 'mafToBinary':
+        return os.path.abspath(os.path.join(parent, 'test', 'mafToBinary'))
+    return os.path.abspath(os.path.join(parent, '..', 'bin', name))
+def readFile(filename):
+    f = open(filename, 'r')
+    s = f.read()
+    f.close()
+    return s
+def writeTestMaf(tmpDir):
+    body = g_body + mtt.randomMafBody(200, ['hg18.chr7', 'panTro1.chr6', 'baboon', 'mm4.chr6'], seed=3)
+    testMafPath, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')),
+                                       body, [g_header])
+    return testMafPath
+
+class ConversionTest(unittest.TestCase):
+    def testRoundTrip(self):
+        """ A maf converted to .mafb and back should be unchanged.
+        """
+        mtt.makeTempDirParent()
+        tmpDir = os.path.abspath(mtt.makeTempDir('roundTrip'))
+        testMafPath = writeTestMaf(tmpDir)
+        binaryPath = os.path.join(tmpDir, 'test.mafb')
+        textPath = os.path.join(tmpDir, 'back.maf')
+        cmds = [[binary('mafToBinary'), '--maf', testMafPath, '--out', binaryPath],
+                [binary('mafToBinary'), '--maf', binaryPath, '--out', textPath, '--toText']]
+        mtt.recordCommands(cmds, tmpDir)
+        mtt.runCommandsS(cmds, tmpDir)
+        self.assertTrue(os.path.getsize(binaryPath) < os.path.getsize(testMafPath))
+        self.assertEqual(readFile(testMafPath), readFile(textPath))
+        mtt.removeDir(tmpDir)
+    def testStreams(self):
+        """ Conversion should work from stdin to stdout in both directions.
+        """
+        mtt.makeTempDirParent()
+        tmpDir = os.path.abspath(mtt.makeTempDir('streams'))
+        testMafPath = writeTestMaf(tmpDir)
+        binaryPath = os.path.join(tmpDir, 'test.mafb')
+        textPath = os.path.join(tmpDir, 'back.maf')
+        cmds = [[binary('mafToBinary'), '--maf', '-'],
+                [binary('mafToBinary'), '--maf', '-', '--toText']]
+        inpipes = [testMafPath, binaryPath]
+        outpipes = [binaryPath, textPath]
+        mtt.recordCommands(cmds, tmpDir, inPipes=inpipes, outPipes=outpipes)
+        mtt.runCommandsS(cmds, tmpDir, inPipes=inpipes, outPipes=outpipes)
+        self.assertEqual(readFile(testMafPath), readFile(textPath))
+        mtt.removeDir(tmpDir)
+    def testToolsReadBinary(self):
+        """ Tools should give the same output for a .mafb as for the maf it was made from.
+        """
+        mtt.makeTempDirParent()
+        tmpDir = os.path.abspath(mtt.makeTempDir('toolsReadBinary'))
+        testMafPath = writeTestMaf(tmpDir)
+        binaryPath = os.path.join(tmpDir, 'test.mafb')
+        cmd = [binary('mafToBinary'), '--maf', testMafPath, '--out', binaryPath]
+        mtt.recordCommands([cmd], tmpDir)
+        mtt.runCommandsS([cmd], tmpDir)
+        outputs = []
+        for mafFile in [testMafPath, binaryPath]:
+            cmds = [[binary('mafExtractor'), '--maf', mafFile, '--seq', 'hg18.chr7',
+                     '--start', '27578830', '--stop', '27699741'],
+                    [binary('mafExtractor'), '--maf', mafFile, '--seq', 'baboon',
+                     '--start', '0', '--stop', '2000', '--soft'],
+                    [binary('mafFilter'), '--maf', mafFile, '--includeSeq', 'hg18.chr7,baboon'],
+                    [binary('mafPositionFinder'), '--maf', mafFile, '--seq', 'baboon', '--pos', '241165'],
+                    ]
+            outpipes = [os.path.join(tmpDir, 'out.%d.%s' % (i, os.path.basename(mafFile)))
+                        for i in xrange(len(cmds))]
+            mtt.recordCommands(cmds, tmpDir, outPipes=outpipes)
+            mtt.runCommandsS(cmds, tmpDir, outPipes=outpipes)
+            outputs.append(outpipes)
+        for a, b in zip(outputs[0], outputs[1]):
+            self.assertEqual(readFile(a), readFile(b))
+        mtt.removeDir(tmpDir)
+    def testMemory1(self):
+        """ If valgrind is installed on the system, check for memory related errors (1).
+        """
+        mtt.makeTempDirParent()
+        valgrind = mtt.which('valgrind')
+        if valgrind is None:
+            return
+        tmpDir = os.path.abspath(mtt.makeTempDir('memory1'))
+        testMafPath = writeTestMaf(tmpDir)
+        cmd = mtt.genericValgrind(tmpDir)
+        cmd += [binary('mafToBinary'), '--maf', testMafPath, '--out', os.path.join(tmpDir, 'test.mafb')]
+        mtt.recordCommands([cmd], tmpDir)
+        mtt.runCommandsS([cmd], tmpDir)
+        self.assertTrue(mtt.noMemoryErrors(os.path.join(tmpDir, 'valgrind.xml')))
+        mtt.removeDir(tmpDir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -185,10 +185,14 @@ int main(int argc, char **argv) {
   parseOptions(argc, argv, options);
   // read fastas, populate sequenceHash
   de_verbose("Creating sequence hash.\n");
+  PROFILE_BEGIN("createSequenceHash");
   sequenceHash = createSequenceHash(options->seqs);
+  PROFILE_END("createSequenceHash");
   mafFileApi_t *mfapi = maf_newMfa(options->maf, "r");
   de_verbose("Creating alignment hash.\n");
+  PROFILE_BEGIN("buildAlignmentHash");
   buildAlignmentHash(mfapi, alignmentHash, sequenceHash, rowOrder, options);
+  PROFILE_END("buildAlignmentHash");
   if (options->outMfa != NULL) {
     // fasta output
     de_verbose("Writing fasta output.\n");
@@ -32,6 +32,7 @@
 #include "common.h"
 #include "CuTest.h"
 #include "sharedMaf.h"
+#include "seqKernels.h"
 #include "sonLib.h"
 #include "stPinchGraphs.h"
 #include "mafTransitiveClosure.h"
@@ -209,21 +210,23 @@ void destroyMafTcComparisonOrder(mafTcComparisonOrder_t *co) {
 void addSequenceValuesToMtcSeq(mafLine_t *ml, mafTcSeq_t *mtcs) {
     // add sequence values to maf transitive closure sequence
     int64_t s; // transformed pos coordinate start (zero based)
+    // THIS IS A DESTRUCTIVE OPERATION ON THE MAF LINE ml, its sequence is upper
+    // cased, and reverse complemented on the - strand, in place:
+    char *seq = maf_mafLine_getMutableSequence(ml);
+    uint64_t n = maf_mafLine_getSequenceFieldLength(ml);
     if (maf_mafLine_getStrand(ml) == '+') {
         s = maf_mafLine_getStart(ml);
     } else {
-        // THIS IS A DESTRUCTIVE OPERATION ON THE MAF LINE ml:
-        reverseComplementSequence(maf_mafLine_getSequence(ml), maf_mafLine_getSequenceFieldLength(ml));
+        reverseComplementSequence(seq, n);
         s = maf_mafLine_getSourceLength(ml) - (maf_mafLine_getStart(ml) + maf_mafLine_getLength(ml));
     }
-    char *seq = maf_mafLine_getSequence(ml);
-    uint64_t n = maf_mafLine_getSequenceFieldLength(ml);
+    seq_toUpper(seq, n);
     for (uint64_t i = 0, p = 0; i < n; ++i) {
         // p is the current position coordinate within the sequence (zero based)
         if (seq[i] != '-') {
             if (mtcs->sequence[s + p] != 'N') {
-                // sanity check
-                if (toupper(mtcs->sequence[s + p]) != toupper(seq[i])) {
+                // sanity check, mtcs->sequence is always upper case
+                if (mtcs->sequence[s + p] != seq[i]) {
                     fprintf(stderr, "Error, maf file is inconsistent with regard to sequence. "
                             "On line number %" PRIu64 " sequence %s position %" PRIu64" is %c, but previously "
                             "observed value is %c.\n", maf_mafLine_getLineNumber(ml), maf_mafLine_getSpecies(ml), 
@@ -231,7 +234,7 @@ void addSequenceValuesToMtcSeq(mafLine_t *ml, mafTcSeq_t *mtcs) {
                     exit(EXIT_FAILURE);
                 }
             }
-            mtcs->sequence[s + p] = toupper(seq[i]);
+            mtcs->sequence[s + p] = seq[i];
             ++p;
         }
     }
@@ -306,7 +309,7 @@ stPinchThreadSet* buildThreadSet(stHash *hash) {
     return ts;
 }
 mafTcComparisonOrder_t *getComparisonOrderFromMatrix(char **mat, uint64_t numRows, uint64_t numCols, 
-                                                     uint64_t *lengths, int **vizMat) {
+                                                     const uint64_t *lengths, int **vizMat) {
     /* given a char matrix and its dimensions (and a debugging int visualization matrix) generate
        a linked list of mafTcComparisonOrder_t that contains gapless sequences that produce coverage
        of the entire matrix. Example:
@@ -465,45 +468,24 @@ int64_t localSeqCoordsToGlobalPositiveCoords(int64_t c, uint64_t start, uint64_t
         return (int64_t) (sourceLength - 1 - (start + c));
     }
 }
-int64_t localSeqCoords(uint64_t p, char *s, mafCoordinatePair_t *b, int containsGaps) {
-    // given a coordinate inside of a sequence with respect to the start (which is 0), 
-    // walk backwards and anytime you see a gap drop one from the coordinate to return
-    if (containsGaps == 0) {
-        // store bookmark
-        b->a = p;
-        b->b = p;
-        return b->b;
-    }
-    int64_t bases = 0;
-    for (int64_t i = p; i >= 0; --i) {
-        if (b->a == i) {
-            if (s[i] != '-' && b->b == -1) {
-                bases += 1;
-            }
-            b->a = p;
-            b->b += bases;
-            return b->b;
-        }
-        if (s[i] != '-') {
-            ++bases;
-        }
-    }
-    b->a = p;
-    b->b = bases;
-    return b->b;
+int64_t localSeqCoordOfColumn(mafCoordinateMap_t *map, uint64_t column) {
+    // given a column of a row, return the coordinate inside of the sequence with respect to the
+    // start (which is 0) of the base in it. A gap column takes the coordinate of the last base
+    // before it, or -1 if there is none.
+    return (int64_t) maf_mafCoordinateMap_getBasesBefore(map, column + 1) - 1;
 }
 uint64_t g_numPinches = 0;
 void processPairForPinching(stPinchThreadSet *threadSet, stPinchThread *a, uint64_t aGlobalStart, 
                             uint64_t aGlobalLength, int aStrand, 
                             char *aSeq, stPinchThread *b, uint64_t bGlobalStart, uint64_t bGlobalLength,
                             int bStrand, char *bSeq, uint64_t regionStart, uint64_t regionEnd,
-                            mafCoordinatePair_t aBookmark, mafCoordinatePair_t bBookmark, 
-                            int aContainsGaps, int bContainsGaps, 
+                            mafCoordinateMap_t *aMap, mafCoordinateMap_t *bMap,
                             void (*pinchFunction)(stPinchThread *, stPinchThread *, int64_t, int64_t, int64_t, bool)) {
     // perform a pinch operation for regions of bSeq that are not gaps, i.e. `-'
     // GlobalStart is the positive strand position (zero based) coordinate of the start of this block
     // the nasty construction of passing in the pinch function is so that we can more easily unit test 
     // this code. Sorry about that.
+    // aMap and bMap are the coordinate maps of the two rows, see localSeqCoordOfColumn().
     (void) (threadSet);
     uint64_t length = 0, localPos = 0;
     uint64_t localBlockStart = localPos;
@@ -518,10 +500,10 @@ void processPairForPinching(stPinchThreadSet *threadSet, stPinchThread *a, uint6
         if (bSeq[localPos] == '-') {
             if (inBlock) {
                 inBlock = false;
-                aLocalPosCoords = localSeqCoords(localBlockStart, aSeq, &aBookmark, aContainsGaps);
+                aLocalPosCoords = localSeqCoordOfColumn(aMap, localBlockStart);
                 aGlobalPosCoords = localSeqCoordsToGlobalPositiveStartCoords(aLocalPosCoords, aGlobalStart, 
                                                                              aGlobalLength, aStrand, length);
-                bLocalPosCoords = localSeqCoords(localBlockStart, bSeq, &bBookmark, bContainsGaps);
+                bLocalPosCoords = localSeqCoordOfColumn(bMap, localBlockStart);
                 bGlobalPosCoords = localSeqCoordsToGlobalPositiveStartCoords(bLocalPosCoords, bGlobalStart, 
                                                                              bGlobalLength, bStrand, length);
                 de_debug("bSeq[pos] is a gap && inBlock\n");
@@ -546,10 +528,10 @@ void processPairForPinching(stPinchThreadSet *threadSet, stPinchThread *a, uint6
     de_debug("done walking comparison region\n");
     if (inBlock) {
         inBlock = false;
-        aLocalPosCoords = localSeqCoords(localBlockStart, aSeq, &aBookmark, aContainsGaps);
+        aLocalPosCoords = localSeqCoordOfColumn(aMap, localBlockStart);
         aGlobalPosCoords = localSeqCoordsToGlobalPositiveStartCoords(aLocalPosCoords, aGlobalStart, 
                                                                      aGlobalLength, aStrand, length);
-        bLocalPosCoords = localSeqCoords(localBlockStart, bSeq, &bBookmark, bContainsGaps);
+        bLocalPosCoords = localSeqCoordOfColumn(bMap, localBlockStart);
         bGlobalPosCoords = localSeqCoordsToGlobalPositiveStartCoords(bLocalPosCoords, bGlobalStart, 
                                                                      bGlobalLength, bStrand, length);
         de_debug("maybe little pinch (#2)? p:%" PRIu64 ", l:%" PRIu64 "\n", localBlockStart, length);
@@ -571,25 +553,6 @@ static void printu32Array(uint64_t *a, uint64_t n) {
     for (uint64_t i = 0; i < n; ++i)
         fprintf(stderr, "%" PRIu64 "%s", a[i], (i == n - 1) ? "\n" : ", ");
 }
-mafCoordinatePair_t* newCoordinatePairArray(uint64_t numSeqs, char **seqs) {
-    // create a new array of mafCoordinatePair_t* and then initialize it using the 
-    // decomposed information from the mafBlock_t (strands, starts, sourceLengths, seqs, etc)
-    mafCoordinatePair_t *a = (mafCoordinatePair_t*) de_malloc(sizeof(*a) * numSeqs);
-    uint64_t pos;
-    for (uint64_t i = 0; i < numSeqs; ++i) {
-        pos = 0;
-        while ((seqs[i][pos] == '-') && (pos < strlen(seqs[i]))) {
-            // find the first non gap position in the sequence and start the bookmark there.
-            ++pos;
-        }
-        a[i].a = (int64_t) pos;
-        a[i].b = -1;
-    }
-    return a;
-}
-void destroyCoordinatePairArray(mafCoordinatePair_t *cp) {
-    free(cp);
-}
 int** getVizMatrix(mafBlock_t *mb, unsigned n, unsigned m) {
     // currently this is not stored and must be built
     // should return a matrix containing the alignment, one row per sequence
@@ -733,8 +696,26 @@ void mafBlock_sortBlockByIncreasingGap(mafBlock_t *mb) {
         free(array[i]);
     free(array);
 }
-void walkBlockAddingAlignments(mafBlock_t *mb, stPinchThreadSet *threadSet) {
+static stPinchThread* getThreadByNameId(stPinchThreadSet *threadSet, mafTcThreadCache_t *cache,
+                                        uint32_t nameId, const char *name) {
+    // look the thread of name up by its interned id, only hashing name the
+    // first time the id is seen. Without an id or a cache, name is hashed.
+    if (cache == NULL || nameId == kMafNoNameId)
+        return stPinchThreadSet_getThread(threadSet, stHash_stringKey(name));
+    if (nameId >= cache->size) {
+        uint32_t size = (2 * cache->size > nameId + 1) ? 2 * cache->size : nameId + 1;
+        cache->threads = (stPinchThread **) realloc(cache->threads, sizeof(*(cache->threads)) * size);
+        assert(cache->threads != NULL);
+        memset(cache->threads + cache->size, 0, sizeof(*(cache->threads)) * (size - cache->size));
+        cache->size = size;
+    }
+    if (cache->threads[nameId] == NULL)
+        cache->threads[nameId] = stPinchThreadSet_getThread(threadSet, stHash_stringKey(name));
+    return cache->threads[nameId];
+}
+void walkBlockAddingAlignments(mafBlock_t *mb, stPinchThreadSet *threadSet, mafTcThreadCache_t *cache) {
     // for a given block, add the alignment information to the threadset.
+    // cache may be NULL, otherwise threads are found by the lines' name ids.
     de_debug("walkBlockAddingAlignments():\n");
     if (g_isSort)
         mafBlock_sortBlockByIncreasingGap(mb);
@@ -742,34 +723,39 @@ void walkBlockAddingAlignments(mafBlock_t *mb, stPinchThreadSet *threadSet) {
     if (numSeqs < 1) 
         return;
     uint64_t seqFieldLength = maf_mafBlock_getSequenceFieldLength(mb);
-    char **mat = maf_mafBlock_getSequenceMatrix(mb, numSeqs, seqFieldLength);
+    // rows are borrowed from the block's lines rather than copied
+    char **mat = maf_mafSequenceMatrix_getRows(maf_mafBlock_getSequenceMatrixView(mb));
     int **vizMat = NULL;
     if (g_debug_flag) {
         vizMat = getVizMatrix(mb, numSeqs, seqFieldLength);
     }
-    char *strands = maf_mafBlock_getStrandArray(mb);
-    char **names = maf_mafBlock_getSpeciesArray(mb);
-    uint64_t *starts = maf_mafBlock_getStartArray(mb);
-    uint64_t *sourceLengths = maf_mafBlock_getSourceLengthArray(mb);
-    uint64_t *lengths = maf_mafBlock_getSequenceLengthArray(mb);
-    // coordinate bookmarks are used to store the mapping between local block position
-    // and local sequence coordinate positions, ie local block position minus gap positions.
-    mafCoordinatePair_t *bookmarks = newCoordinatePairArray(numSeqs, mat);
+    // the per row fields are read-only views owned by the block, built once here
+    const char *strands = maf_mafBlock_getStrandArrayView(mb);
+    char *const *names = maf_mafBlock_getSpeciesArrayView(mb);
+    const uint32_t *nameIds = maf_mafBlock_getNameIdArrayView(mb);
+    const uint64_t *starts = maf_mafBlock_getStartArrayView(mb);
+    const uint64_t *sourceLengths = maf_mafBlock_getSourceLengthArrayView(mb);
+    const uint64_t *lengths = maf_mafBlock_getSequenceLengthArrayView(mb);
+    // the mapping between local block position and local sequence coordinate positions,
+    // ie local block position minus gap positions, comes from each line's coordinate map.
+    mafLine_t *const *lines = maf_mafBlock_getMafLineArrayView_seqOnly(mb);
+    mafCoordinateMap_t **maps = (mafCoordinateMap_t **) de_malloc(sizeof(*maps) * numSeqs);
+    for (uint64_t i = 0; i < numSeqs; ++i)
+        maps[i] = maf_mafLine_getCoordinateMap(lines[i]);
     // comparison order coordinates are relative to the block
     mafTcComparisonOrder_t *c = getComparisonOrderFromMatrix(mat, numSeqs, seqFieldLength, lengths, vizMat);
     de_debug("comparisonOrder_t obtained\n");
     mafTcComparisonOrder_t *tmp = NULL;
     stPinchThread *a = NULL, *b = NULL;
     while (c != NULL) {
-        a = stPinchThreadSet_getThread(threadSet, stHash_stringKey(names[c->ref]));
+        a = getThreadByNameId(threadSet, cache, nameIds[c->ref], names[c->ref]);
         assert(a != NULL);
         for (uint64_t r = c->ref + 1; r < numSeqs; ++r) {
-            b = stPinchThreadSet_getThread(threadSet, stHash_stringKey(names[r]));
+            b = getThreadByNameId(threadSet, cache, nameIds[r], names[r]);
             assert(b != NULL);
             processPairForPinching(threadSet, a, starts[c->ref], sourceLengths[c->ref], strands[c->ref],
                                    mat[c->ref], b, starts[r], sourceLengths[r], strands[r], mat[r], 
-                                   c->region->start, c->region->end, bookmarks[c->ref], bookmarks[r],
-                                   (lengths[c->ref] != seqFieldLength), (lengths[r] != seqFieldLength), 
+                                   c->region->start, c->region->end, maps[c->ref], maps[r],
                                    stPinchThread_pinch);
         }
         tmp = c;
@@ -778,24 +764,22 @@ void walkBlockAddingAlignments(mafBlock_t *mb, stPinchThreadSet *threadSet) {
         free(tmp);
     }
     // cleanup
-    maf_mafBlock_destroySequenceMatrix(mat, numSeqs);
     destroyVizMatrix(vizMat, numSeqs);
-    free(strands);
-    free(starts);
-    free(sourceLengths);
-    free(lengths);
-    destroyCoordinatePairArray(bookmarks);
-    for (uint64_t i = 0; i < numSeqs; ++i) {
-        free(names[i]);
-    }
-    free(names);
+    free(maps);
 }
 void addAlignmentsToThreadSet(mafFileApi_t *mfa, stPinchThreadSet *threadSet) {
+    // blocks are read and parsed on a separate thread while this one pinches them.
+    // Lines are read with their name ids so that threads are found by id.
     mafBlock_t *mb = NULL;
-    while ((mb = maf_readBlock(mfa)) != NULL) {
-        walkBlockAddingAlignments(mb, threadSet);
+    mafTcThreadCache_t cache = {NULL, 0};
+    maf_mafFileApi_setNameInterning(mfa, true);
+    mafBlockPipeline_t *bp = maf_newMafBlockPipeline(mfa, kMafBlockPipelineDepth);
+    while ((mb = maf_mafBlockPipeline_readBlock(bp)) != NULL) {
+        walkBlockAddingAlignments(mb, threadSet, &cache);
         maf_destroyMafBlockList(mb);
     }
+    maf_destroyMafBlockPipeline(bp);
+    free(cache.threads);
     stPinchThreadSet_joinTrivialBoundaries(threadSet);
 }
 uint64_t getMaxNameLength(stHash *hash) {
@@ -882,10 +866,14 @@ void reportTransitiveClosure(stPinchThreadSet *threadSet, stHash *hash, stHash *
     int64_t xformedStart;
     int64_t *intKey = NULL;
     maxNameLength = getMaxNameLength(hash);
+    // blocks are formatted into a buffer and written out on a separate thread
+    mafWriter_t *w = maf_newMafWriter(stdout, true);
     while ((thisBlock = stPinchThreadSetBlockIt_getNext(&thisBlockIt)) != NULL) {
         getMaxFieldLengths(hash, nameHash, thisBlock, &maxStartLength,
                            &maxLengthLength, &maxSourceLengthLength);
-        printf("a degree=%" PRIu64 "\n", stPinchBlock_getDegree(thisBlock));
+        maf_mafWriter_writeString(w, "a degree=");
+        maf_mafWriter_writeUInt(w, stPinchBlock_getDegree(thisBlock), 0);
+        maf_mafWriter_writeChar(w, '\n');
         thisSegIt = stPinchBlock_getSegmentIterator(thisBlock);
         while ((thisSeg = stPinchBlockIt_getNext(&thisSegIt)) != NULL) {
             intKey = (int64_t *) st_malloc(sizeof(*intKey));
@@ -902,20 +890,28 @@ void reportTransitiveClosure(stPinchThreadSet *threadSet, stHash *hash, stHash *
                 xformedStart = (((int64_t)((mafTcSeq_t*)stHash_search(hash, key))->length) - 
                                 stPinchSegment_getStart(thisSeg) - stPinchSegment_getLength(thisSeg));
             }
-            printf("s %-*s %*" PRIi32 " %*" PRIi32 " %c %*" PRIu32 " %s\n",
-                   (uint32_t)maxNameLength, key,
-                   (uint32_t)maxStartLength, (int32_t)xformedStart,
-                   (uint32_t)maxLengthLength, (uint32_t)stPinchSegment_getLength(thisSeg),
-                   strand,
-                   (uint32_t)maxSourceLengthLength, (uint32_t)((mafTcSeq_t*)stHash_search(hash, key))->length,
-                   seq
-                   );
+            // as printf("s %-*s %*" PRIi32 " %*" PRIi32 " %c %*" PRIu32 " %s\n", ...)
+            maf_mafWriter_write(w, "s ", 2);
+            maf_mafWriter_writePadded(w, key, (uint32_t)maxNameLength);
+            maf_mafWriter_writeChar(w, ' ');
+            maf_mafWriter_writeInt(w, (int32_t)xformedStart, (uint32_t)maxStartLength);
+            maf_mafWriter_writeChar(w, ' ');
+            maf_mafWriter_writeInt(w, (int32_t)stPinchSegment_getLength(thisSeg), (uint32_t)maxLengthLength);
+            maf_mafWriter_writeChar(w, ' ');
+            maf_mafWriter_writeChar(w, strand);
+            maf_mafWriter_writeChar(w, ' ');
+            maf_mafWriter_writeUInt(w, (uint32_t)((mafTcSeq_t*)stHash_search(hash, key))->length,
+                                    (uint32_t)maxSourceLengthLength);
+            maf_mafWriter_writeChar(w, ' ');
+            maf_mafWriter_writeString(w, seq);
+            maf_mafWriter_writeChar(w, '\n');
             free(seq);
             free(intKey);
         }
-        printf("\n");
+        maf_mafWriter_writeChar(w, '\n');
     }
-    printf("\n");
+    maf_mafWriter_writeChar(w, '\n');
+    maf_destroyMafWriter(w);
 } 
 int main(int argc, char **argv) {
     (void) (printMatrix);
@@ -928,15 +924,21 @@ int main(int argc, char **argv) {
     parseOptions(argc, argv, filename);
     // first pass, build sequence hash
     mafFileApi_t *mfa = maf_newMfa(filename, "r");
+    PROFILE_BEGIN("createSequenceHash");
     createSequenceHash(mfa, &sequenceHash, &nameHash);
     stPinchThreadSet *threadSet = buildThreadSet(sequenceHash);
+    PROFILE_END("createSequenceHash");
     maf_destroyMfa(mfa);
     // second pass, build pinch graph
     mfa = maf_newMfa(filename, "r");
+    PROFILE_BEGIN("addAlignmentsToThreadSet");
     addAlignmentsToThreadSet(mfa, threadSet);
+    PROFILE_END("addAlignmentsToThreadSet");
     maf_destroyMfa(mfa);
     // consolidate and report
+    PROFILE_BEGIN("reportTransitiveClosure");
     reportTransitiveClosure(threadSet, sequenceHash, nameHash);
+    PROFILE_END("reportTransitiveClosure");
     // cleanup
     stHash_destruct(sequenceHash);
     stHash_destruct(nameHash);
@@ -62,50 +62,48 @@ typedef struct mafTcComparisonOrder {
     mafTcRegion_t *region;
     struct mafTcComparisonOrder *next;
 } mafTcComparisonOrder_t;
-typedef struct mafCoordinatePair {
-    /* this struct is used to store pairs of coordinates
-    */
-    int64_t a;
-    int64_t b;
-} mafCoordinatePair_t;
 typedef struct mafBlockSort {
     /* this struct is used to sort a sequence matrix by the number of gaps in each row
      */
     int64_t value; // value to sort upon
     mafLine_t *ml;
 } mafBlockSort_t;
+typedef struct mafTcThreadCache {
+    /* pinch threads by the name ids of the lines of an interning mafFileApi_t,
+     * filled in as ids are first seen. threads[i] is NULL until then.
+     */
+    stPinchThread **threads;
+    uint32_t size;
+} mafTcThreadCache_t;
 
 void usage(void);
 mafTcSeq_t* newMafTcSeq(char *name, uint64_t length);
 mafTcComparisonOrder_t* newMafTcComparisonOrder(void);
 mafTcRegion_t* newMafTcRegion(uint64_t start, uint64_t end);
-mafCoordinatePair_t* newCoordinatePairArray(uint64_t numSeqs, char **seqs);
 void destroyMafTcSeq(void *p);
 void destroyMafTcRegionList(mafTcRegion_t *r);
 void destroyMafTcRegion(mafTcRegion_t *r);
 void destroyMafTcComparisonOrder(mafTcComparisonOrder_t *c);
-void destroyCoordinatePairArray(mafCoordinatePair_t *cp);
 uint64_t hashMafTcSeq(const mafTcSeq_t *mtcs);
 int hashCompareMafTcSeq(const mafTcSeq_t *m1, const mafTcSeq_t *m2);
 char* createNSequence(uint64_t length);
 void addSequenceValuesToMtcSeq(mafLine_t *ml, mafTcSeq_t *mtcs);
 void parseOptions(int argc, char **argv, char *filename);
 stPinchThreadSet* buildThreadSet(stHash *hash);
-void walkBlockAddingAlignments(mafBlock_t *mb, stPinchThreadSet *threadSet);
+void walkBlockAddingAlignments(mafBlock_t *mb, stPinchThreadSet *threadSet, mafTcThreadCache_t *cache);
 void addAlignmentsToThreadSet(mafFileApi_t *mfa, stPinchThreadSet *threadSet);
 void createSequenceHash(mafFileApi_t *mfa, stHash **hash, stHash **nameHash);
 mafTcRegion_t* getComparisonOrderFromRow(char **mat, uint64_t row, mafTcComparisonOrder_t **done,
                                          mafTcRegion_t *todo, int containsGaps);
 mafTcComparisonOrder_t *getComparisonOrderFromMatrix(char **mat, uint64_t rowLength, uint64_t colLength,
-                                                     uint64_t *lengths, int **vizMat);
+                                                     const uint64_t *lengths, int **vizMat);
 void processPairForPinching(stPinchThreadSet *threadSet, stPinchThread *a, uint64_t aGlobalStart,
                             uint64_t aGlobalLength, int aStrand,
                             char *aSeq, stPinchThread *b, uint64_t bGlobalStart, uint64_t bGlobalLength,
                             int bStrand, char *bSeq, uint64_t regionStart, uint64_t regionEnd,
-                            mafCoordinatePair_t aBookmark, mafCoordinatePair_t bBookmark,
-                            int aContainsGaps, int bContainsGaps,
+                            mafCoordinateMap_t *aMap, mafCoordinateMap_t *bMap,
                             void (*pinchFunction)(stPinchThread *, stPinchThread *, int64_t, int64_t, int64_t, bool));
-int64_t localSeqCoords(uint64_t p, char *s, mafCoordinatePair_t *bookmark, int containsGaps);
+int64_t localSeqCoordOfColumn(mafCoordinateMap_t *map, uint64_t column);
 int64_t localSeqCoordsToGlobalPositiveCoords(int64_t c, uint64_t start, uint64_t sourceLength, char strand);
 int64_t localSeqCoordsToGlobalPositiveStartCoords(int64_t c, uint64_t start, uint64_t sourceLength,
                                                   char strand, uint64_t length);
@@ -788,90 +788,47 @@ static void test_addSequenceValuesToMtcSeq_0(CuTest *testCase) {
     maf_destroyMafLineList(ml);
     destroyMafTcSeq(mtcs);
 }
+static mafLine_t* newSeqLine(const char *seq, uint64_t start, char strand, uint64_t sourceLength) {
+    // a sequence line holding seq, so that tests can use its coordinate map
+    uint64_t bases = 0;
+    for (const char *c = seq; *c != '\0'; ++c)
+        if (*c != '-')
+            ++bases;
+    char *line = (char*) de_malloc(strlen(seq) + 128);
+    sprintf(line, "s test.chr0 %" PRIu64 " %" PRIu64 " %c %" PRIu64 " %s", start, bases, strand, sourceLength, seq);
+    mafLine_t *ml = maf_newMafLineFromString(line, 1);
+    free(line);
+    return ml;
+}
+static int64_t columnCoord(const char *seq, uint64_t column) {
+    // localSeqCoordOfColumn() of column in a row holding seq
+    mafLine_t *ml = newSeqLine(seq, 0, '+', 1000);
+    int64_t c = localSeqCoordOfColumn(maf_mafLine_getCoordinateMap(ml), column);
+    maf_destroyMafLineList(ml);
+    return c;
+}
 static void test_localSeqCoords_0(CuTest *testCase) {
-    mafCoordinatePair_t mcp;
-    mcp.a = 0;
-    mcp.b = -1;
-    char *s = de_strdup("ACGT");
-    CuAssertTrue(testCase, localSeqCoords(3, s, &mcp, 0) == 3);
-    CuAssertTrue(testCase, mcp.a == 3);
-    CuAssertTrue(testCase, mcp.b == 3);
-    free(s);
-    mcp.a = 0;
-    mcp.b = -1;
-    s = de_strdup("-------ACGT");
-    // printf("expecting 3 observing %" PRIi64 "\n", localSeqCoords(10, s, &mcp, 1));
-    mcp.a = 0;
-    mcp.b = -1;
-    CuAssertTrue(testCase, localSeqCoords(10, s, &mcp, 1) == 3);
-    CuAssertTrue(testCase, mcp.a == 10);
-    CuAssertTrue(testCase, mcp.b == 3);
-    free(s);
-    mcp.a = 0;
-    mcp.b = 0;
-    s = de_strdup("A-------ACGT");    
-    // printf("expecting 4 observing %" PRIi64 "\n", localSeqCoords(11, s, &mcp, 1));
-    mcp.a = 0;
-    mcp.b = 0;
-    CuAssertTrue(testCase, localSeqCoords(11, s, &mcp, 1) == 4);
-    CuAssertTrue(testCase, mcp.a == 11);
-    CuAssertTrue(testCase, mcp.b == 4);
-    free(s);
-    mcp.a = 8;
-    mcp.b = 1;
-    s = de_strdup("-------ACGT");
-    CuAssertTrue(testCase, localSeqCoords(10, s, &mcp, 1) == 3);
-    CuAssertTrue(testCase, mcp.a == 10);
-    CuAssertTrue(testCase, mcp.b == 3);
-    free(s);
-    mcp.a = 10;
-    mcp.b = 3;
-    s = de_strdup("-------ACGT");
-    CuAssertTrue(testCase, localSeqCoords(10, s, &mcp, 1) == 3);
-    CuAssertTrue(testCase, mcp.a == 10);
-    CuAssertTrue(testCase, mcp.b == 3);
-    free(s);
-    mcp.a = 0;
-    mcp.b = -1;
-    s = de_strdup("-A-C-G-T");
-    CuAssertTrue(testCase, localSeqCoords(7, s, &mcp, 1) == 3);
-    CuAssertTrue(testCase, mcp.a == 7);
-    CuAssertTrue(testCase, mcp.b == 3);
-    free(s);
-    mcp.a = 0;
-    mcp.b = -1;
-    s = de_strdup("AA-A-C-G-T");
-    // printf("expecting 5 observing %" PRIi64 "\n", localSeqCoords(9, s, &mcp, 1));
-    CuAssertTrue(testCase, localSeqCoords(9, s, &mcp, 1) == 5);
-    CuAssertTrue(testCase, mcp.a == 9);
-    CuAssertTrue(testCase, mcp.b == 5);
-    free(s);
-    mcp.a = 0;
-    mcp.b = -1;
-    s = de_strdup("AA-A-C-G-T");
-    CuAssertTrue(testCase, localSeqCoords(3, s, &mcp, 1) == 2);
-    CuAssertTrue(testCase, mcp.a == 3);
-    CuAssertTrue(testCase, mcp.b == 2);
-    free(s);
-    mcp.a = 1;
-    mcp.b = 1;
-    s = de_strdup("AA-A-C-G-T");
-    CuAssertTrue(testCase, localSeqCoords(3, s, &mcp, 1) == 2);
-    CuAssertTrue(testCase, mcp.a == 3);
-    CuAssertTrue(testCase, mcp.b == 2);
-    free(s);
-    mcp.a = 0;
-    mcp.b = -1;
-    s = de_strdup("GTTGTCTCTCAATGTG");
-    CuAssertTrue(testCase, localSeqCoords(6, s, &mcp, 0) == 6);
-    CuAssertTrue(testCase, mcp.a == 6);
-    CuAssertTrue(testCase, mcp.b == 6);
-    free(s);
-    s = de_strdup("GTTGTCTCTCAATGTG");
-    CuAssertTrue(testCase, localSeqCoords(15, s, &mcp, 0) == 15);
-    CuAssertTrue(testCase, mcp.a == 15);
-    CuAssertTrue(testCase, mcp.b == 15);
-    free(s);
+    CuAssertTrue(testCase, columnCoord("ACGT", 3) == 3);
+    CuAssertTrue(testCase, columnCoord("-------ACGT", 10) == 3);
+    CuAssertTrue(testCase, columnCoord("A-------ACGT", 11) == 4);
+    CuAssertTrue(testCase, columnCoord("-------ACGT", 7) == 0);
+    CuAssertTrue(testCase, columnCoord("-A-C-G-T", 7) == 3);
+    CuAssertTrue(testCase, columnCoord("AA-A-C-G-T", 9) == 5);
+    CuAssertTrue(testCase, columnCoord("AA-A-C-G-T", 3) == 2);
+    CuAssertTrue(testCase, columnCoord("AA-A-C-G-T", 0) == 0);
+    CuAssertTrue(testCase, columnCoord("GTTGTCTCTCAATGTG", 6) == 6);
+    CuAssertTrue(testCase, columnCoord("GTTGTCTCTCAATGTG", 15) == 15);
+    // gap columns take the coordinate of the base before them
+    CuAssertTrue(testCase, columnCoord("AA-A-C-G-T", 2) == 1);
+    CuAssertTrue(testCase, columnCoord("A-------ACGT", 5) == 0);
+    CuAssertTrue(testCase, columnCoord("-------ACGT", 3) == -1);
+    // the same map answers any column, in any order
+    mafLine_t *ml = newSeqLine("AA-A-C-G-T", 0, '+', 1000);
+    mafCoordinateMap_t *map = maf_mafLine_getCoordinateMap(ml);
+    CuAssertTrue(testCase, localSeqCoordOfColumn(map, 9) == 5);
+    CuAssertTrue(testCase, localSeqCoordOfColumn(map, 3) == 2);
+    CuAssertTrue(testCase, localSeqCoordOfColumn(map, 5) == 3);
+    maf_destroyMafLineList(ml);
 }
 static void test_localSeqCoordsToGlobalPositiveCoords_0(CuTest *testCase) {
     // int64_t localSeqCoordsToGlobalPositiveCoords(localPosition, startField, sourceLength, strand);
@@ -899,93 +856,126 @@ static void test_localSeqCoordsToGlobalPositiveStartCoords_0(CuTest *testCase) {
 }
 static void test_coordinateTransforms_0(CuTest *testCase) {
     char *input = de_strdup("-AA-GGGAATGTTAACCAAATGA---ATTGTCTCTTACGGTG");
-    mafCoordinatePair_t mcp;
     uint64_t start = 0, sourceLength = 100, seqLength = 37, localStart = 1;
     int64_t expectation = 0;
     char strand = '+';
-    bool containsGaps = true;
-    mcp.a = 0;
-    mcp.b = -1;
-    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(localSeqCoords(localStart, input, &mcp, containsGaps), start, sourceLength, strand, seqLength) == expectation);
-    CuAssertTrue(testCase, mcp.a == 1);
-    CuAssertTrue(testCase, mcp.b == 0);
-    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(localSeqCoords(localStart, input, &mcp, containsGaps), start, sourceLength, strand, seqLength) == expectation);
-    CuAssertTrue(testCase, mcp.a == 1);
-    CuAssertTrue(testCase, mcp.b == 0);
+    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(columnCoord(input, localStart), start, sourceLength, strand, seqLength) == expectation);
+    CuAssertTrue(testCase, columnCoord(input, localStart) == 0);
     localStart = 4;
     expectation = 2;
-    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(localSeqCoords(localStart, input, &mcp, containsGaps), start, sourceLength, strand, seqLength) == expectation);
-    CuAssertTrue(testCase, mcp.a == 4);
-    CuAssertTrue(testCase, mcp.b == 2);
+    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(columnCoord(input, localStart), start, sourceLength, strand, seqLength) == expectation);
+    CuAssertTrue(testCase, columnCoord(input, localStart) == 2);
     localStart = 26;
     expectation = 21;
-    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(localSeqCoords(localStart, input, &mcp, containsGaps), start, sourceLength, strand, seqLength) == expectation);
-    CuAssertTrue(testCase, mcp.a == 26);
-    CuAssertTrue(testCase, mcp.b == 21);
+    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(columnCoord(input, localStart), start, sourceLength, strand, seqLength) == expectation);
+    CuAssertTrue(testCase, columnCoord(input, localStart) == 21);
     localStart = 41;
     expectation = 36;
-    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(localSeqCoords(localStart, input, &mcp, containsGaps), start, sourceLength, strand, seqLength) == expectation);
-    CuAssertTrue(testCase, mcp.a == 41);
-    CuAssertTrue(testCase, mcp.b == 36);
+    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(columnCoord(input, localStart), start, sourceLength, strand, seqLength) == expectation);
+    CuAssertTrue(testCase, columnCoord(input, localStart) == 36);
     // reverse strand.
-    mcp.a = 0;
-    mcp.b = -1;
     seqLength = 2;
     localStart = 1;
     expectation = 98;
     strand = '-';
-    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(localSeqCoords(localStart, input, &mcp, containsGaps), start, sourceLength, strand, seqLength) == expectation);
-    CuAssertTrue(testCase, mcp.a == 1);
-    CuAssertTrue(testCase, mcp.b == 0);    
+    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(columnCoord(input, localStart), start, sourceLength, strand, seqLength) == expectation);
+    CuAssertTrue(testCase, columnCoord(input, localStart) == 0);
     seqLength = 19;
     localStart = 4;
     expectation = 79;
-    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(localSeqCoords(localStart, input, &mcp, containsGaps), start, sourceLength, strand, seqLength) == expectation);
-    CuAssertTrue(testCase, mcp.a == 4);
-    CuAssertTrue(testCase, mcp.b == 2);
+    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(columnCoord(input, localStart), start, sourceLength, strand, seqLength) == expectation);
+    CuAssertTrue(testCase, columnCoord(input, localStart) == 2);
     seqLength = 16;
     localStart = 26;
     expectation = 63;
-    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(localSeqCoords(localStart, input, &mcp, containsGaps), start, sourceLength, strand, seqLength) == expectation);
-    CuAssertTrue(testCase, mcp.a == 26);
-    CuAssertTrue(testCase, mcp.b == 21);
+    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(columnCoord(input, localStart), start, sourceLength, strand, seqLength) == expectation);
+    CuAssertTrue(testCase, columnCoord(input, localStart) == 21);
     free(input);
     input = de_strdup("GTTGTCTCTCAATGTG");
-    mcp.a = 0;
-    mcp.b = 0;
     start = 1;
     seqLength = 16;
     localStart = 0;
     expectation = 1;
     strand = '+';
-    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(localSeqCoords(localStart, input, &mcp, 0), start, sourceLength, strand, seqLength) == expectation);
+    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(columnCoord(input, localStart), start, sourceLength, strand, seqLength) == expectation);
     free(input);
 }
 static void test_coordinateTransforms_1(CuTest *testCase) {
     char *input = de_strdup("CGTCCGCAGATCGTTAACTTAATTGTTCCGCTTGAAATCCGAAAACT---------GCCAA-CGCTATTGTTGCGACTGATAGTCGTGAATGGCCGTGACCACGCCCCCAATCCC----CTAAGCCCCCCTTT--------------TGGCAAA---------------------------------------CGGC---GCCTATGG--CTGG-----g-aa---------acag-------------------------------------------------------------------------------ga------------------------------------------acaga-----------------------------------------------------------------------------------------aacaggaacagGAATGCAATAAAA---TTGGCGTGACTAACTCAGCACTGGGATGCGAT---------GCGAGCATTG--CAG---------------------ATGAGCTGAG------GATTGGAG--CTTGAAAGTGGAGGAGGA---------T------TGGGGGGG-----GATGAAGGGGT----------------------------------------TC-----TGGGATTGGATGCC------CCAA---TGTGGCAGC---------CACAGAAGGGC--------------GCAAGTCGTGCGTGC---------CTCGGCGAAAC------------GTTGACGC------T-----------------GTCATGCAATCAGCAAATAGGCGACCGCAGCAAAAGTCGCGTAATTAACGC");
-    mafCoordinatePair_t mcp;
     uint64_t start = 47275, localStart = 566, sourceLength = 47773, seqLength = 1, localCoord = 234;
     int64_t expectation = 263;
     char strand = '-';
-    bool containsGaps = true;
-    mcp.a = 0;
-    mcp.b = 0;
-    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(localSeqCoords(localStart, input, &mcp, containsGaps), start, sourceLength, strand, seqLength) == expectation);
-    CuAssertTrue(testCase, mcp.a == localStart);
-    CuAssertTrue(testCase, mcp.b == localCoord);
+    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(columnCoord(input, localStart), start, sourceLength, strand, seqLength) == expectation);
+    CuAssertTrue(testCase, columnCoord(input, localStart) == (int64_t) localCoord);
 
-    localStart = 629;    
+    localStart = 629;
     seqLength = 11;
     expectation = 218;
     localCoord = 269;
-    // printf("localSeqCoords: %" PRIi64 "\n", localSeqCoords(localStart, input, &mcp, containsGaps));
-    // printf("expecting %" PRIi64 " observing %" PRIi64 "\n", expectation, localSeqCoordsToGlobalPositiveStartCoords(localSeqCoords(localStart, input, &mcp, containsGaps), start, sourceLength, strand, seqLength));
-    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(localSeqCoords(localStart, input, &mcp, containsGaps), start, sourceLength, strand, seqLength) == expectation);
-    CuAssertTrue(testCase, mcp.a == localStart);
-    CuAssertTrue(testCase, mcp.b == localCoord);
+    CuAssertTrue(testCase, localSeqCoordsToGlobalPositiveStartCoords(columnCoord(input, localStart), start, sourceLength, strand, seqLength) == expectation);
+    CuAssertTrue(testCase, columnCoord(input, localStart) == (int64_t) localCoord);
     
     free(input);
 }
+typedef struct testPinch {
+    int64_t aStart;
+    int64_t bStart;
+    int64_t length;
+    bool strand;
+} testPinch_t;
+static testPinch_t g_testPinches[8];
+static int g_numTestPinches = 0;
+static void recordPinch(stPinchThread *a, stPinchThread *b, int64_t aStart, int64_t bStart, int64_t length, bool strand) {
+    // stands in for stPinchThread_pinch() so that the pinches can be checked
+    (void) (a);
+    (void) (b);
+    assert(g_numTestPinches < 8);
+    testPinch_t *p = g_testPinches + g_numTestPinches++;
+    p->aStart = aStart;
+    p->bStart = bStart;
+    p->length = length;
+    p->strand = strand;
+}
+static void test_processPairForPinching_0(CuTest *testCase) {
+    // the pinched segments are found in the rows' coordinate maps
+    mafLine_t *aLine = newSeqLine("A-CGTACGTA", 10, '+', 100);
+    mafLine_t *bLine = newSeqLine("AACG--CGTA", 5, '+', 50);
+    char *aSeq = de_strdup("A-CGTACGTA");
+    char *bSeq = de_strdup("AACG--CGTA");
+    g_numTestPinches = 0;
+    processPairForPinching(NULL, NULL, 10, 100, '+', aSeq, NULL, 5, 50, '+', bSeq, 2, 9,
+                           maf_mafLine_getCoordinateMap(aLine), maf_mafLine_getCoordinateMap(bLine),
+                           recordPinch);
+    CuAssertTrue(testCase, g_numTestPinches == 2);
+    CuAssertTrue(testCase, g_testPinches[0].aStart == 11);
+    CuAssertTrue(testCase, g_testPinches[0].bStart == 7);
+    CuAssertTrue(testCase, g_testPinches[0].length == 2);
+    CuAssertTrue(testCase, g_testPinches[0].strand);
+    CuAssertTrue(testCase, g_testPinches[1].aStart == 15);
+    CuAssertTrue(testCase, g_testPinches[1].bStart == 9);
+    CuAssertTrue(testCase, g_testPinches[1].length == 4);
+    CuAssertTrue(testCase, g_testPinches[1].strand);
+    maf_destroyMafLineList(bLine);
+    // b on the reverse strand
+    bLine = newSeqLine("AACG--CGTA", 5, '-', 50);
+    g_numTestPinches = 0;
+    processPairForPinching(NULL, NULL, 10, 100, '+', aSeq, NULL, 5, 50, '-', bSeq, 2, 9,
+                           maf_mafLine_getCoordinateMap(aLine), maf_mafLine_getCoordinateMap(bLine),
+                           recordPinch);
+    CuAssertTrue(testCase, g_numTestPinches == 2);
+    CuAssertTrue(testCase, g_testPinches[0].aStart == 11);
+    CuAssertTrue(testCase, g_testPinches[0].bStart == 41);
+    CuAssertTrue(testCase, g_testPinches[0].length == 2);
+    CuAssertTrue(testCase, !g_testPinches[0].strand);
+    CuAssertTrue(testCase, g_testPinches[1].aStart == 15);
+    CuAssertTrue(testCase, g_testPinches[1].bStart == 37);
+    CuAssertTrue(testCase, g_testPinches[1].length == 4);
+    CuAssertTrue(testCase, !g_testPinches[1].strand);
+    free(aSeq);
+    free(bSeq);
+    maf_destroyMafLineList(aLine);
+    maf_destroyMafLineList(bLine);
+}
 static void test_mafBlockGapSorting_0(CuTest *testCase) {
     // test that the mafBlock_sortBlockByIncreasingGap() function works as expected
     // HEY YOU! qsort is NOT stable on all systems, do NOT write a test case that assumes stability.
@@ -1074,6 +1064,7 @@ CuSuite* mafTransitiveClosure_TestSuite(void) {
     SUITE_ADD_TEST(suite, test_localSeqCoordsToGlobalPositiveStartCoords_0);
     SUITE_ADD_TEST(suite, test_coordinateTransforms_0);
     SUITE_ADD_TEST(suite, test_coordinateTransforms_1);
+    SUITE_ADD_TEST(suite, test_processPairForPinching_0);
     SUITE_ADD_TEST(suite, test_mafBlockGapSorting_0);
     return suite;
 }
@@ -55,6 +55,7 @@ void test_localSeqCoordsToGlobalPositiveCoords_0(CuTest *testCase);
 void test_localSeqCoordsToGlobalPositiveStartCoords_0(CuTest *testCase);
 void test_coordinateTransforms_0(CuTest *testCase);
 void test_coordinateTransforms_1(CuTest *testCase);
+void test_processPairForPinching_0(CuTest *testCase);
 void test_mafBlockGapSorting_0(CuTest *testCase);
 CuSuite* mafTransitiveClosure_TestSuite(void);
 
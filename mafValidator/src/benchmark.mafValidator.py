@@ -0,0 +1,108 @@
+"""
+Times mafValidator.py --validateSequence on a synthetic maf against the numpy
+implementation of the sequence consistency checks that it replaced, each in a
+process of its own so that their peak memory can be told apart.
+
+python src/benchmark.mafValidator.py [--size 4m] [--sourceLength 100000000]
+"""
+from optparse import OptionParser
+import numpy
+import os
+import shutil
+import sys
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]), '../../lib/')))
+import mafToolsBenchmark as mtb
+from mafToolsBenchmark.runner import timeCommand
+import mafValidator as mafval
+
+def legacyReverseComplement(s):
+   s = s[::-1]
+   s = s.replace('A', '1')
+   s = s.replace('a', '1')
+   s = s.replace('T', 'A')
+   s = s.replace('t', 'A')
+   s = s.replace('1', 'T')
+   s = s.replace('G', '2')
+   s = s.replace('g', '2')
+   s = s.replace('C', 'G')
+   s = s.replace('c', 'G')
+   s = s.replace('2', 'C')
+   return s
+def legacyCheckForSequenceInconsistencies(data, sfd, filename, lineno, line):
+   """ the checks as they were, a full length numpy.string_ array per sequence
+   """
+   name = data[1]
+   start, length = map(int, data[2:4])
+   totalSrcLength = int(data[5])
+   if name not in sfd:
+      sfd[name] = numpy.zeros(int(totalSrcLength), dtype=numpy.string_)
+      sfd[name][:] = 'N'
+   if data[4] == '+':
+      stop = start + length
+      seqstr = data[6]
+   else:
+      start, stop = totalSrcLength - (start + length), totalSrcLength - start
+      seqstr = legacyReverseComplement(data[6])
+   seqstr = seqstr.upper().replace('-', '')
+   seq = numpy.zeros(length, dtype=numpy.string_)
+   seq[:] = list(seqstr)
+   stored = numpy.ma.array(sfd[name][start:stop], mask=sfd[name][start:stop] == 'N')
+   if not (stored == seq).all():
+      if not (stored == seq).mask.all():
+         if not stored is numpy.ma.masked:
+            raise mafval.SequenceConsistencyError('maf %s has inconsistent sequence, discovered on '
+                                                  'line number %d.' % (filename, lineno))
+   sfd[name][start:stop] = seq
+def initOptions(parser):
+   parser.add_option('--size', dest='size', default='s=4m',
+                     help='size of the synthetic maf, as for mafToolsBenchmark --tiers. default=%default')
+   parser.add_option('--sourceLength', dest='sourceLength', type='int', default=None,
+                     help='length of every sequence in the synthetic maf. default=little more than '
+                     'the rows need')
+   parser.add_option('--seed', dest='seed', type='int', default=0,
+                     help='seed of the synthetic maf. default=%default')
+   parser.add_option('--repeats', dest='repeats', type='int', default=3,
+                     help='times to validate with each implementation. default=%default')
+   parser.add_option('--run', dest='run', default=None, help='internal, validate --maf with '
+                     'the legacy or the current implementation')
+   parser.add_option('--maf', dest='maf', default=None, help='internal')
+def validate(maf, implementation):
+   if implementation == 'legacy':
+      mafval.checkForSequenceInconsistencies = legacyCheckForSequenceInconsistencies
+   options = mafval.GenericValidationOptions()
+   options.validateSequence = True
+   mafval.validateMaf(maf, options)
+def main():
+   parser = OptionParser(usage=__doc__.strip())
+   initOptions(parser)
+   options, args = parser.parse_args()
+   if options.run is not None:
+      validate(options.maf, options.run)
+      return
+   tmpDir = tempfile.mkdtemp(prefix='benchmark.mafValidator')
+   try:
+      maf = os.path.join(tmpDir, 'benchmark.maf')
+      info = mtb.generateMaf(maf, mtb.parseTiers(options.size)[0][1], seed=options.seed,
+                             sourceLength=options.sourceLength)
+      print('%d blocks, %d bytes, source length %d'
+            % (info['blocks'], info['bytes'], info['sourceLength']))
+      times = {}
+      for implementation in ['legacy', 'current']:
+         cmd = [sys.executable, os.path.abspath(sys.argv[0]), '--run', implementation, '--maf', maf]
+         runs = [timeCommand(cmd, tmpDir) for i in xrange(0, options.repeats)]
+         if any(status != 0 for wall, rss, status in runs):
+            sys.stderr.write('%s failed:\n%s' % (implementation,
+                                                 open(os.path.join(tmpDir, 'stderr.txt')).read()))
+            sys.exit(1)
+         times[implementation] = min(wall for wall, rss, status in runs)
+         print('%-8s %8.3fs %8.1f MB/s %8.1f MB peak'
+               % (implementation, times[implementation],
+                  info['bytes'] / float(1 << 20) / times[implementation],
+                  max(rss for wall, rss, status in runs) / float(1 << 20)))
+      print('speedup %.2fx' % (times['legacy'] / times['current']))
+   finally:
+      shutil.rmtree(tmpDir)
+
+if __name__ == '__main__':
+   main()
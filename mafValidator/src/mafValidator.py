@@ -34,10 +34,21 @@ files.
 # THE SOFTWARE.
 ##############################
 from optparse import OptionParser
+import collections
+import hashlib
+import itertools
+import marshal
+import multiprocessing
 import numpy
 import os
 import re
 import sys
+import zlib
+try:
+   # compiled line checks, `make' builds them where it can
+   import _mafValidatorLines as g_lineChecks
+except ImportError:
+   g_lineChecks = None
 
 g_version = '0.1 May 2012'
 
@@ -66,6 +77,8 @@ class GenericValidationOptions:
         self.lookForDuplicateColumns = False
         self.testChromNames = False
         self.validateSequence = True
+        self.processes = 1
+        self.checkpoint = None
 
 def initOptions(parser):
    parser.add_option('--maf', dest='filename', 
@@ -82,8 +95,16 @@ def initOptions(parser):
    parser.add_option('--validateSequence', dest='validateSequence', 
                      default=False, action='store_true',
                      help=('Turn on checks to make sure all sequence fields are '
-                           'consistent. Slows things down considerably. Note that selecting this option '
+                           'consistent. Slows things down, about twofold. Note that selecting this option '
                            'implicitly sets --ignoreDuplicateColumns'))
+   parser.add_option('--processes', dest='processes', type='int', default=1,
+                     help=('Number of processes to validate with. Large mafs are cut into pieces at '
+                           'alignment blocks and the pieces validated side by side, errors are reported '
+                           'as they would be otherwise. default=%default'))
+   parser.add_option('--checkpoint', dest='checkpoint', default=None,
+                     help=('Path to a checkpoint file. After a successful run the state of the validator '
+                           'is saved there, and a later run with the same options on the same maf, '
+                           'grown only by appending, validates just the appended lines. default=%default'))
    parser.add_option('--version', dest='isVersion', action='store_true', default=False,
                      help='Print version number and exit.')
 def checkOptions(options, args, parser):
@@ -94,6 +115,8 @@ def checkOptions(options, args, parser):
       parser.error('specify --maf')
    if not os.path.exists(options.filename):
       parser.error('--maf %s does not exist.' % options.filename)
+   if options.processes < 1:
+      parser.error('--processes must be at least 1.')
    if options.validateSequence:
       options.lookForDuplicateColumns = False
 
@@ -104,18 +127,106 @@ def validateMaf(filename, options):
    if os.path.getsize(filename) == 0:
       # empty files are considered invalid
       raise EmptyInputError('maf %s is completely empty.' % filename)
+   checkpoint = getattr(options, 'checkpoint', None)
+   state, start = ValidationState(), 0
+   if checkpoint is not None:
+      state, start = readCheckpoint(checkpoint, filename, options)
+   processes = getattr(options, 'processes', 1)
+   if processes > 1:
+      end = validateMafInParallel(filename, options, processes, state, start)
+   else:
+      f = open(filename, 'r')
+      f.seek(start)
+      validateLines(f, filename, options, state.lines, state, start == 0)
+      end = f.tell()
+      f.close()
+   validateFooter(state, filename)
+   if checkpoint is not None:
+      writeCheckpoint(checkpoint, filename, options, state, end)
+   return True
+class ValidationState:
+   """ Everything that validating the lines of a maf leaves behind for the lines after them:
+   the source lengths, the columns and sequence seen so far and how the last line left off.
+   """
+   def __init__(self):
+      self.sources = {}
+      self.sequenceColumnDict = {}
+      self.sequenceFieldDict = {}
+      self.prevLineWasAlignmentBlock = False
+      self.alignmentFieldLength = None
+      self.prevline = ''
+      self.line = ''
+      self.lines = 0
+   def conflicts(self, other):
+      """ returns True if the lines that left other, validated from a fresh state, could fail when
+      validated after the lines that left this state.
+      """
+      for key, length in other.sources.iteritems():
+         if self.sources.get(key, length) != length:
+            return True
+      for d, od in [(self.sequenceColumnDict, other.sequenceColumnDict),
+                    (self.sequenceFieldDict, other.sequenceFieldDict)]:
+         for name, tracker in od.iteritems():
+            if name in d and d[name].conflicts(tracker):
+               return True
+      return False
+   def update(self, other):
+      """ adds other, left by the lines following those that left this state, to this state.
+      """
+      for key, length in other.sources.iteritems():
+         self.sources.setdefault(key, length)
+      for d, od in [(self.sequenceColumnDict, other.sequenceColumnDict),
+                    (self.sequenceFieldDict, other.sequenceFieldDict)]:
+         for name, tracker in od.iteritems():
+            if name in d:
+               d[name].update(tracker)
+            else:
+               d[name] = tracker
+      self.prevLineWasAlignmentBlock = other.prevLineWasAlignmentBlock
+      self.alignmentFieldLength = other.alignmentFieldLength
+      self.prevline = other.prevline
+      self.line = other.line
+      self.lines += other.lines
+   def toData(self):
+      """ returns this state as built in types, for marshal.
+      """
+      return {'sources': self.sources,
+              'columns': dict((n, t.toData()) for n, t in self.sequenceColumnDict.iteritems()),
+              'sequences': dict((n, t.toData()) for n, t in self.sequenceFieldDict.iteritems()),
+              'prevLineWasAlignmentBlock': self.prevLineWasAlignmentBlock,
+              'alignmentFieldLength': self.alignmentFieldLength,
+              'prevline': self.prevline,
+              'line': self.line,
+              'lines': self.lines}
+   @staticmethod
+   def fromData(data):
+      state = ValidationState()
+      state.sources = data['sources']
+      state.sequenceColumnDict = dict((n, ColumnTracker.fromData(d)) for n, d in data['columns'].iteritems())
+      state.sequenceFieldDict = dict((n, SequenceTracker.fromData(d)) for n, d in data['sequences'].iteritems())
+      state.prevLineWasAlignmentBlock = data['prevLineWasAlignmentBlock']
+      state.alignmentFieldLength = data['alignmentFieldLength']
+      state.prevline = data['prevline']
+      state.line = data['line']
+      state.lines = data['lines']
+      return state
+def validateLines(lines, filename, options, offset, state, isFileStart):
+   """ validates lines, those of the maf following its first offset lines, picking up from and
+   updating state. The header is validated first if isFileStart.
+   """
    nameRegex = r'(.+?)\.(chr.+)'
    namePat = re.compile(nameRegex)
-   sequenceColumnDict = {}
-   sequenceFieldDict = {}
-   
-   f = open(filename, 'r')
-   headerProcessedLines = validateHeader(f, filename)
-   sources = {}
-   prevLineWasAlignmentBlock = False
-   alignmentFieldLength = None
-   prevline = ''
-   for lineno, line in enumerate(f, headerProcessedLines + 1):
+   sequenceColumnDict = state.sequenceColumnDict
+   sequenceFieldDict = state.sequenceFieldDict
+   sources = state.sources
+   prevLineWasAlignmentBlock = state.prevLineWasAlignmentBlock
+   alignmentFieldLength = state.alignmentFieldLength
+   prevline = state.prevline
+   line = state.line
+   lineno = offset
+   if isFileStart:
+      lineno += validateHeader(lines, filename)
+   for lineno, line in enumerate(lines, lineno + 1):
       line = line.strip()
       if line.startswith('#'):
          alignmentFieldLength = None
@@ -173,16 +284,178 @@ def validateMaf(filename, options):
          prevLineWasAlignmentBlock = False
          alignmentFieldLength = None
       prevline = line
-
-   if line != '':
-      if prevLineWasAlignmentBlock:
+   state.prevLineWasAlignmentBlock = prevLineWasAlignmentBlock
+   state.alignmentFieldLength = alignmentFieldLength
+   state.prevline = prevline
+   state.line = line
+   state.lines += lineno - offset
+def validateFooter(state, filename):
+   if state.line != '':
+      if state.prevLineWasAlignmentBlock:
          raise FooterError('maf %s has a bad footer, last alignment block was not closed with a new line.' 
                            % filename)
       else:
-         if not line.startswith('#'):
+         if not state.line.startswith('#'):
             raise FooterError('maf %s has a bad footer, should end with a blank line: %s' 
-                              % (filename, line))
-   return True
+                              % (filename, state.line))
+g_minChunkBytes = 16 << 20
+def chunkBoundaries(filename, chunkBytes, start=0):
+   """ returns (start, stop) byte offsets that cut the maf from byte start into pieces of about chunkBytes.
+   Every piece but the first starts on an 'a' line that follows a blank line, where validation
+   picks up from a fresh state save for what the blocks before left.
+   """
+   size = os.path.getsize(filename)
+   starts = [start]
+   f = open(filename, 'r')
+   target = start + chunkBytes
+   while target < size:
+      f.seek(target)
+      # the rest of the line that target falls in
+      f.readline()
+      prevline = None
+      start = None
+      while True:
+         pos = f.tell()
+         line = f.readline()
+         if line == '':
+            break
+         if prevline is not None and prevline.strip() == '' and line.strip().startswith('a'):
+            start = pos
+            break
+         prevline = line
+      if start is None:
+         break
+      starts.append(start)
+      target = start + chunkBytes
+   f.close()
+   return zip(starts, starts[1:] + [size])
+def chunkLines(f, start, stop):
+   """ yields the lines of f from byte offset start, which begins a line, up to stop.
+   """
+   f.seek(start)
+   for line in f:
+      if start >= stop:
+         return
+      start += len(line)
+      yield line
+def validateChunk(filename, options, start, stop, offset, state):
+   f = open(filename, 'r')
+   try:
+      validateLines(chunkLines(f, start, stop), filename, options, offset, state, start == 0)
+   finally:
+      f.close()
+def validateChunkInWorker(args):
+   """ validates one chunk from a fresh state in a worker process. Returns the state left behind,
+   or None if the chunk is invalid on its own, as the line numbers in the error would be wrong.
+   """
+   filename, options, start, stop = args
+   state = ValidationState()
+   try:
+      validateChunk(filename, options, start, stop, 0, state)
+   except ValidatorError:
+      return None
+   return state
+def validateMafInParallel(filename, options, processes, state, start):
+   """ validates the maf from byte start, picking up from state, in processes worker processes and
+   merges the states they leave, in order. Returns the byte offset validation stopped at. A chunk
+   that fails, or whose state conflicts with the chunks before it, is validated again here from
+   the merged state so that the error raised is exactly the one that validating the whole maf in
+   order would raise, line number and all.
+   """
+   chunks = chunkBoundaries(filename, max(g_minChunkBytes, (os.path.getsize(filename) - start) // (4 * processes)),
+                            start)
+   workerOptions = GenericValidationOptions()
+   workerOptions.lookForDuplicateColumns = options.lookForDuplicateColumns
+   workerOptions.testChromNames = options.testChromNames
+   workerOptions.validateSequence = options.validateSequence
+   if len(chunks) == 1:
+      validateChunk(filename, options, start, chunks[0][1], state.lines, state)
+      return chunks[0][1]
+   first = None
+   if start > 0:
+      # picking up from a checkpoint, the first chunk follows on from state rather than from a
+      # fresh state. It is validated here while the workers get on with the rest.
+      first = chunks.pop(0)
+   processes = min(processes, len(chunks))
+   pool = multiprocessing.Pool(processes)
+   # a few chunks in flight per process bounds the states waiting to be merged
+   window = collections.deque()
+   tasks = iter(chunks)
+   def submit(n):
+      for chunkStart, chunkStop in itertools.islice(tasks, n):
+         window.append((chunkStart, chunkStop, pool.apply_async(validateChunkInWorker,
+                                                                [(filename, workerOptions, chunkStart, chunkStop)])))
+   try:
+      submit(2 * processes)
+      if first is not None:
+         validateChunk(filename, options, first[0], first[1], state.lines, state)
+      while window:
+         chunkStart, chunkStop, result = window.popleft()
+         chunkState = result.get()
+         submit(1)
+         if chunkState is None or state.conflicts(chunkState):
+            validateChunk(filename, options, chunkStart, chunkStop, state.lines, state)
+         else:
+            state.update(chunkState)
+   finally:
+      # Pool.terminate() can deadlock on workers that are still sending states back
+      pool.close()
+      pool.join()
+   return chunks[-1][1]
+g_checkpointVersion = 1
+g_fingerprintBytes = 1 << 16
+def fingerprint(filename, end):
+   """ returns a digest of the first and the last g_fingerprintBytes bytes of the maf before byte end,
+   enough to tell a maf that has only been appended to from one that has been rewritten.
+   """
+   h = hashlib.md5()
+   f = open(filename, 'rb')
+   h.update(f.read(min(end, g_fingerprintBytes)))
+   f.seek(max(0, end - g_fingerprintBytes))
+   h.update(f.read(end - max(0, end - g_fingerprintBytes)))
+   f.close()
+   return h.hexdigest()
+def checkpointOptions(options):
+   return (bool(options.lookForDuplicateColumns), bool(options.testChromNames),
+           bool(options.validateSequence))
+def writeCheckpoint(path, filename, options, state, end):
+   """ saves state, left by validating the maf up to byte end, to path as zlib compressed marshal
+   data. Nothing is saved unless byte end follows a new line, lines appended to the maf would
+   otherwise carry on its last line.
+   """
+   f = open(filename, 'rb')
+   f.seek(max(0, end - 1))
+   if f.read(1) != '\n':
+      f.close()
+      return
+   f.close()
+   data = {'version': g_checkpointVersion,
+           'end': end,
+           'fingerprint': fingerprint(filename, end),
+           'options': checkpointOptions(options),
+           'state': state.toData()}
+   f = open(path + '.tmp', 'wb')
+   f.write(zlib.compress(marshal.dumps(data, 2)))
+   f.close()
+   os.rename(path + '.tmp', path)
+def readCheckpoint(path, filename, options):
+   """ returns the state saved to path and the byte of the maf to pick up from, or a fresh state and
+   0 if path holds no checkpoint for the maf as it is now, validated with these options.
+   """
+   fresh = ValidationState(), 0
+   if not os.path.exists(path):
+      return fresh
+   try:
+      f = open(path, 'rb')
+      data = marshal.loads(zlib.decompress(f.read()))
+      f.close()
+   except (IOError, EOFError, ValueError, TypeError, zlib.error):
+      return fresh
+   if (not isinstance(data, dict) or data.get('version') != g_checkpointVersion or
+       data['options'] != checkpointOptions(options) or data['end'] > os.path.getsize(filename) or
+       data['fingerprint'] != fingerprint(filename, data['end'])):
+      return fresh
+   return ValidationState.fromData(data['state']), data['end']
 def validateILine(lineno, line, prevline, filename):
    """ Checks all lines that start with 'i' and raises an exepction if
    the line is malformed.
@@ -209,6 +482,8 @@ def validateILine(lineno, line, prevline, filename):
    M -- there is missing data before or after this block (Ns in the sequence).
    T -- the sequence in this block has been used before in a previous block (likely a tandem duplication)
    """
+   if g_lineChecks is not None and g_lineChecks.checkILine(line, prevline):
+      return
    d = line.split()
    p = prevline.split()
    if len(d) != 6:
@@ -267,6 +542,8 @@ def validateELine(lineno, line, filename):
         still other blocks. The browser shows either a single line or a double 
         line based on how many bases are in the gap between the bridging alignments.
    """
+   if g_lineChecks is not None and g_lineChecks.checkELine(line):
+      return
    d = line.split()
    if len(d) != 7:
       raise ELineFormatError('maf %s contains an "e" line that has too many fields on line number %d: '
@@ -312,6 +589,8 @@ def validateQLine(lineno, line, prevline, filename):
      F |    99 | Finished
 
    """
+   if g_lineChecks is not None and g_lineChecks.checkQLine(line, prevline):
+      return
    d = line.split()
    p = prevline.split()
    if len(d) != 3:
@@ -321,13 +600,14 @@ def validateQLine(lineno, line, prevline, filename):
       raise QLineFormatError('maf %s contains an "q" line that does not follow an "s" line on line number %d: '
                              '%s' % (filename, lineno, line))
    for c in d[2]:
-      if c not in map(str, range(0, 10)) + ['F', '-']:
+      if c not in g_qualityCharacters:
          raise QLineFormatError('maf %s contains an "q" line with an invalid character "%s" on line number %d: '
                                 '%s' % (filename, c, lineno, line))
    if p[1] != d[1]:
       raise QLineFormatError('maf %s contains an "q" line with a different src value "%s" than on the previous '
                              '"s" line "%s" on line number %d: '
                              '%s' % (filename, d[1], p[1], lineno, line))
+g_qualityCharacters = frozenset('0123456789F-')
 def validateAlignmentLine(lineno, line, filename):
    """ Checks all lines that start with 'a' and raises an exception if 
    the line is malformed.
@@ -335,6 +615,8 @@ def validateAlignmentLine(lineno, line, filename):
    validateKeyValuePairLine(lineno, line, filename)
 
 def validateKeyValuePairLine(lineno, line, filename):
+   if g_lineChecks is not None and g_lineChecks.checkKeyValuePairLine(line):
+      return
    d = line.split()
    for i in xrange(1, len(d)):
       if len(d[i].split('=')) != 2:
@@ -342,17 +624,30 @@ def validateKeyValuePairLine(lineno, line, filename):
                                  'good key-value pairs on line number %d: %s' 
                                  % (filename, lineno, line))
 def validateSeqLine(namePat, options, lineno, line, filename, sequenceColumnDict, sequenceFieldDict):
-   data = line.split()
+   data = None
+   if g_lineChecks is not None:
+      data = g_lineChecks.splitSeqLine(line)
+   if data is None:
+      data = line.split()
+      validateSeqLineFields(data, lineno, line, filename)
+   if options.lookForDuplicateColumns:
+      checkForDuplicateColumns(data, sequenceColumnDict, filename, lineno, line)
+   if options.validateSequence:
+      checkForSequenceInconsistencies(data, sequenceFieldDict, filename, lineno, line)   
+   if options.testChromNames:
+      m = re.match(namePat, data[1])
+      if m is None:
+         raise SpeciesFieldError('maf %s has name (source) field without ".chr" suffix: "%s" on line number %d: %s' 
+                                 % (filename, data[1], lineno, line))
+      return m.group(1), m.group(2), data[5], len(data[6])
+   return data[1], None, data[5], len(data[6])
+def validateSeqLineFields(data, lineno, line, filename):
    if len(data) != 7:
       raise FieldNumberError('maf %s has incorrect number of fields on line number %d: %s' 
                              % (filename, lineno, line))
    if data[4] not in ('-', '+'):
       raise StrandCharacterError('maf %s has unexpected character in strand field "%s" on line number %d: %s' 
                                  % (filename, data[4], lineno, line))
-   if data[4] == '+':
-      strand = 1
-   else:
-      strand = -1
    if int(data[3]) != len(data[6].replace('-', '')):
       raise AlignmentLengthError('maf %s sequence length field (%d) contradicts alignment field (non-gapped length %d) on line number %d: %s'
                                  % (filename, int(data[3]), len(data[6].replace('-', '')), lineno, line))
@@ -365,17 +660,17 @@ def validateSeqLine(namePat, options, lineno, line, filename, sequenceColumnDict
    if int(data[2]) + int(data[3]) > int(data[5]):
       raise OutOfRangeError('maf %s out of range sequence on line number %d: %s'
                             % (filename, lineno, line))
-   if options.lookForDuplicateColumns:
-      checkForDuplicateColumns(data, sequenceColumnDict, filename, lineno, line)
-   if options.validateSequence:
-      checkForSequenceInconsistencies(data, sequenceFieldDict, filename, lineno, line)   
-   if options.testChromNames:
-      m = re.match(namePat, data[1])
-      if m is None:
-         raise SpeciesFieldError('maf %s has name (source) field without ".chr" suffix: "%s" on line number %d: %s' 
-                                 % (filename, data[1], lineno, line))
-      return m.group(1), m.group(2), data[5], len(data[6])
-   return data[1], None, data[5], len(data[6])
+def translationTable(complement):
+   """ returns a str.translate() table that upper cases, and if complement is True also
+   complements, the bases of a sequence field.
+   """
+   table = [chr(c).upper() for c in xrange(256)]
+   if complement:
+      for a, b in zip('ACGTacgt', 'TGCATGCA'):
+         table[ord(a)] = b
+   return ''.join(table)
+g_upperTable = translationTable(False)
+g_upperComplementTable = translationTable(True)
 def reverseComplement(s):
    s = s[::-1]
    s = s.replace('A', '1')
@@ -389,9 +684,119 @@ def reverseComplement(s):
    s = s.replace('c', 'G')
    s = s.replace('2', 'C')
    return s
+class SequenceTracker:
+   """ The bases of one sequence seen so far in the alignment, upper case and on the + strand,
+   with N at the positions not yet seen. They are held in lazily allocated pages so that
+   memory grows with the number of aligned positions rather than with the length of the
+   sequence.
+   """
+   pageLength = 1 << 16
+   def __init__(self, totalSrcLength):
+      self.totalSrcLength = totalSrcLength
+      self.pages = {}
+      # positions where a row had an N, which must match a base seen there before
+      self.seenAsN = None
+   def page(self, p, n):
+      """ returns the p-th page, a bytearray allocated to hold at least its first n bases.
+      """
+      page = self.pages.get(p)
+      if page is None:
+         n = min(self.pageLength, max(self.totalSrcLength - p * self.pageLength, n))
+         page = self.pages[p] = bytearray('N' * n)
+      elif len(page) < n:
+         page.extend('N' * (n - len(page)))
+      return page
+   def compareAndSet(self, start, seq):
+      """ stores seq, upper case and without gaps, at positions [start, start + len(seq)).
+      Returns what was stored there before if any base seen before differs from seq,
+      otherwise None.
+      """
+      stop = start + len(seq)
+      if 'N' in seq:
+         self.markSeenAsN(start, seq)
+      previous = []
+      consistent = True
+      i = 0
+      while start < stop:
+         p = start // self.pageLength
+         pageStart = p * self.pageLength
+         end = min(stop, pageStart + self.pageLength)
+         page = self.page(p, end - pageStart)
+         a, b = start - pageStart, end - pageStart
+         stored = page[a:b]
+         new = seq[i:i + b - a]
+         if consistent and stored != new and stored.count('N') != b - a:
+            # compare only the positions already seen, all at once
+            storedBases = numpy.frombuffer(buffer(stored), dtype=numpy.uint8)
+            newBases = numpy.frombuffer(new, dtype=numpy.uint8)
+            consistent = not ((storedBases != newBases) & (storedBases != ord('N'))).any()
+         previous.append(str(stored))
+         page[a:b] = new
+         i += b - a
+         start = end
+      if consistent:
+         return None
+      return ''.join(previous)
+   def markSeenAsN(self, start, seq):
+      if self.seenAsN is None:
+         self.seenAsN = ColumnTracker(self.totalSrcLength)
+         self.seenAsN.pageBits = self.pageLength
+      for m in g_nRunRegex.finditer(seq):
+         self.seenAsN.testAndSet(start + m.start(), start + m.end())
+   def conflicts(self, other):
+      """ returns True if any row that left other, a tracker of the same sequence, disagrees with
+      a base seen by this tracker.
+      """
+      N = ord('N')
+      for p, page in other.pages.iteritems():
+         mine = self.pages.get(p)
+         if mine is None:
+            continue
+         n = min(len(mine), len(page))
+         a = numpy.frombuffer(buffer(mine), dtype=numpy.uint8, count=n)
+         b = numpy.frombuffer(buffer(page), dtype=numpy.uint8, count=n)
+         differs = (a != b) & (b != N)
+         if other.seenAsN is not None and p in other.seenAsN.pages:
+            differs |= unpackBits(other.seenAsN.pages[p], n)
+         if (differs & (a != N)).any():
+            return True
+      return False
+   def update(self, other):
+      """ adds the bases seen by other, a tracker of the same sequence, to this tracker.
+      """
+      N = ord('N')
+      for p, page in other.pages.iteritems():
+         mine = self.pages.get(p)
+         if mine is None:
+            self.pages[p] = page
+            continue
+         if len(mine) < len(page):
+            mine.extend('N' * (len(page) - len(mine)))
+         n = len(page)
+         a = numpy.frombuffer(buffer(mine), dtype=numpy.uint8, count=n)
+         b = numpy.frombuffer(buffer(page), dtype=numpy.uint8, count=n)
+         mine[:n] = numpy.where(a == N, b, a).astype(numpy.uint8).tostring()
+      if other.seenAsN is not None:
+         if self.seenAsN is None:
+            self.seenAsN = other.seenAsN
+         else:
+            self.seenAsN.update(other.seenAsN)
+   def toData(self):
+      return (self.totalSrcLength, self.pageLength, dict((p, str(page)) for p, page in self.pages.iteritems()),
+              None if self.seenAsN is None else self.seenAsN.toData())
+   @staticmethod
+   def fromData(data):
+      totalSrcLength, pageLength, pages, seenAsN = data
+      tracker = SequenceTracker(totalSrcLength)
+      tracker.pageLength = pageLength
+      tracker.pages = dict((p, bytearray(page)) for p, page in pages.iteritems())
+      if seenAsN is not None:
+         tracker.seenAsN = ColumnTracker.fromData(seenAsN)
+      return tracker
+g_nRunRegex = re.compile('N+')
 def checkForSequenceInconsistencies(data, sfd, filename, lineno, line):
    """ sfd = sequenceFieldDict, a dictionary keyed on sequence field names and valued with
-   numpy arrays (dtype chararray) that stores all reperesentations of the sequence in the maf.
+   SequenceTrackers that store all reperesentations of the sequence in the maf.
    If the sequence should change over the course of the file, throws an error.
    """
    name = data[1]
@@ -399,29 +804,114 @@ def checkForSequenceInconsistencies(data, sfd, filename, lineno, line):
    strand = data[4]
    totalSrcLength = int(data[5])
    if name not in sfd:
-      sfd[name] = numpy.zeros(int(totalSrcLength), dtype=numpy.string_)
-      sfd[name][:] = 'N'
+      sfd[name] = SequenceTracker(totalSrcLength)
    if data[4] == '+':
-      stop = start + length
-      seqstr = data[6]
+      seqstr = data[6].translate(g_upperTable, '-')
    else:
-      start, stop = totalSrcLength - (start + length), totalSrcLength - start
-      seqstr = reverseComplement(data[6])
-   # remove gaps, switch to uppercase
-   seqstr = seqstr.upper().replace('-', '')
-   seq = numpy.zeros(length, dtype=numpy.string_)
-   seq[:] = list(seqstr)
-   stored = numpy.ma.array(sfd[name][start:stop], mask=sfd[name][start:stop] == 'N')
-   if not (stored == seq).all():
-      if not (stored == seq).mask.all():
-         if not stored is numpy.ma.masked:
-            raise SequenceConsistencyError('maf %s has inconsistent sequence, discovered on line number %d. '
-                                           '\nFirst: %s\nNow  : %s\n%s' 
-                                           % (filename, lineno, stored, seqstr, line))
-   sfd[name][start:stop] = seq
+      start = totalSrcLength - (start + length)
+      seqstr = data[6][::-1].translate(g_upperComplementTable, '-')
+   stored = sfd[name].compareAndSet(start, seqstr)
+   if stored is not None:
+      raise SequenceConsistencyError('maf %s has inconsistent sequence, discovered on line number %d. '
+                                     '\nFirst: %s\nNow  : %s\n%s' 
+                                     % (filename, lineno, stored, seqstr, line))
+class ColumnTracker:
+   """ The positions of one sequence that have appeared in the alignment, held as lazily
+   allocated pages of packed bits so that memory grows with the number of aligned positions
+   rather than with the length of the sequence.
+   """
+   pageBits = 1 << 16
+   def __init__(self, totalSrcLength):
+      self.totalSrcLength = totalSrcLength
+      self.pages = {}
+   def page(self, p, bits):
+      """ returns the p-th page, a bytearray allocated to hold at least its first bits bits.
+      """
+      page = self.pages.get(p)
+      if page is None:
+         # a page is only as long as the sequence leaves it, short sequences are common
+         n = min(self.pageBits, max(self.totalSrcLength - p * self.pageBits, bits))
+         page = self.pages[p] = bytearray((n + 7) // 8)
+      elif len(page) * 8 < bits:
+         page.extend(bytearray((bits + 7) // 8 - len(page)))
+      return page
+   def testAndSet(self, start, stop):
+      """ marks positions [start, stop) as seen and returns True if any of them were already.
+      """
+      seen = False
+      while start < stop:
+         p = start // self.pageBits
+         pageStart = p * self.pageBits
+         end = min(stop, pageStart + self.pageBits)
+         page = self.page(p, end - pageStart)
+         seen = testAndSetBits(page, start - pageStart, end - pageStart) or seen
+         start = end
+      return seen
+   def conflicts(self, other):
+      """ returns True if any position seen by other, a tracker of the same sequence, was seen by
+      this tracker.
+      """
+      for p, page in other.pages.iteritems():
+         mine = self.pages.get(p)
+         if mine is not None:
+            n = min(len(mine), len(page))
+            if (numpy.frombuffer(buffer(mine), dtype=numpy.uint8, count=n) &
+                numpy.frombuffer(buffer(page), dtype=numpy.uint8, count=n)).any():
+               return True
+      return False
+   def update(self, other):
+      """ marks the positions seen by other, a tracker of the same sequence, as seen.
+      """
+      for p, page in other.pages.iteritems():
+         mine = self.pages.get(p)
+         if mine is None:
+            self.pages[p] = page
+            continue
+         if len(mine) < len(page):
+            mine.extend(bytearray(len(page) - len(mine)))
+         n = len(page)
+         mine[:n] = (numpy.frombuffer(buffer(mine), dtype=numpy.uint8, count=n) |
+                     numpy.frombuffer(buffer(page), dtype=numpy.uint8)).tostring()
+   def toData(self):
+      return (self.totalSrcLength, self.pageBits, dict((p, str(page)) for p, page in self.pages.iteritems()))
+   @staticmethod
+   def fromData(data):
+      totalSrcLength, pageBits, pages = data
+      tracker = ColumnTracker(totalSrcLength)
+      tracker.pageBits = pageBits
+      tracker.pages = dict((p, bytearray(page)) for p, page in pages.iteritems())
+      return tracker
+g_setBytes = '\xff' * (ColumnTracker.pageBits // 8)
+def testAndSetBits(page, a, b):
+   """ sets bits [a, b) of page, a bytearray of packed bits, and returns True if any of them
+   were already set. The bytes wholly inside the range are tested and set as a slice, only
+   the partial bytes at either end need masks.
+   """
+   first, last = a >> 3, (b - 1) >> 3
+   lowMask = (0xff << (a & 7)) & 0xff
+   highMask = 0xff >> (7 - ((b - 1) & 7))
+   if first == last:
+      mask = lowMask & highMask
+      seen = page[first] & mask
+      page[first] |= mask
+      return seen != 0
+   n = last - first - 1
+   seen = (page[first] & lowMask) or (page[last] & highMask) or page.count('\x00', first + 1, last) != n
+   page[first] |= lowMask
+   page[last] |= highMask
+   if n:
+      page[first + 1:last] = g_setBytes[:n] if n <= len(g_setBytes) else '\xff' * n
+   return bool(seen)
+def unpackBits(page, n):
+   """ returns the first n bits of page, packed as by testAndSetBits(), as a numpy bool array.
+   """
+   bits = numpy.unpackbits(numpy.frombuffer(buffer(page), dtype=numpy.uint8)).reshape(-1, 8)[:, ::-1].ravel()
+   if len(bits) < n:
+      bits = numpy.concatenate([bits, numpy.zeros(n - len(bits), dtype=numpy.uint8)])
+   return bits[:n].astype(bool)
 def checkForDuplicateColumns(data, scd, filename, lineno, line):
    """ scd = sequenceColumnDict, a dictionary keyed on sequence field names and valued with
-   numpy arrays (dtype boolean) that indicates whether or not a column has already appeared in
+   ColumnTrackers that indicate whether or not a column has already appeared in
    the alignment.
    """
    # data[1] sequence name
@@ -434,15 +924,14 @@ def checkForDuplicateColumns(data, scd, filename, lineno, line):
    strand = data[4]
    totalSrcLength = int(data[5])
    if name not in scd:
-      scd[name] = numpy.zeros(int(totalSrcLength), dtype=numpy.bool)
+      scd[name] = ColumnTracker(totalSrcLength)
    if data[4] == '+':
       stop = start + length
    else:
       start, stop = totalSrcLength - (start + length), totalSrcLength - start
-   if scd[name][start:stop].any():
+   if scd[name].testAndSet(start, stop):
       raise DuplicateColumnError('maf %s has duplicate columns, second instance discovered on line number %d: %s' 
                                  % (filename, lineno, line))
-   scd[name][start:stop] = True
 def validateHeader(f, filename):
    """ tests the first line of the maf file to make sure it is valid. 
    valid starts are either "track ..." or "##maf..."
@@ -0,0 +1,270 @@
+/*
+ * Copyright (C) 2011-2014 by
+ * Dent Earl (dearl@soe.ucsc.edu, dentearl@gmail.com)
+ * ... and other members of the Reconstruction Team of David Haussler's
+ * lab (BME Dept. UCSC).
+ *
+ * Permission is hereby granted, free of charge, to any person obtaining a copy
+ * of this software and associated documentation files (the "Software"), to deal
+ * in the Software without restriction, including without limitation the rights
+ * to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+ * copies of the Software, and to permit persons to whom the Software is
+ * furnished to do so, subject to the following conditions:
+ *
+ * The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+ *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+ * AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+ * LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+ * OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+ * THE SOFTWARE.
+ */
+
+// _mafValidatorLines, an optional compiled companion to mafValidator.py.
+//
+// Each function here answers one question: would the matching python check in
+// mafValidator.py pass on this line? A yes lets mafValidator.py skip its own
+// check, a no sends the line through the python check, which then raises the
+// error, so the exceptions and their messages are the python ones whichever
+// way a maf is validated. Anything these functions are not sure of, numbers
+// too long for an int64_t for instance, gets a no.
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdbool.h>
+#include <stdint.h>
+#include <string.h>
+#include "seqKernels.h"
+
+#if PY_MAJOR_VERSION != 2
+#error "_mafValidatorLines is a python 2 module, build it against the python 2.7 headers"
+#endif
+
+#define kMaxFields 7
+#define kMaxDigits 18
+
+typedef struct fields {
+    // the first kMaxFields fields of a line, split as by python's str.split()
+    int n; // the number of fields in the line, up to kMaxFields + 1
+    const char *s[kMaxFields];
+    Py_ssize_t len[kMaxFields];
+} fields_t;
+
+static bool isSpace(char c);
+static void splitFields(const char *line, Py_ssize_t n, fields_t *f);
+static bool isField(const fields_t *f, int i, const char *value);
+static bool isCharField(const fields_t *f, int i, const char *chars);
+static bool parseInteger(const fields_t *f, int i, int64_t *value);
+static PyObject* splitSeqLine(PyObject *self, PyObject *args);
+static PyObject* checkKeyValuePairLine(PyObject *self, PyObject *args);
+static PyObject* checkILine(PyObject *self, PyObject *args);
+static PyObject* checkELine(PyObject *self, PyObject *args);
+static PyObject* checkQLine(PyObject *self, PyObject *args);
+PyMODINIT_FUNC init_mafValidatorLines(void);
+
+static bool isSpace(char c) {
+    // the characters python's str.split() splits on
+    return c == ' ' || c == '\t' || c == '\n' || c == '\r' || c == '\v' || c == '\f';
+}
+static void splitFields(const char *line, Py_ssize_t n, fields_t *f) {
+    Py_ssize_t i = 0;
+    f->n = 0;
+    while (1) {
+        while (i < n && isSpace(line[i])) {
+            ++i;
+        }
+        if (i == n) {
+            return;
+        }
+        if (f->n == kMaxFields) {
+            ++(f->n);
+            return;
+        }
+        f->s[f->n] = line + i;
+        while (i < n && !isSpace(line[i])) {
+            ++i;
+        }
+        f->len[f->n] = line + i - f->s[f->n];
+        ++(f->n);
+    }
+}
+static bool isField(const fields_t *f, int i, const char *value) {
+    return f->len[i] == (Py_ssize_t)strlen(value) && memcmp(f->s[i], value, f->len[i]) == 0;
+}
+static bool isCharField(const fields_t *f, int i, const char *chars) {
+    // true if the field is one of chars
+    return f->len[i] == 1 && strchr(chars, f->s[i][0]) != NULL;
+}
+static bool parseInteger(const fields_t *f, int i, int64_t *value) {
+    // parses what python's int() would, short of numbers longer than kMaxDigits
+    const char *s = f->s[i];
+    Py_ssize_t n = f->len[i];
+    bool negative = false;
+    if (n > 0 && (s[0] == '+' || s[0] == '-')) {
+        negative = (s[0] == '-');
+        ++s;
+        --n;
+    }
+    if (n == 0 || n > kMaxDigits) {
+        return false;
+    }
+    *value = 0;
+    for (Py_ssize_t j = 0; j < n; ++j) {
+        if (s[j] < '0' || s[j] > '9') {
+            return false;
+        }
+        *value = *value * 10 + (s[j] - '0');
+    }
+    if (negative) {
+        *value = -*value;
+    }
+    return true;
+}
+static PyObject* splitSeqLine(PyObject *self, PyObject *args) {
+    // returns line.split() if validateSeqLine()'s checks of the fields pass, otherwise None
+    const char *line;
+    Py_ssize_t n;
+    fields_t f;
+    int64_t start, length, sourceLength;
+    (void) self;
+    if (!PyArg_ParseTuple(args, "s#", &line, &n)) {
+        return NULL;
+    }
+    splitFields(line, n, &f);
+    if (f.n != 7 || !isCharField(&f, 4, "+-") ||
+        !parseInteger(&f, 2, &start) || !parseInteger(&f, 3, &length) ||
+        !parseInteger(&f, 5, &sourceLength)) {
+        Py_RETURN_NONE;
+    }
+    if (length != (int64_t)(f.len[6] - seq_countGaps(f.s[6], f.len[6])) ||
+        start < 0 || sourceLength < 0 || start + length > sourceLength) {
+        Py_RETURN_NONE;
+    }
+    PyObject *data = PyList_New(7);
+    if (data == NULL) {
+        return NULL;
+    }
+    for (int i = 0; i < 7; ++i) {
+        PyObject *field = PyString_FromStringAndSize(f.s[i], f.len[i]);
+        if (field == NULL) {
+            Py_DECREF(data);
+            return NULL;
+        }
+        PyList_SET_ITEM(data, i, field);
+    }
+    return data;
+}
+static PyObject* checkKeyValuePairLine(PyObject *self, PyObject *args) {
+    // true if every field after the first holds exactly one '='
+    const char *line;
+    Py_ssize_t n, i = 0;
+    int field = 0;
+    (void) self;
+    if (!PyArg_ParseTuple(args, "s#", &line, &n)) {
+        return NULL;
+    }
+    while (1) {
+        while (i < n && isSpace(line[i])) {
+            ++i;
+        }
+        if (i == n) {
+            Py_RETURN_TRUE;
+        }
+        int equals = 0;
+        while (i < n && !isSpace(line[i])) {
+            equals += (line[i++] == '=');
+        }
+        if (field++ > 0 && equals != 1) {
+            Py_RETURN_FALSE;
+        }
+    }
+}
+static PyObject* checkILine(PyObject *self, PyObject *args) {
+    const char *line, *prevline;
+    Py_ssize_t n, pn;
+    fields_t d, p;
+    int64_t count;
+    (void) self;
+    if (!PyArg_ParseTuple(args, "s#s#", &line, &n, &prevline, &pn)) {
+        return NULL;
+    }
+    splitFields(line, n, &d);
+    splitFields(prevline, pn, &p);
+    if (d.n != 6 || p.n < 2 || !isField(&p, 0, "s")) {
+        Py_RETURN_FALSE;
+    }
+    for (int i = 2; i <= 4; i += 2) {
+        if (!isCharField(&d, i, "CINnMT") || !parseInteger(&d, i + 1, &count) || count < 0 ||
+            (d.s[i][0] == 'I' && count < 1)) {
+            Py_RETURN_FALSE;
+        }
+    }
+    if (d.len[1] != p.len[1] || memcmp(d.s[1], p.s[1], d.len[1]) != 0) {
+        Py_RETURN_FALSE;
+    }
+    Py_RETURN_TRUE;
+}
+static PyObject* checkELine(PyObject *self, PyObject *args) {
+    const char *line;
+    Py_ssize_t n;
+    fields_t d;
+    int64_t count;
+    (void) self;
+    if (!PyArg_ParseTuple(args, "s#", &line, &n)) {
+        return NULL;
+    }
+    splitFields(line, n, &d);
+    if (d.n != 7 || !isCharField(&d, 4, "+-") || !isCharField(&d, 6, "CIMn")) {
+        Py_RETURN_FALSE;
+    }
+    for (int i = 2; i <= 5; ++i) {
+        if (i != 4 && (!parseInteger(&d, i, &count) || count < 0)) {
+            Py_RETURN_FALSE;
+        }
+    }
+    Py_RETURN_TRUE;
+}
+static PyObject* checkQLine(PyObject *self, PyObject *args) {
+    const char *line, *prevline;
+    Py_ssize_t n, pn;
+    fields_t d, p;
+    (void) self;
+    if (!PyArg_ParseTuple(args, "s#s#", &line, &n, &prevline, &pn)) {
+        return NULL;
+    }
+    splitFields(line, n, &d);
+    splitFields(prevline, pn, &p);
+    if (d.n != 3 || p.n < 2 || !isField(&p, 0, "s")) {
+        Py_RETURN_FALSE;
+    }
+    for (Py_ssize_t j = 0; j < d.len[2]; ++j) {
+        char c = d.s[2][j];
+        if (!((c >= '0' && c <= '9') || c == 'F' || c == '-')) {
+            Py_RETURN_FALSE;
+        }
+    }
+    if (d.len[1] != p.len[1] || memcmp(d.s[1], p.s[1], d.len[1]) != 0) {
+        Py_RETURN_FALSE;
+    }
+    Py_RETURN_TRUE;
+}
+
+static PyMethodDef g_methods[] = {
+    {"splitSeqLine", splitSeqLine, METH_VARARGS,
+     "splitSeqLine(line) returns line.split() if the checks of validateSeqLine() pass, otherwise None."},
+    {"checkKeyValuePairLine", checkKeyValuePairLine, METH_VARARGS,
+     "checkKeyValuePairLine(line) returns True if validateKeyValuePairLine() would pass."},
+    {"checkILine", checkILine, METH_VARARGS,
+     "checkILine(line, prevline) returns True if validateILine() would pass."},
+    {"checkELine", checkELine, METH_VARARGS,
+     "checkELine(line) returns True if validateELine() would pass."},
+    {"checkQLine", checkQLine, METH_VARARGS,
+     "checkQLine(line, prevline) returns True if validateQLine() would pass."},
+    {NULL, NULL, 0, NULL}
+};
+PyMODINIT_FUNC init_mafValidatorLines(void) {
+    Py_InitModule3("_mafValidatorLines", g_methods,
+                   "Compiled line checks for mafValidator.py, see mafValidatorLines.c.");
+}
@@ -1,7 +1,9 @@
 import mafValidator as mafval
 import os
+import random
 import unittest
 import shutil
+import string
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]), '../../lib/')))
 import mafToolsTest as mtt
@@ -948,6 +950,44 @@ s panTro1.chr6 28869787 13 + 161576975 gcagctgaaaaca
             mafFile, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')), g, g_headers)
             self.assertTrue(mafval.validateMaf(mafFile, customOpts))
         mtt.removeDir(tmpDir)
+    def testColumnTracker(self):
+        """ ColumnTracker should report exactly the positions seen before, across page boundaries
+        """
+        rng = random.Random(7)
+        for totalSrcLength in [1, 13, 64, 200, 1000]:
+            tracker = mafval.ColumnTracker(totalSrcLength)
+            tracker.pageBits = 64
+            seen = set()
+            for i in xrange(0, 300):
+                start = rng.randint(0, totalSrcLength)
+                stop = rng.randint(start, min(totalSrcLength, start + rng.choice([1, 8, 70, 200])))
+                expected = any(p in seen for p in xrange(start, stop))
+                self.assertEqual(tracker.testAndSet(start, stop), expected)
+                seen.update(xrange(start, stop))
+    def testHugeSourceLengths(self):
+        """ mafValidator should check columns of sequences far longer than memory
+        """
+        customOpts = GenericObject()
+        customOpts.lookForDuplicateColumns = True
+        customOpts.testChromNames = True
+        customOpts.validateSequence = False
+        tmpDir = mtt.makeTempDir('hugeSourceLengths')
+        maf = '''a score=0
+s hg16.chr7    27707221 13 + 1000000000000 gcagctgaaaaca
+s panTro1.chr6 999999999987 13 - 1000000000000 gcagctgaaaaca
+
+a score=0
+s hg16.chr7    27707234 13 + 1000000000000 gcagctgaaaaca
+s panTro1.chr6        0 13 + 1000000000000 gcagctgaaaaca
+
+'''
+        mafFile, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')), maf, g_headers)
+        self.assertRaises(mafval.DuplicateColumnError, mafval.validateMaf, mafFile, customOpts)
+        mafFile, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')),
+                                       maf.replace('s panTro1.chr6        0', 's panTro1.chr6       13'),
+                                       g_headers)
+        self.assertTrue(mafval.validateMaf(mafFile, customOpts))
+        mtt.removeDir(tmpDir)
 class InconsistentSequenceChecks(unittest.TestCase):
     badMafs = ['''a score=23262.0
 s hg16.chr7    27707221 13 + 158545518 gcagctgaaaaca
@@ -1017,6 +1057,55 @@ s mm4.chr6     53310102 13 + 151104725 ACAGCTGAAAATA
 
 ''',
                ]
+    def testSequenceTracker(self):
+        """ SequenceTracker should find exactly the changes to bases seen before, across page boundaries
+        """
+        rng = random.Random(11)
+        for totalSrcLength in [1, 13, 64, 200, 1000]:
+            tracker = mafval.SequenceTracker(totalSrcLength)
+            tracker.pageLength = 16
+            model = ['N'] * totalSrcLength
+            for i in xrange(0, 300):
+                start = rng.randint(0, totalSrcLength)
+                stop = rng.randint(start, min(totalSrcLength, start + rng.choice([1, 8, 40, 100])))
+                seq = ''.join(rng.choice('ACGTN') if rng.random() < 0.1 or model[p] == 'N' else model[p]
+                              for p in xrange(start, stop))
+                consistent = all(model[p] in ('N', seq[p - start]) for p in xrange(start, stop))
+                stored = tracker.compareAndSet(start, seq)
+                if consistent:
+                    self.assertTrue(stored is None)
+                else:
+                    self.assertEqual(stored, ''.join(model[start:stop]))
+                model[start:stop] = list(seq)
+    def testReverseComplement(self):
+        """ reverseComplement should complement ACGT in either case to upper case and leave other
+        characters be
+        """
+        self.assertEqual(mafval.reverseComplement('AaCcGgTtNn-RY'), 'YR-nNAACCGGTT')
+    def testSoftMaskedInconsistencyMessage(self):
+        """ mafValidator should report soft-masked inconsistent sequence in upper case on + strand
+        """
+        tmpDir = mtt.makeTempDir('softMaskedInconsistency')
+        customOpts = GenericObject()
+        customOpts.lookForDuplicateColumns = False
+        customOpts.testChromNames = True
+        customOpts.validateSequence = True
+        maf = '''a score=0
+s hg18.chr1 0 4 + 10 acgt
+s mm9.chr1  0 4 + 10 ACGT
+
+a score=0
+s hg18.chr1 6 4 - 10 aaaa
+s mm9.chr1  4 4 + 10 ACGT
+
+'''
+        mafFile, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')), maf, g_headers)
+        try:
+            mafval.validateMaf(mafFile, customOpts)
+            self.fail('no SequenceConsistencyError')
+        except mafval.SequenceConsistencyError, e:
+            self.assertTrue('\nFirst: ACGT\nNow  : TTTT\n' in str(e))
+        mtt.removeDir(tmpDir)
     def testInconsistentSequences(self):
         """ mafValidator should fail when a sequence becomes inconsistent
         """
@@ -1060,6 +1149,289 @@ class GoodKnownMafs(unittest.TestCase):
             mafFile, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')), g, g_headers)
             self.assertTrue(mafval.validateMaf(mafFile, options))
         mtt.removeDir(tmpDir)
+def validationOutcome(mafFile, opts, processes=1):
+    """ returns the error class name and message that validating mafFile raises, or 'valid'
+    """
+    opts.processes = processes
+    try:
+        mafval.validateMaf(mafFile, opts)
+    except mafval.ValidatorError, e:
+        return e.__class__.__name__, str(e)
+    return 'valid'
+def mafMutants():
+    """ yields mafs, good and bad, with the bad parts far from the blocks they clash with
+    """
+    for m in (g_goodMafs + DuplicateColumnChecks.badMafs + InconsistentSequenceChecks.badMafs +
+              SourceLengthChecks.badSources + FooterCheck.badFooters):
+        yield m
+    rng = random.Random(5)
+    for i in xrange(0, 12):
+        blocks = mtt.randomMafBody(40, ['hg19.chr1', 'mm9.chr2', 'rn4.chr3', 'hg19.chr1'],
+                                   seed=i).split('\n\n')[:-1]
+        copy = blocks[rng.randint(0, 9)].split('\n')
+        row = rng.randint(1, len(copy) - 1)
+        d = copy[row].split()
+        kind = i % 4
+        if kind == 1:
+            d[5] = str(int(d[5]) + 1)
+        elif kind == 2:
+            d[6] = d[6].translate(string.maketrans('ACGTacgt', 'CGTAcgta'))
+        elif kind == 3:
+            d[6] = d[6].translate(string.maketrans('ACGTacgt', 'NNNNNNNN'))
+        copy[row] = ' '.join(d)
+        blocks.insert(rng.randint(20, len(blocks)), '\n'.join(copy))
+        yield '\n\n'.join(blocks) + '\n\n'
+class ParallelValidation(unittest.TestCase):
+    def setUp(self):
+        # cut even the smallest maf into pieces of a block or two
+        self.minChunkBytes = mafval.g_minChunkBytes
+        mafval.g_minChunkBytes = 1
+    def tearDown(self):
+        mafval.g_minChunkBytes = self.minChunkBytes
+    def testChunkBoundaries(self):
+        """ chunkBoundaries should cut a maf only before alignment lines that follow blank lines
+        """
+        tmpDir = mtt.makeTempDir('chunkBoundaries')
+        mafFile, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')),
+                                       mtt.randomMafBody(50, ['hg19.chr1', 'mm9.chr2']), g_headers)
+        contents = open(mafFile).read()
+        for chunkBytes in [1, 100, 1000, 1 << 20]:
+            chunks = mafval.chunkBoundaries(mafFile, chunkBytes)
+            self.assertEqual(chunks[0][0], 0)
+            self.assertEqual(chunks[-1][1], len(contents))
+            for (start, stop), (nextStart, nextStop) in zip(chunks, chunks[1:]):
+                self.assertEqual(stop, nextStart)
+                self.assertTrue(contents[nextStart - 2:nextStart + 1] == '\n\na')
+            if chunkBytes == 1:
+                self.assertTrue(len(chunks) >= 50)
+        mtt.removeDir(tmpDir)
+    def testSameAsSerial(self):
+        """ mafValidator --processes should raise exactly the errors, line numbers included, that it does without
+        """
+        tmpDir = mtt.makeTempDir('sameAsSerial')
+        customOpts = GenericObject()
+        customOpts.testChromNames = True
+        for g in mafMutants():
+            mafFile, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')), g, g_headers)
+            for duplicates, sequence in [(True, False), (False, True)]:
+                customOpts.lookForDuplicateColumns = duplicates
+                customOpts.validateSequence = sequence
+                self.assertEqual(validationOutcome(mafFile, customOpts, 3), validationOutcome(mafFile, customOpts, 1))
+        mtt.removeDir(tmpDir)
+    def testTrackerMerges(self):
+        """ trackers filled by two halves of the rows should conflict exactly when the second half fails after the first
+        """
+        rng = random.Random(13)
+        for trial in xrange(0, 200):
+            totalSrcLength = rng.choice([20, 100])
+            rows = []
+            for i in xrange(0, 6):
+                start = rng.randint(0, totalSrcLength - 1)
+                stop = rng.randint(start + 1, totalSrcLength)
+                rows.append((start, ''.join(rng.choice('ACN') for p in xrange(start, stop))))
+            first, second, serial = [mafval.SequenceTracker(totalSrcLength) for i in xrange(0, 3)]
+            columns, secondColumns = mafval.ColumnTracker(totalSrcLength), mafval.ColumnTracker(totalSrcLength)
+            for t in [first, second, serial]:
+                t.pageLength = 16
+            for t in [columns, secondColumns]:
+                t.pageBits = 16
+            for start, seq in rows[:3]:
+                if first.compareAndSet(start, seq) is not None:
+                    break
+                serial.compareAndSet(start, seq)
+                columns.testAndSet(start, start + len(seq))
+            else:
+                if any(second.compareAndSet(start, seq) is not None for start, seq in rows[3:]):
+                    continue
+                serialFails = any(serial.compareAndSet(start, seq) is not None for start, seq in rows[3:])
+                self.assertEqual(first.conflicts(second), serialFails)
+                if not serialFails:
+                    first.update(second)
+                    for p in xrange(0, totalSrcLength):
+                        self.assertEqual(first.compareAndSet(p, 'N'), serial.compareAndSet(p, 'N'))
+                if not any(secondColumns.testAndSet(start, start + len(seq)) for start, seq in rows[3:]):
+                    conflicts = columns.conflicts(secondColumns)
+                    serialDuplicates = any(columns.testAndSet(start, start + len(seq)) for start, seq in rows[3:])
+                    self.assertEqual(conflicts, serialDuplicates)
+class CompiledLineChecks(unittest.TestCase):
+    lines = ['s hg16.chr7    27707221 13 + 158545518 gcagctgaaaaca',
+             's mm4.chr6 0 6 - 151104725 A-CA-GCT',
+             'e mm4.chr6     53310102 13 + 151104725 I',
+             'i panTro1.chr6 N 0 C 0',
+             'i panTro1.chr6 I 234 n 19',
+             'q panTro1.chr6 99999999999-99F',
+             'a score=23262.0 pass=2',
+             ]
+    fieldValues = ['0', '-1', '+3', '13', 'x', '1e3', '99999999999999999999', '-', '+', '--', 'F', 'I',
+                   'C', 'N', 'n', 'M', 'T', 's', 'q', 'a=b', 'a==b', 'hg16.chr7', 'panTro1.chr6', 'AC-GT']
+    def setUp(self):
+        if mafval.g_lineChecks is None:
+            self.skipTest('the compiled line checks are not built')
+    def mutants(self, rng):
+        for line in self.lines:
+            yield line
+            for i in xrange(0, 300):
+                d = line.split()
+                for j in xrange(0, rng.randint(1, 2)):
+                    k = rng.randint(0, len(d) - 1)
+                    kind = rng.random()
+                    if kind < 0.7:
+                        d[k] = rng.choice(self.fieldValues)
+                    elif kind < 0.8:
+                        del d[k]
+                    elif kind < 0.9:
+                        d.insert(k, rng.choice(self.fieldValues))
+                    else:
+                        d[k] = d[k][:-1]
+                d = [x for x in d if x != '']
+                yield rng.choice([' ', '\t', '  ']).join(d)
+    def passes(self, f, *args):
+        try:
+            f(*args)
+        except mafval.ValidatorError:
+            return False
+        except (ValueError, IndexError):
+            return False
+        return True
+    def testSameAsPython(self):
+        """ the compiled line checks should pass exactly the lines that the python checks pass
+        """
+        rng = random.Random(17)
+        prevlines = ['s panTro1.chr6 28869787 13 + 161576975 gcagctgaaaaca', 's hg16.chr7 0 1 + 2 A',
+                     'a score=0', '# comment', 's']
+        checks = mafval.g_lineChecks
+        for line in self.mutants(rng):
+            prevline = rng.choice(prevlines)
+            data = checks.splitSeqLine(line)
+            python = self.passes(mafval.validateSeqLineFields, line.split(), 1, line, 'test.maf')
+            if data is not None or '99999999999999999999' not in line:
+                self.assertEqual(data is not None, python)
+            if data is not None:
+                self.assertEqual(data, line.split())
+            mafval.g_lineChecks = None
+            try:
+                expected = [self.passes(mafval.validateILine, 1, line, prevline, 'test.maf'),
+                            self.passes(mafval.validateELine, 1, line, 'test.maf'),
+                            self.passes(mafval.validateQLine, 1, line, prevline, 'test.maf'),
+                            self.passes(mafval.validateKeyValuePairLine, 1, line, 'test.maf')]
+            finally:
+                mafval.g_lineChecks = checks
+            compiled = [checks.checkILine(line, prevline), checks.checkELine(line),
+                        checks.checkQLine(line, prevline), checks.checkKeyValuePairLine(line)]
+            if '99999999999999999999' in line:
+                # too long for the compiled checks, which leave such lines to python
+                self.assertTrue(all(e or not c for e, c in zip(expected, compiled)))
+            else:
+                self.assertEqual(compiled, expected)
+    def testSameErrors(self):
+        """ mafValidator should raise the same errors with the compiled line checks as without
+        """
+        tmpDir = mtt.makeTempDir('compiledLineChecks')
+        checks = mafval.g_lineChecks
+        for g in mafMutants():
+            mafFile, header = mtt.testFile(os.path.abspath(os.path.join(tmpDir, 'test.maf')), g, g_headers)
+            outcomes = []
+            for lineChecks in [checks, None]:
+                mafval.g_lineChecks = lineChecks
+                try:
+                    outcomes.append(validationOutcome(mafFile, options))
+                finally:
+                    mafval.g_lineChecks = checks
+            self.assertEqual(outcomes[0], outcomes[1])
+        mtt.removeDir(tmpDir)
+class CheckpointChecks(unittest.TestCase):
+    names = ['hg19.chr1', 'mm9.chr2', 'rn4.chr3', 'hg19.chr1']
+    def setUp(self):
+        self.tmpDir = mtt.makeTempDir('checkpoints')
+        self.mafFile = os.path.abspath(os.path.join(self.tmpDir, 'test.maf'))
+        self.checkpoint = os.path.abspath(os.path.join(self.tmpDir, 'test.checkpoint'))
+        self.opts = GenericObject()
+        self.opts.lookForDuplicateColumns = True
+        self.opts.testChromNames = True
+        self.opts.validateSequence = False
+        self.opts.checkpoint = self.checkpoint
+        self.minChunkBytes = mafval.g_minChunkBytes
+        mafval.g_minChunkBytes = 1
+        self.validateHeader = mafval.validateHeader
+        self.headersValidated = 0
+        def countingValidateHeader(f, filename):
+            self.headersValidated += 1
+            return self.validateHeader(f, filename)
+        mafval.validateHeader = countingValidateHeader
+    def tearDown(self):
+        mafval.g_minChunkBytes = self.minChunkBytes
+        mafval.validateHeader = self.validateHeader
+        mtt.removeDir(self.tmpDir)
+    def blocks(self, seed):
+        return mtt.randomMafBody(30, self.names, seed=seed).split('\n\n')[:-1]
+    def append(self, blocks):
+        f = open(self.mafFile, 'a')
+        f.write('\n\n'.join(blocks) + '\n\n')
+        f.close()
+    def testResume(self):
+        """ mafValidator --checkpoint should validate only what was appended, and find the errors it would otherwise
+        """
+        for sequence in [False, True]:
+            self.opts.lookForDuplicateColumns = not sequence
+            self.opts.validateSequence = sequence
+            for processes in [1, 3]:
+                blocks = self.blocks(processes)
+                for i, mutant in enumerate(mafMutants()):
+                    if os.path.exists(self.checkpoint):
+                        os.remove(self.checkpoint)
+                    mtt.testFile(self.mafFile, '', g_headers)
+                    self.append(blocks[:10])
+                    self.assertTrue(mafval.validateMaf(self.mafFile, self.opts))
+                    self.headersValidated = 0
+                    for b in blocks[10:20]:
+                        self.append([b])
+                        self.assertTrue(mafval.validateMaf(self.mafFile, self.opts))
+                    self.assertEqual(self.headersValidated, 0)
+                    # the mutants clash with the blocks they were made from, and so with blocks
+                    f = open(self.mafFile, 'a')
+                    f.write(mutant)
+                    f.close()
+                    expected = validationOutcome(self.mafFile, self.opts, processes)
+                    checkpoint = self.opts.checkpoint
+                    self.opts.checkpoint = None
+                    self.assertEqual(expected, validationOutcome(self.mafFile, self.opts))
+                    self.opts.checkpoint = checkpoint
+                    if i == 4:
+                        break
+    def testFreshStarts(self):
+        """ mafValidator --checkpoint should validate the whole maf if it was rewritten, the options changed or the checkpoint is unreadable
+        """
+        blocks = self.blocks(3)
+        mtt.testFile(self.mafFile, '', g_headers)
+        self.append(blocks[:10])
+        self.assertTrue(mafval.validateMaf(self.mafFile, self.opts))
+        self.opts.validateSequence = True
+        self.headersValidated = 0
+        self.assertTrue(mafval.validateMaf(self.mafFile, self.opts))
+        self.assertEqual(self.headersValidated, 1)
+        f = open(self.checkpoint, 'w')
+        f.write('garbage')
+        f.close()
+        self.assertTrue(mafval.validateMaf(self.mafFile, self.opts))
+        self.assertEqual(self.headersValidated, 2)
+        # the same length, but a different maf
+        contents = open(self.mafFile).read()
+        f = open(self.mafFile, 'w')
+        f.write(contents.replace('a score=', 'a score+', 1))
+        f.close()
+        self.assertRaises(mafval.KeyValuePairError, mafval.validateMaf, self.mafFile, self.opts)
+    def testNoCheckpointAfterErrors(self):
+        """ mafValidator --checkpoint should not save a checkpoint for an invalid maf, or one not ending in a new line
+        """
+        mtt.testFile(self.mafFile, FooterCheck.badFooters[1], g_headers)
+        self.assertRaises(mafval.FooterError, mafval.validateMaf, self.mafFile, self.opts)
+        self.assertFalse(os.path.exists(self.checkpoint))
+        self.opts.testChromNames = False
+        unterminated = [g for g in g_goodMafs if not g.endswith('\n')]
+        self.assertTrue(unterminated)
+        mtt.testFile(self.mafFile, unterminated[0], g_headers)
+        self.assertTrue(mafval.validateMaf(self.mafFile, self.opts))
+        self.assertFalse(os.path.exists(self.checkpoint))
 
 if __name__ == '__main__':
     unittest.main()